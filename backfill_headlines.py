@@ -0,0 +1,32 @@
+"""
+Remplit les champs parsés du headline (titre, entreprise, séniorité) des réactions existantes
+À lancer une fois après une mise à jour du parseur de headline (utils.headline_parser) :
+en attendant, les pages et le scoring reparsent le headline des réactions non remplies
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.database import init_db, backfill_headline_fields
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remplit les champs parsés du headline des réactions existantes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Réactions mises à jour par requête')
+    args = parser.parse_args()
+
+    init_db()
+
+    updated = backfill_headline_fields(batch_size=args.batch_size)
+    print(f"✓ {updated} réaction(s) mise(s) à jour")
+
+
+if __name__ == "__main__":
+    main()
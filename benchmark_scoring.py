@@ -0,0 +1,101 @@
+"""
+Benchmark du scoring par règles : version unitaire (calculate_prospect_score)
+vs version vectorisée (score_prospects_batch)
+Vérifie aussi que les deux versions retournent exactement les mêmes scores
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent))
+
+import pandas as pd
+
+from utils.intelligent_scoring import calculate_prospect_score
+from utils.batch_scoring import score_prospects_batch, batch_scores_to_dicts
+
+JOB_TITLES = [
+    'CEO', 'CTO', 'Head of Marketing', 'VP Sales', 'Directeur Commercial',
+    'Growth Manager', 'Fondateur', 'Responsable Marketing', 'Data Analyst',
+    'Business Developer', 'Chief Revenue Officer', 'Office Manager'
+]
+COMPANIES = [
+    'Acme SaaS', 'Datalab', 'Groupe Horizon', 'Startup Factory', 'PME Conseil',
+    'TechCorp', 'Agence Lumière', 'Cloudify', 'Retail Group', 'Fintech Labs'
+]
+LOCATIONS = ['Paris, France', 'Lyon, France', 'Bruxelles, Belgique', 'France', 'Genève, Suisse', '']
+REACTION_TYPES = ['LIKE', 'PRAISE', 'EMPATHY', 'COMMENT', 'REPOST', 'INTEREST']
+
+BENCHMARK_PROFILE = {
+    'target_persona': {
+        'job_titles': ['CEO', 'Head of Marketing', 'Directeur Commercial', 'Growth Manager'],
+        'company_types': ['SaaS', 'Startup'],
+        'industries': ['Tech', 'Fintech', 'Data'],
+        'company_size': 'Startup (10-50)',
+        'geographic_location': 'France'
+    }
+}
+
+
+def generate_prospects(count: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Génère un jeu de prospects synthétiques
+
+    Args:
+        count: Nombre de prospects
+        seed: Graine aléatoire
+
+    Returns:
+        DataFrame de prospects (headline, reaction_type, location)
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        separator = rng.choice([' chez ', ' at ', ' @ ', ' | '])
+        rows.append({
+            'headline': f"{rng.choice(JOB_TITLES)}{separator}{rng.choice(COMPANIES)}",
+            'reaction_type': rng.choice(REACTION_TYPES),
+            'location': rng.choice(LOCATIONS)
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du scoring par règles (unitaire vs vectorisé)')
+    parser.add_argument('--count', type=int, default=100_000, help='Nombre de prospects (défaut: 100000)')
+    parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire')
+    parser.add_argument('--skip-check', action='store_true', help='Ne pas comparer les scores ligne à ligne')
+    args = parser.parse_args()
+
+    prospects = generate_prospects(args.count, args.seed)
+    records = prospects.to_dict('records')
+
+    print(f"Benchmark sur {args.count} prospect(s)")
+
+    start = time.perf_counter()
+    unit_results = [calculate_prospect_score(record, BENCHMARK_PROFILE) for record in records]
+    unit_duration = time.perf_counter() - start
+    print(f"  calculate_prospect_score (boucle): {unit_duration:.2f}s")
+
+    start = time.perf_counter()
+    batch_scores = score_prospects_batch(prospects, BENCHMARK_PROFILE)
+    batch_duration = time.perf_counter() - start
+    print(f"  score_prospects_batch (vectorisé): {batch_duration:.2f}s")
+
+    if batch_duration > 0:
+        print(f"  Accélération: x{unit_duration / batch_duration:.1f}")
+
+    if not args.skip_check:
+        batch_results = batch_scores_to_dicts(batch_scores)
+        mismatches = sum(1 for unit, batch in zip(unit_results, batch_results) if unit != batch)
+        if mismatches:
+            print(f"✗ {mismatches} score(s) différent(s) entre les deux versions")
+            sys.exit(1)
+        print("✓ Scores identiques entre les deux versions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,19 @@
 """
 Script pour exécuter automatiquement les radars LinkedIn configurés
-Permet de lancer tous les radars activés pour un client donné
+Permet de lancer tous les radars activés pour un client donné, via la file de tâches
 """
 import logging
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Ajouter le répertoire parent au path
 sys.path.append(str(Path(__file__).parent))
 
 from utils.database import (
-    get_client, get_enabled_radars, update_radar_last_run,
-    save_reaction, init_db
+    get_client, get_enabled_radars, get_task, init_db, get_radar_run, get_resumable_radar_runs
 )
-from utils.radar_manager import process_radar
+from utils.task_queue import enqueue_radar_run, run_worker, PRIORITY_SCHEDULED
 
 # Configuration du logging
 logging.basicConfig(
@@ -28,12 +27,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def process_all_radars(client_id: int) -> Dict[str, Any]:
+def process_all_radars(client_id: int, wait: bool = True, concurrency: int = 1) -> Dict[str, Any]:
     """
     Traite tous les radars activés pour un client
     
+    Les exécutions passent par la file de tâches (file équitable entre clients, limite globale
+    d'exécutions simultanées) ; avec wait, ce script les exécute lui-même comme un worker.
+    
     Args:
         client_id: ID du client
+        wait: Exécute la file dans ce processus et attend la fin des exécutions
+        concurrency: Nombre de radars exécutés en parallèle par ce processus
     
     Returns:
         Dict contenant les statistiques d'exécution
@@ -74,68 +78,36 @@ def process_all_radars(client_id: int) -> Dict[str, Any]:
         'errors': []
     }
     
-    # Traiter chaque radar
+    # Ajouter chaque radar à la file (même priorité que les exécutions planifiées)
+    task_ids = {}
+    for radar in radars:
+        task_id = enqueue_radar_run(radar['id'], priority=PRIORITY_SCHEDULED)
+        if task_id:
+            task_ids[radar['id']] = task_id
+    
+    if not wait:
+        logger.info(f"{len(task_ids)} exécution(s) ajoutée(s) à la file, exécutées par les workers (radar_worker.py)")
+        stats['success'] = True
+        stats['task_ids'] = list(task_ids.values())
+        return stats
+    
+    run_worker(concurrency=concurrency, once=True)
+    
     for radar in radars:
         radar_name = radar.get('name', 'Unknown')
-        radar_type = radar.get('radar_type', 'Unknown')
-        radar_id = radar.get('id')
+        task = get_task(task_ids[radar['id']]) if radar['id'] in task_ids else None
         
-        logger.info("-" * 60)
-        logger.info(f"Traitement du radar: {radar_name} (Type: {radar_type})")
-        logger.info("-" * 60)
-        
-        try:
-            # Traiter le radar
-            reactions = process_radar(radar)
-            
-            if reactions:
-                # Sauvegarder les réactions
-                saved_count = 0
-                for reaction in reactions:
-                    try:
-                        # Adapter les données pour save_reaction
-                        reaction_data = {
-                            'company_name': reaction.get('company_name') or reaction.get('keyword') or '',
-                            'post_url': reaction.get('post_url', ''),
-                            'post_date': reaction.get('post_date', ''),
-                            'reactor_name': reaction.get('reactor_name', ''),
-                            'reactor_urn': reaction.get('reactor_urn', ''),
-                            'profile_url': reaction.get('profile_url', ''),
-                            'reaction_type': reaction.get('reaction_type', ''),
-                            'headline': reaction.get('headline', ''),
-                            'profile_picture_url': reaction.get('profile_picture_url', ''),
-                            'post_relevant': False,
-                            'prospect_relevant': False,
-                            'relevance_score': 0.0,
-                            'relevance_reasoning': '',
-                            'personalized_message': ''
-                        }
-                        save_reaction(client_id, reaction_data)
-                        saved_count += 1
-                    except Exception as e:
-                        error_msg = f"Erreur lors de la sauvegarde d'une réaction: {e}"
-                        logger.warning(error_msg)
-                        stats['errors'].append(error_msg)
-                
-                # Mettre à jour la date de dernière exécution
-                update_radar_last_run(radar_id)
-                
-                stats['processed_radars'] += 1
-                stats['successful_radars'] += 1
-                stats['total_reactions'] += saved_count
-                
-                logger.info(f"✓ Radar '{radar_name}' traité avec succès")
-                logger.info(f"  {saved_count} réaction(s) collectée(s)")
-            else:
-                # Mettre à jour quand même la date de dernière exécution
-                update_radar_last_run(radar_id)
-                stats['processed_radars'] += 1
-                stats['successful_radars'] += 1
-                logger.info(f"✓ Radar '{radar_name}' traité (aucune réaction trouvée)")
-                
-        except Exception as e:
-            error_msg = f"Erreur lors du traitement du radar '{radar_name}': {e}"
-            logger.error(error_msg, exc_info=True)
+        if task and task['status'] == 'done':
+            saved_count = (task.get('result') or {}).get('saved', 0)
+            stats['processed_radars'] += 1
+            stats['successful_radars'] += 1
+            stats['total_reactions'] += saved_count
+            logger.info(f"✓ Radar '{radar_name}' traité avec succès: {saved_count} réaction(s) collectée(s)")
+        elif task and task['status'] in ('queued', 'running'):
+            logger.info(f"Radar '{radar_name}': exécution toujours {'en cours' if task['status'] == 'running' else 'en attente'} (tâche #{task['id']})")
+        else:
+            error_msg = f"Erreur lors du traitement du radar '{radar_name}': {(task or {}).get('error_message') or 'non ajouté à la file'}"
+            logger.error(error_msg.splitlines()[0])
             stats['processed_radars'] += 1
             stats['failed_radars'] += 1
             stats['errors'].append(error_msg)
@@ -154,6 +126,46 @@ def process_all_radars(client_id: int) -> Dict[str, Any]:
     return stats
 
 
+def resume_run(run_id: int, wait: bool = True, concurrency: int = 1) -> Optional[int]:
+    """
+    Reprend une exécution de radar interrompue depuis sa dernière étape terminée
+
+    Args:
+        run_id: ID de l'exécution interrompue
+        wait: Exécute la file avant de rendre la main (sinon exécutée par radar_worker.py)
+        concurrency: Nombre d'exécutions en parallèle
+
+    Returns:
+        ID de la tâche de reprise, ou None si l'exécution n'est pas reprenable
+    """
+    run = get_radar_run(run_id)
+    if not run:
+        logger.error(f"Exécution #{run_id} introuvable")
+        return None
+    if not run['resumable']:
+        logger.error(f"Exécution #{run_id} non reprenable (statut: {run['status']})")
+        return None
+
+    task_id = enqueue_radar_run(run['radar_id'], scheduled=run['trigger'] == 'scheduled', resume_run_id=run_id)
+    if task_id and wait:
+        run_worker(concurrency=concurrency, once=True)
+        task = get_task(task_id)
+        logger.info(f"Reprise de l'exécution #{run_id}: tâche #{task_id} {task['status'] if task else 'introuvable'}")
+    return task_id
+
+
+def list_resumable_runs(client_id: Optional[int] = None):
+    """Affiche les exécutions interrompues qui peuvent être reprises"""
+    runs = get_resumable_radar_runs(client_id)
+    if not runs:
+        logger.info("Aucune exécution à reprendre")
+        return
+    for run in runs:
+        logger.info(f"  #{run['id']} radar '{run.get('radar_name') or run['radar_id']}' "
+                    f"({run['status']}, démarrée le {run['started_at']})"
+                    f"{': ' + run['error_message'].splitlines()[0] if run.get('error_message') else ''}")
+
+
 def main():
     """Fonction principale"""
     import argparse
@@ -163,23 +175,40 @@ def main():
                        help='ID du client (défaut: 1)')
     parser.add_argument('--all-clients', action='store_true',
                        help='Exécute les radars pour tous les clients')
+    parser.add_argument('--enqueue-only', action='store_true',
+                       help='Ajoute les radars à la file sans les exécuter (exécutés par radar_worker.py)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                       help='Nombre de radars exécutés en parallèle (défaut: 1)')
+    parser.add_argument('--resume', type=int, metavar='RUN_ID',
+                       help='Reprend une exécution interrompue depuis sa dernière étape terminée')
+    parser.add_argument('--list-resumable', action='store_true',
+                       help='Liste les exécutions interrompues qui peuvent être reprises')
     
     args = parser.parse_args()
     
     # Initialiser la base de données
     init_db()
     
-    if args.all_clients:
+    if args.list_resumable:
+        list_resumable_runs(None if args.all_clients else args.client_id)
+    elif args.resume:
+        resume_run(args.resume, wait=not args.enqueue_only, concurrency=args.concurrency)
+    elif args.all_clients:
         # Traiter tous les clients
         from utils.database import get_all_clients
         clients = get_all_clients()
         
+        # Tous les radars sont mis en file avant l'exécution : la file équitable alterne entre clients
         for client in clients:
             logger.info(f"\n{'='*60}\n")
-            process_all_radars(client['id'])
+            process_all_radars(client['id'], wait=False)
+        
+        if not args.enqueue_only:
+            processed = run_worker(concurrency=args.concurrency, once=True)
+            logger.info(f"{processed} exécution(s) de radar terminée(s) pour {len(clients)} client(s)")
     else:
         # Traiter un seul client
-        process_all_radars(args.client_id)
+        process_all_radars(args.client_id, wait=not args.enqueue_only, concurrency=args.concurrency)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 """
 Script pour exécuter automatiquement les radars LinkedIn planifiés
-Utilise APScheduler pour exécuter les radars selon leur configuration de scheduling
+Utilise APScheduler pour déclencher les radars selon leur configuration de scheduling :
+les exécutions sont ajoutées à la file de tâches et faites par les workers (radar_worker.py)
 """
 import logging
 import signal
@@ -14,9 +15,12 @@ sys.path.append(str(Path(__file__).parent))
 from utils.database import init_db, get_client
 from utils.radar_scheduler import (
     start_scheduler, stop_scheduler, schedule_all_radars,
-    get_scheduler_status
+    get_scheduler_status, refresh_scheduler
 )
 
+# Intervalle de relecture des jobs persistés (modifiés depuis la page Radars)
+REFRESH_INTERVAL_SECONDS = 60
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -49,6 +53,11 @@ def main():
         default=None,
         help='ID du client (tous les clients si non spécifié)'
     )
+    parser.add_argument(
+        '--replan',
+        action='store_true',
+        help='Recalcule la phase de tous les radars planifiés (étalement des démarrages)'
+    )
     parser.add_argument(
         '--run-once',
         action='store_true',
@@ -76,10 +85,10 @@ def main():
             logger.error(f"Client {args.client_id} introuvable")
             return
         logger.info(f"Planification des radars pour le client: {client['name']}")
-        schedule_all_radars(args.client_id)
+        schedule_all_radars(args.client_id, replan=args.replan)
     else:
         logger.info("Planification de tous les radars")
-        schedule_all_radars()
+        schedule_all_radars(replan=args.replan)
     
     # Vérifier le statut
     status = get_scheduler_status()
@@ -94,21 +103,25 @@ def main():
         logger.info("Mode exécution unique activé")
         from utils.radar_scheduler import run_scheduled_radars
         run_scheduled_radars()
-        logger.info("Exécution terminée")
+        logger.info("Radars dus ajoutés à la file de tâches")
     else:
         # Mode continu avec scheduler
         # Démarrer le scheduler
         if start_scheduler():
-            logger.info("Scheduler démarré avec succès")
+            logger.info("Scheduler démarré avec succès (les jobs sont déclenchés par le processus leader)")
             logger.info("Appuyez sur Ctrl+C pour arrêter")
             
             try:
                 # Maintenir le script en vie
+                elapsed = 0
                 while True:
                     time.sleep(1)
-                    # Vérifier périodiquement que le scheduler tourne toujours
+                    elapsed += 1
+                    if elapsed % REFRESH_INTERVAL_SECONDS == 0:
+                        refresh_scheduler()
+                    # Vérifier périodiquement que le scheduler tourne toujours (leader ou en attente)
                     status = get_scheduler_status()
-                    if not status.get('running', False):
+                    if not status.get('running', False) and not status.get('standby', False):
                         logger.error("Le scheduler s'est arrêté de manière inattendue")
                         break
             except KeyboardInterrupt:
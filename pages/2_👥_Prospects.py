@@ -16,6 +16,11 @@ from utils.export_manager import export_to_csv, export_to_excel
 from utils.session import render_client_selector
 from utils.database import get_client, get_client_profile_as_dict, delete_reaction, delete_reactions_batch, save_reaction
 from utils.intelligent_scoring import recalculate_prospect_scoring
+from utils.bulk_rescoring import (
+    start_rescoring, run_in_background, cancel_rescoring_job, is_running_in_process, RESCORING_MODES
+)
+from utils.database import get_rescoring_job, get_rescoring_jobs, count_stale_reactions, get_persona_version
+from utils.headline_parser import SENIORITY_LABELS
 from utils.styles import render_page_header, render_metric_card
 from utils.radar_manager import get_profile_detail, extract_username_from_url
 
@@ -123,6 +128,82 @@ with col5:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
+# ========== RECALCUL EN MASSE ==========
+RESCORING_STATUS_LABELS = {
+    'pending': '⏳ En attente',
+    'running': '🔄 En cours',
+    'completed': '✅ Terminé',
+    'failed': '❌ Échec',
+    'cancelled': '⏹️ Annulé'
+}
+
+stale_count = count_stale_reactions(client_id)
+
+with st.expander(f"🔁 Recalcul en masse du scoring (après modification du persona)"
+                 f"{f' - {stale_count} score(s) obsolète(s)' if stale_count else ''}"):
+    if stale_count:
+        st.info(f"ℹ️ {stale_count} prospect(s) ont été scorés avec une version antérieure du persona "
+                f"(version actuelle: {get_persona_version(client_id)}). Ils sont recalculés progressivement "
+                f"en arrière-plan, ou immédiatement avec « Scores obsolètes uniquement ».")
+    col_scope, col_mode, col_threshold = st.columns(3)
+    with col_scope:
+        rescoring_scope = st.selectbox(
+            "Prospects à recalculer",
+            options=['stale', 'all', 'relevant', 'not_relevant'],
+            format_func=lambda scope: {'stale': 'Scores obsolètes uniquement', 'all': 'Tous',
+                                       'relevant': 'Qualifiés uniquement',
+                                       'not_relevant': 'Non qualifiés uniquement'}[scope],
+            key="rescoring_scope"
+        )
+    with col_mode:
+        rescoring_mode = st.selectbox(
+            "Mode de scoring",
+            options=list(RESCORING_MODES.keys()),
+            format_func=lambda mode: RESCORING_MODES[mode],
+            key="rescoring_mode"
+        )
+    with col_threshold:
+        rescoring_threshold = st.slider("Score minimum pour qualifier", 0.0, 1.0, 0.6, 0.05,
+                                        key="rescoring_threshold")
+    
+    if st.button("🚀 Lancer le recalcul", key="start_bulk_rescoring"):
+        rescoring_filters = {}
+        if rescoring_scope == 'stale':
+            rescoring_filters['stale_only'] = True
+        elif rescoring_scope == 'relevant':
+            rescoring_filters['only_relevant'] = True
+        elif rescoring_scope == 'not_relevant':
+            rescoring_filters['max_score'] = rescoring_threshold
+        job_id = start_rescoring(client_id, filters=rescoring_filters, scoring_mode=rescoring_mode,
+                                 score_threshold=rescoring_threshold, background=True)
+        st.success(f"✅ Recalcul #{job_id} lancé en arrière-plan")
+    
+    rescoring_jobs = get_rescoring_jobs(client_id, limit=5)
+    if rescoring_jobs:
+        st.markdown("**Derniers recalculs**")
+        for job in rescoring_jobs:
+            total_to_score = job.get('total') or 0
+            col_job, col_job_action = st.columns([4, 1])
+            with col_job:
+                st.progress(min(job['processed'] / total_to_score, 1.0) if total_to_score else
+                            (1.0 if job['status'] == 'completed' else 0.0),
+                            text=f"#{job['id']} {RESCORING_STATUS_LABELS.get(job['status'], job['status'])} - "
+                                 f"{job['processed']}/{total_to_score} ({job['errors']} erreur(s))")
+            with col_job_action:
+                if job['status'] in ('pending', 'running') and is_running_in_process(job['id']):
+                    if st.button("⏹️ Arrêter", key=f"cancel_rescoring_{job['id']}"):
+                        cancel_rescoring_job(job['id'])
+                        st.rerun()
+                elif job['status'] != 'completed':
+                    if st.button("▶️ Reprendre", key=f"resume_rescoring_{job['id']}"):
+                        run_in_background(job['id'])
+                        st.rerun()
+        if st.button("🔄 Actualiser", key="refresh_rescoring_jobs"):
+            load_data.clear()
+            st.rerun()
+
+st.markdown("<br>", unsafe_allow_html=True)
+
 # ========== CONTROLES DE SÉLECTION ET ACTIONS ==========
 st.markdown("### 📋 Actions en masse")
 
@@ -150,44 +231,38 @@ with col_sel3:
             if not company_profile:
                 st.error("❌ Profil entreprise non trouvé. Configurez d'abord le persona.")
             else:
-                selected_prospects_data = []
+                selected_reaction_ids = []
                 for idx, row in filtered_df.iterrows():
                     prospect_key = f"{row.get('reactor_urn', '')}_{row.get('post_url', '')}"
-                    if prospect_key in st.session_state.selected_prospects:
-                        selected_prospects_data.append(row)
+                    if prospect_key in st.session_state.selected_prospects and pd.notna(row.get('id')):
+                        selected_reaction_ids.append(int(row['id']))
                 
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-                success_count = 0
-                error_count = 0
                 
-                for idx, prospect in enumerate(selected_prospects_data):
-                    progress = (idx + 1) / len(selected_prospects_data)
-                    progress_bar.progress(progress)
-                    status_text.text(f"Traitement {idx + 1}/{len(selected_prospects_data)}: {prospect.get('reactor_name', 'Unknown')}")
-                    
-                    try:
-                        result = recalculate_prospect_scoring(
-                            client_id,
-                            prospect.get('reactor_urn', ''),
-                            prospect.get('post_url', ''),
-                            company_profile
-                        )
-                        if result:
-                            success_count += 1
-                        else:
-                            error_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        logger.error(f"Erreur recalcul prospect {prospect.get('reactor_name')}: {e}")
+                def show_progress(job):
+                    total_to_score = job.get('total') or 1
+                    progress_bar.progress(min(job['processed'] / total_to_score, 1.0))
+                    status_text.text(f"Traitement {job['processed']}/{job['total']}")
+                
+                # Recalcul en masse : lecture par blocs, IA en parallèle, écriture groupée
+                job_id = start_rescoring(
+                    client_id,
+                    filters={'reaction_ids': selected_reaction_ids},
+                    progress_callback=show_progress
+                )
+                job = get_rescoring_job(job_id)
                 
                 progress_bar.empty()
                 status_text.empty()
                 
+                success_count = job['processed'] - job['errors']
                 if success_count > 0:
                     st.success(f"✅ {success_count} prospect(s) recalculé(s) avec succès!")
-                if error_count > 0:
-                    st.warning(f"⚠️ {error_count} erreur(s) lors du recalcul")
+                if job['errors'] > 0:
+                    st.warning(f"⚠️ {job['errors']} erreur(s) lors du recalcul")
+                if job['status'] == 'failed':
+                    st.error(f"❌ Recalcul interrompu: {job.get('error_message')} (reprise possible depuis « Recalcul en masse »)")
                 
                 load_data.clear()
                 st.rerun()
@@ -401,7 +476,7 @@ st.markdown("### 📊 Liste des Prospects")
 
 # Préparer les données pour la page actuelle
 paginated_df = filtered_df.iloc[start_idx:end_idx].copy()
-display_cols = ['reactor_name', 'headline', 'detected_company', 'company_name',
+display_cols = ['reactor_name', 'headline', 'detected_company', 'seniority', 'company_name',
                 'reaction_type', 'relevance_score', 'prospect_relevant',
                 'personalized_message', 'profile_url', 'post_date']
 available_cols = [col for col in display_cols if col in filtered_df.columns]
@@ -415,6 +490,8 @@ if not display_df.empty:
         display_df['prospect_relevant'] = display_df['prospect_relevant'].map({True: '✓', False: '✗'})
     if 'relevance_score' in display_df.columns:
         display_df['relevance_score'] = display_df['relevance_score'].round(2)
+    if 'seniority' in display_df.columns:
+        display_df['seniority'] = display_df['seniority'].map(SENIORITY_LABELS).fillna('')
     
     # Colonne de sélection
     def create_selection_column(idx):
@@ -431,6 +508,7 @@ col_names = {
     'reactor_name': 'Nom',
     'headline': 'Titre',
     'detected_company': 'Entreprise',
+    'seniority': 'Séniorité',
     'company_name': 'Concurrent',
     'reaction_type': 'Réaction',
     'relevance_score': 'Score',
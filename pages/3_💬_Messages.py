@@ -12,10 +12,12 @@ from utils.data_loader import load_all_reactions, get_prospects_with_messages
 from utils.session import render_client_selector
 from utils.database import (
     get_client, get_edited_messages, save_edited_message,
-    get_client_profile_as_dict, save_reaction, find_radar_by_identifier, get_radar_message_template
+    get_client_profile_as_dict, find_radar_by_identifier, get_radar_message_template, get_post
 )
 from utils.styles import render_page_header, render_metric_card, render_empty_state
-from utils.ai_analyzer import generate_message_for_prospect
+from utils.ai_analyzer import stream_message_for_prospect, clean_generated_message
+from utils.database import get_qualified_prospects_without_message, get_message_jobs, save_prospect_message
+from utils.message_generation import start_message_generation, cancel_message_job, is_running_in_process
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,6 +97,55 @@ with col3:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
+# Génération en masse (thread de fond, la page suit la progression sans bloquer)
+MESSAGE_JOB_STATUS_LABELS = {
+    'pending': "En attente",
+    'running': "En cours",
+    'completed': "Terminée",
+    'failed': "Échec",
+    'cancelled': "Annulée",
+}
+missing_messages_count = len(get_qualified_prospects_without_message(client_id))
+message_jobs = get_message_jobs(client_id, limit=3)
+running_message_job = next(
+    (job for job in message_jobs if job['status'] in ('pending', 'running') and is_running_in_process(job['id'])),
+    None
+)
+
+with st.expander(f"🤖 Génération en masse - {missing_messages_count} prospect(s) qualifié(s) sans message",
+                 expanded=running_message_job is not None):
+    if running_message_job:
+        total_to_generate = running_message_job.get('total') or 0
+        st.progress(
+            min(running_message_job['processed'] / total_to_generate, 1.0) if total_to_generate else 0.0,
+            text=f"{running_message_job['processed']}/{total_to_generate} message(s) - "
+                 f"{running_message_job['errors']} erreur(s)"
+        )
+        col_refresh, col_cancel = st.columns(2)
+        with col_refresh:
+            if st.button("🔄 Actualiser", key="refresh_message_job", use_container_width=True):
+                load_data.clear()
+                st.rerun()
+        with col_cancel:
+            if st.button("⏹️ Arrêter", key="cancel_message_job", use_container_width=True):
+                cancel_message_job(running_message_job['id'])
+                st.rerun()
+    else:
+        if message_jobs:
+            last_job = message_jobs[0]
+            st.caption(f"Dernière génération #{last_job['id']}: "
+                       f"{MESSAGE_JOB_STATUS_LABELS.get(last_job['status'], last_job['status'])} - "
+                       f"{last_job['processed'] - last_job['errors']}/{last_job['total']} message(s), "
+                       f"{last_job['errors']} erreur(s)")
+        if st.button("🤖 Générer pour tous les qualifiés sans message", type="primary",
+                     disabled=missing_messages_count == 0, key="start_message_job"):
+            if not get_client_profile_as_dict(client_id):
+                st.error("❌ Profil entreprise non trouvé. Configurez d'abord le persona.")
+            else:
+                job_id = start_message_generation(client_id)
+                st.success(f"✅ Génération #{job_id} lancée en arrière-plan")
+                st.rerun()
+
 # Liste des messages avec edition
 st.markdown("""
     <div class="data-card">
@@ -193,103 +244,91 @@ if selected_idx is not None and selected_idx < len(unique_prospects):
     col_gen1, col_gen2 = st.columns([3, 1])
     
     with col_gen2:
-        if st.button("🤖 Générer le message", type="primary", use_container_width=True):
-            company_profile = get_client_profile_as_dict(client_id)
-            if not company_profile:
-                st.error("❌ Profil entreprise non trouvé. Configurez d'abord le persona.")
+        generate_clicked = st.button("🤖 Générer le message", type="primary", use_container_width=True)
+    
+    if generate_clicked:
+        company_profile = get_client_profile_as_dict(client_id)
+        if not company_profile:
+            st.error("❌ Profil entreprise non trouvé. Configurez d'abord le persona.")
+        else:
+            # Préparer les données du prospect
+            prospect_data = {
+                'reactor_name': selected_prospect.get('reactor_name', ''),
+                'headline': selected_prospect.get('headline', ''),
+                'post_url': selected_prospect.get('post_url', ''),
+                'company_name': selected_prospect.get('company_name', ''),
+                'competitor_name': selected_prospect.get('company_name', ''),
+                'reaction_type': selected_prospect.get('reaction_type', ''),
+                'profile_url': selected_prospect.get('profile_url', ''),
+                'reactor_urn': reactor_urn,
+                # Contenu du post enregistré lors de la collecte du radar
+                'post_text': (get_post(selected_prospect.get('post_url', '')) or {}).get('post_text') or ''
+            }
+            
+            # Trouver le radar correspondant pour récupérer son message template
+            # Essayer d'abord avec company_name (pour competitor_last_post)
+            company_name = selected_prospect.get('company_name', '')
+            radar = find_radar_by_identifier(
+                client_id,
+                company_name=company_name,
+                keyword=None
+            )
+            
+            # Si pas trouvé, essayer avec keyword si disponible dans les données
+            if not radar and company_name:
+                # Pour les radars keyword_posts, le company_name peut contenir le keyword
+                radar = find_radar_by_identifier(
+                    client_id,
+                    company_name=None,
+                    keyword=company_name
+                )
+            
+            radar_message_template = None
+            if radar:
+                radar_id = radar.get('id')
+                radar_name = radar.get('name', 'Unknown')
+                radar_message_template = get_radar_message_template(radar_id)
+                if radar_message_template:
+                    logger.info(f"[DEBUG] Template de radar trouvé pour '{radar_name}' (ID: {radar_id}): {radar_message_template[:100]}...")
+                else:
+                    logger.info(f"[DEBUG] Radar '{radar_name}' trouvé mais aucun template configuré")
+            else:
+                logger.info(f"[DEBUG] Aucun radar trouvé pour company_name='{company_name}'. Utilisation du template général du profil entreprise.")
+            
+            # Générer le message en streaming (le texte s'affiche au fil des tokens)
+            try:
+                streamed_message = st.write_stream(stream_message_for_prospect(
+                    client_id,
+                    prospect_data,
+                    company_profile,
+                    radar_message_template=radar_message_template
+                ))
+                generated_message = clean_generated_message(streamed_message if isinstance(streamed_message, str) else '')
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération du message pour {prospect_data['reactor_name']}: {e}")
+                generated_message = None
+            
+            if generated_message:
+                # Enregistrer le message complet (réaction + message édité) en une transaction
+                save_prospect_message(client_id, reactor_urn, selected_prospect.get('post_url', ''), generated_message)
+                
+                # Stocker le message généré dans le session state pour l'afficher après rerun
+                st.session_state.just_generated_message = {
+                    'reactor_urn': reactor_urn,
+                    'message': generated_message
+                }
+                
+                # Préserver l'index du prospect sélectionné ET le reactor_urn
+                st.session_state.selected_prospect_idx = selected_idx
+                st.session_state.selected_reactor_urn = reactor_urn
+                
+                # Vider les caches pour recharger les données fraîches
+                load_data.clear()
+                load_edited_messages_cached.clear()
+                
+                st.rerun()
             else:
-                with st.spinner("Génération du message en cours..."):
-                    # Préparer les données du prospect
-                    prospect_data = {
-                        'reactor_name': selected_prospect.get('reactor_name', ''),
-                        'headline': selected_prospect.get('headline', ''),
-                        'post_url': selected_prospect.get('post_url', ''),
-                        'company_name': selected_prospect.get('company_name', ''),
-                        'competitor_name': selected_prospect.get('company_name', ''),
-                        'reaction_type': selected_prospect.get('reaction_type', ''),
-                        'profile_url': selected_prospect.get('profile_url', ''),
-                        'reactor_urn': reactor_urn
-                    }
-                    
-                    # Trouver le radar correspondant pour récupérer son message template
-                    # Essayer d'abord avec company_name (pour competitor_last_post)
-                    company_name = selected_prospect.get('company_name', '')
-                    radar = find_radar_by_identifier(
-                        client_id,
-                        company_name=company_name,
-                        keyword=None
-                    )
-                    
-                    # Si pas trouvé, essayer avec keyword si disponible dans les données
-                    if not radar and company_name:
-                        # Pour les radars keyword_posts, le company_name peut contenir le keyword
-                        radar = find_radar_by_identifier(
-                            client_id,
-                            company_name=None,
-                            keyword=company_name
-                        )
-                    
-                    radar_message_template = None
-                    if radar:
-                        radar_id = radar.get('id')
-                        radar_name = radar.get('name', 'Unknown')
-                        radar_message_template = get_radar_message_template(radar_id)
-                        if radar_message_template:
-                            logger.info(f"[DEBUG] Template de radar trouvé pour '{radar_name}' (ID: {radar_id}): {radar_message_template[:100]}...")
-                        else:
-                            logger.info(f"[DEBUG] Radar '{radar_name}' trouvé mais aucun template configuré")
-                    else:
-                        logger.info(f"[DEBUG] Aucun radar trouvé pour company_name='{company_name}'. Utilisation du template général du profil entreprise.")
-                    
-                    # Générer le message
-                    generated_message = generate_message_for_prospect(
-                        client_id,
-                        prospect_data,
-                        company_profile,
-                        radar_message_template=radar_message_template
-                    )
-                    
-                    if generated_message:
-                        # Mettre à jour le message dans la base de données
-                        reaction_data = {
-                            'company_name': selected_prospect.get('company_name', ''),
-                            'post_url': selected_prospect.get('post_url', ''),
-                            'post_date': str(selected_prospect.get('post_date', '')),
-                            'reactor_name': selected_prospect.get('reactor_name', ''),
-                            'reactor_urn': reactor_urn,
-                            'profile_url': selected_prospect.get('profile_url', ''),
-                            'reaction_type': selected_prospect.get('reaction_type', ''),
-                            'headline': selected_prospect.get('headline', ''),
-                            'profile_picture_url': selected_prospect.get('profile_picture_url', ''),
-                            'post_relevant': selected_prospect.get('post_relevant', False),
-                            'prospect_relevant': selected_prospect.get('prospect_relevant', False),
-                            'relevance_score': float(selected_prospect.get('relevance_score', 0.0)),
-                            'relevance_reasoning': selected_prospect.get('relevance_reasoning', ''),
-                            'personalized_message': generated_message
-                        }
-                        
-                        save_reaction(client_id, reaction_data)
-                        
-                        # Sauvegarder aussi dans les messages édités pour affichage immédiat
-                        save_edited_message(client_id, reactor_urn, generated_message)
-                        
-                        # Stocker le message généré dans le session state pour l'afficher après rerun
-                        st.session_state.just_generated_message = {
-                            'reactor_urn': reactor_urn,
-                            'message': generated_message
-                        }
-                        
-                        # Préserver l'index du prospect sélectionné ET le reactor_urn
-                        st.session_state.selected_prospect_idx = selected_idx
-                        st.session_state.selected_reactor_urn = reactor_urn
-                        
-                        # Vider les caches pour recharger les données fraîches
-                        load_data.clear()
-                        load_edited_messages_cached.clear()
-                        
-                        st.rerun()
-                    else:
-                        st.error("❌ Erreur lors de la génération du message. Vérifiez la configuration OpenAI.")
+                st.error("❌ Erreur lors de la génération du message. Vérifiez la configuration OpenAI.")
 
     # Editeur de message
     edited = st.text_area("Message personnalise", current_message, height=200, key=f"msg_{reactor_urn}")
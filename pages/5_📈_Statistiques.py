@@ -13,7 +13,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.auth import require_auth
 from utils.data_loader import load_all_reactions, get_stats
 from utils.session import render_client_selector
-from utils.database import get_client, get_reactions, get_radars
+from utils.database import get_client, get_reactions, get_radars, get_llm_cost_by_radar, get_llm_usage_by_purpose
 from utils.styles import render_page_header, render_metric_card, render_empty_state
 
 st.set_page_config(page_title="Statistiques | LeadFlow", page_icon="📈", layout="wide")
@@ -572,3 +572,66 @@ if 'company_name' in df.columns and 'prospect_relevant' in df.columns and not df
     st.dataframe(display_stats, use_container_width=True, hide_index=True)
 else:
     st.info("Aucune donnée disponible")
+
+# ============== COÛTS LLM ==============
+st.markdown("<br>", unsafe_allow_html=True)
+st.markdown("""
+    <div class="data-card">
+        <div class="data-card-header">
+            <div class="data-card-title">💰 Coûts LLM</div>
+        </div>
+    </div>
+""", unsafe_allow_html=True)
+
+cost_period = st.selectbox(
+    "Période",
+    options=[7, 30, 90, 0],
+    format_func=lambda days: f"{days} derniers jours" if days else "Depuis le début",
+    index=1,
+    key="llm_cost_period"
+)
+cost_since = (datetime.now() - timedelta(days=cost_period)).strftime('%Y-%m-%d %H:%M:%S') if cost_period else None
+
+radar_costs = pd.DataFrame(get_llm_cost_by_radar(client_id, since=cost_since))
+purpose_usage = pd.DataFrame(get_llm_usage_by_purpose(client_id, since=cost_since))
+
+if radar_costs.empty:
+    st.info("Aucun appel LLM enregistré sur la période")
+else:
+    total_cost = radar_costs['cost_usd'].sum()
+    total_qualified = radar_costs['qualified_prospects'].sum()
+    total_tokens = radar_costs['tokens'].sum()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Coût Total", f"${total_cost:.2f}")
+    with col2:
+        st.metric("Appels LLM", f"{int(radar_costs['calls'].sum()):,}")
+    with col3:
+        st.metric("Tokens", f"{int(total_tokens):,}")
+    with col4:
+        st.metric("Coût / Prospect Qualifié", f"${total_cost / total_qualified:.4f}" if total_qualified else "-")
+
+    st.markdown("#### Coût par Radar")
+    radar_costs['radar_name'] = radar_costs['radar_name'].fillna('Hors radar (messages, recalculs...)')
+    radar_costs['cost_per_qualified'] = radar_costs.apply(
+        lambda row: row['cost_usd'] / row['qualified_prospects'] if row['qualified_prospects'] else None,
+        axis=1
+    )
+    display_costs = radar_costs[['radar_name', 'calls', 'tokens', 'cost_usd', 'qualified_prospects', 'cost_per_qualified']].copy()
+    display_costs.columns = ['Radar', 'Appels', 'Tokens', 'Coût ($)', 'Qualifiés', 'Coût / Qualifié ($)']
+    display_costs['Coût ($)'] = display_costs['Coût ($)'].round(4)
+    display_costs['Coût / Qualifié ($)'] = display_costs['Coût / Qualifié ($)'].round(4)
+    st.dataframe(display_costs, use_container_width=True, hide_index=True)
+
+    if not purpose_usage.empty:
+        st.markdown("#### Détails par Usage")
+        display_usage = purpose_usage[['purpose', 'model', 'calls', 'errors', 'retries', 'prompt_tokens',
+                                       'cached_tokens', 'completion_tokens', 'avg_latency_ms', 'avg_ttft_ms', 'cost_usd']].copy()
+        display_usage.columns = ['Usage', 'Modèle', 'Appels', 'Erreurs', 'Tentatives', 'Tokens prompt',
+                                 'Tokens en cache', 'Tokens générés', 'Latence moy. (ms)',
+                                 '1er token moy. (ms)', 'Coût ($)']
+        display_usage['Latence moy. (ms)'] = display_usage['Latence moy. (ms)'].round(0)
+        display_usage['1er token moy. (ms)'] = display_usage['1er token moy. (ms)'].round(0)
+        display_usage['Coût ($)'] = display_usage['Coût ($)'].round(4)
+        st.dataframe(display_usage, use_container_width=True, hide_index=True)
@@ -16,17 +16,20 @@ from utils.auth import require_auth
 from utils.session import render_client_selector
 from utils.database import (
     get_client, get_radars, get_radar, add_radar, update_radar,
-    delete_radar, update_radar_last_run, get_competitors,
+    delete_radar, get_competitors, get_tasks, cancel_task,
     get_radar_targets, add_radar_target, delete_radar_targets,
     get_radar_message_template, save_radar_message_template, get_client_profile_as_dict,
-    get_client_profile
+    get_client_profile, get_radar_runs, get_radar_run_stages
 )
-from utils.ai_analyzer import generate_message_for_prospect
-from utils.radar_manager import process_radar, process_radar_with_scoring
+from utils.radar_manager import SCORING_MODES
 from utils.radar_scheduler import schedule_radar, unschedule_radar, get_next_run_time, get_scheduler_status
-from utils.database import save_reaction, save_reactions_batch, get_client_profile_as_dict
+from utils.database import count_pending_reactions
 from utils.styles import render_page_header, render_metric_card
-from utils.log_capture import setup_log_capture, format_log_for_display
+from utils.task_queue import enqueue_radar_run, get_queue_metrics
+from utils.run_history import RUN_STAGES
+from utils.adaptive_schedule import (
+    load_adaptive_config, effective_interval_minutes, format_interval, reset_adaptive_interval
+)
 
 st.set_page_config(page_title="Radars | LeadFlow", page_icon="🎯", layout="wide")
 
@@ -47,7 +50,8 @@ render_page_header(
 radars = get_radars(client_id)
 
 # Onglets
-tab1, tab2, tab3, tab4 = st.tabs(["📋 Liste des Radars", "➕ Nouveau Radar", "▶️ Exécuter un Radar", "⏰ Scheduling"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 Liste des Radars", "➕ Nouveau Radar", "▶️ Exécuter un Radar", "⏰ Scheduling",
+                                        "📜 Historique"])
 
 # ============== ONGLET 1: Liste des Radars ==============
 with tab1:
@@ -322,6 +326,27 @@ with tab1:
                                 help="Score minimum (0-1) pour qu'un prospect soit considéré comme qualifié"
                             )
                         
+                        scoring_mode_keys = list(SCORING_MODES.keys())
+                        current_scoring_mode = edit_radar.get('scoring_mode') or 'ai'
+                        edited_scoring_mode = st.selectbox(
+                            "Mode de scoring",
+                            options=scoring_mode_keys,
+                            index=scoring_mode_keys.index(current_scoring_mode) if current_scoring_mode in scoring_mode_keys else 0,
+                            format_func=lambda mode: SCORING_MODES[mode],
+                            key=f"edit_scoring_mode_{edit_radar_id}",
+                            help="Le mode sémantique local fonctionne sans OpenAI ; le préfiltre sémantique écarte les profils clairement hors cible avant l'IA"
+                        )
+                        
+                        edited_post_relevance_threshold = st.slider(
+                            "Pertinence minimum des posts",
+                            min_value=0.0,
+                            max_value=1.0,
+                            value=float(edit_radar.get('post_relevance_threshold') or 0.0),
+                            step=0.05,
+                            key=f"edit_post_relevance_{edit_radar_id}",
+                            help="Chaque post est analysé une fois par l'IA : les réactions des posts sous ce score ne sont ni récupérées ni scorées (0 = désactivé)"
+                        )
+                        
                         st.markdown("<br>", unsafe_allow_html=True)
                         
                         # Section Message Type du Radar
@@ -430,48 +455,41 @@ Utilise des variables comme [entreprise], [sujet], [notre entreprise], [prospect
 Réponds UNIQUEMENT avec le message type, sans markdown, sans "Message:", sans guillemets."""
                                     
                                     try:
-                                        from utils.ai_analyzer import openai_client, OPENAI_ENABLED, OPENAI_MODEL
+                                        from utils.ai_analyzer import openai_client, OPENAI_ENABLED, stream_completion_text, clean_generated_message
                                         if OPENAI_ENABLED and openai_client:
-                                            with st.spinner("Génération en cours..."):
-                                                response = openai_client.chat.completions.create(
-                                                    model=OPENAI_MODEL,
-                                                    messages=[
-                                                        {"role": "system", "content": "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec le message final, sans formatage supplémentaire."},
-                                                        {"role": "user", "content": prompt}
-                                                    ],
-                                                    temperature=0.7,
-                                                    max_tokens=200
-                                                )
-                                                generated_template = response.choices[0].message.content.strip()
+                                            # Le message type s'affiche au fil des tokens
+                                            streamed_template = st.write_stream(stream_completion_text(
+                                                prompt,
+                                                'message_template',
+                                                temperature=0.7,
+                                                max_tokens=200,
+                                                client_id=client_id,
+                                                radar_id=edit_radar_id
+                                            ))
+                                            generated_template = clean_generated_message(streamed_template if isinstance(streamed_template, str) else '')
+                                            
+                                            if generated_template:
+                                                generated_key = f'generated_template_{edit_radar_id}'
+                                                textarea_key = f"edit_message_template_{edit_radar_id}"
                                                 
-                                                # Nettoyer le message
-                                                if generated_template.startswith('"') and generated_template.endswith('"'):
-                                                    generated_template = generated_template[1:-1]
-                                                if generated_template.startswith("Message:"):
-                                                    generated_template = generated_template[8:].strip()
+                                                logger.info(f"[DEBUG] Message généré par OpenAI (longueur: {len(generated_template)}): {generated_template[:100]}...")
                                                 
-                                                if generated_template:
-                                                    generated_key = f'generated_template_{edit_radar_id}'
-                                                    textarea_key = f"edit_message_template_{edit_radar_id}"
-                                                    
-                                                    logger.info(f"[DEBUG] Message généré par OpenAI (longueur: {len(generated_template)}): {generated_template[:100]}...")
-                                                    
-                                                    # Stocker le message généré
-                                                    st.session_state[generated_key] = generated_template
-                                                    
-                                                    # Supprimer la clé du textarea pour forcer sa réinitialisation au prochain rendu
-                                                    # Cela permet d'éviter l'erreur "cannot be modified after widget is instantiated"
-                                                    if textarea_key in st.session_state:
-                                                        del st.session_state[textarea_key]
-                                                        logger.info(f"[DEBUG] Clé textarea supprimée pour forcer la réinitialisation")
-                                                    
-                                                    logger.info(f"[DEBUG] Message stocké dans session_state avec la clé: {generated_key}")
-                                                    
-                                                    st.success("✅ Message type généré avec succès!")
-                                                    st.rerun()
-                                                else:
-                                                    logger.error("[DEBUG] Aucun message généré par OpenAI (réponse vide)")
-                                                    st.error("❌ Aucun message généré")
+                                                # Stocker le message généré
+                                                st.session_state[generated_key] = generated_template
+                                                
+                                                # Supprimer la clé du textarea pour forcer sa réinitialisation au prochain rendu
+                                                # Cela permet d'éviter l'erreur "cannot be modified after widget is instantiated"
+                                                if textarea_key in st.session_state:
+                                                    del st.session_state[textarea_key]
+                                                    logger.info(f"[DEBUG] Clé textarea supprimée pour forcer la réinitialisation")
+                                                
+                                                logger.info(f"[DEBUG] Message stocké dans session_state avec la clé: {generated_key}")
+                                                
+                                                st.success("✅ Message type généré avec succès!")
+                                                st.rerun()
+                                            else:
+                                                logger.error("[DEBUG] Aucun message généré par OpenAI (réponse vide)")
+                                                st.error("❌ Aucun message généré")
                                         else:
                                             st.error("❌ OpenAI non configuré")
                                     except Exception as e:
@@ -517,7 +535,9 @@ Réponds UNIQUEMENT avec le message type, sans markdown, sans "Message:", sans g
                                             target_identifier=edited_target_identifier,
                                             filter_competitors=edited_filter_competitors,
                                             min_score_threshold=edited_min_score_threshold,
-                                            max_extractions=edited_max_extractions
+                                            max_extractions=edited_max_extractions,
+                                            scoring_mode=edited_scoring_mode,
+                                            post_relevance_threshold=edited_post_relevance_threshold or None
                                         )
                                         # Mettre à jour les cibles multiples
                                         delete_radar_targets(edit_radar_id)
@@ -539,7 +559,9 @@ Réponds UNIQUEMENT avec le message type, sans markdown, sans "Message:", sans g
                                             target_value=edited_profile_urls[0],
                                             filter_competitors=edited_filter_competitors,
                                             min_score_threshold=edited_min_score_threshold,
-                                            max_extractions=edited_max_extractions
+                                            max_extractions=edited_max_extractions,
+                                            scoring_mode=edited_scoring_mode,
+                                            post_relevance_threshold=edited_post_relevance_threshold or None
                                         )
                                         # Mettre à jour les cibles multiples
                                         delete_radar_targets(edit_radar_id)
@@ -562,7 +584,9 @@ Réponds UNIQUEMENT avec le message type, sans markdown, sans "Message:", sans g
                                             post_count=edited_post_count,
                                             filter_competitors=edited_filter_competitors,
                                             min_score_threshold=edited_min_score_threshold,
-                                            max_extractions=edited_max_extractions
+                                            max_extractions=edited_max_extractions,
+                                            scoring_mode=edited_scoring_mode,
+                                            post_relevance_threshold=edited_post_relevance_threshold or None
                                         )
                                         st.success("✅ Radar modifié avec succès!")
                                         if 'edit_radar_id' in st.session_state:
@@ -686,6 +710,22 @@ with tab2:
             help="Score minimum (0-1) pour qu'un prospect soit considéré comme qualifié"
         )
     
+    scoring_mode = st.selectbox(
+        "Mode de scoring",
+        options=list(SCORING_MODES.keys()),
+        format_func=lambda mode: SCORING_MODES[mode],
+        help="Le mode sémantique local fonctionne sans OpenAI ; le préfiltre sémantique écarte les profils clairement hors cible avant l'IA"
+    )
+    
+    post_relevance_threshold = st.slider(
+        "Pertinence minimum des posts",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.0,
+        step=0.05,
+        help="Chaque post est analysé une fois par l'IA : les réactions des posts sous ce score ne sont ni récupérées ni scorées (0 = désactivé)"
+    )
+    
     # Limite d'extraction/export (sur les profils QUALIFIÉS après scoring IA)
     st.markdown("### Limite d'Extraction/Export")
     max_extractions = st.number_input(
@@ -725,7 +765,9 @@ with tab2:
                     keyword=keyword_value,
                     post_count=post_count_value,
                     filter_competitors=filter_competitors,
-                    min_score_threshold=min_score_threshold
+                    min_score_threshold=min_score_threshold,
+                    scoring_mode=scoring_mode,
+                    post_relevance_threshold=post_relevance_threshold or None
                 )
                 
                 # Ajouter les cibles multiples si nécessaire
@@ -791,248 +833,75 @@ with tab3:
                     
                     st.info(f"**Filtrage concurrents:** {'Activé' if radar.get('filter_competitors', True) else 'Désactivé'}")
                     st.info(f"**Score minimum:** {radar.get('min_score_threshold', 0.6)}")
+                    st.info(f"**Mode de scoring:** {SCORING_MODES.get(radar.get('scoring_mode') or 'ai', radar.get('scoring_mode'))}")
+                    if radar.get('post_relevance_threshold'):
+                        st.info(f"**Pertinence minimum des posts:** {radar['post_relevance_threshold']}")
+                    if radar.get('scoring_mode') == 'batch':
+                        pending_count = count_pending_reactions(client_id)
+                        if pending_count:
+                            st.info(f"**En attente de scoring (lot OpenAI):** {pending_count} prospect(s)")
                     
                     st.markdown("<br>", unsafe_allow_html=True)
                     
-                    # Zone de logs
+                    # Les exécutions sont faites par les workers (radar_worker.py) : la page ne fait que les mettre en file
+                    if st.button("▶️ Exécuter le Radar", type="primary", use_container_width=True):
+                        task_id = enqueue_radar_run(selected_radar_id)
+                        if task_id:
+                            st.success(f"✅ Exécution du radar ajoutée à la file (tâche #{task_id})")
+                            st.info("💡 Les prospects qualifiés seront disponibles dans l'onglet 'Prospects' une fois la tâche terminée")
+                        else:
+                            st.error("❌ Impossible d'ajouter l'exécution du radar à la file")
+                    
                     st.markdown("<br>", unsafe_allow_html=True)
                     
-                    col_logs_title, col_copy = st.columns([3, 1])
-                    with col_logs_title:
-                        st.markdown("### 📋 Console de logs")
-                    with col_copy:
-                        # Bouton pour copier les logs (uniquement si des logs existent)
-                        if 'radar_logs' in st.session_state and st.session_state.radar_logs:
-                            logs_text = "\n".join(st.session_state.radar_logs)
-                            
-                            # Utiliser JavaScript pour copier dans le presse-papier (plus fiable)
-                            copy_button_id = "copy_logs_btn"
-                            
-                            st.markdown(f"""
-                                <button id="{copy_button_id}" style="
-                                    background: #6366f1;
-                                    color: white;
-                                    border: none;
-                                    border-radius: 6px;
-                                    padding: 0.5rem 1rem;
-                                    cursor: pointer;
-                                    font-size: 0.9rem;
-                                    width: 100%;
-                                ">📋 Copier les logs</button>
-                                <script>
-                                    document.getElementById('{copy_button_id}').addEventListener('click', function() {{
-                                        const logs = `{logs_text.replace('`', '\\`').replace('$', '\\$')}`;
-                                        navigator.clipboard.writeText(logs).then(function() {{
-                                            alert('✅ Logs copiés dans le presse-papier!');
-                                        }}, function(err) {{
-                                            // Fallback pour navigateurs anciens
-                                            const textarea = document.createElement('textarea');
-                                            textarea.value = logs;
-                                            document.body.appendChild(textarea);
-                                            textarea.select();
-                                            document.execCommand('copy');
-                                            document.body.removeChild(textarea);
-                                            alert('✅ Logs copiés dans le presse-papier!');
-                                        }});
-                                    }});
-                                </script>
-                            """, unsafe_allow_html=True)
-                        
-                    log_container = st.empty()
-                    logs_code_container = st.empty()
+                    col_tasks_title, col_refresh = st.columns([3, 1])
+                    with col_tasks_title:
+                        st.markdown("### 📋 Exécutions du radar")
+                    with col_refresh:
+                        if st.button("🔄 Actualiser", use_container_width=True, key="refresh_radar_tasks"):
+                            st.rerun()
                     
-                    # Afficher les logs précédents si disponibles
-                    if 'radar_logs' in st.session_state and st.session_state.radar_logs:
-                        logs_html = "".join([
-                            format_log_for_display(log)
-                            for log in st.session_state.radar_logs
+                    radar_tasks = get_tasks(radar_id=selected_radar_id, limit=10)
+                    if not radar_tasks:
+                        st.info("Aucune exécution pour ce radar")
+                    else:
+                        task_status_labels = {
+                            'queued': '⏳ En attente',
+                            'running': '▶️ En cours',
+                            'done': '✅ Terminée',
+                            'failed': '❌ Échec',
+                            'cancelled': '🚫 Annulée'
+                        }
+                        tasks_df = pd.DataFrame([
+                            {
+                                'Tâche': f"#{task['id']}",
+                                'Statut': task_status_labels.get(task['status'], task['status']),
+                                'Déclenchement': 'Planifié' if task['payload'].get('scheduled') else 'Manuel',
+                                'Tentatives': f"{task['attempts']}/{task['max_attempts']}",
+                                'Prospects qualifiés': (task.get('result') or {}).get('reactions', ''),
+                                'Sauvegardés': (task.get('result') or {}).get('saved', ''),
+                                'Créée le': (task.get('created_at') or '')[:19].replace('T', ' '),
+                                'Terminée le': (task.get('finished_at') or '')[:19].replace('T', ' ')
+                            }
+                            for task in radar_tasks
                         ])
+                        st.dataframe(tasks_df, use_container_width=True, hide_index=True)
                         
-                        # Affichage stylisé HTML
-                        log_container.markdown(f"""
-                            <div style="background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; 
-                                        font-family: 'Courier New', monospace; font-size: 0.85rem; 
-                                        max-height: 400px; overflow-y: auto; line-height: 1.5;">
-                                {logs_html}
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Affichage en texte brut sélectionnable pour copier facilement (Ctrl+C / Cmd+C)
-                        logs_text = "\n".join(st.session_state.radar_logs)
-                        st.markdown("**📄 Version texte (sélectionnable et copiable avec Ctrl+C / Cmd+C) :**")
-                        logs_code_container.code(logs_text, language=None)
-                    
-                    if st.button("▶️ Exécuter le Radar", type="primary", use_container_width=True):
-                        # Initialiser la liste des logs
-                        st.session_state.radar_logs = []
-                        
-                        # Configurer la capture de logs
-                        log_handler = setup_log_capture()
-                        log_handler.clear()
-                        
-                        try:
-                            # Afficher un message d'initialisation
-                            st.session_state.radar_logs.append(f"[INFO] 🚀 Démarrage de l'exécution du radar: {radar['name']}")
-                            st.session_state.radar_logs.append(f"[INFO] Type: {radar_type_label}")
-                            st.session_state.radar_logs.append(f"[INFO] Cible: {radar['target_identifier']}")
-                            
-                            # Afficher les logs initiaux
-                            logs_html = "".join([format_log_for_display(log) for log in st.session_state.radar_logs])
-                            logs_text = "\n".join(st.session_state.radar_logs)
-                            
-                            log_container.markdown(f"""
-                                <div style="background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; 
-                                            font-family: 'Courier New', monospace; font-size: 0.85rem; 
-                                            max-height: 400px; overflow-y: auto; line-height: 1.5;">
-                                    {logs_html}
-                                </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Affichage en texte brut sélectionnable pour copier facilement
-                            st.markdown("**📄 Version texte (sélectionnable et copiable avec Ctrl+C / Cmd+C) :**")
-                            logs_code_container.code(logs_text, language=None)
-                            
-                            with st.spinner("Exécution du radar en cours..."):
-                                # Charger le profil et les concurrents
-                                st.session_state.radar_logs.append("[INFO] 📥 Chargement du profil entreprise...")
-                                company_profile = get_client_profile_as_dict(client_id)
-                                competitors = get_competitors(client_id)
-                                st.session_state.radar_logs.append(f"[INFO] ✓ Profil chargé - {len(competitors)} concurrent(s) configuré(s)")
-                                
-                                # Traiter le radar avec scoring
-                                st.session_state.radar_logs.append("[INFO] 🔍 Récupération des posts et réactions...")
-                                max_qualified = radar.get('max_extractions')
-                                if max_qualified:
-                                    st.session_state.radar_logs.append(f"[INFO] 📊 Limite: {max_qualified} prospect(s) qualifié(s) maximum")
-                                reactions = process_radar_with_scoring(
-                                    radar,
-                                    client_id,
-                                    company_profile,
-                                    competitors,
-                                    min_score_threshold=radar.get('min_score_threshold', 0.6),
-                                    filter_competitors=radar.get('filter_competitors', True),
-                                    max_qualified_prospects=max_qualified
-                                )
-                                
-                                # Récupérer les logs capturés depuis les modules
-                                captured_logs = log_handler.get_logs()
-                                if captured_logs:
-                                    st.session_state.radar_logs.extend(captured_logs)
-                                
-                                st.session_state.radar_logs.append(f"[INFO] ✓ Traitement terminé - {len(reactions)} prospect(s) qualifié(s) et enrichi(s)")
-                                
-                                if reactions:
-                                    st.session_state.radar_logs.append("[INFO] Étape 7/7: Sauvegarde des prospects qualifiés dans la base de données...")
-                                    st.session_state.radar_logs.append(f"[INFO] 📊 {len(reactions)} prospect(s) qualifié(s) à sauvegarder")
-                                    
-                                    # Sauvegarder les réactions qualifiées (la limite a déjà été appliquée dans process_radar_with_scoring)
-                                    saved_count = 0
-                                    for idx, reaction in enumerate(reactions, 1):
-                                        try:
-                                            # Adapter les données pour save_reaction
-                                            scoring_breakdown = reaction.get('scoring_breakdown', {})
-                                            enriched_profile = reaction.get('enriched_profile', {})
-                                            
-                                            # Fusionner les données enrichies dans le scoring_breakdown pour les sauvegarder
-                                            if enriched_profile:
-                                                scoring_breakdown['enriched_profile'] = enriched_profile
-                                            if reaction.get('enriched_company'):
-                                                scoring_breakdown['enriched_company'] = reaction.get('enriched_company')
-                                            
-                                            # Utiliser le profile_url enrichi si disponible (vrai slug)
-                                            profile_url_to_save = reaction.get('profile_url', '')
-                                            
-                                            reaction_data = {
-                                                'company_name': reaction.get('company_name') or reaction.get('keyword') or '',
-                                                'post_url': reaction.get('post_url', ''),
-                                                'post_date': reaction.get('post_date', ''),
-                                                'reactor_name': reaction.get('reactor_name', ''),
-                                                'reactor_urn': reaction.get('reactor_urn', ''),
-                                                'profile_url': profile_url_to_save,  # Utilise le profile_url enrichi (vrai slug)
-                                                'reaction_type': reaction.get('reaction_type', ''),
-                                                'headline': reaction.get('headline', ''),
-                                                'profile_picture_url': reaction.get('profile_picture_url', ''),
-                                                'post_relevant': False,
-                                                'prospect_relevant': reaction.get('prospect_relevant', False),
-                                                'relevance_score': reaction.get('relevance_score', 0.0),
-                                                'relevance_reasoning': json.dumps(scoring_breakdown) if scoring_breakdown else '',
-                                                'personalized_message': ''
-                                            }
-                                            save_reaction(client_id, reaction_data)
-                                            saved_count += 1
-                                            
-                                            # Log tous les 10 pour ne pas surcharger
-                                            if saved_count % 10 == 0:
-                                                st.session_state.radar_logs.append(f"[INFO]   → {saved_count} réaction(s) sauvegardée(s)...")
-                                        except Exception as e:
-                                            st.session_state.radar_logs.append(f"[ERROR] ❌ Erreur sauvegarde réaction {idx}: {e}")
-                                    
-                                    # Mettre à jour la date de dernière exécution
-                                    update_radar_last_run(selected_radar_id)
-                                    st.session_state.radar_logs.append(f"[SUCCESS] ✅ {saved_count} réaction(s) qualifiée(s) sauvegardée(s) avec succès!")
-                                    
-                                    # Afficher les logs dans la console
-                                    logs_html = "".join([format_log_for_display(log) for log in st.session_state.radar_logs])
-                                    logs_text = "\n".join(st.session_state.radar_logs)
-                                    
-                                    log_container.markdown(f"""
-                                        <div style="background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; 
-                                                    font-family: 'Courier New', monospace; font-size: 0.85rem; 
-                                                    max-height: 400px; overflow-y: auto; line-height: 1.5;">
-                                            {logs_html}
-                                        </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Affichage en texte brut sélectionnable pour copier facilement
-                                    st.markdown("**📄 Version texte (sélectionnable et copiable avec Ctrl+C / Cmd+C) :**")
-                                    logs_code_container.code(logs_text, language=None)
-                                    
-                                    st.success(f"✅ Radar exécuté avec succès!")
-                                    st.success(f"📊 {saved_count} réaction(s) qualifiée(s) collectée(s) et sauvegardée(s)")
-                                    st.info("💡 Les réactions sont maintenant disponibles dans l'onglet 'Prospects'")
+                        queued_task = next((task for task in radar_tasks if task['status'] == 'queued'), None)
+                        if queued_task:
+                            queued_since = datetime.fromisoformat(queued_task['created_at'])
+                            if (datetime.now() - queued_since).total_seconds() > 120:
+                                st.warning("⚠️ Cette exécution attend depuis plus de 2 minutes : vérifiez qu'un worker est lancé (python radar_worker.py)")
+                            if st.button(f"🚫 Annuler la tâche #{queued_task['id']}", key=f"cancel_task_{queued_task['id']}"):
+                                if cancel_task(queued_task['id']):
+                                    st.rerun()
                                 else:
-                                    st.session_state.radar_logs.append("[WARNING] ⚠️ Aucune réaction qualifiée trouvée pour ce radar")
-                                    
-                                    logs_html = "".join([format_log_for_display(log) for log in st.session_state.radar_logs])
-                                    logs_text = "\n".join(st.session_state.radar_logs)
-                                    
-                                    log_container.markdown(f"""
-                                        <div style="background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; 
-                                                    font-family: 'Courier New', monospace; font-size: 0.85rem; 
-                                                    max-height: 400px; overflow-y: auto; line-height: 1.5;">
-                                            {logs_html}
-                                        </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Affichage en texte brut sélectionnable pour copier facilement
-                                    st.markdown("**📄 Version texte (sélectionnable et copiable avec Ctrl+C / Cmd+C) :**")
-                                    logs_code_container.code(logs_text, language=None)
-                                    
-                                    st.warning("⚠️ Aucune réaction qualifiée trouvée pour ce radar")
-                                
-                        except Exception as e:
-                            import traceback
-                            error_details = traceback.format_exc()
-                            st.session_state.radar_logs.append(f"[ERROR] ❌ Erreur lors de l'exécution: {e}")
-                            st.session_state.radar_logs.append(f"[ERROR] Détails: {error_details}")
-                            
-                            logs_html = "".join([format_log_for_display(log) for log in st.session_state.radar_logs])
-                            logs_text = "\n".join(st.session_state.radar_logs)
-                            
-                            log_container.markdown(f"""
-                                <div style="background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; 
-                                            font-family: 'Courier New', monospace; font-size: 0.85rem; 
-                                            max-height: 400px; overflow-y: auto; line-height: 1.5;">
-                                    {logs_html}
-                                </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Affichage en texte brut sélectionnable pour copier facilement
-                            st.markdown("**📄 Version texte (sélectionnable et copiable avec Ctrl+C / Cmd+C) :**")
-                            logs_code_container.code(logs_text, language=None)
-                            
-                            st.error(f"❌ Erreur lors de l'exécution du radar: {e}")
-                            st.exception(e)
+                                    st.warning("La tâche a déjà été prise en charge par un worker")
+                        
+                        last_error_task = next((task for task in radar_tasks if task.get('error_message')), None)
+                        if last_error_task:
+                            with st.expander(f"Dernière erreur (tâche #{last_error_task['id']})"):
+                                st.code(last_error_task['error_message'], language=None)
 
 # ============== ONGLET 4: Scheduling ==============
 with tab4:
@@ -1052,11 +921,30 @@ with tab4:
         if scheduler_status.get('available'):
             if scheduler_status.get('running'):
                 st.success(f"✅ Scheduler actif - {scheduler_status.get('jobs_count', 0)} job(s) planifié(s)")
+            elif scheduler_status.get('jobs_count') and scheduler_status.get('leader'):
+                # Jobs persistés en base : déclenchés par le processus leader
+                st.info(f"📋 {scheduler_status.get('jobs_count', 0)} job(s) planifié(s), déclenchés par le scheduler leader ({scheduler_status['leader']})")
+            elif scheduler_status.get('jobs_count'):
+                st.warning(f"⚠️ {scheduler_status.get('jobs_count', 0)} job(s) planifié(s) mais aucun scheduler actif. Lancez le script linkedin_scraper_radars_scheduled.py.")
             else:
                 st.warning("⚠️ Scheduler non démarré. Utilisez le script linkedin_scraper_radars_scheduled.py pour démarrer le scheduler.")
         else:
             st.error("❌ APScheduler non disponible. Installez-le avec: pip install APScheduler")
         
+        # File d'exécution partagée par tous les clients (workers radar_worker.py)
+        queue_metrics = get_queue_metrics()
+        client_queue = next((row for row in queue_metrics['clients'] if row['client_id'] == client_id), {})
+        col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+        with col_q1:
+            st.metric("En file (tous clients)", queue_metrics['queued'])
+        with col_q2:
+            st.metric("En cours", f"{queue_metrics['running']}/{queue_metrics['max_concurrency'] or '∞'}")
+        with col_q3:
+            st.metric("En file (ce client)", client_queue.get('queued', 0))
+        with col_q4:
+            avg_wait = client_queue.get('avg_wait_seconds')
+            st.metric("Attente moy. 24h", f"{avg_wait:.0f}s" if avg_wait is not None else "—")
+        
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Sélectionner un radar
@@ -1099,6 +987,51 @@ with tab4:
                     else:
                         schedule_interval = 0
                 
+                # Intervalle adaptatif : ajusté après chaque exécution selon le rendement observé
+                adaptive_config = load_adaptive_config()
+                adaptive_schedule = st.checkbox(
+                    "🔁 Intervalle adaptatif",
+                    value=bool(radar.get('adaptive_schedule')),
+                    disabled=schedule_type == 'manual',
+                    help="Allonge l'intervalle quand le radar ne trouve ni nouveau post ni nouveau réacteur, "
+                         "le raccourcit quand il trouve beaucoup de prospects qualifiés"
+                ) and schedule_type != 'manual'
+                adaptive_min_minutes = radar.get('adaptive_min_minutes')
+                adaptive_max_minutes = radar.get('adaptive_max_minutes')
+                if adaptive_schedule:
+                    col_min, col_max = st.columns(2)
+                    with col_min:
+                        adaptive_min_minutes = st.number_input(
+                            "Intervalle minimum (minutes)",
+                            min_value=1,
+                            max_value=100000,
+                            value=int(adaptive_min_minutes or adaptive_config['min_minutes'])
+                        )
+                    with col_max:
+                        adaptive_max_minutes = st.number_input(
+                            "Intervalle maximum (minutes)",
+                            min_value=int(adaptive_min_minutes),
+                            max_value=100000,
+                            value=max(int(adaptive_max_minutes or adaptive_config['max_minutes']),
+                                      int(adaptive_min_minutes))
+                        )
+                
+                if radar.get('adaptive_schedule') and radar.get('schedule_type') != 'manual':
+                    effective = effective_interval_minutes(radar, adaptive_config)
+                    st.info(f"🔁 Intervalle effectif: **{format_interval(effective)}** — "
+                            f"{radar.get('adaptive_reason') or 'intervalle configuré (aucune exécution depuis son activation)'}")
+                try:
+                    last_yield = json.loads(radar['last_run_yield']) if radar.get('last_run_yield') else None
+                except ValueError:
+                    last_yield = None
+                if last_yield:
+                    st.caption(
+                        f"Dernière exécution: {last_yield.get('posts', 0)} post(s) dont {last_yield.get('new_posts', 0)} "
+                        f"nouveau(x), {last_yield.get('reactions', 0)} réaction(s) dont {last_yield.get('new_reactors', 0)} "
+                        f"nouveau(x) réacteur(s), {last_yield.get('qualified', 0)} prospect(s) qualifié(s)"
+                        + (f", {last_yield['deferred']} en attente de scoring" if last_yield.get('deferred') else "")
+                    )
+                
                 # Afficher la prochaine exécution si planifié
                 if schedule_type != 'manual' and schedule_interval > 0:
                     next_run = get_next_run_time(selected_radar_id)
@@ -1114,8 +1047,15 @@ with tab4:
                         update_radar(
                             selected_radar_id,
                             schedule_type=schedule_type,
-                            schedule_interval=schedule_interval
+                            schedule_interval=schedule_interval,
+                            adaptive_schedule=adaptive_schedule,
+                            adaptive_min_minutes=adaptive_min_minutes if adaptive_schedule else radar.get('adaptive_min_minutes'),
+                            adaptive_max_minutes=adaptive_max_minutes if adaptive_schedule else radar.get('adaptive_max_minutes')
                         )
+                        # Planification modifiée : l'intervalle adaptatif repart de l'intervalle configuré
+                        if (schedule_type != radar.get('schedule_type') or schedule_interval != radar.get('schedule_interval')
+                                or adaptive_schedule != bool(radar.get('adaptive_schedule'))):
+                            reset_adaptive_interval(selected_radar_id)
                         
                         # Mettre à jour le scheduler
                         if schedule_type != 'manual' and schedule_interval > 0:
@@ -1137,12 +1077,124 @@ with tab4:
                 st.markdown("### Instructions")
                 st.info("""
                 **Pour activer le scheduling automatique:**
-                1. Configurez le type et l'intervalle ci-dessus
+                1. Configurez le type et l'intervalle ci-dessus (intervalle adaptatif optionnel)
                 2. Sauvegardez la configuration
-                3. Démarrez le script `linkedin_scraper_radars_scheduled.py` pour exécuter les radars automatiquement
+                3. Démarrez le script `linkedin_scraper_radars_scheduled.py` pour planifier les radars automatiquement
+                4. Démarrez au moins un worker (`python radar_worker.py`) pour exécuter les radars en file
                 
                 **Commandes:**
                 - `python linkedin_scraper_radars_scheduled.py` : Démarre le scheduler en continu
                 - `python linkedin_scraper_radars_scheduled.py --run-once` : Exécute une fois tous les radars planifiés
                 - `python linkedin_scraper_radars_scheduled.py --client-id 1` : Seulement pour un client spécifique
                 """)
+
+# ============== ONGLET 5: Historique des exécutions ==============
+with tab5:
+    if not radars:
+        st.info("Créez d'abord un radar dans l'onglet 'Nouveau Radar'")
+    else:
+        st.markdown("""
+            <div class="data-card">
+                <div class="data-card-header">
+                    <div class="data-card-title">Historique des Exécutions</div>
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
+        
+        col_filter, col_history_refresh = st.columns([3, 1])
+        with col_filter:
+            history_radar_id = st.selectbox(
+                "Radar",
+                options=[None] + [r['id'] for r in radars],
+                format_func=lambda x: 'Tous les radars' if x is None else next((r['name'] for r in radars if r['id'] == x), ''),
+                key="history_radar"
+            )
+        with col_history_refresh:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("🔄 Actualiser", use_container_width=True, key="refresh_run_history"):
+                st.rerun()
+        
+        runs = get_radar_runs(client_id=client_id, radar_id=history_radar_id, limit=50)
+        if not runs:
+            st.info("Aucune exécution enregistrée")
+        else:
+            run_status_labels = {'running': '▶️ En cours', 'done': '✅ Terminée', 'failed': '❌ Échec'}
+            runs_df = pd.DataFrame([
+                {
+                    'Exécution': f"#{run['id']}",
+                    'Radar': run.get('radar_name') or run['radar_id'],
+                    'Déclenchement': 'Planifié' if run.get('trigger') == 'scheduled' else 'Manuel',
+                    'Statut': run_status_labels.get(run['status'], run['status']),
+                    'Début': (run.get('started_at') or '')[:19].replace('T', ' '),
+                    'Durée (s)': round(run['duration_ms'] / 1000, 1) if run.get('duration_ms') is not None else None,
+                    'Réactions': run.get('reactions'),
+                    'Nouveaux': run.get('new_reactors'),
+                    'Qualifiés': run.get('qualified'),
+                    'Sauvegardés': run.get('saved'),
+                    'Appels API': run.get('api_calls'),
+                    'Appels LLM': run.get('llm_calls'),
+                    'Coût LLM ($)': round(run.get('llm_cost_usd') or 0.0, 4),
+                    'Cache': run.get('cache_hits'),
+                    'Erreurs': run.get('errors')
+                }
+                for run in runs
+            ])
+            st.dataframe(runs_df, use_container_width=True, hide_index=True)
+            
+            selected_run_id = st.selectbox(
+                "Détail d'une exécution",
+                options=[run['id'] for run in runs],
+                format_func=lambda x: next(
+                    f"#{run['id']} - {run.get('radar_name') or run['radar_id']} - {(run.get('started_at') or '')[:16].replace('T', ' ')}"
+                    for run in runs if run['id'] == x
+                ),
+                key="history_run"
+            )
+            selected_run = next(run for run in runs if run['id'] == selected_run_id)
+            if selected_run.get('error_message'):
+                st.error(f"Erreur: {selected_run['error_message']}")
+
+            # Exécution interrompue : reprise depuis la dernière étape terminée (points de reprise)
+            if selected_run.get('resumable'):
+                col_resume_info, col_resume = st.columns([3, 1])
+                with col_resume_info:
+                    st.warning("⚠️ Exécution interrompue : elle peut reprendre à sa dernière étape terminée, sans refaire les appels déjà effectués")
+                with col_resume:
+                    if st.button("↩️ Reprendre", use_container_width=True, key=f"resume_run_{selected_run_id}"):
+                        task_id = enqueue_radar_run(
+                            selected_run['radar_id'],
+                            scheduled=selected_run.get('trigger') == 'scheduled',
+                            resume_run_id=selected_run_id
+                        )
+                        if task_id:
+                            st.success(f"✅ Reprise ajoutée à la file (tâche #{task_id})")
+                        else:
+                            st.error("❌ Impossible d'ajouter la reprise à la file")
+
+            stages = get_radar_run_stages(selected_run_id)
+            if not stages:
+                st.info("Aucune étape enregistrée pour cette exécution")
+            else:
+                stage_status_labels = {'done': '✅', 'error': '❌', 'running': '▶️'}
+                stages_df = pd.DataFrame([
+                    {
+                        'Étape': RUN_STAGES.get(stage['stage'], stage['stage']),
+                        'Statut': stage_status_labels.get(stage['status'], stage['status']),
+                        'Durée (s)': round((stage.get('duration_ms') or 0) / 1000, 2),
+                        'Entrée': stage.get('items_in'),
+                        'Sortie': stage.get('items_out'),
+                        'Appels API': stage.get('api_calls'),
+                        'Appels LLM': stage.get('llm_calls'),
+                        'Coût LLM ($)': round(stage.get('llm_cost_usd') or 0.0, 4),
+                        'Cache': stage.get('cache_hits'),
+                        'Erreurs': stage.get('errors')
+                    }
+                    for stage in stages
+                ])
+                st.dataframe(stages_df, use_container_width=True, hide_index=True)
+                st.bar_chart(stages_df.set_index('Étape')['Durée (s)'])
+                
+                for stage in stages:
+                    if stage.get('error_message'):
+                        with st.expander(f"Erreur: {RUN_STAGES.get(stage['stage'], stage['stage'])}"):
+                            st.code(stage['error_message'], language=None)
@@ -17,6 +17,9 @@ from utils.database import (
     get_client_profile_as_dict
 )
 from utils.ai_analyzer import openai_client, OPENAI_ENABLED, OPENAI_MODEL
+from utils.llm_telemetry import tracked_chat_completion
+from utils.persona_matcher import invalidate_persona_matchers
+from utils.semantic_scoring import invalidate_persona_vectors
 from utils.styles import render_page_header
 
 st.set_page_config(page_title="Persona | LeadFlow", page_icon="👤", layout="wide")
@@ -275,7 +278,11 @@ Utilise des variables comme [entreprise], [sujet], [notre entreprise], [prospect
 
 Réponds UNIQUEMENT avec le message type, sans markdown, sans "Message:", sans guillemets."""
                                     
-                                    response = openai_client.chat.completions.create(
+                                    response = tracked_chat_completion(
+                                        openai_client,
+                                        'message_template',
+                                        client_id=client_id,
+                                        radar_id=radar.get('id'),
                                         model=OPENAI_MODEL,
                                         messages=[
                                             {"role": "system", "content": "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec le message final, sans formatage supplémentaire."},
@@ -541,6 +548,8 @@ with col_save:
         if save_client_profile(client_id, profile_data):
             st.success("✅ Profil sauvegardé avec succès!")
             st.cache_data.clear()
+            invalidate_persona_matchers()
+            invalidate_persona_vectors()
             st.rerun()
         else:
             st.error("Erreur lors de la sauvegarde")
@@ -0,0 +1,69 @@
+"""
+Worker de la file de tâches : exécute les radars ajoutés à la file par l'interface et le scheduler
+Plusieurs workers (processus ou machines partageant la base) peuvent tourner en parallèle
+"""
+import logging
+import signal
+import sys
+import threading
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.database import init_db
+from utils.task_queue import run_worker, default_worker_id
+
+# Configuration du logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('radar_worker.log', encoding='utf-8'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Fonction principale"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Exécute les tâches de la file (exécutions de radars)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Nombre de tâches exécutées en parallèle (défaut: 1)')
+    parser.add_argument('--worker-id', default=None,
+                        help='Identifiant du worker (défaut: machine:pid)')
+    parser.add_argument('--once', action='store_true',
+                        help='Vide la file puis quitte')
+    parser.add_argument('--task-type', action='append', dest='task_types', default=None,
+                        help='Type de tâche accepté (répétable, tous par défaut)')
+
+    args = parser.parse_args()
+
+    # Initialiser la base de données
+    init_db()
+
+    # Arrêt propre : les tâches en cours sont terminées avant de quitter
+    stop_event = threading.Event()
+
+    def signal_handler(signum, frame):
+        logger.info("Signal d'arrêt reçu, fin des tâches en cours...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, signal_handler)
+
+    run_worker(
+        worker_id=args.worker_id or default_worker_id(),
+        concurrency=args.concurrency,
+        once=args.once,
+        stop_event=stop_event,
+        task_types=args.task_types
+    )
+
+
+if __name__ == "__main__":
+    main()
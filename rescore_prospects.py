@@ -0,0 +1,96 @@
+"""
+Recalcule le scoring des prospects d'un client en masse (après modification du persona)
+Le job est reprenable : --resume JOB_ID reprend là où il s'était arrêté
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.database import init_db, get_client, get_rescoring_jobs
+from utils.bulk_rescoring import (
+    start_rescoring, run_rescoring_job, cancel_rescoring_job,
+    RESCORING_MODES, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_WORKERS
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def print_progress(job: dict):
+    """Affiche la progression d'un job"""
+    total = job.get('total') or 0
+    percent = (job['processed'] / total * 100) if total else 100.0
+    print(f"  Job #{job['id']}: {job['processed']}/{total} ({percent:.0f}%) - {job['errors']} erreur(s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recalcule le scoring des prospects en masse')
+    parser.add_argument('--client-id', type=int, help='ID du client')
+    parser.add_argument('--mode', choices=list(RESCORING_MODES), default='ai', help='Mode de scoring (défaut: ai)')
+    parser.add_argument('--threshold', type=float, default=0.6, help='Score minimum pour qualifier (défaut: 0.6)')
+    parser.add_argument('--only-relevant', action='store_true', help='Uniquement les prospects qualifiés')
+    parser.add_argument('--min-score', type=float, default=None, help='Score actuel minimum')
+    parser.add_argument('--max-score', type=float, default=None, help='Score actuel maximum')
+    parser.add_argument('--competitor', default=None, help='Uniquement les réactions collectées sur ce concurrent')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Réactions par transaction')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help='Appels IA simultanés')
+    parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Reprendre un job interrompu')
+    parser.add_argument('--cancel', type=int, metavar='JOB_ID', help='Annuler un job en cours')
+    parser.add_argument('--list', action='store_true', help='Lister les derniers jobs du client')
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.cancel:
+        if cancel_rescoring_job(args.cancel):
+            print(f"✓ Annulation du job #{args.cancel} demandée")
+        else:
+            print(f"✗ Job #{args.cancel} introuvable ou déjà terminé")
+        return
+
+    if args.resume:
+        job = run_rescoring_job(args.resume, chunk_size=args.chunk_size, max_workers=args.workers,
+                                progress_callback=print_progress)
+        if not job:
+            sys.exit(1)
+        print(f"Job #{job['id']}: {job['status']}")
+        sys.exit(0 if job['status'] == 'completed' else 1)
+
+    if args.client_id is None:
+        parser.error("--client-id est requis (sauf avec --resume / --cancel)")
+    client = get_client(args.client_id)
+    if not client:
+        logger.error(f"Client {args.client_id} introuvable")
+        sys.exit(1)
+
+    if args.list:
+        for job in get_rescoring_jobs(args.client_id):
+            print(f"#{job['id']} {job['status']:<10} {job['scoring_mode']:<12} "
+                  f"{job['processed']}/{job['total']} créé le {job['created_at']}")
+        return
+
+    filters = {
+        'only_relevant': args.only_relevant,
+        'min_score': args.min_score,
+        'max_score': args.max_score,
+        'competitor_name': args.competitor
+    }
+    print(f"Recalcul du scoring pour {client['name']} (mode {args.mode})")
+    job_id = start_rescoring(
+        args.client_id,
+        filters={key: value for key, value in filters.items() if value not in (None, False)},
+        scoring_mode=args.mode,
+        score_threshold=args.threshold,
+        chunk_size=args.chunk_size,
+        max_workers=args.workers,
+        progress_callback=print_progress
+    )
+    print(f"Job #{job_id} terminé (reprendre avec --resume {job_id} en cas d'interruption)")
+
+
+if __name__ == "__main__":
+    main()
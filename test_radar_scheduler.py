@@ -0,0 +1,96 @@
+"""
+Tests de la planification des radars : un radar en retard reçoit une exécution de rattrapage
+ponctuelle, et son job d'intervalle reste sur la grille de sa phase (celle que lit le planificateur)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+# Ajouter le chemin du projet
+sys.path.append(str(Path(__file__).parent))
+
+import utils.radar_scheduler as radar_scheduler
+
+pytestmark = pytest.mark.skipif(not radar_scheduler.APSCHEDULER_AVAILABLE, reason="APScheduler non installé")
+
+INTERVAL_SECONDS = 3600
+
+
+def _with_scheduler(radar, check):
+    """Exécute check() avec un scheduler en mémoire (en pause) et get_radar renvoyant radar"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler_obj = BackgroundScheduler(timezone='UTC')
+    scheduler_obj.start(paused=True)
+    original_scheduler, original_get_radar = radar_scheduler.scheduler, radar_scheduler.get_radar
+    radar_scheduler.scheduler = scheduler_obj
+    radar_scheduler.get_radar = lambda radar_id: radar if radar_id == radar['id'] else None
+    try:
+        check(scheduler_obj)
+    finally:
+        radar_scheduler.scheduler, radar_scheduler.get_radar = original_scheduler, original_get_radar
+        scheduler_obj.shutdown(wait=False)
+
+
+def _overdue_radar():
+    last_run = radar_scheduler._now() - timedelta(hours=3)
+    return {'id': 7, 'name': 'Test', 'enabled': 1, 'schedule_type': 'hours', 'schedule_interval': 1,
+            'last_scheduled_run': last_run.isoformat()}
+
+
+def _assert_on_phase_grid(job):
+    """Le job d'intervalle s'exécute sur sa phase, y compris après l'exécution suivante"""
+    phase = radar_scheduler.trigger_phase(job.trigger.start_date, INTERVAL_SECONDS)
+    following = job.trigger.get_next_fire_time(job.next_run_time, job.next_run_time)
+    for fire_time in (job.next_run_time, following):
+        assert int(fire_time.timestamp()) % INTERVAL_SECONDS == phase
+    assert radar_scheduler._planned_radar_phases(job._scheduler) == [(phase, INTERVAL_SECONDS)]
+
+
+def test_overdue_radar_catchup_keeps_interval_job_on_phase():
+    """Le rattrapage est un job ponctuel, le job d'intervalle démarre au créneau de sa phase"""
+    def check(scheduler_obj):
+        now = radar_scheduler._now()
+        assert radar_scheduler.schedule_radar(7)
+
+        job = scheduler_obj.get_job('radar_7')
+        catchup = scheduler_obj.get_job('catchup_radar_7')
+        assert job.next_run_time == job.trigger.start_date
+        assert job.next_run_time > now
+        assert catchup.next_run_time <= job.next_run_time
+        # Le job ponctuel n'a pas d'exécution après le rattrapage
+        assert catchup.trigger.get_next_fire_time(catchup.next_run_time, catchup.next_run_time) is None
+        assert radar_scheduler.get_next_run_time(7) == catchup.next_run_time
+        _assert_on_phase_grid(job)
+
+    _with_scheduler(_overdue_radar(), check)
+
+
+def test_stagger_moves_overdue_interval_job_back_to_its_phase():
+    """Un job d'intervalle en retard après un arrêt est rattrapé par un job ponctuel"""
+    def check(scheduler_obj):
+        radar = dict(_overdue_radar(), last_scheduled_run=None)
+        radar_scheduler.get_radar = lambda radar_id: radar
+        assert radar_scheduler.schedule_radar(7)
+        job = scheduler_obj.get_job('radar_7')
+        job.modify(next_run_time=job.next_run_time - timedelta(hours=2))
+
+        assert radar_scheduler.stagger_overdue_radars() == 1
+
+        job = scheduler_obj.get_job('radar_7')
+        assert job.next_run_time > radar_scheduler._now()
+        assert scheduler_obj.get_job('catchup_radar_7') is not None
+        _assert_on_phase_grid(job)
+
+        assert radar_scheduler.unschedule_radar(7)
+        assert scheduler_obj.get_jobs() == []
+
+    _with_scheduler(_overdue_radar(), check)
+
+
+if __name__ == "__main__":
+    test_overdue_radar_catchup_keeps_interval_job_on_phase()
+    test_stagger_moves_overdue_interval_job_back_to_its_phase()
+    print("✓ Tests de la planification des radars OK")
@@ -0,0 +1,46 @@
+"""
+Tests du scoring sémantique local : un prospect dont le titre correspond exactement
+au persona doit passer le préfiltre sémantique (et ne pas être écarté avant le LLM)
+"""
+import sys
+from pathlib import Path
+
+# Ajouter le chemin du projet
+sys.path.append(str(Path(__file__).parent))
+
+from utils.semantic_scoring import semantic_prefilter, semantic_scores_batch, DEFAULT_PREFILTER_THRESHOLD
+
+PROFILE = {'target_persona': {'job_titles': ['Data Analyst'], 'industries': ['SaaS']}}
+
+EXACT_MATCH_HEADLINES = [
+    'Data Analyst chez Acme',
+    'Data Analyst at Acme',
+    'Data Analyst @Acme',
+    'Data Analyst | Python, SQL',
+]
+
+
+def test_exact_persona_title_scores_as_title_match():
+    """Le titre est découpé sur des mots entiers, pas sur la sous-chaîne 'at' de 'Data'"""
+    reactions = [{'headline': headline, 'reaction_type': 'LIKE'} for headline in EXACT_MATCH_HEADLINES]
+    for headline, score in zip(EXACT_MATCH_HEADLINES, semantic_scores_batch(reactions, PROFILE)):
+        assert score['details']['job_title'] == 'Data Analyst', headline
+        assert score['semantic_title_score'] == 1.0, headline
+
+
+def test_exact_persona_title_passes_prefilter():
+    """Un titre identique au persona passe le préfiltre, un titre hors cible est écarté"""
+    reactions = [{'headline': headline, 'reaction_type': 'LIKE'} for headline in EXACT_MATCH_HEADLINES]
+    off_target = {'headline': 'Boulanger chez Paul', 'reaction_type': 'LIKE'}
+
+    kept, kept_scores, rejected = semantic_prefilter(reactions + [off_target], PROFILE, DEFAULT_PREFILTER_THRESHOLD)
+
+    assert kept == reactions
+    assert all(score['total_score'] >= DEFAULT_PREFILTER_THRESHOLD for score in kept_scores)
+    assert rejected == [off_target]
+
+
+if __name__ == "__main__":
+    test_exact_persona_title_scores_as_title_match()
+    test_exact_persona_title_passes_prefilter()
+    print("✓ Tests du scoring sémantique OK")
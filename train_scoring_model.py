@@ -0,0 +1,81 @@
+"""
+Entraîne le modèle de scoring local (distillé des scores LLM) d'un ou plusieurs clients
+et affiche le rapport d'évaluation (taux d'accord, appels LLM évités)
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.database import init_db, get_all_clients, get_active_scoring_model
+from utils.local_classifier import train_client_model, maybe_retrain, MIN_TRAINING_LABELS, MIN_CONFIDENT_AGREEMENT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def print_report(client_name: str, report: dict):
+    """Affiche le rapport d'évaluation d'un modèle"""
+    print(f"\n=== {client_name} ===")
+    print(f"  Modèle #{report.get('model_id')} - {report.get('n_labels')} score(s) LLM du persona v{report.get('persona_version')} ({report.get('n_train', 0)} pour l'entraînement, {report.get('n_test', 0)} pour le test)")
+    if report.get('n_test'):
+        confident_agreement = report.get('confident_agreement_rate')
+        print(f"  Erreur absolue moyenne: {report['mae']:.3f}")
+        print(f"  Accord qualifié/non qualifié (seuil {report['threshold']}): {report['agreement_rate']:.1%}")
+        print(f"  Appels LLM évités (marge {report['margin']}): {report['llm_calls_saved_rate']:.1%}")
+        if confident_agreement is not None:
+            print(f"  Accord sur les prédictions sûres: {confident_agreement:.1%}")
+        reliable_thresholds = [
+            threshold for threshold, evaluation in (report.get('by_threshold') or {}).items()
+            if (evaluation.get('confident_agreement_rate') or 0) >= MIN_CONFIDENT_AGREEMENT
+        ]
+        print(f"  Seuils où le modèle remplace le LLM: {', '.join(reliable_thresholds) or 'aucun'}")
+    else:
+        print("  Pas assez d'exemples pour un jeu de test")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entraîne le modèle de scoring local à partir des scores LLM')
+    parser.add_argument('--client-id', type=int, default=None, help='ID du client (tous les clients si non spécifié)')
+    parser.add_argument('--min-labels', type=int, default=MIN_TRAINING_LABELS,
+                        help=f'Nombre minimum de scores LLM (défaut: {MIN_TRAINING_LABELS})')
+    parser.add_argument('--if-needed', action='store_true',
+                        help="N'entraîne que si assez de nouveaux scores LLM ont été enregistrés")
+    parser.add_argument('--report', action='store_true', help='Affiche le rapport du modèle actif sans entraîner')
+    args = parser.parse_args()
+
+    init_db()
+
+    clients = get_all_clients()
+    if args.client_id is not None:
+        clients = [client for client in clients if client['id'] == args.client_id]
+        if not clients:
+            logger.error(f"Client {args.client_id} introuvable")
+            sys.exit(1)
+
+    for client in clients:
+        if args.report:
+            model = get_active_scoring_model(client['id'])
+            if model:
+                print_report(client['name'], {'model_id': model['id'], 'n_labels': model['n_labels'],
+                                              'persona_version': model.get('persona_version'), **model['metrics']})
+            else:
+                print(f"\n=== {client['name']} ===\n  Aucun modèle entraîné")
+            continue
+
+        if args.if_needed:
+            report = maybe_retrain(client['id'])
+        else:
+            report = train_client_model(client['id'], min_labels=args.min_labels)
+
+        if report:
+            print_report(client['name'], report)
+        else:
+            print(f"\n=== {client['name']} ===\n  Pas d'entraînement")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Intervalle adaptatif des radars planifiés
+Après chaque exécution, le rendement du radar (nouveaux posts, nouveaux réacteurs, prospects
+qualifiés) allonge ou raccourcit son intervalle effectif, dans les bornes configurées : un
+concurrent qui publie une fois par semaine n'est plus interrogé toutes les heures, un mot-clé
+très actif est interrogé plus souvent. L'explication du choix est enregistrée pour l'interface
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from utils.database import update_radar_adaptive_state
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "adaptive_schedule" de config.json)
+DEFAULT_ADAPTIVE_CONFIG = {
+    # Multiplicateur appliqué après des exécutions sans nouveau post ni nouveau réacteur
+    'stretch_factor': 1.5,
+    # Multiplicateur appliqué après une exécution à fort rendement
+    'shrink_factor': 0.5,
+    # Exécutions vides consécutives avant d'allonger l'intervalle
+    'empty_runs_before_stretch': 1,
+    # Seuils d'une exécution à fort rendement (l'un ou l'autre)
+    'high_yield_qualified': 3,
+    'high_yield_new_reactors': 25,
+    # Bornes par défaut de l'intervalle (surchargées par radar)
+    'min_minutes': 15,
+    'max_minutes': 7 * 24 * 60
+}
+
+# Minutes par unité de planification
+_UNIT_MINUTES = {'minutes': 1, 'hours': 60, 'days': 24 * 60}
+
+
+def load_adaptive_config() -> Dict[str, Any]:
+    """Configuration de l'intervalle adaptatif (clé "adaptive_schedule" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_ADAPTIVE_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('adaptive_schedule', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration adaptive_schedule: {e}")
+    return config
+
+
+def format_interval(minutes: int) -> str:
+    """Intervalle lisible (ex: 45 min, 2 h 30, 3 j 4 h)"""
+    days, rest = divmod(int(minutes), 24 * 60)
+    hours, mins = divmod(rest, 60)
+    if days:
+        return f"{days} j {hours} h" if hours else f"{days} j"
+    if hours:
+        return f"{hours} h {mins:02d}" if mins else f"{hours} h"
+    return f"{mins} min"
+
+
+def base_interval_minutes(radar: Dict[str, Any]) -> Optional[int]:
+    """Intervalle configuré du radar en minutes (None si le radar n'est pas planifié)"""
+    unit = _UNIT_MINUTES.get(radar.get('schedule_type') or 'manual')
+    interval = radar.get('schedule_interval') or 0
+    if not unit or interval <= 0:
+        return None
+    return int(interval) * unit
+
+
+def interval_bounds(radar: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """Bornes (min, max) de l'intervalle adaptatif du radar en minutes"""
+    config = config or load_adaptive_config()
+    min_minutes = int(radar.get('adaptive_min_minutes') or config['min_minutes'])
+    max_minutes = int(radar.get('adaptive_max_minutes') or config['max_minutes'])
+    return max(1, min_minutes), max(min_minutes, max_minutes)
+
+
+def effective_interval_minutes(radar: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    Intervalle effectif du radar en minutes
+
+    Intervalle configuré pour un radar non adaptatif ; pour un radar adaptatif, dernier intervalle
+    retenu (l'intervalle configuré avant la première exécution), borné.
+
+    Returns:
+        Intervalle en minutes, ou None si le radar n'est pas planifié
+    """
+    base = base_interval_minutes(radar)
+    if base is None or not radar.get('adaptive_schedule'):
+        return base
+    min_minutes, max_minutes = interval_bounds(radar, config)
+    current = radar.get('adaptive_interval_minutes') or base
+    return min(max(int(current), min_minutes), max_minutes)
+
+
+def effective_schedule(radar: Dict[str, Any]) -> Tuple[str, int]:
+    """(schedule_type, schedule_interval) à utiliser pour planifier le radar"""
+    schedule_type = radar.get('schedule_type') or 'manual'
+    schedule_interval = radar.get('schedule_interval') or 0
+    effective = effective_interval_minutes(radar)
+    if effective is None or effective == base_interval_minutes(radar):
+        return schedule_type, schedule_interval
+    return 'minutes', effective
+
+
+def next_interval(radar: Dict[str, Any], run_yield: Dict[str, Any],
+                  config: Optional[Dict[str, Any]] = None) -> Tuple[int, int, str]:
+    """
+    Calcule l'intervalle suivant d'un radar adaptatif à partir du rendement de sa dernière exécution
+
+    Une exécution à fort rendement (prospects qualifiés ou nouveaux réacteurs au-dessus des seuils)
+    raccourcit l'intervalle ; des exécutions sans nouveau post ni nouveau réacteur l'allongent ;
+    sinon il est conservé.
+
+    Args:
+        radar: Radar (avec son état adaptatif courant)
+        run_yield: Rendement de l'exécution (new_posts, new_reactors, qualified)
+        config: Configuration (défaut: load_adaptive_config())
+
+    Returns:
+        Tuple (intervalle en minutes, exécutions vides consécutives, explication)
+    """
+    config = config or load_adaptive_config()
+    current = effective_interval_minutes(radar, config)
+    min_minutes, max_minutes = interval_bounds(radar, config)
+
+    new_posts = int(run_yield.get('new_posts') or 0)
+    new_reactors = int(run_yield.get('new_reactors') or 0)
+    qualified = int(run_yield.get('qualified') or 0)
+
+    empty_runs = int(radar.get('adaptive_empty_runs') or 0) + 1 if not (new_posts or new_reactors) else 0
+
+    if qualified >= int(config['high_yield_qualified']) or new_reactors >= int(config['high_yield_new_reactors']):
+        target = current * float(config['shrink_factor'])
+        reason = (f"Raccourci : {qualified} prospect(s) qualifié(s) et {new_reactors} nouveau(x) "
+                  f"réacteur(s) lors de la dernière exécution")
+    elif empty_runs and empty_runs >= int(config['empty_runs_before_stretch']):
+        target = current * float(config['stretch_factor'])
+        reason = f"Allongé : aucun nouveau post ni nouveau réacteur depuis {empty_runs} exécution(s)"
+    else:
+        target = current
+        reason = (f"Conservé : {new_posts} nouveau(x) post(s), {new_reactors} nouveau(x) réacteur(s), "
+                  f"{qualified} prospect(s) qualifié(s) lors de la dernière exécution")
+
+    minutes = min(max(int(round(target)), min_minutes), max_minutes)
+    if minutes != int(round(target)):
+        bound = 'minimum' if minutes == min_minutes else 'maximum'
+        reason += f" (borné au {bound} de {format_interval(minutes)})"
+    if minutes != current:
+        reason = f"{format_interval(current)} → {format_interval(minutes)}. {reason}"
+    return minutes, empty_runs, reason
+
+
+def apply_run_yield(radar: Dict[str, Any], run_yield: Dict[str, Any]) -> Optional[int]:
+    """
+    Enregistre le rendement d'une exécution et, pour un radar adaptatif planifié, ajuste son
+    intervalle et le replanifie si l'intervalle change
+
+    Args:
+        radar: Radar tel qu'avant l'exécution
+        run_yield: Rendement de l'exécution (posts, new_posts, reactions, new_reactors, qualified)
+
+    Returns:
+        Nouvel intervalle effectif en minutes, ou None si le radar n'est pas adaptatif
+    """
+    radar_id = radar['id']
+    if not radar.get('adaptive_schedule') or base_interval_minutes(radar) is None:
+        update_radar_adaptive_state(radar_id, radar.get('adaptive_interval_minutes'), radar.get('adaptive_reason'),
+                                    radar.get('adaptive_empty_runs') or 0, run_yield)
+        return None
+
+    previous = effective_interval_minutes(radar)
+    minutes, empty_runs, reason = next_interval(radar, run_yield)
+    update_radar_adaptive_state(radar_id, minutes, reason, empty_runs, run_yield)
+    logger.info(f"Radar {radar_id} intervalle adaptatif: {reason}")
+
+    if minutes != previous:
+        from utils.radar_scheduler import schedule_radar
+        schedule_radar(radar_id)
+    return minutes
+
+
+def reset_adaptive_interval(radar_id: int):
+    """Repart de l'intervalle configuré (après une modification de la planification du radar)"""
+    update_radar_adaptive_state(radar_id, None, None, 0)
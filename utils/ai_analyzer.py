@@ -4,7 +4,7 @@ Analyse améliorée avec filtrage des concurrents et scoring détaillé
 """
 import json
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
 from pathlib import Path
 
 try:
@@ -13,6 +13,8 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+from utils.llm_telemetry import tracked_chat_completion, tracked_chat_completion_stream
+
 logger = logging.getLogger(__name__)
 
 # Configuration OpenAI depuis config.json
@@ -114,7 +116,9 @@ Réponds UNIQUEMENT avec un JSON valide au format suivant:
 
 Score > 0.6 = post pertinent pour contacter les réacteurs."""
         
-        response = openai_client.chat.completions.create(
+        response = tracked_chat_completion(
+            openai_client,
+            'post_relevance',
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Tu es un expert en qualification de prospects B2B. Réponds UNIQUEMENT avec du JSON valide, sans markdown, sans explications supplémentaires."},
@@ -273,7 +277,9 @@ Réponds UNIQUEMENT avec un JSON valide:
 
 Le score doit être précis: 0.8-1.0 = excellent match, 0.6-0.8 = bon match, 0.4-0.6 = match partiel, <0.4 = faible match."""
         
-        response = openai_client.chat.completions.create(
+        response = tracked_chat_completion(
+            openai_client,
+            'prospect_relevance',
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Tu es un expert en qualification de prospects B2B. Réponds UNIQUEMENT avec du JSON valide, sans markdown."},
@@ -452,9 +458,9 @@ def generate_personalized_message(prospect_data: Dict[str, Any],
             post_text = first_post.get('text', '') or first_post.get('content', '') or ''
             author_company = first_post.get('author', {}).get('name', '') or ''
         
-        # Détecter l'entreprise du prospect depuis le headline
-        from utils.intelligent_scoring import extract_company_from_headline
-        prospect_company = extract_company_from_headline(headline)
+        # Entreprise du prospect (colonne stockée sur la réaction, sinon parseur de headline)
+        from utils.headline_parser import get_parsed_headline
+        prospect_company = get_parsed_headline(prospect_data).company
         
         message_template = company_profile.get('outreach_strategy', {}).get('message_template', {})
         
@@ -487,7 +493,9 @@ Génère un message court (maximum 150 mots) en français qui:
 
 Réponds UNIQUEMENT avec le message, sans markdown, sans "Message:", sans guillemets, directement le texte du message."""
         
-        response = openai_client.chat.completions.create(
+        response = tracked_chat_completion(
+            openai_client,
+            'message',
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec le message final, sans formatage supplémentaire."},
@@ -513,57 +521,84 @@ Réponds UNIQUEMENT avec le message, sans markdown, sans "Message:", sans guille
         return None
 
 
-def generate_message_for_prospect(client_id: int, prospect_data: Dict[str, Any], 
-                                  company_profile: Optional[Dict[str, Any]] = None,
-                                  radar_message_template: Optional[str] = None) -> Optional[str]:
+MESSAGE_SYSTEM_PROMPT = "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec le message final, sans formatage supplémentaire."
+
+
+def build_message_prompt_prefix(company_profile: Dict[str, Any],
+                                radar_message_template: Optional[str] = None) -> str:
     """
-    Génère un message personnalisé pour un prospect spécifique
-    Utilise les données du prospect pour créer le message sans nécessiter les détails complets du post
+    Construit la partie du prompt de message commune à tous les prospects (entreprise, style)
+    
+    Elle est placée en tête du prompt : calculée une fois pour un lot de prospects d'un même radar,
+    elle forme un préfixe identique d'un appel à l'autre (réutilisé par le cache de prompt d'OpenAI).
     
     Args:
-        client_id: ID du client
-        prospect_data: Données du prospect depuis la base de données
-        company_profile: Profil de l'entreprise (optionnel, sera récupéré si non fourni)
+        company_profile: Profil de l'entreprise
         radar_message_template: Message template du radar (optionnel, prioritaire sur le template du profil)
     
     Returns:
-        Message personnalisé en français ou None
+        Préfixe du prompt
     """
-    if not OPENAI_ENABLED or not openai_client:
-        logger.warning("OpenAI non disponible, génération de message ignorée")
-        return None
+    outreach_strategy = company_profile.get('outreach_strategy', {})
     
-    try:
-        # Récupérer le profil entreprise si non fourni
-        if not company_profile:
-            from utils.database import get_client_profile_as_dict
-            company_profile = get_client_profile_as_dict(client_id)
-            if not company_profile:
-                logger.error("Profil entreprise non trouvé")
-                return None
-        
-        prospect_name = prospect_data.get('reactor_name', '')
-        headline = prospect_data.get('headline', '')
-        post_url = prospect_data.get('post_url', '')
-        competitor_name = prospect_data.get('company_name', '') or prospect_data.get('competitor_name', '')
-        
-        # Détecter l'entreprise du prospect depuis le headline
-        from utils.intelligent_scoring import extract_company_from_headline
-        prospect_company = extract_company_from_headline(headline)
-        
-        # Utiliser le message template du radar si disponible, sinon celui du profil entreprise
-        if radar_message_template:
-            # Le message template du radar est utilisé comme base
-            message_template_text = radar_message_template
-            message_template = {}  # Pas de template du profil si on utilise celui du radar
-        else:
-            # Utiliser le template du profil entreprise
-            message_template = company_profile.get('outreach_strategy', {}).get('message_template', {})
-            message_template_text = message_template.get('structure', '') or company_profile.get('outreach_strategy', {}).get('message_example', '')
-        
-        # Créer un prompt simplifié qui utilise les données disponibles
-        prompt = f"""Tu es un expert en outbound B2B. Génère un message personnalisé (icebreaker) LinkedIn pour ce prospect.
+    # Utiliser le message template du radar si disponible, sinon celui du profil entreprise
+    if radar_message_template:
+        message_template_text = radar_message_template
+        tone = 'professionnel, amical'
+        key_points = 'Personnalisation basée sur le template du radar'
+    else:
+        message_template = outreach_strategy.get('message_template', {})
+        message_template_text = message_template.get('structure', '') or outreach_strategy.get('message_example', '')
+        tone = message_template.get('tone', 'professionnel, amical')
+        key_points = ', '.join(message_template.get('key_points', []))
+    
+    return f"""Tu es un expert en outbound B2B. Génère un message personnalisé (icebreaker) LinkedIn pour ce prospect.
 
+Notre entreprise:
+- Nom: {company_profile.get('company_name', '')}
+- Description: {company_profile.get('company_description', '')}
+- Ce qu'on offre: {outreach_strategy.get('what_offers', '')}
+- Proposition de valeur: {outreach_strategy.get('value_proposition', '')}
+
+Style souhaité:
+- Ton: {tone}
+- Structure/Template: {message_template_text if message_template_text else 'Message personnalisé basé sur la réaction du prospect'}
+- Points clés: {key_points}
+"""
+
+
+def build_message_prompt(prompt_prefix: str, prospect_data: Dict[str, Any],
+                         radar_message_template: Optional[str] = None) -> str:
+    """
+    Complète le préfixe commun avec les informations propres au prospect
+    
+    Args:
+        prompt_prefix: Préfixe construit par build_message_prompt_prefix
+        prospect_data: Données du prospect
+        radar_message_template: Message template du radar utilisé pour le préfixe (optionnel)
+    
+    Returns:
+        Prompt complet
+    """
+    prospect_name = prospect_data.get('reactor_name', '')
+    headline = prospect_data.get('headline', '')
+    post_url = prospect_data.get('post_url', '')
+    post_text = (prospect_data.get('post_text') or '')[:800]
+    competitor_name = prospect_data.get('company_name', '') or prospect_data.get('competitor_name', '')
+    
+    # Entreprise du prospect (colonne stockée sur la réaction, sinon parseur de headline)
+    from utils.headline_parser import get_parsed_headline
+    prospect_company = get_parsed_headline(prospect_data).company
+    
+    if radar_message_template:
+        first_instruction = f'1. Suit le template du radar: "{radar_message_template}"'
+        last_instruction = '5. Remplace les variables du template ([entreprise], [sujet], [notre entreprise]) par les valeurs réelles'
+    else:
+        first_instruction = ('1. Fait référence à la réaction du prospect ("Je te contacte car j\'ai vu que tu as réagi à un post de '
+                             + competitor_name + '")')
+        last_instruction = ''
+    
+    return prompt_prefix + f"""
 Prospect:
 - Nom: {prospect_name}
 - Headline: {headline}
@@ -572,44 +607,184 @@ Prospect:
 Contexte:
 - Le prospect a réagi à un post de {competitor_name}
 - Post: {post_url}
-
-Notre entreprise:
-- Nom: {company_profile.get('company_name', '')}
-- Description: {company_profile.get('company_description', '')}
-- Ce qu'on offre: {company_profile.get('outreach_strategy', {}).get('what_offers', '')}
-- Proposition de valeur: {company_profile.get('outreach_strategy', {}).get('value_proposition', '')}
-
-Style souhaité:
-- Ton: {message_template.get('tone', 'professionnel, amical') if not radar_message_template else 'professionnel, amical'}
-- Structure/Template: {message_template_text if message_template_text else 'Message personnalisé basé sur la réaction du prospect'}
-- Points clés: {', '.join(message_template.get('key_points', [])) if not radar_message_template else 'Personnalisation basée sur le template du radar'}
+- Texte du post: {post_text if post_text else 'non disponible'}
 
 Génère un message court (maximum 150 mots) en français qui:
-{f'1. Suit le template du radar: "{message_template_text}"' if radar_message_template else '1. Fait référence à la réaction du prospect ("Je te contacte car j\'ai vu que tu as réagi à un post de ' + competitor_name + '")'}
+{first_instruction}
 2. Connecte avec notre solution en se basant sur le titre/headline du prospect
 3. Pose une question ouverte pertinente basée sur le persona et ce que nous offrons
 4. Est naturel, personnel et engageant
-{f'5. Remplace les variables du template ([entreprise], [sujet], [notre entreprise]) par les valeurs réelles' if radar_message_template else ''}
+{last_instruction}
 
 Réponds UNIQUEMENT avec le message, sans markdown, sans "Message:", sans guillemets, directement le texte du message."""
+
+
+def clean_generated_message(message: str) -> str:
+    """Retire les guillemets et le préfixe "Message:" qu'ajoute parfois le modèle"""
+    message = message.strip()
+    if message.startswith('"') and message.endswith('"'):
+        message = message[1:-1]
+    if message.startswith("Message:"):
+        message = message[8:].strip()
+    return message
+
+
+def _message_prompt(client_id: int, prospect_data: Dict[str, Any],
+                    company_profile: Optional[Dict[str, Any]],
+                    radar_message_template: Optional[str],
+                    prompt_prefix: Optional[str]) -> Optional[str]:
+    """Prompt complet du message d'un prospect (None si le profil entreprise est introuvable)"""
+    if prompt_prefix is None:
+        # Récupérer le profil entreprise si non fourni
+        if not company_profile:
+            from utils.database import get_client_profile_as_dict
+            company_profile = get_client_profile_as_dict(client_id)
+            if not company_profile:
+                logger.error("Profil entreprise non trouvé")
+                return None
+        prompt_prefix = build_message_prompt_prefix(company_profile, radar_message_template)
+    return build_message_prompt(prompt_prefix, prospect_data, radar_message_template)
+
+
+def _hybrid_message(client_id: int, prospect_data: Dict[str, Any],
+                    company_profile: Optional[Dict[str, Any]],
+                    radar_message_template: Optional[str]) -> Optional[str]:
+    """Message rendu depuis le template du radar avec une accroche IA (None : génération complète)"""
+    if not radar_message_template:
+        return None
+    from utils.message_renderer import render_hybrid_message
+    if not company_profile:
+        from utils.database import get_client_profile_as_dict
+        company_profile = get_client_profile_as_dict(client_id)
+        if not company_profile:
+            return None
+    return render_hybrid_message(client_id, prospect_data, company_profile, radar_message_template)
+
+
+def stream_completion_text(prompt: str, purpose: str, system_prompt: str = MESSAGE_SYSTEM_PROMPT,
+                           temperature: float = 0.7, max_tokens: int = 300,
+                           client_id: Optional[int] = None, radar_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Génère un texte en streaming (fragments produits au fil des tokens, ex: pour st.write_stream)
+    
+    Args:
+        prompt: Prompt utilisateur
+        purpose: Usage de l'appel (télémétrie)
+        system_prompt: Prompt système
+        temperature: Température
+        max_tokens: Nombre maximum de tokens générés
+        client_id: ID du client (télémétrie)
+        radar_id: ID du radar (télémétrie)
+    
+    Yields:
+        Fragments du texte généré
+    
+    Raises:
+        RuntimeError: si OpenAI n'est pas disponible
+    """
+    if not OPENAI_ENABLED or not openai_client:
+        raise RuntimeError("OpenAI non disponible")
+    
+    yield from tracked_chat_completion_stream(
+        openai_client,
+        purpose,
+        client_id=client_id,
+        radar_id=radar_id,
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+
+
+def stream_message_for_prospect(client_id: int, prospect_data: Dict[str, Any],
+                                company_profile: Optional[Dict[str, Any]] = None,
+                                radar_message_template: Optional[str] = None,
+                                prompt_prefix: Optional[str] = None) -> Iterator[str]:
+    """
+    Variante en streaming de generate_message_for_prospect
+    
+    Le texte brut est produit au fil des tokens ; l'appelant nettoie le texte complet avec
+    clean_generated_message avant de l'enregistrer.
+    
+    Args:
+        client_id: ID du client
+        prospect_data: Données du prospect depuis la base de données
+        company_profile: Profil de l'entreprise (optionnel, sera récupéré si non fourni)
+        radar_message_template: Message template du radar (optionnel)
+        prompt_prefix: Préfixe du prompt déjà calculé (optionnel)
+    
+    Yields:
+        Fragments du message
+    
+    Raises:
+        RuntimeError: si OpenAI n'est pas disponible ou si le profil entreprise est introuvable
+    """
+    # Template du radar rempli localement : le message est produit d'un bloc
+    message = _hybrid_message(client_id, prospect_data, company_profile, radar_message_template)
+    if message:
+        yield message
+        return
+    
+    prompt = _message_prompt(client_id, prospect_data, company_profile, radar_message_template, prompt_prefix)
+    if prompt is None:
+        raise RuntimeError("Profil entreprise non trouvé")
+    yield from stream_completion_text(prompt, 'message', client_id=client_id)
+
+
+def generate_message_for_prospect(client_id: int, prospect_data: Dict[str, Any], 
+                                  company_profile: Optional[Dict[str, Any]] = None,
+                                  radar_message_template: Optional[str] = None,
+                                  prompt_prefix: Optional[str] = None) -> Optional[str]:
+    """
+    Génère un message personnalisé pour un prospect spécifique
+    Utilise les données du prospect pour créer le message sans nécessiter les détails complets du post
+    Avec un template de radar, le message est rendu localement et seule l'accroche est générée par l'IA
+    (voir utils.message_renderer) ; sinon il est entièrement généré
+    
+    Args:
+        client_id: ID du client
+        prospect_data: Données du prospect depuis la base de données
+        company_profile: Profil de l'entreprise (optionnel, sera récupéré si non fourni)
+        radar_message_template: Message template du radar (optionnel, prioritaire sur le template du profil)
+        prompt_prefix: Préfixe du prompt déjà calculé pour ce profil et ce template (génération en lot)
+    
+    Returns:
+        Message personnalisé en français ou None
+    """
+    if not OPENAI_ENABLED or not openai_client:
+        logger.warning("OpenAI non disponible, génération de message ignorée")
+        return None
+    
+    try:
+        prospect_name = prospect_data.get('reactor_name', '')
         
-        response = openai_client.chat.completions.create(
+        # Rendu hybride : seule l'accroche est demandée à l'IA (mise en cache par post et entreprise)
+        message = _hybrid_message(client_id, prospect_data, company_profile, radar_message_template)
+        if message:
+            return message
+        
+        prompt = _message_prompt(client_id, prospect_data, company_profile, radar_message_template, prompt_prefix)
+        if prompt is None:
+            return None
+        
+        response = tracked_chat_completion(
+            openai_client,
+            'message',
+            client_id=client_id,
             model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec le message final, sans formatage supplémentaire."},
+                {"role": "system", "content": MESSAGE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,  # Plus créatif pour les messages
             max_tokens=300
         )
         
-        message = response.choices[0].message.content.strip()
-        
-        # Nettoyer le message
-        if message.startswith('"') and message.endswith('"'):
-            message = message[1:-1]
-        if message.startswith("Message:"):
-            message = message[8:].strip()
+        message = clean_generated_message(response.choices[0].message.content)
         
         logger.info(f"Message généré pour {prospect_name}: {message[:50]}...")
         return message
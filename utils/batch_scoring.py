@@ -0,0 +1,374 @@
+"""
+Module de scoring par lots (vectorisé) pour la qualification de prospects
+Calcule exactement les mêmes scores que calculate_prospect_score, mais sur un lot entier
+de prospects (DataFrame pandas ou table Arrow) avec des opérations vectorisées NumPy/pandas
+"""
+import re
+import logging
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from utils.headline_parser import LEGACY_COMPANY_PATTERNS, COMPANY_STOPWORDS
+from utils.persona_matcher import SIZE_INDICATORS
+
+logger = logging.getLogger(__name__)
+
+# Au-delà de cette longueur, l'ensemble des sous-chaînes de la cible devient trop gros
+MAX_SUBSTRING_TARGET_LENGTH = 256
+
+
+def _to_dataframe(prospects: Any) -> pd.DataFrame:
+    """Convertit l'entrée (DataFrame, table Arrow, liste de dicts) en DataFrame pandas"""
+    if isinstance(prospects, pd.DataFrame):
+        return prospects
+    if hasattr(prospects, 'to_pandas'):
+        # pyarrow.Table / RecordBatch (sans dépendance directe à pyarrow)
+        return prospects.to_pandas()
+    return pd.DataFrame(list(prospects))
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Retourne une colonne texte sans valeurs manquantes (équivalent de `.get(col, '') or ''`)"""
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    values = df[column]
+    return values.where(values.notna(), '').astype(str)
+
+
+def _substrings(text: str) -> Set[str]:
+    """Ensemble de toutes les sous-chaînes d'une chaîne (pour tester `x in text` via isin)"""
+    return {text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)}
+
+
+def _contained_in(values: pd.Series, target: str) -> np.ndarray:
+    """Masque vectorisé de `value in target` pour chaque valeur"""
+    if len(target) <= MAX_SUBSTRING_TARGET_LENGTH:
+        substrings = _substrings(target)
+        substrings.add('')
+        return values.isin(substrings).to_numpy()
+    return np.fromiter((value in target for value in values), dtype=bool, count=len(values))
+
+
+def _similarity_above(values: pd.Series, target: str, threshold: float, candidates: np.ndarray) -> np.ndarray:
+    """
+    Masque de similarity_score(value, target) > threshold, calculé uniquement sur les candidats
+
+    Le ratio de SequenceMatcher est borné par 2*min(la, lb)/(la + lb) : les lignes dont la borne
+    de longueur ne dépasse pas le seuil sont écartées sans calcul (résultat strictement identique).
+    """
+    result = np.zeros(len(values), dtype=bool)
+    stripped = values.str.strip()
+    target_stripped = target.strip()
+    lengths = stripped.str.len().to_numpy()
+    if not target_stripped:
+        # SequenceMatcher('', '').ratio() vaut 1.0
+        return candidates & (lengths == 0) & (values != '').to_numpy() & bool(target)
+
+    target_length = len(target_stripped)
+    upper_bound = 2.0 * np.minimum(lengths, target_length) / np.maximum(lengths + target_length, 1)
+    candidates = candidates & (lengths > 0) & (upper_bound > threshold)
+
+    matcher = SequenceMatcher(None)
+    matcher.set_seq2(target_stripped)
+    for idx in np.flatnonzero(candidates):
+        matcher.set_seq1(stripped.iat[idx])
+        if matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold:
+            result[idx] = matcher.ratio() > threshold
+    return result
+
+
+def extract_companies_batch(headlines: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de l'extraction historique d'entreprise (utils.headline_parser.extract_legacy_company)
+
+    Args:
+        headlines: Série de headlines (sans valeurs manquantes)
+
+    Returns:
+        Série avec le nom de l'entreprise ou None
+    """
+    companies = pd.Series(np.full(len(headlines), None, dtype=object), index=headlines.index)
+    unresolved = headlines != ''
+
+    for pattern in LEGACY_COMPANY_PATTERNS:
+        if not unresolved.any():
+            break
+        extracted = headlines[unresolved].str.extract(pattern, flags=re.IGNORECASE, expand=False).str.strip()
+        valid = extracted.notna() & ~extracted.str.lower().isin(COMPANY_STOPWORDS)
+        valid_index = valid[valid].index
+        companies.loc[valid_index] = extracted.loc[valid_index]
+        unresolved.loc[valid_index] = False
+
+    return companies
+
+
+def extract_job_titles_batch(headlines: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de l'extraction du titre de poste faite dans calculate_prospect_score
+    (partie avant 'chez' puis avant 'at', ou le headline complet)
+    """
+    has_separator = (
+        headlines.str.contains('chez', regex=False) |
+        headlines.str.contains('at', regex=False)
+    )
+    titles = (
+        headlines.str.split('chez', n=1, regex=False).str[0]
+        .str.split('at', n=1, regex=False).str[0]
+        .str.strip()
+    )
+    return titles.where(has_separator, headlines)
+
+
+def job_title_scores_batch(job_titles: pd.Series, target_job_titles: List[str]) -> np.ndarray:
+    """
+    Version vectorisée de calculate_job_title_score
+
+    Comme la version unitaire, le premier titre cible (dans l'ordre) qui correspond
+    à un critère détermine le score.
+
+    Args:
+        job_titles: Série de titres de poste
+        target_job_titles: Liste des titres cibles
+
+    Returns:
+        Tableau de scores (0-0.3)
+    """
+    scores = np.zeros(len(job_titles), dtype=float)
+    if not target_job_titles or len(job_titles) == 0:
+        return scores
+
+    # Travailler sur les valeurs uniques (les headlines se répètent beaucoup)
+    codes, uniques = pd.factorize(job_titles)
+    titles = pd.Series(uniques, dtype=object).str.lower()
+    unique_scores = np.zeros(len(titles), dtype=float)
+    undecided = (titles != '').to_numpy().copy()
+
+    # Ensembles de mots par titre (pour le critère "mots clés communs")
+    exploded = titles.str.split().explode().dropna()
+    words = pd.DataFrame({
+        'row': exploded.index.to_numpy(dtype=np.int64),
+        'word': exploded.to_numpy()
+    }).drop_duplicates()
+
+    for target_title in target_job_titles:
+        if not undecided.any():
+            break
+        target_lower = target_title.lower()
+
+        exact = (titles == target_lower).to_numpy()
+        partial = titles.str.contains(target_lower, regex=False).to_numpy() | _contained_in(titles, target_lower)
+
+        target_words = set(target_lower.split())
+        matching_rows = words['row'].to_numpy()[words['word'].isin(target_words).to_numpy()]
+        common = np.bincount(matching_rows, minlength=len(titles)) >= 2
+
+        remaining = undecided & ~exact & ~partial & ~common
+        similar = _similarity_above(titles, target_lower, 0.6, remaining)
+
+        target_scores = np.select(
+            [exact, partial, common, similar],
+            [0.3, 0.2, 0.15, 0.1],
+            default=0.0
+        )
+        matched = undecided & (target_scores > 0)
+        unique_scores[matched] = target_scores[matched]
+        undecided &= ~matched
+
+    return unique_scores[codes]
+
+
+def company_scores_batch(companies: pd.Series, target_persona: Dict[str, Any]) -> np.ndarray:
+    """
+    Version vectorisée de calculate_company_match_score
+
+    Args:
+        companies: Série de noms d'entreprise (None si non détectée)
+        target_persona: Profil persona cible
+
+    Returns:
+        Tableau de scores (0-0.25)
+    """
+    scores = np.zeros(len(companies), dtype=float)
+    has_company = (companies.notna() & (companies != '')).to_numpy()
+    if not has_company.any():
+        return scores
+
+    companies_lower = companies.where(has_company, '').astype(str).str.lower()
+
+    def any_contained(keywords: List[str]) -> np.ndarray:
+        mask = np.zeros(len(companies_lower), dtype=bool)
+        for keyword in keywords:
+            mask |= companies_lower.str.contains(keyword.lower(), regex=False).to_numpy()
+        return mask & has_company
+
+    scores += np.where(any_contained(target_persona.get('company_types', [])), 0.1, 0.0)
+    scores += np.where(any_contained(target_persona.get('industries', [])), 0.1, 0.0)
+
+    company_size = (target_persona.get('company_size', '') or '').lower()
+    if company_size:
+        for size_key, indicators in SIZE_INDICATORS.items():
+            if size_key in company_size:
+                scores += np.where(any_contained(indicators), 0.05, 0.0)
+                break
+
+    return np.minimum(scores, 0.25)
+
+
+def location_scores_batch(locations: pd.Series, target_location: str) -> np.ndarray:
+    """
+    Version vectorisée de calculate_location_score
+
+    Args:
+        locations: Série de localisations
+        target_location: Localisation cible
+
+    Returns:
+        Tableau de scores (0-0.15)
+    """
+    if not target_location or len(locations) == 0:
+        return np.zeros(len(locations), dtype=float)
+
+    codes, uniques = pd.factorize(locations)
+    values = pd.Series(uniques, dtype=object).str.lower()
+    target_lower = target_location.lower()
+    has_value = (values != '').to_numpy()
+
+    exact = (values == target_lower).to_numpy()
+    partial = values.str.contains(target_lower, regex=False).to_numpy() | _contained_in(values, target_lower)
+    similar = _similarity_above(values, target_lower, 0.7, has_value & ~exact & ~partial)
+
+    unique_scores = np.select([exact, partial, similar], [0.15, 0.1, 0.05], default=0.0)
+    unique_scores[~has_value] = 0.0
+    return unique_scores[codes]
+
+
+def engagement_scores_batch(reaction_types: pd.Series) -> np.ndarray:
+    """Version vectorisée de calculate_engagement_score"""
+    upper = reaction_types.str.upper()
+    return np.select(
+        [
+            upper.str.contains('COMMENT', regex=False).to_numpy(),
+            (upper.str.contains('REPOST', regex=False) | upper.str.contains('SHARE', regex=False)).to_numpy(),
+            (upper.str.contains('LIKE', regex=False) | upper.str.contains('PRAISE', regex=False)).to_numpy(),
+        ],
+        [0.15, 0.1, 0.05],
+        default=0.0
+    )
+
+
+def score_prospects_batch(prospects: Any, company_profile: Dict[str, Any],
+                          post_context: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Calcule le score multi-critères d'un lot de prospects (équivalent vectorisé de calculate_prospect_score)
+
+    Args:
+        prospects: DataFrame pandas, table Arrow ou liste de dicts (colonnes headline,
+                   reaction_type, location)
+        company_profile: Profil de l'entreprise client
+        post_context: Contexte du post commun à tout le lot (optionnel)
+
+    Returns:
+        DataFrame aligné sur l'index d'entrée avec les colonnes total_score, job_title_score,
+        company_score, location_score, engagement_score, post_relevance_score,
+        job_title, prospect_company et reaction_type
+    """
+    df = _to_dataframe(prospects)
+    target_persona = company_profile.get('target_persona', {}) or {}
+
+    headlines = _text_column(df, 'headline')
+    reaction_types = _text_column(df, 'reaction_type')
+    locations = _text_column(df, 'location')
+
+    # Extraction sur les headlines uniques
+    codes, unique_headlines = pd.factorize(headlines)
+    unique_headlines = pd.Series(unique_headlines, dtype=object)
+    unique_companies = extract_companies_batch(unique_headlines)
+    unique_titles = extract_job_titles_batch(unique_headlines)
+
+    job_titles = pd.Series(unique_titles.to_numpy()[codes], index=df.index, dtype=object)
+    companies = pd.Series(unique_companies.to_numpy()[codes], index=df.index, dtype=object)
+
+    job_title_scores = np.zeros(len(df), dtype=float)
+    if len(unique_titles):
+        job_title_scores = job_title_scores_batch(unique_titles, target_persona.get('job_titles', []))[codes]
+    company_scores = np.zeros(len(df), dtype=float)
+    if len(unique_companies):
+        company_scores = company_scores_batch(unique_companies, target_persona)[codes]
+    location_scores = location_scores_batch(locations, target_persona.get('geographic_location', ''))
+    engagement_scores = engagement_scores_batch(reaction_types)
+
+    post_relevance_score = 0.0
+    if post_context and post_context.get('post_relevant', False):
+        post_relevance_score = min(post_context.get('post_score', 0.0), 0.15)
+    post_relevance_scores = np.full(len(df), post_relevance_score, dtype=float)
+
+    # Même ordre d'addition que calculate_prospect_score (résultats flottants identiques)
+    total_scores = (
+        job_title_scores +
+        company_scores +
+        location_scores +
+        engagement_scores +
+        post_relevance_scores
+    )
+
+    return pd.DataFrame({
+        'total_score': np.minimum(total_scores, 1.0),
+        'job_title_score': job_title_scores,
+        'company_score': company_scores,
+        'location_score': location_scores,
+        'engagement_score': engagement_scores,
+        'post_relevance_score': post_relevance_scores,
+        'job_title': job_titles,
+        'prospect_company': companies,
+        'reaction_type': reaction_types
+    }, index=df.index)
+
+
+def batch_scores_to_dicts(scores: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convertit le résultat de score_prospects_batch au format de calculate_prospect_score
+
+    Args:
+        scores: DataFrame retourné par score_prospects_batch
+
+    Returns:
+        Liste de dicts (total_score, sous-scores et details)
+    """
+    results = []
+    for row in scores.itertuples(index=False):
+        results.append({
+            'total_score': float(row.total_score),
+            'job_title_score': float(row.job_title_score),
+            'company_score': float(row.company_score),
+            'location_score': float(row.location_score),
+            'engagement_score': float(row.engagement_score),
+            'post_relevance_score': float(row.post_relevance_score),
+            'details': {
+                'job_title': row.job_title,
+                'prospect_company': row.prospect_company,
+                'reaction_type': row.reaction_type
+            }
+        })
+    return results
+
+
+def score_reactions_rule_based(reactions: List[Dict[str, Any]], company_profile: Dict[str, Any],
+                               post_context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Score une liste de réactions avec le scoring par règles, en un seul passage vectorisé
+
+    Args:
+        reactions: Liste de réactions (dicts)
+        company_profile: Profil de l'entreprise client
+        post_context: Contexte du post (optionnel)
+
+    Returns:
+        Liste de résultats de scoring, dans le même ordre que les réactions
+    """
+    if not reactions:
+        return []
+    scores = score_prospects_batch(reactions, company_profile, post_context)
+    return batch_scores_to_dicts(scores)
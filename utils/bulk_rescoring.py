@@ -0,0 +1,549 @@
+"""
+Recalcul du scoring en masse (après modification du persona)
+Les réactions sont lues par blocs (pagination par id), scorées par lot ou en parallèle
+pour l'IA, puis réécrites en une transaction par bloc ; la progression est enregistrée
+dans rescoring_jobs pour pouvoir reprendre un job interrompu
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from utils.llm_telemetry import llm_context
+from utils.database import (
+    get_connection, get_client_profile_as_dict, create_rescoring_job,
+    get_rescoring_job, update_rescoring_job, claim_rescoring_job, get_posts_by_url,
+    get_radar_score_thresholds
+)
+
+logger = logging.getLogger(__name__)
+
+# Nombre de réactions lues et réécrites par transaction
+DEFAULT_CHUNK_SIZE = 200
+
+# Nombre d'appels IA simultanés
+DEFAULT_MAX_WORKERS = 8
+
+# Modes de scoring disponibles pour le recalcul
+RESCORING_MODES = {
+    'ai': "IA (règles si OpenAI indisponible)",
+    'rules': "Règles",
+    'semantic': "Sémantique local",
+    'local_model': "Modèle local (IA si incertain)",
+}
+
+# Statuts à partir desquels un job peut être (re)lancé
+RESUMABLE_STATUSES = ('pending', 'failed', 'cancelled')
+
+# Un job 'running' sans progression depuis ce délai est considéré comme interrompu et peut être repris
+STALLED_JOB_MINUTES = 15
+
+# Clés du scoring existant conservées lors du recalcul (données d'enrichissement)
+PRESERVED_KEYS = ('enriched_profile', 'enriched_company')
+
+# Réaction scorée avec une version antérieure du persona
+STALE_CLAUSE = (
+    "COALESCE(persona_version, 0) < (SELECT COALESCE(persona_version, 1) FROM client_profiles "
+    "WHERE client_profiles.client_id = reactions.client_id)"
+)
+
+# Configuration par défaut du recalcul progressif des scores obsolètes (clé "stale_rescoring" de config.json)
+DEFAULT_STALE_RESCORING_CONFIG = {
+    'enabled': True,
+    'interval_minutes': 30,
+    'llm_budget_per_run': 50,
+    'max_rows_per_run': 1000,
+    'scoring_mode': 'ai',
+    # Seuil des réactions sans radar : les autres sont requalifiées avec le seuil de leur radar
+    'score_threshold': 0.6
+}
+
+_running_jobs: Dict[int, threading.Thread] = {}
+_running_jobs_lock = threading.Lock()
+
+
+def _filters_clause(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Construit la clause SQL des filtres d'un job
+
+    Filtres supportés:
+        reaction_ids: liste d'IDs de réactions (sélection)
+        only_relevant: uniquement les prospects qualifiés
+        min_score / max_score: bornes du score actuel
+        competitor_name: réactions collectées sur ce concurrent
+        stale_only: uniquement les réactions scorées avec une version antérieure du persona
+    """
+    clauses, params = [], []
+    if filters.get('reaction_ids'):
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(reaction_id) for reaction_id in filters['reaction_ids']]))
+    if filters.get('only_relevant'):
+        clauses.append("prospect_relevant = 1")
+    if filters.get('min_score') is not None:
+        clauses.append("COALESCE(relevance_score, 0) >= ?")
+        params.append(float(filters['min_score']))
+    if filters.get('max_score') is not None:
+        clauses.append("COALESCE(relevance_score, 0) <= ?")
+        params.append(float(filters['max_score']))
+    if filters.get('competitor_name'):
+        clauses.append("competitor_name = ?")
+        params.append(filters['competitor_name'])
+    if filters.get('stale_only'):
+        clauses.append(STALE_CLAUSE)
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def count_reactions_to_rescore(client_id: int, filters: Dict[str, Any], after_id: int = 0) -> int:
+    """Nombre de réactions correspondant aux filtres (au-delà de after_id)"""
+    where, params = _filters_clause(filters)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT COUNT(*) FROM reactions WHERE client_id = ? AND id > ?{where}",
+            [client_id, after_id] + params
+        )
+        return cursor.fetchone()[0]
+
+
+def iter_reaction_chunks(client_id: int, filters: Dict[str, Any], after_id: int = 0,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Parcourt les réactions par blocs, triées par id (pagination par clé, sans OFFSET)
+
+    Args:
+        client_id: ID du client
+        filters: Filtres du job
+        after_id: Reprendre après cet id
+        chunk_size: Taille des blocs
+
+    Yields:
+        Listes de réactions (dicts)
+    """
+    where, params = _filters_clause(filters)
+    last_id = after_id
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT * FROM reactions WHERE client_id = ? AND id > ?{where} ORDER BY id LIMIT ?",
+                [client_id, last_id] + params + [chunk_size]
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        yield rows
+
+
+def _prospect_for_scoring(reaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Données du prospect utilisées par le scoring (cf. recalculate_prospect_scoring)"""
+    return {
+        'reactor_name': reaction.get('reactor_name', ''),
+        'headline': reaction.get('headline', ''),
+        'headline_title': reaction.get('headline_title'),
+        'headline_company': reaction.get('headline_company'),
+        'headline_seniority': reaction.get('headline_seniority'),
+        'reaction_type': reaction.get('reaction_type', ''),
+        'location': '',
+        'profile_url': reaction.get('profile_url', ''),
+        'reactor_urn': reaction.get('reactor_urn', '')
+    }
+
+
+def score_reactions(reactions: List[Dict[str, Any]], company_profile: Dict[str, Any],
+                    client_id: int, scoring_mode: str = 'ai', score_threshold: float = 0.6,
+                    max_workers: int = DEFAULT_MAX_WORKERS) -> List[Optional[Dict[str, Any]]]:
+    """
+    Score un bloc de réactions : passage vectorisé (règles, sémantique, modèle local)
+    et appels IA en parallèle pour le reste
+
+    Le modèle local n'est utilisé que s'il a été entraîné sur la version du persona du profil,
+    celle enregistrée avec les nouveaux scores (voir write_scores) ; sinon tout le bloc passe par l'IA.
+
+    Args:
+        reactions: Réactions lues depuis la base
+        company_profile: Profil entreprise
+        client_id: ID du client
+        scoring_mode: Mode de scoring
+        score_threshold: Seuil de qualification
+        max_workers: Nombre d'appels IA simultanés
+
+    Returns:
+        Liste (même ordre) de résultats de scoring, None en cas d'erreur
+    """
+    from utils import intelligent_scoring
+    from utils.intelligent_scoring import calculate_prospect_score_with_ai, build_post_context
+
+    prospects = [_prospect_for_scoring(reaction) for reaction in reactions]
+    openai_available = intelligent_scoring.OPENAI_ENABLED and intelligent_scoring.openai_client
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(prospects)
+    if scoring_mode == 'semantic':
+        from utils.semantic_scoring import semantic_scores_batch
+        return semantic_scores_batch(prospects, company_profile)
+    if scoring_mode == 'rules' or not openai_available:
+        from utils.batch_scoring import score_reactions_rule_based
+        return score_reactions_rule_based(prospects, company_profile)
+    if scoring_mode == 'local_model':
+        from utils.local_classifier import score_with_local_model
+        results = score_with_local_model(prospects, client_id, score_threshold,
+                                         persona_version=company_profile.get('persona_version'))
+
+    pending = [position for position, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    # Contenu des posts lu en une requête pour tout le bloc
+    posts = get_posts_by_url([reactions[position].get('post_url') for position in pending])
+
+    def score_one(position: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+        reaction = reactions[position]
+        try:
+            with llm_context(client_id=client_id, radar_id=reaction.get('radar_id')):
+                return position, calculate_prospect_score_with_ai(
+                    prospects[position],
+                    company_profile,
+                    post_context=build_post_context(posts.get(reaction.get('post_url')),
+                                                    reaction.get('competitor_name', ''))
+                )
+        except Exception as e:
+            logger.error(f"Erreur de scoring pour {reaction.get('reactor_name', 'Unknown')}: {e}")
+            return position, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+        for position, result in executor.map(score_one, pending):
+            results[position] = result
+
+    llm_scores = [
+        (prospects[position], results[position].get('total_score', 0.0))
+        for position in pending
+        if results[position] and results[position].get('reasoning')
+    ]
+    if llm_scores:
+        from utils.local_classifier import record_llm_scores
+        record_llm_scores(client_id, llm_scores, company_profile.get('persona_version'))
+
+    return results
+
+
+def _merged_reasoning(reaction: Dict[str, Any], scoring_result: Dict[str, Any]) -> str:
+    """Nouveau scoring sérialisé, en gardant les données d'enrichissement existantes"""
+    merged = dict(scoring_result)
+    try:
+        previous = json.loads(reaction.get('relevance_reasoning') or '{}')
+    except (TypeError, ValueError):
+        previous = {}
+    if isinstance(previous, dict):
+        for key in PRESERVED_KEYS:
+            if key in previous and key not in merged:
+                merged[key] = previous[key]
+    return json.dumps(merged, ensure_ascii=False)
+
+
+def write_scores(job_id: Optional[int], reactions: List[Dict[str, Any]],
+                 results: List[Optional[Dict[str, Any]]], score_threshold: float,
+                 persona_version: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Réécrit les scores d'un bloc et la progression du job dans une seule transaction
+
+    Args:
+        job_id: ID du job (None : pas de progression à enregistrer)
+        reactions: Réactions du bloc
+        results: Résultats de scoring (None en cas d'erreur)
+        score_threshold: Seuil de qualification
+        persona_version: Version du persona utilisée pour scorer
+
+    Returns:
+        Tuple (nombre de réactions mises à jour, nombre d'erreurs)
+    """
+    updates = []
+    errors = 0
+    for reaction, result in zip(reactions, results):
+        if result is None:
+            errors += 1
+            continue
+        score = result.get('total_score', 0.0)
+        updates.append((score, 1 if score >= score_threshold else 0,
+                        _merged_reasoning(reaction, result), persona_version, reaction['id']))
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE reactions
+            SET relevance_score = ?, prospect_relevant = ?, relevance_reasoning = ?,
+                persona_version = COALESCE(?, persona_version), score_status = 'scored'
+            WHERE id = ?
+        """, updates)
+        if job_id is None:
+            return len(updates), errors
+        cursor.execute("""
+            UPDATE rescoring_jobs
+            SET processed = processed + ?, errors = errors + ?, last_reaction_id = ?, updated_at = ?
+            WHERE id = ?
+        """, (len(reactions), errors, reactions[-1]['id'], datetime.now().isoformat(), job_id))
+    return len(updates), errors
+
+
+def run_rescoring_job(job_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Exécute (ou reprend) un job de recalcul jusqu'au bout
+
+    Args:
+        job_id: ID du job
+        chunk_size: Nombre de réactions par bloc
+        max_workers: Nombre d'appels IA simultanés
+        progress_callback: Fonction appelée après chaque bloc avec l'état du job
+
+    Returns:
+        État final du job ou None si le job est introuvable
+    """
+    job = get_rescoring_job(job_id)
+    if not job:
+        logger.error(f"Job de recalcul {job_id} introuvable")
+        return None
+    if job['status'] not in RESUMABLE_STATUSES + ('running',):
+        logger.info(f"Job de recalcul {job_id} déjà terminé ({job['status']})")
+        return job
+
+    # Réclamation atomique : un job en cours ailleurs n'est repris que s'il ne progresse plus
+    stalled_before = (datetime.now() - timedelta(minutes=STALLED_JOB_MINUTES)).isoformat()
+    if not claim_rescoring_job(job_id, RESUMABLE_STATUSES, stalled_before):
+        logger.info(f"Job de recalcul {job_id} déjà en cours d'exécution")
+        return get_rescoring_job(job_id)
+
+    client_id = job['client_id']
+    company_profile = get_client_profile_as_dict(client_id)
+    if not company_profile:
+        update_rescoring_job(job_id, status='failed', error_message="Profil entreprise non trouvé")
+        logger.error(f"Profil entreprise non trouvé pour le client {client_id}")
+        return get_rescoring_job(job_id)
+
+    filters = job['filters']
+    remaining = count_reactions_to_rescore(client_id, filters, job['last_reaction_id'])
+    update_rescoring_job(
+        job_id,
+        total=job['processed'] + remaining,
+        started_at=job.get('started_at') or datetime.now().isoformat(),
+        error_message=None
+    )
+    logger.info(f"Recalcul {job_id}: {remaining} prospect(s) à scorer (mode {job['scoring_mode']})")
+
+    try:
+        for chunk in iter_reaction_chunks(client_id, filters, job['last_reaction_id'], chunk_size):
+            # Annulation demandée depuis l'interface ou la ligne de commande
+            if get_rescoring_job(job_id)['status'] == 'cancelled':
+                logger.info(f"Recalcul {job_id} annulé")
+                return get_rescoring_job(job_id)
+
+            results = score_reactions(chunk, company_profile, client_id, job['scoring_mode'],
+                                      job['score_threshold'], max_workers)
+            updated, errors = write_scores(job_id, chunk, results, job['score_threshold'],
+                                           company_profile.get('persona_version'))
+
+            state = get_rescoring_job(job_id)
+            logger.info(f"  → Recalcul {job_id}: {state['processed']}/{state['total']} ({updated} mis à jour, {errors} erreur(s))")
+            if progress_callback:
+                progress_callback(state)
+
+        # Une annulation demandée pendant le dernier bloc n'est pas écrasée
+        if update_rescoring_job(job_id, expected_status='running', status='completed',
+                                finished_at=datetime.now().isoformat()):
+            logger.info(f"✓ Recalcul {job_id} terminé")
+        else:
+            logger.info(f"Recalcul {job_id} annulé")
+    except Exception as e:
+        logger.error(f"Erreur lors du recalcul {job_id}: {e}", exc_info=True)
+        update_rescoring_job(job_id, expected_status='running', status='failed', error_message=str(e))
+
+    return get_rescoring_job(job_id)
+
+
+def start_rescoring(client_id: int, filters: Optional[Dict[str, Any]] = None, scoring_mode: str = 'ai',
+                    score_threshold: float = 0.6, background: bool = False, **kwargs) -> int:
+    """
+    Crée un job de recalcul et l'exécute (dans un thread si background=True)
+
+    Args:
+        client_id: ID du client
+        filters: Filtres sur les réactions
+        scoring_mode: Mode de scoring
+        score_threshold: Seuil de qualification
+        background: Exécuter dans un thread (l'interface suit la progression via rescoring_jobs)
+        **kwargs: chunk_size, max_workers
+
+    Returns:
+        ID du job
+    """
+    job_id = create_rescoring_job(client_id, filters, scoring_mode, score_threshold)
+    if background:
+        run_in_background(job_id, **kwargs)
+    else:
+        run_rescoring_job(job_id, **kwargs)
+    return job_id
+
+
+def run_in_background(job_id: int, **kwargs) -> bool:
+    """
+    Lance (ou reprend) un job dans un thread de fond
+
+    Returns:
+        False si le job tourne déjà dans ce processus
+    """
+    with _running_jobs_lock:
+        thread = _running_jobs.get(job_id)
+        if thread is not None and thread.is_alive():
+            return False
+        thread = threading.Thread(target=run_rescoring_job, args=(job_id,), kwargs=kwargs,
+                                  name=f"rescoring-{job_id}", daemon=True)
+        _running_jobs[job_id] = thread
+        thread.start()
+    return True
+
+
+def is_running_in_process(job_id: int) -> bool:
+    """Indique si le job tourne dans un thread de ce processus"""
+    with _running_jobs_lock:
+        thread = _running_jobs.get(job_id)
+        return thread is not None and thread.is_alive()
+
+
+def cancel_rescoring_job(job_id: int) -> bool:
+    """Demande l'arrêt d'un job (pris en compte avant le bloc suivant)"""
+    job = get_rescoring_job(job_id)
+    if not job or job['status'] not in ('pending', 'running'):
+        return False
+    return update_rescoring_job(job_id, status='cancelled')
+
+
+def load_stale_rescoring_config() -> Dict[str, Any]:
+    """Configuration du recalcul progressif (clé "stale_rescoring" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_STALE_RESCORING_CONFIG)
+    config_file = Path(__file__).parent.parent / "config.json"
+    try:
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('stale_rescoring', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration stale_rescoring: {e}")
+    return config
+
+
+def rescore_stale_reactions(client_id: int, llm_budget: int, max_rows: int,
+                            scoring_mode: str = 'ai', score_threshold: float = 0.6,
+                            chunk_size: int = 50) -> Dict[str, int]:
+    """
+    Recalcule une partie des réactions obsolètes d'un client, dans la limite d'un budget d'appels LLM
+
+    Les prospects qualifiés et les meilleurs scores passent en premier. Chaque réaction est
+    requalifiée avec le seuil du radar qui l'a trouvée.
+
+    Args:
+        client_id: ID du client
+        llm_budget: Nombre maximum d'appels LLM
+        max_rows: Nombre maximum de réactions recalculées
+        scoring_mode: Mode de scoring
+        score_threshold: Seuil de qualification des réactions sans radar (ou d'un radar supprimé)
+        chunk_size: Réactions par transaction
+
+    Returns:
+        Dict avec rescored, errors, llm_calls
+    """
+    from utils import intelligent_scoring
+
+    stats = {'rescored': 0, 'errors': 0, 'llm_calls': 0}
+    company_profile = get_client_profile_as_dict(client_id)
+    if not company_profile:
+        return stats
+
+    uses_llm = (scoring_mode in ('ai', 'local_model') and
+                intelligent_scoring.OPENAI_ENABLED and intelligent_scoring.openai_client)
+    attempted = set()
+
+    while stats['rescored'] + stats['errors'] < max_rows:
+        limit = min(chunk_size, max_rows - stats['rescored'] - stats['errors'])
+        if uses_llm:
+            # En mode IA pur, chaque réaction coûte au plus un appel
+            limit = min(limit, llm_budget - stats['llm_calls'])
+        if limit <= 0:
+            break
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT * FROM reactions
+                WHERE client_id = ? AND {STALE_CLAUSE}
+                ORDER BY prospect_relevant DESC, COALESCE(relevance_score, 0) DESC, id
+                LIMIT ?
+            """, (client_id, limit + len(attempted)))
+            chunk = [dict(row) for row in cursor.fetchall() if row['id'] not in attempted][:limit]
+        if not chunk:
+            break
+        attempted.update(reaction['id'] for reaction in chunk)
+
+        # Un groupe par radar d'origine, requalifié avec le seuil de ce radar
+        thresholds = get_radar_score_thresholds([reaction.get('radar_id') for reaction in chunk])
+        groups: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        for reaction in chunk:
+            groups.setdefault(reaction.get('radar_id'), []).append(reaction)
+
+        for radar_id, group in groups.items():
+            threshold = thresholds.get(radar_id, score_threshold)
+            results = score_reactions(group, company_profile, client_id, scoring_mode, threshold,
+                                      max_workers=DEFAULT_MAX_WORKERS)
+            updated, errors = write_scores(None, group, results, threshold,
+                                           company_profile.get('persona_version'))
+            stats['rescored'] += updated
+            stats['errors'] += errors
+            stats['llm_calls'] += sum(1 for result in results if result and result.get('reasoning'))
+
+    return stats
+
+
+def run_stale_rescoring(config: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    Tâche de fond : recalcule progressivement les scores obsolètes de tous les clients
+    avec un budget global d'appels LLM par exécution
+
+    Args:
+        config: Configuration (défaut: load_stale_rescoring_config())
+
+    Returns:
+        Totaux (rescored, errors, llm_calls)
+    """
+    from utils.database import get_all_clients, count_stale_reactions
+
+    config = config or load_stale_rescoring_config()
+    totals = {'rescored': 0, 'errors': 0, 'llm_calls': 0}
+    if not config.get('enabled', True):
+        return totals
+
+    llm_budget = int(config.get('llm_budget_per_run', 50))
+    max_rows = int(config.get('max_rows_per_run', 1000))
+
+    for client in get_all_clients():
+        remaining_budget = llm_budget - totals['llm_calls']
+        remaining_rows = max_rows - totals['rescored'] - totals['errors']
+        if remaining_budget <= 0 or remaining_rows <= 0:
+            break
+        stale_count = count_stale_reactions(client['id'])
+        if not stale_count:
+            continue
+        logger.info(f"Recalcul des scores obsolètes: {client['name']} ({stale_count} réaction(s) obsolète(s))")
+        stats = rescore_stale_reactions(
+            client['id'],
+            llm_budget=remaining_budget,
+            max_rows=remaining_rows,
+            scoring_mode=config.get('scoring_mode', 'ai'),
+            score_threshold=float(config.get('score_threshold', 0.6))
+        )
+        for key in totals:
+            totals[key] += stats[key]
+
+    if totals['rescored'] or totals['errors']:
+        logger.info(f"✓ Scores obsolètes recalculés: {totals['rescored']} ({totals['llm_calls']} appel(s) LLM, {totals['errors']} erreur(s))")
+    return totals
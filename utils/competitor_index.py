@@ -0,0 +1,238 @@
+"""
+Index des concurrents pour le filtrage des réactions
+Construit une fois par client (depuis get_competitors) et donne les mêmes verdicts que
+check_if_competitor sans boucler sur tous les concurrents pour chaque prospect
+"""
+import re
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.headline_parser import get_parsed_headline
+
+logger = logging.getLogger(__name__)
+
+# Seuil de similarité utilisé par check_if_competitor
+COMPETITOR_SIMILARITY_THRESHOLD = 0.8
+
+# Nombre d'index gardés en mémoire (un par liste de concurrents)
+MAX_CACHED_INDEXES = 32
+
+# Nombre de cases de l'histogramme de caractères utilisé comme clé de blocage
+CHAR_BUCKETS = 64
+
+_indexes: "OrderedDict[Tuple, CompetitorIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Construit une regex en forme de trie (préfixes communs factorisés)
+
+    Le moteur de regex ne teste plus chaque nom à chaque position du texte mais descend
+    dans le trie : c'est l'équivalent d'un automate de recherche multi-motifs.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        if '' in node and len(node) == 1:
+            return ''
+        optional = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            # Un nom plus court se termine ici : la suite est facultative
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+def _char_histogram(text: str) -> np.ndarray:
+    """Histogramme des caractères d'une chaîne (caractères regroupés en CHAR_BUCKETS cases)"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return np.bincount(codes % CHAR_BUCKETS, minlength=CHAR_BUCKETS)
+
+
+class CompetitorIndex:
+    """
+    Index des noms de concurrents normalisés
+
+    - un automate (regex trie) pour trouver en un passage les noms présents dans le headline
+      ou l'URL du profil
+    - des clés de blocage (longueur, histogramme de caractères) pour limiter le calcul de
+      similarité aux noms pour lesquels un ratio > 0.8 est possible
+    """
+
+    def __init__(self, competitors_list: List[Dict[str, Any]]):
+        # (ordre dans la liste, nom normalisé, nom d'origine)
+        self.entries: List[Tuple[int, str, str]] = []
+        for order, competitor in enumerate(competitors_list or []):
+            normalized = (competitor.get('company_name', '') or '').lower().strip()
+            if normalized:
+                self.entries.append((order, normalized, competitor['company_name']))
+
+        # Automate : à chaque position, le plus long nom qui commence là (lookahead => chevauchements)
+        self._order_by_name: Dict[str, int] = {}
+        for order, normalized, _ in self.entries:
+            self._order_by_name.setdefault(normalized, order)
+        names = sorted(self._order_by_name)
+        self._names_finder = re.compile('(?=(' + _trie_pattern(names) + '))') if names else None
+
+        self._names_by_order = {order: company_name for order, _, company_name in self.entries}
+
+        # Blocage : (longueur, ordre, nom comparé par similarity_score) triés par longueur,
+        # avec l'histogramme de caractères de chaque nom
+        fuzzy_names = [(order, normalized.lower().strip()) for order, normalized, _ in self.entries]
+        self._by_length = sorted((len(name), order, name) for order, name in fuzzy_names)
+        self._lengths = [length for length, _, _ in self._by_length]
+        self._histograms = np.array(
+            [_char_histogram(name) for _, _, name in self._by_length],
+            dtype=np.int64
+        ).reshape(len(self._by_length), CHAR_BUCKETS)
+        self._local = threading.local()
+
+        self._fuzzy_matches = lru_cache(maxsize=50000)(self._compute_fuzzy_matches)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _substring_matches(self, text_lower: str) -> List[int]:
+        """Ordres des concurrents dont le nom apparaît dans le texte"""
+        if not text_lower or self._names_finder is None:
+            return []
+        orders = []
+        for found in self._names_finder.finditer(text_lower):
+            longest = found.group(1)
+            # Les noms plus courts qui commencent à la même position sont des préfixes du plus long
+            for length in range(1, len(longest) + 1):
+                order = self._order_by_name.get(longest[:length])
+                if order is not None:
+                    orders.append(order)
+        return orders
+
+    def _matchers(self) -> Dict[str, SequenceMatcher]:
+        # SequenceMatcher n'est pas thread-safe : un cache de matchers par thread
+        matchers = getattr(self._local, 'matchers', None)
+        if matchers is None:
+            matchers = {}
+            self._local.matchers = matchers
+        return matchers
+
+    def _compute_fuzzy_matches(self, prospect_company: str) -> Tuple[int, ...]:
+        """Ordres des concurrents dont le nom est similaire (> 0.8) à l'entreprise du prospect"""
+        company = prospect_company.lower().strip()
+        company_length = len(company)
+        threshold = COMPETITOR_SIMILARITY_THRESHOLD
+
+        # ratio <= 2*min(la, lb)/(la + lb) : seules les longueurs dans ]la*t/(2-t), la*(2-t)/t[
+        # peuvent dépasser le seuil (fenêtre élargie d'un caractère, la borne exacte est revérifiée)
+        low = bisect.bisect_right(self._lengths, company_length * threshold / (2 - threshold) - 1)
+        high = bisect.bisect_left(self._lengths, company_length * (2 - threshold) / threshold + 1)
+
+        if low >= high:
+            return ()
+
+        # Borne de quick_ratio calculée en un coup sur tous les candidats : les caractères communs
+        # (par case d'histogramme) majorent le nombre de caractères appariés par SequenceMatcher
+        lengths = np.asarray(self._lengths[low:high], dtype=np.float64)
+        common = np.minimum(self._histograms[low:high], _char_histogram(company)).sum(axis=1)
+        totals = lengths + company_length
+        upper_bounds = np.where(totals > 0, 2.0 * common / np.maximum(totals, 1), 1.0)
+        candidates = np.flatnonzero(upper_bounds > threshold)
+
+        matches = []
+        matchers = self._matchers()
+        for position in candidates:
+            name_length, order, name = self._by_length[low + position]
+            total_length = company_length + name_length
+            if total_length == 0:
+                continue
+            matcher = matchers.get(name)
+            if matcher is None:
+                matcher = SequenceMatcher(None)
+                matcher.set_seq2(name)
+                matchers[name] = matcher
+            matcher.set_seq1(company)
+            if (matcher.real_quick_ratio() > threshold and
+                    matcher.quick_ratio() > threshold and
+                    matcher.ratio() > threshold):
+                matches.append(order)
+        return tuple(sorted(matches))
+
+    def match(self, prospect_data: Dict[str, Any],
+              prospect_company: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Vérifie si le prospect travaille pour un concurrent (mêmes verdicts que check_if_competitor)
+
+        Args:
+            prospect_data: Données du prospect (headline, profile_url, etc.)
+            prospect_company: Entreprise déjà extraite du headline (optionnel)
+
+        Returns:
+            Tuple (is_competitor: bool, matched_competitor_name: Optional[str])
+        """
+        if not self.entries:
+            return False, None
+
+        headline = prospect_data.get('headline', '') or ''
+        profile_url = prospect_data.get('profile_url', '') or ''
+
+        matched_orders = self._substring_matches(headline.lower() if headline else '')
+        matched_orders += self._substring_matches(profile_url.lower() if profile_url else '')
+        best_order = min(matched_orders) if matched_orders else None
+
+        # La similarité n'est utile que pour un concurrent placé avant le meilleur match actuel
+        if headline and best_order != self.entries[0][0]:
+            if prospect_company is None:
+                prospect_company = get_parsed_headline(prospect_data).company
+            if prospect_company:
+                fuzzy_orders = self._fuzzy_matches(prospect_company)
+                if fuzzy_orders and (best_order is None or fuzzy_orders[0] < best_order):
+                    best_order = fuzzy_orders[0]
+
+        if best_order is None:
+            return False, None
+        return True, self._names_by_order[best_order]
+
+
+def competitors_fingerprint(competitors_list: List[Dict[str, Any]]) -> Tuple:
+    """Clé identifiant une liste de concurrents (noms dans l'ordre)"""
+    return tuple((competitor.get('company_name', '') or '') for competitor in competitors_list or [])
+
+
+def get_competitor_index(competitors_list: List[Dict[str, Any]]) -> CompetitorIndex:
+    """
+    Retourne l'index des concurrents (construit au premier appel puis réutilisé)
+
+    Args:
+        competitors_list: Liste des concurrents du client (get_competitors)
+
+    Returns:
+        CompetitorIndex
+    """
+    key = competitors_fingerprint(competitors_list)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = CompetitorIndex(competitors_list)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    logger.debug(f"Index des concurrents construit ({len(index)} concurrent(s))")
+    return index
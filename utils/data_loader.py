@@ -4,9 +4,9 @@ Utilitaire pour charger et traiter les données du scraper LinkedIn (SQLite)
 import pandas as pd
 from pathlib import Path
 from typing import Optional
-import re
 
 from utils.database import get_reactions
+from utils.headline_parser import parse_headline
 
 
 def load_all_reactions(client_id: int = None, data_dir: Path = None) -> pd.DataFrame:
@@ -62,9 +62,21 @@ def load_all_reactions(client_id: int = None, data_dir: Path = None) -> pd.DataF
         if col in df.columns:
             df[col] = df[col].fillna(False).astype(bool)
 
-    # Extraire l'entreprise depuis le headline
+    # Champs du headline : colonnes stockées sur les réactions, sinon parseur (mémoïsé)
     if 'headline' in df.columns:
-        df['detected_company'] = df['headline'].apply(extract_company_from_headline)
+        for col in ['headline_title', 'headline_company', 'headline_seniority']:
+            if col not in df.columns:
+                df[col] = None
+        missing = df['headline_title'].isna()
+        if missing.any():
+            parsed = df.loc[missing, 'headline'].apply(
+                lambda headline: parse_headline(headline if isinstance(headline, str) else None)
+            )
+            df.loc[missing, 'headline_title'] = parsed.map(lambda p: p.title)
+            df.loc[missing, 'headline_company'] = parsed.map(lambda p: p.company)
+            df.loc[missing, 'headline_seniority'] = parsed.map(lambda p: p.seniority)
+        df['detected_company'] = df['headline_company'].fillna('')
+        df['seniority'] = df['headline_seniority']
 
     # Trier par date (plus recent en premier)
     if 'post_date' in df.columns:
@@ -86,23 +98,7 @@ def extract_company_from_headline(headline: str) -> str:
     if pd.isna(headline) or not headline:
         return ""
 
-    headline = str(headline)
-
-    # Chercher des patterns comme "@Company", "chez Company", "at Company"
-    patterns = [
-        r'(?:@|chez|at)\s+([A-Z][a-zA-Z\s&]+)',
-        r'@([A-Z][a-zA-Z\s&]+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, headline)
-        if match:
-            company = match.group(1).strip()
-            # Nettoyer (enlever les mots courts communs en fin)
-            company = re.sub(r'\s+(Inc|Ltd|LLC|SA|SAS|SARL)\s*$', '', company, flags=re.IGNORECASE)
-            return company
-
-    return ""
+    return parse_headline(str(headline)).company or ""
 
 
 def get_prospects_with_messages(df: pd.DataFrame) -> pd.DataFrame:
@@ -3,16 +3,27 @@ Module de gestion de la base de données SQLite (multi-tenant)
 """
 import sqlite3
 import json
+import hashlib
 import logging
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+
+from utils.headline_parser import HEADLINE_COLUMNS, HEADLINE_PARSER_VERSION, headline_fields
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "data" / "linkedin_scraper.db"
 
+# Champs du profil client utilisés par le scoring (leur modification crée une nouvelle version du persona)
+PERSONA_SCORING_FIELDS = [
+    'products_services', 'job_titles', 'company_types', 'industries', 'company_size',
+    'geographic_location', 'pain_points', 'characteristics', 'what_offers',
+    'value_proposition', 'ideal_signals'
+]
+
 
 def get_db_path():
     """Retourne le chemin de la base de données"""
@@ -41,6 +52,9 @@ def init_db():
     with get_connection() as conn:
         cursor = conn.cursor()
 
+        # Mode WAL (persistant) : les lectures de l'interface ne bloquent pas les workers qui écrivent
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         # Table clients
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS clients (
@@ -187,6 +201,15 @@ def init_db():
                 min_score_threshold REAL DEFAULT 0.6,
                 message_template TEXT,
                 max_extractions INTEGER DEFAULT NULL,
+                scoring_mode TEXT DEFAULT 'ai',
+                post_relevance_threshold REAL DEFAULT NULL,
+                adaptive_schedule BOOLEAN DEFAULT 0,
+                adaptive_min_minutes INTEGER DEFAULT NULL,
+                adaptive_max_minutes INTEGER DEFAULT NULL,
+                adaptive_interval_minutes INTEGER DEFAULT NULL,
+                adaptive_reason TEXT,
+                adaptive_empty_runs INTEGER DEFAULT 0,
+                last_run_yield TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
             )
@@ -258,6 +281,461 @@ def init_db():
             cursor.execute("ALTER TABLE radars ADD COLUMN max_extractions INTEGER DEFAULT NULL")
         except sqlite3.OperationalError:
             pass
+        
+        try:
+            cursor.execute("ALTER TABLE radars ADD COLUMN scoring_mode TEXT DEFAULT 'ai'")
+        except sqlite3.OperationalError:
+            pass
+
+        # Seuil de pertinence des posts : en dessous, les réactions du post ne sont ni récupérées ni scorées
+        try:
+            cursor.execute("ALTER TABLE radars ADD COLUMN post_relevance_threshold REAL DEFAULT NULL")
+        except sqlite3.OperationalError:
+            pass
+
+        # Intervalle adaptatif : l'intervalle effectif s'allonge ou se raccourcit selon le rendement
+        # observé des exécutions (nouveaux posts, nouveaux réacteurs, prospects qualifiés)
+        for column in ('adaptive_schedule BOOLEAN DEFAULT 0', 'adaptive_min_minutes INTEGER DEFAULT NULL',
+                       'adaptive_max_minutes INTEGER DEFAULT NULL', 'adaptive_interval_minutes INTEGER DEFAULT NULL',
+                       'adaptive_reason TEXT', 'adaptive_empty_runs INTEGER DEFAULT 0', 'last_run_yield TEXT'):
+            try:
+                cursor.execute(f"ALTER TABLE radars ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+
+        # Table radar_seen_posts : posts déjà vus par chaque radar (nouveaux posts d'une exécution)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS radar_seen_posts (
+                radar_id INTEGER NOT NULL,
+                post_url TEXT NOT NULL,
+                first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (radar_id, post_url),
+                FOREIGN KEY (radar_id) REFERENCES radars(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table radar_seen_reactors : réacteurs déjà vus par chaque radar, qualifiés ou non
+        # (nouveaux réacteurs d'une exécution, pour l'intervalle adaptatif)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS radar_seen_reactors (
+                radar_id INTEGER NOT NULL,
+                reactor_urn TEXT NOT NULL,
+                first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (radar_id, reactor_urn),
+                FOREIGN KEY (radar_id) REFERENCES radars(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table post_relevance_cache : pertinence des posts (une analyse IA par post et version du persona)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS post_relevance_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                post_url TEXT NOT NULL,
+                persona_version INTEGER NOT NULL DEFAULT 1,
+                score REAL NOT NULL,
+                relevant BOOLEAN,
+                reasoning TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(client_id, post_url, persona_version),
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table scoring_labels : scores produits par le LLM (y compris les prospects non qualifiés)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scoring_labels (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                reactor_urn TEXT NOT NULL,
+                headline TEXT,
+                reaction_type TEXT,
+                score REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(client_id, reactor_urn),
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table scoring_models : modèles locaux entraînés sur les scores LLM
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scoring_models (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                model_type TEXT NOT NULL,
+                n_features INTEGER NOT NULL,
+                weights BLOB NOT NULL,
+                bias REAL NOT NULL,
+                n_labels INTEGER NOT NULL,
+                metrics TEXT,
+                active BOOLEAN DEFAULT 1,
+                trained_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_scoring_models_client_active
+            ON scoring_models(client_id, active)
+        """)
+
+        # Table rescoring_jobs : recalculs de scoring en masse (reprenables)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rescoring_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                scoring_mode TEXT DEFAULT 'ai',
+                filters TEXT,
+                score_threshold REAL DEFAULT 0.6,
+                total INTEGER DEFAULT 0,
+                processed INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                last_reaction_id INTEGER DEFAULT 0,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Migration : version du persona (incrémentée quand les critères de scoring changent)
+        try:
+            cursor.execute("ALTER TABLE client_profiles ADD COLUMN persona_version INTEGER DEFAULT 1")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            cursor.execute("ALTER TABLE client_profiles ADD COLUMN persona_hash TEXT")
+        except sqlite3.OperationalError:
+            pass
+
+        # Migration : version du persona utilisée pour scorer chaque réaction
+        try:
+            cursor.execute("ALTER TABLE reactions ADD COLUMN persona_version INTEGER")
+            # Les scores existants sont rattachés à la version initiale du persona
+            cursor.execute("UPDATE reactions SET persona_version = 1 WHERE persona_version IS NULL")
+        except sqlite3.OperationalError:
+            pass
+
+        # Migration : version du persona des exemples d'entraînement et des modèles locaux
+        for table in ('scoring_labels', 'scoring_models'):
+            try:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN persona_version INTEGER")
+                # Les exemples et modèles existants sont rattachés à la version initiale du persona
+                cursor.execute(f"UPDATE {table} SET persona_version = 1 WHERE persona_version IS NULL")
+            except sqlite3.OperationalError:
+                pass
+
+        # Migration : statut du scoring ('scored' ou 'pending_score' en attente d'un lot OpenAI)
+        try:
+            cursor.execute("ALTER TABLE reactions ADD COLUMN score_status TEXT DEFAULT 'scored'")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            cursor.execute("ALTER TABLE reactions ADD COLUMN llm_batch_id TEXT")
+        except sqlite3.OperationalError:
+            pass
+
+        # Table llm_batches : lots de scoring soumis à l'API Batch d'OpenAI
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT UNIQUE NOT NULL,
+                client_id INTEGER NOT NULL,
+                radar_id INTEGER,
+                status TEXT NOT NULL DEFAULT 'validating',
+                input_file_id TEXT,
+                output_file_id TEXT,
+                error_file_id TEXT,
+                request_count INTEGER DEFAULT 0,
+                score_threshold REAL DEFAULT 0.6,
+                persona_version INTEGER,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP,
+                ingested_at TIMESTAMP,
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_reactions_score_status
+            ON reactions(client_id, score_status)
+        """)
+
+        # Migration : radar à l'origine de la réaction
+        try:
+            cursor.execute("ALTER TABLE reactions ADD COLUMN radar_id INTEGER")
+        except sqlite3.OperationalError:
+            pass
+
+        # Table llm_calls : télémétrie des appels LLM (tokens, latence, coût)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER,
+                radar_id INTEGER,
+                purpose TEXT NOT NULL,
+                model TEXT,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                cached_tokens INTEGER DEFAULT 0,
+                latency_ms REAL,
+                retries INTEGER DEFAULT 0,
+                outcome TEXT NOT NULL DEFAULT 'success',
+                error TEXT,
+                cost_usd REAL DEFAULT 0,
+                batch BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_llm_calls_client_created
+            ON llm_calls(client_id, created_at)
+        """)
+
+        # Migration : délai avant le premier token des appels en streaming
+        try:
+            cursor.execute("ALTER TABLE llm_calls ADD COLUMN ttft_ms REAL")
+        except sqlite3.OperationalError:
+            pass
+
+        # Table message_jobs : générations de messages en masse (prospects qualifiés sans message)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS message_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                total INTEGER DEFAULT 0,
+                processed INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table posts : contenu des posts téléchargés par les radars (texte, auteur, date, compteurs)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                post_url TEXT NOT NULL UNIQUE,
+                source TEXT,
+                author_name TEXT,
+                author_url TEXT,
+                post_text TEXT,
+                post_date TEXT,
+                reaction_count INTEGER,
+                comment_count INTEGER,
+                repost_count INTEGER,
+                stats_json TEXT,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Table scheduler_jobs : jobs APScheduler persistés (survivent aux redémarrages du scheduler)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scheduler_jobs (
+                id TEXT PRIMARY KEY,
+                next_run_time REAL,
+                job_state BLOB NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_next_run_time
+            ON scheduler_jobs(next_run_time)
+        """)
+
+        # Table message_hooks : accroches générées par l'IA, partagées par les prospects
+        # d'une même entreprise ayant réagi au même post
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS message_hooks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL,
+                post_url TEXT NOT NULL,
+                company_key TEXT NOT NULL DEFAULT '',
+                persona_version INTEGER,
+                hook TEXT NOT NULL,
+                topic TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(client_id, post_url, company_key),
+                FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Table tasks : file de tâches (exécutions de radars) consommée par les workers (radar_worker.py)
+        # Une tâche réclamée est louée par un worker (bail renouvelé par heartbeat) ; un bail expiré
+        # (worker arrêté) la rend de nouveau disponible
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_type TEXT NOT NULL,
+                payload TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                client_id INTEGER,
+                radar_id INTEGER,
+                dedupe_key TEXT,
+                virtual_start REAL,
+                virtual_finish REAL,
+                wait_ms REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                run_after TIMESTAMP,
+                lease_owner TEXT,
+                lease_expires_at TIMESTAMP,
+                heartbeat_at TIMESTAMP,
+                result TEXT,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                updated_at TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_claim
+            ON tasks(status, priority, id)
+        """)
+        # Une seule tâche active (en attente ou en cours) par clé de déduplication
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_active_dedupe
+            ON tasks(dedupe_key) WHERE status IN ('queued', 'running')
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_radar
+            ON tasks(radar_id, id)
+        """)
+
+        # Table leader_leases : baux d'élection (un seul processus détient le bail "scheduler"
+        # et déclenche les jobs ; renouvelé par heartbeat, repris par un autre processus s'il expire)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS leader_leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                acquired_at TIMESTAMP,
+                renewed_at TIMESTAMP
+            )
+        """)
+
+        # Migration : étiquettes de file équitable pondérée par client et temps d'attente des tâches
+        for column in ('virtual_start REAL', 'virtual_finish REAL', 'wait_ms REAL'):
+            try:
+                cursor.execute(f"ALTER TABLE tasks ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_client_virtual_finish
+            ON tasks(client_id, virtual_finish)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_virtual_start
+            ON tasks(virtual_start)
+        """)
+
+        # Table radar_runs : historique des exécutions de radars (totaux de l'exécution)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS radar_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                radar_id INTEGER NOT NULL,
+                client_id INTEGER,
+                task_id INTEGER,
+                trigger TEXT DEFAULT 'manual',
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                duration_ms REAL,
+                reactions INTEGER,
+                new_reactors INTEGER,
+                qualified INTEGER,
+                saved INTEGER,
+                api_calls INTEGER DEFAULT 0,
+                llm_calls INTEGER DEFAULT 0,
+                llm_cost_usd REAL DEFAULT 0,
+                cache_hits INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                error_message TEXT,
+                FOREIGN KEY (radar_id) REFERENCES radars(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_radar_runs_radar
+            ON radar_runs(radar_id, started_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_radar_runs_client
+            ON radar_runs(client_id, started_at)
+        """)
+
+        # Table radar_run_stages : étapes d'une exécution (durée, éléments, appels API / LLM, cache, erreurs)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS radar_run_stages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                duration_ms REAL,
+                items_in INTEGER,
+                items_out INTEGER,
+                api_calls INTEGER DEFAULT 0,
+                llm_calls INTEGER DEFAULT 0,
+                llm_cost_usd REAL DEFAULT 0,
+                cache_hits INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                error_message TEXT,
+                FOREIGN KEY (run_id) REFERENCES radar_runs(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_radar_run_stages_run
+            ON radar_run_stages(run_id, position)
+        """)
+
+        # Table radar_run_checkpoints : points de reprise d'une exécution (sortie des étapes terminées,
+        # progression des étapes en cours), supprimés quand l'exécution se termine
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS radar_run_checkpoints (
+                run_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                completed BOOLEAN DEFAULT 0,
+                state TEXT NOT NULL,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (run_id, stage),
+                FOREIGN KEY (run_id) REFERENCES radar_runs(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Migration : champs parsés du headline (titre, entreprise, séniorité)
+        for column in HEADLINE_COLUMNS:
+            try:
+                cursor.execute(f"ALTER TABLE reactions ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+        # Migration : version du parseur des champs parsés. Les champs écrits par le découpage
+        # historique sont effacés une fois (les lecteurs reparsent le headline quand ils sont
+        # vides), puis remplis par backfill_headlines.py
+        try:
+            cursor.execute("ALTER TABLE reactions ADD COLUMN headline_parser_version INTEGER")
+            cursor.execute("""
+                UPDATE reactions
+                SET headline_title = NULL, headline_company = NULL, headline_seniority = NULL
+                WHERE headline_title IS NOT NULL
+            """)
+        except sqlite3.OperationalError:
+            pass
 
 
 # ============== CLIENTS ==============
@@ -366,8 +844,29 @@ def save_client_profile(client_id: int, profile_data: dict):
         if field in data and isinstance(data[field], list):
             data[field] = json.dumps(data[field], ensure_ascii=False)
 
+    new_persona_hash = persona_hash(data)
+
     with get_connection() as conn:
         cursor = conn.cursor()
+
+        # Nouvelle version du persona si les critères de scoring ont changé
+        cursor.execute(
+            "SELECT persona_version, persona_hash FROM client_profiles WHERE client_id = ?",
+            (client_id,)
+        )
+        current = cursor.fetchone()
+        if current and current['persona_hash'] != new_persona_hash:
+            # Premier hash enregistré : la version initiale ne change pas si les critères sont identiques
+            if current['persona_hash'] is None and persona_hash(_stored_profile_fields(cursor, client_id)) == new_persona_hash:
+                new_version = current['persona_version'] or 1
+            else:
+                new_version = (current['persona_version'] or 1) + 1
+                logger.info(f"Persona du client {client_id} modifié : version {new_version}")
+            cursor.execute(
+                "UPDATE client_profiles SET persona_version = ?, persona_hash = ? WHERE client_id = ?",
+                (new_version, new_persona_hash, client_id)
+            )
+
         cursor.execute("""
             UPDATE client_profiles SET
                 products_services = ?,
@@ -409,6 +908,49 @@ def save_client_profile(client_id: int, profile_data: dict):
         return cursor.rowcount > 0
 
 
+def persona_hash(profile_fields: dict) -> str:
+    """
+    Empreinte des critères de scoring d'un profil client
+
+    Args:
+        profile_fields: Champs du profil (listes ou JSON déjà sérialisé)
+
+    Returns:
+        Hash SHA-256 hexadécimal
+    """
+    normalized = {}
+    for field in PERSONA_SCORING_FIELDS:
+        value = profile_fields.get(field)
+        if isinstance(value, str) and value.startswith('['):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        if value in (None, '', []):
+            value = None
+        normalized[field] = value
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _stored_profile_fields(cursor, client_id: int) -> dict:
+    """Champs de scoring actuellement enregistrés pour un client"""
+    cursor.execute(
+        f"SELECT {', '.join(PERSONA_SCORING_FIELDS)} FROM client_profiles WHERE client_id = ?",
+        (client_id,)
+    )
+    row = cursor.fetchone()
+    return dict(row) if row else {}
+
+
+def get_persona_version(client_id: int) -> int:
+    """Version actuelle du persona d'un client"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT persona_version FROM client_profiles WHERE client_id = ?", (client_id,))
+        row = cursor.fetchone()
+        return (row['persona_version'] or 1) if row else 1
+
+
 def get_client_profile_as_dict(client_id: int):
     """Récupère le profil d'un client au format JSON compatible avec l'ancien format"""
     client = get_client(client_id)
@@ -421,6 +963,7 @@ def get_client_profile_as_dict(client_id: int):
     return {
         "company_name": client['name'],
         "company_description": client['description'] or '',
+        "persona_version": profile.get('persona_version') or 1,
         "website": client['website'] or '',
         "products_services": profile.get('products_services', []),
         "target_persona": {
@@ -629,86 +1172,197 @@ def get_reactions(client_id: int = None):
         return [dict(row) for row in cursor.fetchall()]
 
 
+# Upsert d'une réaction : une seule ligne par client, prospect et post (index idx_reactions_unique)
+_UPSERT_REACTION_SQL = """
+    INSERT INTO reactions (
+        client_id, competitor_name, post_url, post_date, reactor_name,
+        reactor_urn, profile_url, reaction_type, headline, profile_picture_url,
+        post_relevant, prospect_relevant, relevance_score, relevance_reasoning,
+        personalized_message, headline_title, headline_company, headline_seniority,
+        headline_parser_version, persona_version, score_status, radar_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(client_id, reactor_urn, post_url) DO UPDATE SET
+        competitor_name = excluded.competitor_name,
+        post_date = excluded.post_date,
+        reactor_name = excluded.reactor_name,
+        profile_url = excluded.profile_url,
+        reaction_type = excluded.reaction_type,
+        headline = excluded.headline,
+        profile_picture_url = excluded.profile_picture_url,
+        post_relevant = excluded.post_relevant,
+        prospect_relevant = excluded.prospect_relevant,
+        relevance_score = excluded.relevance_score,
+        relevance_reasoning = excluded.relevance_reasoning,
+        personalized_message = excluded.personalized_message,
+        headline_title = excluded.headline_title,
+        headline_company = excluded.headline_company,
+        headline_seniority = excluded.headline_seniority,
+        headline_parser_version = excluded.headline_parser_version,
+        persona_version = COALESCE(excluded.persona_version, reactions.persona_version),
+        score_status = excluded.score_status,
+        radar_id = COALESCE(excluded.radar_id, reactions.radar_id)
+"""
+
+
+def _reaction_params(client_id: int, reaction_data: dict) -> tuple:
+    # Headline parsé une fois à l'enregistrement (lu ensuite par les pages et le scoring)
+    parsed_headline = headline_fields(reaction_data.get('headline', ''))
+    return (
+        client_id,
+        reaction_data.get('company_name', reaction_data.get('competitor_name', '')),
+        reaction_data.get('post_url', ''),
+        reaction_data.get('post_date', ''),
+        reaction_data.get('reactor_name', ''),
+        reaction_data.get('reactor_urn', ''),
+        reaction_data.get('profile_url', ''),
+        reaction_data.get('reaction_type', ''),
+        reaction_data.get('headline', ''),
+        reaction_data.get('profile_picture_url', ''),
+        reaction_data.get('post_relevant', False),
+        reaction_data.get('prospect_relevant', False),
+        reaction_data.get('relevance_score', 0.0),
+        reaction_data.get('relevance_reasoning', ''),
+        reaction_data.get('personalized_message', ''),
+        parsed_headline['headline_title'],
+        parsed_headline['headline_company'],
+        parsed_headline['headline_seniority'],
+        HEADLINE_PARSER_VERSION,
+        reaction_data.get('persona_version'),
+        reaction_data.get('score_status', 'scored'),
+        reaction_data.get('radar_id')
+    )
+
+
 def save_reaction(client_id: int, reaction_data: dict):
     """Sauvegarde une réaction (upsert)"""
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO reactions (
-                client_id, competitor_name, post_url, post_date, reactor_name,
-                reactor_urn, profile_url, reaction_type, headline, profile_picture_url,
-                post_relevant, prospect_relevant, relevance_score, relevance_reasoning,
-                personalized_message
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(client_id, reactor_urn, post_url) DO UPDATE SET
-                competitor_name = excluded.competitor_name,
-                post_date = excluded.post_date,
-                reactor_name = excluded.reactor_name,
-                profile_url = excluded.profile_url,
-                reaction_type = excluded.reaction_type,
-                headline = excluded.headline,
-                profile_picture_url = excluded.profile_picture_url,
-                post_relevant = excluded.post_relevant,
-                prospect_relevant = excluded.prospect_relevant,
-                relevance_score = excluded.relevance_score,
-                relevance_reasoning = excluded.relevance_reasoning,
-                personalized_message = excluded.personalized_message
-        """, (
-            client_id,
-            reaction_data.get('company_name', reaction_data.get('competitor_name', '')),
-            reaction_data.get('post_url', ''),
-            reaction_data.get('post_date', ''),
-            reaction_data.get('reactor_name', ''),
-            reaction_data.get('reactor_urn', ''),
-            reaction_data.get('profile_url', ''),
-            reaction_data.get('reaction_type', ''),
-            reaction_data.get('headline', ''),
-            reaction_data.get('profile_picture_url', ''),
-            reaction_data.get('post_relevant', False),
-            reaction_data.get('prospect_relevant', False),
-            reaction_data.get('relevance_score', 0.0),
-            reaction_data.get('relevance_reasoning', ''),
-            reaction_data.get('personalized_message', '')
-        ))
+        cursor.execute(_UPSERT_REACTION_SQL, _reaction_params(client_id, reaction_data))
         return cursor.lastrowid
 
 
-def save_reactions_batch(client_id: int, reactions: list):
-    """Sauvegarde plusieurs réactions en batch"""
-    for reaction in reactions:
-        save_reaction(client_id, reaction)
+def save_reactions_bulk(client_id: int, reactions: List[dict]) -> Dict[str, int]:
+    """
+    Sauvegarde plusieurs réactions en une seule transaction (upsert)
 
+    Une réaction déjà enregistrée pour le même prospect et le même post (index unique
+    client / prospect / post) est mise à jour au lieu d'être dupliquée. Les comptages sont
+    faits dans la transaction de l'upsert, verrouillée en écriture dès son début, pour ne pas
+    compter les réactions sauvegardées en parallèle par d'autres workers.
 
-def delete_reaction(client_id: int, reactor_urn: str, post_url: str):
-    """
-    Supprime une réaction (prospect) de la base de données
-    
     Args:
         client_id: ID du client
-        reactor_urn: URN du prospect (reactor_urn)
-        post_url: URL du post
-    
+        reactions: Réactions (mêmes champs que save_reaction)
+
     Returns:
-        True si la suppression a réussi, False sinon
+        Dict avec le nombre de réactions insérées et mises à jour
     """
+    if not reactions:
+        return {'inserted': 0, 'updated': 0}
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "DELETE FROM reactions WHERE client_id = ? AND reactor_urn = ? AND post_url = ?",
-            (client_id, reactor_urn, post_url)
-        )
-        return cursor.rowcount > 0
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COUNT(*) FROM reactions WHERE client_id = ?", (client_id,))
+        before = cursor.fetchone()[0]
+        cursor.executemany(_UPSERT_REACTION_SQL, [_reaction_params(client_id, reaction) for reaction in reactions])
+        cursor.execute("SELECT COUNT(*) FROM reactions WHERE client_id = ?", (client_id,))
+        inserted = cursor.fetchone()[0] - before
+    return {'inserted': inserted, 'updated': len(reactions) - inserted}
 
 
-def delete_reactions_batch(client_id: int, reactions_data: list):
-    """
-    Supprime plusieurs réactions en batch
-    
-    Args:
-        client_id: ID du client
-        reactions_data: Liste de dicts avec 'reactor_urn' et 'post_url'
-    
-    Returns:
+def count_stale_reactions(client_id: int) -> int:
+    """Nombre de réactions scorées avec une version antérieure du persona"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM reactions
+            WHERE client_id = ?
+            AND COALESCE(persona_version, 0) < (
+                SELECT COALESCE(persona_version, 1) FROM client_profiles WHERE client_id = ?
+            )
+        """, (client_id, client_id))
+        return cursor.fetchone()[0]
+
+
+def backfill_headline_fields(batch_size: int = 1000) -> int:
+    """
+    Remplit headline_title / headline_company / headline_seniority des réactions jamais
+    parsées ou parsées par une version précédente du parseur (voir backfill_headlines.py)
+
+    Args:
+        batch_size: Nombre de réactions mises à jour par requête
+
+    Returns:
+        Nombre de réactions mises à jour
+    """
+    updated = 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT id, headline FROM reactions WHERE COALESCE(headline_parser_version, 0) < ? LIMIT ?",
+                (HEADLINE_PARSER_VERSION, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                fields = headline_fields(row['headline'])
+                updates.append((
+                    fields['headline_title'],
+                    fields['headline_company'],
+                    fields['headline_seniority'],
+                    HEADLINE_PARSER_VERSION,
+                    row['id']
+                ))
+            cursor.executemany("""
+                UPDATE reactions
+                SET headline_title = ?, headline_company = ?, headline_seniority = ?,
+                    headline_parser_version = ?
+                WHERE id = ?
+            """, updates)
+            updated += len(updates)
+    if updated:
+        logger.info(f"✓ Headline parsé pour {updated} réaction(s) existante(s)")
+    return updated
+
+
+def save_reactions_batch(client_id: int, reactions: list):
+    """Sauvegarde plusieurs réactions en batch"""
+    save_reactions_bulk(client_id, reactions)
+
+
+def delete_reaction(client_id: int, reactor_urn: str, post_url: str):
+    """
+    Supprime une réaction (prospect) de la base de données
+    
+    Args:
+        client_id: ID du client
+        reactor_urn: URN du prospect (reactor_urn)
+        post_url: URL du post
+    
+    Returns:
+        True si la suppression a réussi, False sinon
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM reactions WHERE client_id = ? AND reactor_urn = ? AND post_url = ?",
+            (client_id, reactor_urn, post_url)
+        )
+        return cursor.rowcount > 0
+
+
+def delete_reactions_batch(client_id: int, reactions_data: list):
+    """
+    Supprime plusieurs réactions en batch
+    
+    Args:
+        client_id: ID du client
+        reactions_data: Liste de dicts avec 'reactor_urn' et 'post_url'
+    
+    Returns:
         Nombre de réactions supprimées
     """
     deleted_count = 0
@@ -781,6 +1435,26 @@ def get_radar(radar_id: int):
         return dict(row) if row else None
 
 
+def get_radar_score_thresholds(radar_ids: List[int]) -> Dict[int, float]:
+    """
+    Seuils de qualification (min_score_threshold) de plusieurs radars
+
+    Returns:
+        Dict radar_id -> seuil (les radars introuvables sont absents)
+    """
+    radar_ids = list({radar_id for radar_id in radar_ids if radar_id is not None})
+    if not radar_ids:
+        return {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT id, min_score_threshold FROM radars WHERE id IN ({', '.join('?' for _ in radar_ids)})",
+            radar_ids
+        )
+        return {row['id']: row['min_score_threshold'] if row['min_score_threshold'] is not None else 0.6
+                for row in cursor.fetchall()}
+
+
 def get_enabled_radars(client_id: int):
     """Récupère uniquement les radars activés d'un client"""
     with get_connection() as conn:
@@ -796,7 +1470,8 @@ def add_radar(client_id: int, name: str, radar_type: str, target_identifier: str
               target_value: str = None, keyword: str = None, post_count: int = 1,
               schedule_type: str = 'manual', schedule_interval: int = 0,
               filter_competitors: bool = True, min_score_threshold: float = 0.6,
-              max_extractions: int = None):
+              max_extractions: int = None, scoring_mode: str = 'ai',
+              post_relevance_threshold: Optional[float] = None):
     """
     Ajoute un nouveau radar
     
@@ -813,16 +1488,20 @@ def add_radar(client_id: int, name: str, radar_type: str, target_identifier: str
         filter_competitors: Activer le filtrage des concurrents
         min_score_threshold: Score minimum pour qualifier un prospect
         max_extractions: Nombre maximum de prospects à extraire par exécution (None = illimité)
+        scoring_mode: Mode de scoring ('ai', 'rules', 'semantic', 'semantic_prefilter')
+        post_relevance_threshold: Score minimum d'un post pour analyser ses réactions (None = pas de filtre)
     """
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO radars (client_id, name, radar_type, target_identifier, target_value, 
                                keyword, post_count, schedule_type, schedule_interval, 
-                               filter_competitors, min_score_threshold, max_extractions)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                               filter_competitors, min_score_threshold, max_extractions, scoring_mode,
+                               post_relevance_threshold)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (client_id, name, radar_type, target_identifier, target_value, keyword, post_count,
-              schedule_type, schedule_interval, 1 if filter_competitors else 0, min_score_threshold, max_extractions))
+              schedule_type, schedule_interval, 1 if filter_competitors else 0, min_score_threshold, max_extractions,
+              scoring_mode, post_relevance_threshold))
         return cursor.lastrowid
 
 
@@ -834,7 +1513,9 @@ def update_radar(radar_id: int, name: str = None, enabled: bool = None,
                 keyword: str = None, post_count: int = None,
                 schedule_type: str = None, schedule_interval: int = None,
                 filter_competitors: bool = None, min_score_threshold: float = None,
-                max_extractions = _SENTINEL):
+                max_extractions = _SENTINEL, scoring_mode: str = None,
+                post_relevance_threshold = _SENTINEL, adaptive_schedule: bool = None,
+                adaptive_min_minutes = _SENTINEL, adaptive_max_minutes = _SENTINEL):
     """Met à jour un radar"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -871,11 +1552,28 @@ def update_radar(radar_id: int, name: str = None, enabled: bool = None,
         if min_score_threshold is not None:
             updates.append("min_score_threshold = ?")
             params.append(min_score_threshold)
+        if scoring_mode is not None:
+            updates.append("scoring_mode = ?")
+            params.append(scoring_mode)
         # max_extractions peut être None (pour supprimer la limite) ou un nombre
         # On utilise un sentinel pour distinguer "non fourni" de "None"
         if max_extractions is not _SENTINEL:
             updates.append("max_extractions = ?")
             params.append(max_extractions)
+        # post_relevance_threshold peut être None (pour désactiver le filtre des posts)
+        if post_relevance_threshold is not _SENTINEL:
+            updates.append("post_relevance_threshold = ?")
+            params.append(post_relevance_threshold)
+        if adaptive_schedule is not None:
+            updates.append("adaptive_schedule = ?")
+            params.append(1 if adaptive_schedule else 0)
+        # Bornes de l'intervalle adaptatif (None = bornes par défaut de la configuration)
+        if adaptive_min_minutes is not _SENTINEL:
+            updates.append("adaptive_min_minutes = ?")
+            params.append(adaptive_min_minutes)
+        if adaptive_max_minutes is not _SENTINEL:
+            updates.append("adaptive_max_minutes = ?")
+            params.append(adaptive_max_minutes)
         
         if not updates:
             return False
@@ -906,6 +1604,58 @@ def update_radar_last_run(radar_id: int, scheduled: bool = False):
         return cursor.rowcount > 0
 
 
+def update_radar_adaptive_state(radar_id: int, interval_minutes: Optional[int], reason: Optional[str],
+                                empty_runs: int = 0, last_run_yield: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Enregistre l'intervalle adaptatif d'un radar et l'explication de son choix
+
+    Args:
+        radar_id: ID du radar
+        interval_minutes: Intervalle effectif en minutes (None = intervalle configuré)
+        reason: Explication affichée dans l'interface
+        empty_runs: Exécutions consécutives sans nouveau post ni nouveau réacteur
+        last_run_yield: Rendement de la dernière exécution (conservé si None)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE radars
+            SET adaptive_interval_minutes = ?, adaptive_reason = ?, adaptive_empty_runs = ?,
+                last_run_yield = COALESCE(?, last_run_yield)
+            WHERE id = ?
+        """, (interval_minutes, reason, empty_runs,
+              json.dumps(last_run_yield, ensure_ascii=False) if last_run_yield is not None else None, radar_id))
+        return cursor.rowcount > 0
+
+
+def record_radar_posts(radar_id: int, post_urls: List[str]) -> int:
+    """Enregistre les posts vus par un radar et retourne le nombre de posts jamais vus auparavant"""
+    post_urls = [url for url in dict.fromkeys(post_urls) if url]
+    if not post_urls:
+        return 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO radar_seen_posts (radar_id, post_url) VALUES (?, ?)",
+            [(radar_id, url) for url in post_urls]
+        )
+        return cursor.rowcount
+
+
+def record_radar_reactors(radar_id: int, reactor_urns: List[str]) -> int:
+    """Enregistre les réacteurs vus par un radar et retourne le nombre de réacteurs jamais vus auparavant"""
+    reactor_urns = [urn for urn in dict.fromkeys(reactor_urns) if urn]
+    if not reactor_urns:
+        return 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO radar_seen_reactors (radar_id, reactor_urn) VALUES (?, ?)",
+            [(radar_id, urn) for urn in reactor_urns]
+        )
+        return cursor.rowcount
+
+
 def delete_radar(radar_id: int):
     """Supprime un radar"""
     with get_connection() as conn:
@@ -1203,6 +1953,1476 @@ def get_scheduled_radars(client_id: int = None):
         return [dict(row) for row in cursor.fetchall()]
 
 
+# ============== SCORING LOCAL ==============
+
+def save_scoring_labels(client_id: int, labels: List[Dict[str, Any]],
+                        persona_version: Optional[int] = None) -> int:
+    """
+    Enregistre des scores LLM comme exemples d'entraînement (upsert par prospect)
+
+    Le score d'un prospect n'est pas remplacé par un score obtenu avec une version plus
+    ancienne du persona (lot OpenAI terminé après un changement de persona par exemple).
+
+    Args:
+        client_id: ID du client
+        labels: Liste de dicts avec reactor_urn, headline, reaction_type, score
+        persona_version: Version du persona qui a produit les scores (défaut: version actuelle)
+
+    Returns:
+        Nombre d'exemples enregistrés
+    """
+    if persona_version is None:
+        persona_version = get_persona_version(client_id)
+    rows = [
+        (client_id, str(label['reactor_urn']), label.get('headline', '') or '',
+         label.get('reaction_type', '') or '', float(label['score']), persona_version,
+         datetime.now().isoformat())
+        for label in labels
+        if label.get('reactor_urn') and label.get('score') is not None
+    ]
+    if not rows:
+        return 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO scoring_labels (client_id, reactor_urn, headline, reaction_type, score,
+                                        persona_version, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(client_id, reactor_urn) DO UPDATE SET
+                headline = excluded.headline,
+                reaction_type = excluded.reaction_type,
+                score = excluded.score,
+                persona_version = excluded.persona_version,
+                created_at = excluded.created_at
+            WHERE excluded.persona_version >= COALESCE(scoring_labels.persona_version, 1)
+        """, rows)
+    return len(rows)
+
+
+def get_scoring_labels(client_id: int, persona_version: Optional[int] = None) -> List[dict]:
+    """
+    Récupère les exemples d'entraînement d'un client pour une version du persona : scores LLM
+    enregistrés et réactions dont le scoring contient un raisonnement IA
+
+    Args:
+        client_id: ID du client
+        persona_version: Version du persona des scores (défaut: version actuelle)
+
+    Returns:
+        Liste de dicts (reactor_urn, headline, reaction_type, score, created_at)
+    """
+    if persona_version is None:
+        persona_version = get_persona_version(client_id)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT reactor_urn, headline, reaction_type, score, created_at
+            FROM scoring_labels
+            WHERE client_id = ? AND persona_version = ?
+        """, (client_id, persona_version))
+        labels = {row['reactor_urn']: dict(row) for row in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT reactor_urn, headline, reaction_type, relevance_score AS score,
+                   relevance_reasoning, created_at
+            FROM reactions
+            WHERE client_id = ? AND persona_version = ? AND relevance_score IS NOT NULL
+            AND relevance_reasoning LIKE '%"reasoning"%'
+        """, (client_id, persona_version))
+        for row in cursor.fetchall():
+            if row['reactor_urn'] in labels:
+                continue
+            try:
+                scoring = json.loads(row['relevance_reasoning'])
+            except (TypeError, ValueError):
+                continue
+            if isinstance(scoring, dict) and scoring.get('reasoning'):
+                label = dict(row)
+                del label['relevance_reasoning']
+                labels[row['reactor_urn']] = label
+    return list(labels.values())
+
+
+def count_scoring_labels_since(client_id: int, since: Optional[str],
+                               persona_version: Optional[int] = None) -> int:
+    """
+    Nombre de scores LLM d'une version du persona (défaut: version actuelle) enregistrés
+    depuis une date (toutes les dates si None)
+    """
+    if persona_version is None:
+        persona_version = get_persona_version(client_id)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if since:
+            cursor.execute(
+                "SELECT COUNT(*) FROM scoring_labels WHERE client_id = ? AND persona_version = ? AND created_at > ?",
+                (client_id, persona_version, since)
+            )
+        else:
+            cursor.execute(
+                "SELECT COUNT(*) FROM scoring_labels WHERE client_id = ? AND persona_version = ?",
+                (client_id, persona_version)
+            )
+        return cursor.fetchone()[0]
+
+
+def save_scoring_model(client_id: int, model_type: str, n_features: int, weights: bytes,
+                       bias: float, n_labels: int, metrics: Dict[str, Any],
+                       persona_version: Optional[int] = None) -> int:
+    """
+    Enregistre un modèle de scoring local et le rend actif (les précédents sont désactivés)
+
+    Args:
+        persona_version: Version du persona des scores LLM d'entraînement
+
+    Returns:
+        ID du modèle
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE scoring_models SET active = 0 WHERE client_id = ?", (client_id,))
+        cursor.execute("""
+            INSERT INTO scoring_models (client_id, model_type, n_features, weights, bias,
+                                        n_labels, metrics, persona_version, active, trained_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+        """, (client_id, model_type, n_features, sqlite3.Binary(weights), bias, n_labels,
+              json.dumps(metrics, ensure_ascii=False), persona_version, datetime.now().isoformat()))
+        return cursor.lastrowid
+
+
+def get_active_scoring_model(client_id: int) -> Optional[dict]:
+    """Récupère le modèle de scoring local actif d'un client"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM scoring_models WHERE client_id = ? AND active = 1 ORDER BY id DESC LIMIT 1",
+            (client_id,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        model = dict(row)
+        model['metrics'] = json.loads(model['metrics']) if model.get('metrics') else {}
+        return model
+
+
+# ============== RESCORING JOBS ==============
+
+def create_rescoring_job(client_id: int, filters: Optional[Dict[str, Any]] = None,
+                         scoring_mode: str = 'ai', score_threshold: float = 0.6) -> int:
+    """
+    Crée un job de recalcul de scoring en masse
+
+    Args:
+        client_id: ID du client
+        filters: Filtres sur les réactions (voir utils.bulk_rescoring)
+        scoring_mode: Mode de scoring ('ai', 'rules', 'semantic', 'local_model')
+        score_threshold: Score minimum pour qualifier un prospect
+
+    Returns:
+        ID du job
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO rescoring_jobs (client_id, status, scoring_mode, filters, score_threshold, updated_at)
+            VALUES (?, 'pending', ?, ?, ?, ?)
+        """, (client_id, scoring_mode, json.dumps(filters or {}, ensure_ascii=False),
+              score_threshold, datetime.now().isoformat()))
+        return cursor.lastrowid
+
+
+def get_rescoring_job(job_id: int) -> Optional[dict]:
+    """Récupère un job de recalcul (filtres décodés)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM rescoring_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job['filters'] = json.loads(job['filters']) if job.get('filters') else {}
+        return job
+
+
+def get_rescoring_jobs(client_id: int, limit: int = 10) -> List[dict]:
+    """Récupère les derniers jobs de recalcul d'un client"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM rescoring_jobs WHERE client_id = ? ORDER BY id DESC LIMIT ?",
+            (client_id, limit)
+        )
+        jobs = [dict(row) for row in cursor.fetchall()]
+    for job in jobs:
+        job['filters'] = json.loads(job['filters']) if job.get('filters') else {}
+    return jobs
+
+
+def update_rescoring_job(job_id: int, expected_status: Optional[str] = None, **fields) -> bool:
+    """
+    Met à jour les champs d'un job de recalcul (status, total, processed, errors, ...)
+
+    Args:
+        job_id: ID du job
+        expected_status: Ne met à jour que si le job a ce statut (ex: ne pas écraser une annulation)
+        **fields: Champs à mettre à jour
+
+    Returns:
+        True si le job a été mis à jour
+    """
+    allowed = {'status', 'total', 'processed', 'errors', 'last_reaction_id',
+               'error_message', 'started_at', 'finished_at'}
+    updates = {key: value for key, value in fields.items() if key in allowed}
+    if not updates:
+        return False
+    updates['updated_at'] = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        query = f"UPDATE rescoring_jobs SET {', '.join(f'{key} = ?' for key in updates)} WHERE id = ?"
+        params = list(updates.values()) + [job_id]
+        if expected_status is not None:
+            query += " AND status = ?"
+            params.append(expected_status)
+        cursor.execute(query, params)
+        return cursor.rowcount > 0
+
+
+def claim_rescoring_job(job_id: int, statuses: Tuple[str, ...], stalled_before: str) -> bool:
+    """
+    Passe un job de recalcul en 'running' s'il peut être (re)lancé, en une seule requête :
+    deux workers ne peuvent pas exécuter le même job
+
+    Args:
+        job_id: ID du job
+        statuses: Statuts à partir desquels le job peut être lancé
+        stalled_before: Un job 'running' sans progression depuis cette date est repris (processus arrêté)
+
+    Returns:
+        True si le job a été réclamé
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE rescoring_jobs SET status = 'running', updated_at = ?
+            WHERE id = ? AND (status IN ({', '.join('?' for _ in statuses)})
+                              OR (status = 'running' AND COALESCE(updated_at, created_at) < ?))
+        """, [datetime.now().isoformat(), job_id, *statuses, stalled_before])
+        return cursor.rowcount > 0
+
+
+# ============== LOTS OPENAI (API BATCH) ==============
+
+def save_pending_reactions(client_id: int, reactions: List[Dict[str, Any]],
+                           persona_version: Optional[int] = None, radar_id: Optional[int] = None) -> int:
+    """
+    Enregistre des réactions en attente de scoring ('pending_score')
+
+    Args:
+        client_id: ID du client
+        reactions: Réactions brutes du radar
+        persona_version: Version du persona qui servira à les scorer
+        radar_id: Radar à l'origine des réactions
+
+    Returns:
+        Nombre de réactions enregistrées (celles déjà en base sont ignorées)
+    """
+    rows = []
+    for reaction in reactions:
+        parsed_headline = headline_fields(reaction.get('headline', ''))
+        rows.append((
+            client_id,
+            reaction.get('company_name') or reaction.get('keyword') or reaction.get('competitor_name') or '',
+            reaction.get('post_url', ''),
+            reaction.get('post_date', ''),
+            reaction.get('reactor_name', ''),
+            str(reaction.get('reactor_urn', '')),
+            reaction.get('profile_url', ''),
+            reaction.get('reaction_type', ''),
+            reaction.get('headline', ''),
+            reaction.get('profile_picture_url', ''),
+            parsed_headline['headline_title'],
+            parsed_headline['headline_company'],
+            parsed_headline['headline_seniority'],
+            HEADLINE_PARSER_VERSION,
+            persona_version,
+            radar_id
+        ))
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO reactions (
+                client_id, competitor_name, post_url, post_date, reactor_name,
+                reactor_urn, profile_url, reaction_type, headline, profile_picture_url,
+                post_relevant, prospect_relevant, relevance_score, relevance_reasoning,
+                headline_title, headline_company, headline_seniority, headline_parser_version,
+                persona_version, radar_id, score_status
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, NULL, '', ?, ?, ?, ?, ?, ?, 'pending_score')
+            ON CONFLICT(client_id, reactor_urn, post_url) DO NOTHING
+        """, rows)
+        return cursor.rowcount
+
+
+def get_pending_reactions(client_id: int, llm_batch_id: Optional[str] = None,
+                          unsubmitted_only: bool = False, radar_id: Optional[int] = None) -> List[dict]:
+    """
+    Récupère les réactions en attente de scoring
+
+    Args:
+        client_id: ID du client
+        llm_batch_id: Uniquement les réactions de ce lot
+        unsubmitted_only: Uniquement les réactions rattachées à aucun lot (soumission échouée)
+        radar_id: Uniquement les réactions de ce radar
+    """
+    query = "SELECT * FROM reactions WHERE client_id = ? AND score_status = 'pending_score'"
+    params: List[Any] = [client_id]
+    if llm_batch_id is not None:
+        query += " AND llm_batch_id = ?"
+        params.append(llm_batch_id)
+    elif unsubmitted_only:
+        query += " AND llm_batch_id IS NULL"
+    if radar_id is not None:
+        query += " AND radar_id = ?"
+        params.append(radar_id)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query + " ORDER BY id", params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def count_pending_reactions(client_id: int) -> int:
+    """Nombre de réactions en attente d'un lot de scoring"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM reactions WHERE client_id = ? AND score_status = 'pending_score'",
+            (client_id,)
+        )
+        return cursor.fetchone()[0]
+
+
+def unqualify_reactions(reaction_ids: List[int]) -> int:
+    """
+    Retire des prospects qualifiés (au-delà de la limite de prospects qualifiés d'un radar)
+
+    Returns:
+        Nombre de réactions mises à jour
+    """
+    if not reaction_ids:
+        return 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE reactions SET prospect_relevant = 0 WHERE id IN ({', '.join('?' for _ in reaction_ids)})",
+            list(reaction_ids)
+        )
+        return cursor.rowcount
+
+
+def save_reaction_enrichment(reaction_id: int, profile_url: str,
+                             enriched_profile: Optional[Dict[str, Any]] = None,
+                             enriched_company: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Enregistre l'enrichissement (profil, entreprise) d'une réaction déjà sauvegardée
+
+    Les données enrichies sont ajoutées au détail du scoring (relevance_reasoning), comme
+    pour les réactions enrichies pendant l'exécution du radar.
+
+    Returns:
+        True si la réaction a été mise à jour
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT relevance_reasoning FROM reactions WHERE id = ?", (reaction_id,))
+        row = cursor.fetchone()
+        if not row:
+            return False
+        try:
+            scoring = json.loads(row['relevance_reasoning'] or '{}')
+        except (TypeError, ValueError):
+            scoring = {}
+        if not isinstance(scoring, dict):
+            scoring = {}
+        if enriched_profile:
+            scoring['enriched_profile'] = enriched_profile
+        if enriched_company:
+            scoring['enriched_company'] = enriched_company
+        cursor.execute(
+            "UPDATE reactions SET profile_url = ?, relevance_reasoning = ? WHERE id = ?",
+            (profile_url, json.dumps(scoring, ensure_ascii=False), reaction_id)
+        )
+        return cursor.rowcount > 0
+
+
+def create_llm_batch(batch_id: str, client_id: int, radar_id: Optional[int], reaction_ids: List[int],
+                     input_file_id: str, status: str, score_threshold: float,
+                     persona_version: Optional[int] = None) -> int:
+    """
+    Enregistre un lot soumis à l'API Batch et y rattache ses réactions
+
+    Returns:
+        ID du lot en base
+    """
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO llm_batches (batch_id, client_id, radar_id, status, input_file_id,
+                                     request_count, score_threshold, persona_version, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (batch_id, client_id, radar_id, status, input_file_id, len(reaction_ids),
+              score_threshold, persona_version, now))
+        cursor.executemany(
+            "UPDATE reactions SET llm_batch_id = ? WHERE id = ?",
+            [(batch_id, reaction_id) for reaction_id in reaction_ids]
+        )
+        return cursor.lastrowid
+
+
+def get_llm_batches(client_id: Optional[int] = None, open_only: bool = False, limit: int = 50) -> List[dict]:
+    """
+    Récupère les lots de scoring (les plus récents d'abord)
+
+    Args:
+        client_id: ID du client (tous si None)
+        open_only: Uniquement les lots dont les résultats n'ont pas encore été intégrés
+        limit: Nombre maximum de lots
+    """
+    query = "SELECT * FROM llm_batches WHERE 1 = 1"
+    params: List[Any] = []
+    if client_id is not None:
+        query += " AND client_id = ?"
+        params.append(client_id)
+    if open_only:
+        query += " AND ingested_at IS NULL"
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def update_llm_batch(batch_id: str, **fields) -> bool:
+    """
+    Met à jour les champs d'un lot (status, output_file_id, error_file_id, error_message, ingested_at)
+
+    Returns:
+        True si le lot a été mis à jour
+    """
+    allowed = {'status', 'output_file_id', 'error_file_id', 'error_message', 'ingested_at'}
+    updates = {key: value for key, value in fields.items() if key in allowed}
+    if not updates:
+        return False
+    updates['updated_at'] = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE llm_batches SET {', '.join(f'{key} = ?' for key in updates)} WHERE batch_id = ?",
+            list(updates.values()) + [batch_id]
+        )
+        return cursor.rowcount > 0
+
+
+# ============== GÉNÉRATION DE MESSAGES EN MASSE ==============
+
+def get_qualified_prospects_without_message(client_id: int) -> List[dict]:
+    """
+    Prospects qualifiés sans message (ni généré ni édité), une réaction par reactor_urn
+
+    Args:
+        client_id: ID du client
+
+    Returns:
+        Réactions (la plus ancienne de chaque prospect), triées par score décroissant
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.* FROM reactions r
+            WHERE r.client_id = ? AND r.prospect_relevant = 1
+            AND r.id = (
+                SELECT MIN(r2.id) FROM reactions r2
+                WHERE r2.client_id = r.client_id AND r2.reactor_urn = r.reactor_urn AND r2.prospect_relevant = 1
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM reactions r3
+                WHERE r3.client_id = r.client_id AND r3.reactor_urn = r.reactor_urn
+                AND TRIM(COALESCE(r3.personalized_message, '')) != ''
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM edited_messages em
+                WHERE em.client_id = r.client_id AND em.reactor_urn = r.reactor_urn
+                AND TRIM(COALESCE(em.edited_message, '')) != ''
+            )
+            ORDER BY r.relevance_score DESC, r.id
+        """, (client_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def save_prospect_message(client_id: int, reactor_urn: str, post_url: str, message: str) -> None:
+    """
+    Enregistre le message généré d'un prospect (réaction et message édité) dans une seule transaction
+
+    Args:
+        client_id: ID du client
+        reactor_urn: URN du prospect
+        post_url: URL du post de la réaction
+        message: Message généré
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE reactions SET personalized_message = ?
+            WHERE client_id = ? AND reactor_urn = ? AND post_url = ?
+        """, (message, client_id, reactor_urn, post_url))
+        cursor.execute("""
+            INSERT INTO edited_messages (client_id, reactor_urn, edited_message, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(client_id, reactor_urn) DO UPDATE SET
+                edited_message = excluded.edited_message,
+                updated_at = excluded.updated_at
+        """, (client_id, reactor_urn, message, datetime.now().isoformat()))
+
+
+def save_generated_message(job_id: Optional[int], reaction_id: Optional[int], message: Optional[str]) -> None:
+    """
+    Enregistre un message généré et la progression du job dans une seule transaction
+
+    Args:
+        job_id: ID du job (None : pas de progression à enregistrer)
+        reaction_id: ID de la réaction
+        message: Message généré (None en cas d'échec, compté comme erreur)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if message:
+            cursor.execute("UPDATE reactions SET personalized_message = ? WHERE id = ?", (message, reaction_id))
+        if job_id is not None:
+            cursor.execute("""
+                UPDATE message_jobs
+                SET processed = processed + 1, errors = errors + ?, updated_at = ?
+                WHERE id = ?
+            """, (0 if message else 1, datetime.now().isoformat(), job_id))
+
+
+def create_message_job(client_id: int, total: int) -> int:
+    """Crée un job de génération de messages en masse"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO message_jobs (client_id, status, total, updated_at)
+            VALUES (?, 'pending', ?, ?)
+        """, (client_id, total, datetime.now().isoformat()))
+        return cursor.lastrowid
+
+
+def get_message_job(job_id: int) -> Optional[dict]:
+    """Récupère un job de génération de messages"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM message_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_message_jobs(client_id: int, limit: int = 5) -> List[dict]:
+    """Récupère les derniers jobs de génération de messages d'un client"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM message_jobs WHERE client_id = ? ORDER BY id DESC LIMIT ?",
+            (client_id, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def update_message_job(job_id: int, **fields) -> bool:
+    """
+    Met à jour les champs d'un job de génération (status, total, error_message, started_at, finished_at)
+
+    Returns:
+        True si le job a été mis à jour
+    """
+    allowed = {'status', 'total', 'error_message', 'started_at', 'finished_at'}
+    updates = {key: value for key, value in fields.items() if key in allowed}
+    if not updates:
+        return False
+    updates['updated_at'] = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE message_jobs SET {', '.join(f'{key} = ?' for key in updates)} WHERE id = ?",
+            list(updates.values()) + [job_id]
+        )
+        return cursor.rowcount > 0
+
+
+# ============== JOBS DU SCHEDULER ==============
+
+def get_scheduler_job_state(job_id: str) -> Optional[bytes]:
+    """État sérialisé d'un job du scheduler (None si inconnu)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT job_state FROM scheduler_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return row['job_state'] if row else None
+
+
+def get_scheduler_job_states(due_before: Optional[float] = None) -> List[dict]:
+    """
+    Jobs du scheduler triés par prochaine exécution (jobs en pause en dernier)
+
+    Args:
+        due_before: Timestamp UTC : uniquement les jobs dus à cette date (None = tous)
+
+    Returns:
+        Liste de dicts (id, next_run_time, job_state)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if due_before is None:
+            cursor.execute("""
+                SELECT * FROM scheduler_jobs
+                ORDER BY next_run_time IS NULL, next_run_time
+            """)
+        else:
+            cursor.execute("""
+                SELECT * FROM scheduler_jobs
+                WHERE next_run_time <= ?
+                ORDER BY next_run_time
+            """, (due_before,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def get_scheduler_next_run_time() -> Optional[float]:
+    """Timestamp UTC de la prochaine exécution, tous jobs confondus (None si aucun job actif)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(next_run_time) AS next_run_time FROM scheduler_jobs WHERE next_run_time IS NOT NULL")
+        row = cursor.fetchone()
+        return row['next_run_time'] if row else None
+
+
+def insert_scheduler_job(job_id: str, next_run_time: Optional[float], job_state: bytes) -> None:
+    """Enregistre un nouveau job (sqlite3.IntegrityError si l'ID existe déjà)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO scheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+            (job_id, next_run_time, sqlite3.Binary(job_state))
+        )
+
+
+def update_scheduler_job(job_id: str, next_run_time: Optional[float], job_state: bytes) -> bool:
+    """Met à jour un job existant (False si le job est inconnu)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE scheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (next_run_time, sqlite3.Binary(job_state), job_id)
+        )
+        return cursor.rowcount > 0
+
+
+def delete_scheduler_jobs(job_ids: Optional[List[str]] = None) -> int:
+    """Supprime des jobs du scheduler (tous si job_ids est None) et retourne le nombre supprimé"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if job_ids is None:
+            cursor.execute("DELETE FROM scheduler_jobs")
+        else:
+            cursor.executemany("DELETE FROM scheduler_jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        return cursor.rowcount
+
+
+# ============== ÉLECTION DU LEADER ==============
+
+def try_acquire_lease(name: str, holder: str, lease_seconds: float) -> bool:
+    """
+    Prend ou renouvelle un bail d'élection
+
+    Le bail est obtenu s'il est libre, expiré ou déjà détenu par holder (renouvellement),
+    en une seule requête atomique.
+
+    Args:
+        name: Nom du bail (ex: 'scheduler')
+        holder: Identifiant du processus candidat
+        lease_seconds: Durée du bail
+
+    Returns:
+        True si holder détient le bail
+    """
+    now = time.time()
+    now_iso = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO leader_leases (name, holder, expires_at, acquired_at, renewed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                holder = excluded.holder,
+                expires_at = excluded.expires_at,
+                acquired_at = CASE WHEN leader_leases.holder = excluded.holder
+                                   THEN leader_leases.acquired_at ELSE excluded.acquired_at END,
+                renewed_at = excluded.renewed_at
+            WHERE leader_leases.holder = excluded.holder OR leader_leases.expires_at < ?
+        """, (name, holder, now + lease_seconds, now_iso, now_iso, now))
+        return cursor.rowcount > 0
+
+
+def release_lease(name: str, holder: str) -> bool:
+    """Libère un bail détenu par holder (un autre processus peut le prendre immédiatement)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM leader_leases WHERE name = ? AND holder = ?", (name, holder))
+        return cursor.rowcount > 0
+
+
+def get_lease(name: str) -> Optional[dict]:
+    """Bail d'élection courant (None si aucun), avec expired indiquant s'il a expiré"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM leader_leases WHERE name = ?", (name,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    lease = dict(row)
+    lease['expired'] = lease['expires_at'] < time.time()
+    return lease
+
+
+# ============== FILE DE TÂCHES ==============
+
+def _decode_task(row) -> dict:
+    task = dict(row)
+    task['payload'] = json.loads(task['payload']) if task.get('payload') else {}
+    task['result'] = json.loads(task['result']) if task.get('result') else None
+    return task
+
+
+def enqueue_task(task_type: str, payload: Optional[Dict[str, Any]] = None, priority: int = 0,
+                 client_id: Optional[int] = None, radar_id: Optional[int] = None,
+                 dedupe_key: Optional[str] = None, max_attempts: int = 3, weight: float = 1.0) -> int:
+    """
+    Ajoute une tâche à la file
+
+    À priorité égale, les tâches sont servies en file équitable pondérée par client (start-time
+    fair queuing) : chaque tâche reçoit une étiquette virtuelle qui avance de 1/weight par tâche
+    du client, à partir du temps virtuel courant de la file. Un client qui ajoute 30 radars
+    d'un coup passe ainsi après la prochaine tâche des autres clients.
+
+    Args:
+        task_type: Type de tâche (ex: 'radar_run')
+        payload: Paramètres de la tâche
+        priority: Priorité (les plus élevées sont réclamées en premier)
+        client_id: ID du client
+        radar_id: ID du radar
+        dedupe_key: Clé de déduplication : si une tâche active (en attente ou en cours) a la même clé,
+            aucune tâche n'est ajoutée et son ID est retourné
+        max_attempts: Nombre maximum d'exécutions (nouvelles tentatives comprises)
+        weight: Poids du client dans la file équitable (part des exécutions)
+
+    Returns:
+        ID de la tâche
+    """
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        if dedupe_key:
+            cursor.execute(
+                "SELECT id FROM tasks WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                (dedupe_key,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return row['id']
+
+        # Temps virtuel de la file : étiquette de début de la dernière tâche réclamée
+        cursor.execute("""
+            SELECT virtual_start FROM tasks
+            WHERE attempts > 0 AND virtual_start IS NOT NULL
+            ORDER BY virtual_start DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+        virtual_time = row['virtual_start'] if row else 0.0
+        cursor.execute("SELECT MAX(virtual_finish) AS last_finish FROM tasks WHERE client_id IS ?", (client_id,))
+        last_finish = cursor.fetchone()['last_finish'] or 0.0
+        virtual_start = max(virtual_time, last_finish)
+
+        cursor.execute("""
+            INSERT INTO tasks (
+                task_type, payload, priority, status, client_id, radar_id, dedupe_key,
+                virtual_start, virtual_finish, max_attempts, run_after, created_at, updated_at
+            ) VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (task_type, json.dumps(payload or {}, ensure_ascii=False), priority, client_id, radar_id,
+              dedupe_key, virtual_start, virtual_start + 1.0 / max(weight, 0.01), max_attempts,
+              now, now, now))
+        return cursor.lastrowid
+
+
+def claim_task(lease_owner: str, lease_seconds: int, task_types: Optional[List[str]] = None,
+               max_running: Optional[int] = None) -> Optional[dict]:
+    """
+    Réclame la tâche disponible suivante (en attente, ou en cours avec un bail expiré)
+
+    Ordre : priorité décroissante, puis étiquette de la file équitable par client (voir enqueue_task).
+    La réclamation se fait dans une transaction IMMEDIATE : deux workers ne peuvent pas obtenir
+    la même tâche. Les tâches dont le bail a expiré après leur dernière tentative passent en échec.
+
+    Args:
+        lease_owner: Identifiant du worker
+        lease_seconds: Durée du bail (à renouveler avec heartbeat_task)
+        task_types: Types de tâches acceptés (tous si None)
+        max_running: Nombre maximum de tâches en cours, tous workers confondus (pas de limite si None)
+
+    Returns:
+        Tâche réclamée (payload décodé) ou None si la file est vide ou la limite atteinte
+    """
+    now = datetime.now()
+    now_iso = now.isoformat()
+    type_filter = ""
+    type_params: List[Any] = []
+    if task_types:
+        type_filter = f"AND task_type IN ({', '.join('?' for _ in task_types)})"
+        type_params = list(task_types)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            UPDATE tasks
+            SET status = 'failed', error_message = 'Bail expiré (worker arrêté) après la dernière tentative',
+                lease_owner = NULL, lease_expires_at = NULL, finished_at = ?, updated_at = ?
+            WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+        """, (now_iso, now_iso, now_iso))
+
+        if max_running:
+            cursor.execute(
+                "SELECT COUNT(*) AS running FROM tasks WHERE status = 'running' AND lease_expires_at >= ?",
+                (now_iso,)
+            )
+            if cursor.fetchone()['running'] >= max_running:
+                return None
+
+        cursor.execute(f"""
+            SELECT id, attempts, created_at FROM tasks
+            WHERE ((status = 'queued' AND (run_after IS NULL OR run_after <= ?))
+                   OR (status = 'running' AND lease_expires_at < ?))
+            {type_filter}
+            ORDER BY priority DESC, virtual_finish, id
+            LIMIT 1
+        """, [now_iso, now_iso] + type_params)
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        # Temps d'attente dans la file avant la première exécution
+        wait_ms = None
+        if not row['attempts'] and row['created_at']:
+            try:
+                wait_ms = (now - datetime.fromisoformat(row['created_at'])).total_seconds() * 1000
+            except ValueError:
+                pass
+
+        cursor.execute("""
+            UPDATE tasks
+            SET status = 'running', lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                attempts = attempts + 1, started_at = ?, wait_ms = COALESCE(wait_ms, ?), updated_at = ?
+            WHERE id = ?
+        """, (lease_owner, (now + timedelta(seconds=lease_seconds)).isoformat(), now_iso,
+              now_iso, wait_ms, now_iso, row['id']))
+        cursor.execute("SELECT * FROM tasks WHERE id = ?", (row['id'],))
+        return _decode_task(cursor.fetchone())
+
+
+def has_ready_tasks(task_types: Optional[List[str]] = None) -> bool:
+    """Indique si des tâches en attente peuvent être exécutées maintenant (hors nouvelles tentatives différées)"""
+    type_filter = ""
+    params: List[Any] = [datetime.now().isoformat()]
+    if task_types:
+        type_filter = f"AND task_type IN ({', '.join('?' for _ in task_types)})"
+        params += list(task_types)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT 1 FROM tasks
+            WHERE status = 'queued' AND (run_after IS NULL OR run_after <= ?) {type_filter}
+            LIMIT 1
+        """, params)
+        return cursor.fetchone() is not None
+
+
+def heartbeat_task(task_id: int, lease_owner: str, lease_seconds: int) -> bool:
+    """
+    Renouvelle le bail d'une tâche en cours
+
+    Returns:
+        False si le worker ne détient plus la tâche (bail expiré et réclamé par un autre worker)
+    """
+    now = datetime.now()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE tasks SET lease_expires_at = ?, heartbeat_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+        """, ((now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat(), now.isoformat(),
+              task_id, lease_owner))
+        return cursor.rowcount > 0
+
+
+def complete_task(task_id: int, lease_owner: str, result: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Marque une tâche comme terminée
+
+    Returns:
+        False si le worker ne détient plus la tâche
+    """
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE tasks
+            SET status = 'done', result = ?, error_message = NULL, lease_owner = NULL,
+                lease_expires_at = NULL, finished_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+        """, (json.dumps(result or {}, ensure_ascii=False, default=str), now, now, task_id, lease_owner))
+        return cursor.rowcount > 0
+
+
+def fail_task(task_id: int, lease_owner: str, error_message: str,
+              retry_delay_seconds: float) -> Optional[str]:
+    """
+    Enregistre l'échec d'une tentative : la tâche est remise en file après retry_delay_seconds,
+    ou passe en échec si toutes les tentatives ont été faites
+
+    Returns:
+        Nouveau statut ('queued' ou 'failed'), ou None si le worker ne détient plus la tâche
+    """
+    now = datetime.now()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE tasks
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                run_after = ?, error_message = ?, lease_owner = NULL, lease_expires_at = NULL,
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, updated_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+        """, ((now + timedelta(seconds=retry_delay_seconds)).isoformat(), error_message[:2000],
+              now.isoformat(), now.isoformat(), task_id, lease_owner))
+        if not cursor.rowcount:
+            return None
+        cursor.execute("SELECT status FROM tasks WHERE id = ?", (task_id,))
+        return cursor.fetchone()['status']
+
+
+def cancel_task(task_id: int) -> bool:
+    """Annule une tâche en attente (une tâche en cours n'est pas interrompue)"""
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE tasks SET status = 'cancelled', finished_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'queued'
+        """, (now, now, task_id))
+        return cursor.rowcount > 0
+
+
+def get_task(task_id: int) -> Optional[dict]:
+    """Récupère une tâche (payload et résultat décodés)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        row = cursor.fetchone()
+        return _decode_task(row) if row else None
+
+
+def get_tasks(client_id: Optional[int] = None, radar_id: Optional[int] = None,
+              status: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """Récupère les dernières tâches, filtrées par client, radar et/ou statut"""
+    conditions = []
+    params: List[Any] = []
+    for column, value in (('client_id', client_id), ('radar_id', radar_id), ('status', status)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM tasks {where} ORDER BY id DESC LIMIT ?", params + [limit])
+        return [_decode_task(row) for row in cursor.fetchall()]
+
+
+def count_tasks_by_status(client_id: Optional[int] = None) -> Dict[str, int]:
+    """Nombre de tâches par statut"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if client_id is None:
+            cursor.execute("SELECT status, COUNT(*) AS count FROM tasks GROUP BY status")
+        else:
+            cursor.execute(
+                "SELECT status, COUNT(*) AS count FROM tasks WHERE client_id = ? GROUP BY status",
+                (client_id,)
+            )
+        return {row['status']: row['count'] for row in cursor.fetchall()}
+
+
+def get_task_queue_metrics(since: Optional[str] = None) -> List[dict]:
+    """
+    Profondeur de la file et temps d'attente par client
+
+    Args:
+        since: Date ISO : temps d'attente des tâches démarrées depuis cette date (toutes si None)
+
+    Returns:
+        Liste de dicts (client_id, queued, running, oldest_queued_at, started, avg_wait_ms, max_wait_ms)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT client_id,
+                   SUM(CASE WHEN status = 'queued' THEN 1 ELSE 0 END) AS queued,
+                   SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) AS running,
+                   MIN(CASE WHEN status = 'queued' THEN created_at END) AS oldest_queued_at,
+                   SUM(CASE WHEN wait_ms IS NOT NULL AND started_at >= ? THEN 1 ELSE 0 END) AS started,
+                   AVG(CASE WHEN started_at >= ? THEN wait_ms END) AS avg_wait_ms,
+                   MAX(CASE WHEN started_at >= ? THEN wait_ms END) AS max_wait_ms
+            FROM tasks
+            WHERE status IN ('queued', 'running') OR started_at >= ?
+            GROUP BY client_id
+            ORDER BY queued DESC, client_id
+        """, (since or '', since or '', since or '', since or ''))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# ============== POSTS ==============
+
+def save_posts(posts: List[Dict[str, Any]]) -> int:
+    """
+    Enregistre (ou met à jour) des posts en une seule transaction
+
+    Args:
+        posts: Posts normalisés (post_url, source, author_name, author_url, post_text, post_date,
+            reaction_count, comment_count, repost_count, stats)
+
+    Returns:
+        Nombre de posts enregistrés
+    """
+    rows = [
+        (post['post_url'], post.get('source'), post.get('author_name'), post.get('author_url'),
+         post.get('post_text'), post.get('post_date'), post.get('reaction_count'), post.get('comment_count'),
+         post.get('repost_count'), json.dumps(post.get('stats') or {}, ensure_ascii=False),
+         datetime.now().isoformat())
+        for post in posts if post.get('post_url')
+    ]
+    if not rows:
+        return 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # Un post déjà connu garde son texte si la nouvelle charge utile n'en contient pas
+        cursor.executemany("""
+            INSERT INTO posts (post_url, source, author_name, author_url, post_text, post_date,
+                               reaction_count, comment_count, repost_count, stats_json, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(post_url) DO UPDATE SET
+                source = COALESCE(excluded.source, posts.source),
+                author_name = COALESCE(NULLIF(excluded.author_name, ''), posts.author_name),
+                author_url = COALESCE(NULLIF(excluded.author_url, ''), posts.author_url),
+                post_text = COALESCE(NULLIF(excluded.post_text, ''), posts.post_text),
+                post_date = COALESCE(excluded.post_date, posts.post_date),
+                reaction_count = COALESCE(excluded.reaction_count, posts.reaction_count),
+                comment_count = COALESCE(excluded.comment_count, posts.comment_count),
+                repost_count = COALESCE(excluded.repost_count, posts.repost_count),
+                stats_json = COALESCE(NULLIF(excluded.stats_json, '{}'), posts.stats_json),
+                fetched_at = excluded.fetched_at
+        """, rows)
+        return len(rows)
+
+
+def get_post(post_url: str) -> Optional[dict]:
+    """Récupère un post enregistré par son URL"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM posts WHERE post_url = ?", (post_url,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_posts_by_url(post_urls: List[str]) -> Dict[str, dict]:
+    """Récupère les posts enregistrés pour une liste d'URLs (dict URL -> post)"""
+    post_urls = list({url for url in post_urls if url})
+    posts = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # Par paquets pour rester sous la limite de paramètres de SQLite
+        for start in range(0, len(post_urls), 500):
+            chunk = post_urls[start:start + 500]
+            cursor.execute(
+                f"SELECT * FROM posts WHERE post_url IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            posts.update({row['post_url']: dict(row) for row in cursor.fetchall()})
+    return posts
+
+
+# ============== PERTINENCE DES POSTS ==============
+
+def get_post_relevance(client_id: int, post_url: str, persona_version: int) -> Optional[dict]:
+    """Récupère la pertinence en cache d'un post pour une version du persona (None si non analysé)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM post_relevance_cache
+            WHERE client_id = ? AND post_url = ? AND persona_version = ?
+        """, (client_id, post_url, persona_version))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def save_post_relevance(client_id: int, post_url: str, persona_version: int, score: float,
+                        relevant: bool, reasoning: str = '') -> None:
+    """Enregistre la pertinence d'un post pour une version du persona"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO post_relevance_cache (client_id, post_url, persona_version, score, relevant, reasoning, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(client_id, post_url, persona_version) DO UPDATE SET
+                score = excluded.score,
+                relevant = excluded.relevant,
+                reasoning = excluded.reasoning,
+                created_at = excluded.created_at
+        """, (client_id, post_url, persona_version, score, 1 if relevant else 0, reasoning,
+              datetime.now().isoformat()))
+
+
+# ============== ACCROCHES DE MESSAGES ==============
+
+def get_message_hook(client_id: int, post_url: str, company_key: str,
+                     persona_version: Optional[int] = None) -> Optional[dict]:
+    """
+    Récupère l'accroche en cache pour un post et une entreprise
+
+    Args:
+        client_id: ID du client
+        post_url: URL du post
+        company_key: Entreprise du prospect normalisée ('' si inconnue)
+        persona_version: Version du persona attendue (une accroche d'une autre version est ignorée)
+
+    Returns:
+        Accroche (hook, topic) ou None
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM message_hooks
+            WHERE client_id = ? AND post_url = ? AND company_key = ?
+        """, (client_id, post_url, company_key))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if persona_version is not None and row['persona_version'] != persona_version:
+            return None
+        return dict(row)
+
+
+def save_message_hook(client_id: int, post_url: str, company_key: str, hook: str,
+                      topic: Optional[str] = None, persona_version: Optional[int] = None) -> None:
+    """Enregistre (ou remplace) l'accroche d'un post pour une entreprise"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO message_hooks (client_id, post_url, company_key, persona_version, hook, topic, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(client_id, post_url, company_key) DO UPDATE SET
+                persona_version = excluded.persona_version,
+                hook = excluded.hook,
+                topic = excluded.topic,
+                created_at = excluded.created_at
+        """, (client_id, post_url, company_key, persona_version, hook, topic, datetime.now().isoformat()))
+
+
+# ============== TÉLÉMÉTRIE LLM ==============
+
+def save_llm_call(purpose: str, model: str, client_id: Optional[int] = None, radar_id: Optional[int] = None,
+                  prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0,
+                  latency_ms: Optional[float] = None, retries: int = 0, outcome: str = 'success',
+                  error: Optional[str] = None, cost_usd: float = 0.0, batch: bool = False,
+                  ttft_ms: Optional[float] = None) -> int:
+    """Enregistre un appel LLM (voir utils.llm_telemetry)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO llm_calls (client_id, radar_id, purpose, model, prompt_tokens, completion_tokens,
+                                   cached_tokens, latency_ms, retries, outcome, error, cost_usd, batch, ttft_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (client_id, radar_id, purpose, model, prompt_tokens, completion_tokens, cached_tokens,
+              latency_ms, retries, outcome, error, cost_usd, 1 if batch else 0, ttft_ms))
+        return cursor.lastrowid
+
+
+def get_llm_usage_by_purpose(client_id: int, since: Optional[str] = None) -> List[dict]:
+    """
+    Agrège les appels LLM d'un client par usage et par modèle
+
+    Args:
+        client_id: ID du client
+        since: Date ISO de début (optionnel)
+    """
+    query = """
+        SELECT purpose, model, COUNT(*) AS calls,
+               SUM(CASE WHEN outcome = 'success' THEN 0 ELSE 1 END) AS errors,
+               SUM(retries) AS retries,
+               SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+               SUM(cached_tokens) AS cached_tokens, AVG(latency_ms) AS avg_latency_ms,
+               AVG(ttft_ms) AS avg_ttft_ms, SUM(cost_usd) AS cost_usd
+        FROM llm_calls
+        WHERE client_id = ?
+    """
+    params: List[Any] = [client_id]
+    if since:
+        query += " AND created_at >= ?"
+        params.append(since)
+    query += " GROUP BY purpose, model ORDER BY cost_usd DESC"
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def get_llm_cost_by_radar(client_id: int, since: Optional[str] = None) -> List[dict]:
+    """
+    Coût LLM et prospects qualifiés par radar (radar_id NULL : appels hors radar)
+
+    Args:
+        client_id: ID du client
+        since: Date ISO de début (optionnel, s'applique aux appels et aux prospects)
+    """
+    since_clause = " AND created_at >= ?" if since else ""
+    params: List[Any] = [client_id] + ([since] if since else []) + [client_id] + ([since] if since else [])
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            WITH costs AS (
+                SELECT radar_id, COUNT(*) AS calls, SUM(prompt_tokens + completion_tokens) AS tokens,
+                       SUM(cost_usd) AS cost_usd
+                FROM llm_calls
+                WHERE client_id = ?{since_clause}
+                GROUP BY radar_id
+            ),
+            qualified AS (
+                SELECT radar_id, COUNT(*) AS qualified_prospects
+                FROM reactions
+                WHERE client_id = ? AND prospect_relevant = 1{since_clause}
+                GROUP BY radar_id
+            )
+            SELECT costs.radar_id, radars.name AS radar_name, costs.calls, costs.tokens, costs.cost_usd,
+                   COALESCE(qualified.qualified_prospects, 0) AS qualified_prospects
+            FROM costs
+            LEFT JOIN qualified ON qualified.radar_id IS costs.radar_id
+            LEFT JOIN radars ON radars.id = costs.radar_id
+            ORDER BY costs.cost_usd DESC
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# ============== HISTORIQUE DES EXÉCUTIONS ==============
+
+# Compteurs d'une exécution et de ses étapes (voir utils.run_history)
+RUN_COUNTER_COLUMNS = ('api_calls', 'llm_calls', 'llm_cost_usd', 'cache_hits', 'errors')
+
+
+def create_radar_run(radar_id: int, client_id: Optional[int] = None, trigger: str = 'manual',
+                     task_id: Optional[int] = None) -> int:
+    """
+    Enregistre le début d'une exécution de radar
+
+    Args:
+        radar_id: ID du radar
+        client_id: ID du client
+        trigger: 'scheduled' ou 'manual'
+        task_id: Tâche de la file qui exécute le radar (optionnel)
+
+    Returns:
+        ID de l'exécution
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO radar_runs (radar_id, client_id, task_id, trigger, status, started_at)
+            VALUES (?, ?, ?, ?, 'running', ?)
+        """, (radar_id, client_id, task_id, trigger, datetime.now().isoformat()))
+        return cursor.lastrowid
+
+
+def finish_radar_run(run_id: int, status: str, duration_ms: float, counters: Dict[str, Any],
+                     summary: Optional[Dict[str, Any]] = None, error_message: Optional[str] = None) -> bool:
+    """
+    Enregistre la fin d'une exécution de radar
+
+    Args:
+        run_id: ID de l'exécution
+        status: 'done' ou 'failed'
+        duration_ms: Durée (ajoutée à celle des tentatives précédentes d'une exécution reprise)
+        counters: Totaux (api_calls, llm_calls, llm_cost_usd, cache_hits, errors), cumulés de même
+        summary: Résultat (reactions, new_reactors, qualified, saved)
+        error_message: Erreur ayant interrompu l'exécution
+    """
+    summary = summary or {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # Durée et compteurs cumulés : une exécution reprise ajoute ceux de la reprise
+        cursor.execute(f"""
+            UPDATE radar_runs
+            SET status = ?, finished_at = ?, duration_ms = COALESCE(duration_ms, 0) + ?, error_message = ?,
+                reactions = ?, new_reactors = ?, qualified = ?, saved = ?,
+                {', '.join(f'{column} = COALESCE({column}, 0) + ?' for column in RUN_COUNTER_COLUMNS)}
+            WHERE id = ?
+        """, [status, datetime.now().isoformat(), duration_ms, error_message,
+              summary.get('reactions'), summary.get('new_reactors'), summary.get('qualified'), summary.get('saved')]
+             + [counters.get(column, 0) for column in RUN_COUNTER_COLUMNS] + [run_id])
+        return cursor.rowcount > 0
+
+
+def save_radar_run_stage(run_id: int, stage: Dict[str, Any]) -> int:
+    """Enregistre une étape terminée d'une exécution (stage, status, dates, durée, éléments et compteurs)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO radar_run_stages (run_id, position, stage, status, started_at, finished_at, duration_ms,
+                                          items_in, items_out, error_message,
+                                          {', '.join(RUN_COUNTER_COLUMNS)})
+            VALUES (?, (SELECT COALESCE(MAX(position), 0) + 1 FROM radar_run_stages WHERE run_id = ?),
+                    {', '.join('?' * (8 + len(RUN_COUNTER_COLUMNS)))})
+        """, [run_id, run_id, stage['stage'], stage['status'], stage.get('started_at'), stage.get('finished_at'),
+              stage.get('duration_ms'), stage.get('items_in'), stage.get('items_out'), stage.get('error_message')]
+             + [stage.get(column, 0) for column in RUN_COUNTER_COLUMNS])
+        return cursor.lastrowid
+
+
+def get_radar_runs(client_id: Optional[int] = None, radar_id: Optional[int] = None, limit: int = 50) -> List[dict]:
+    """Exécutions de radars, les plus récentes d'abord (avec le nom du radar et resumable)"""
+    where = "1 = 1"
+    params: List[Any] = []
+    if client_id is not None:
+        where += " AND radar_runs.client_id = ?"
+        params.append(client_id)
+    if radar_id is not None:
+        where += " AND radar_runs.radar_id = ?"
+        params.append(radar_id)
+    return _select_radar_runs(where, params, limit)
+
+
+def get_radar_run(run_id: int) -> Optional[dict]:
+    """
+    Exécution de radar par ID
+
+    has_checkpoints indique des points de reprise enregistrés ; resumable, une exécution
+    interrompue (échec, ou tâche qui n'est plus en cours) qui peut être reprise.
+    """
+    runs = _select_radar_runs("radar_runs.id = ?", [run_id], 1)
+    return runs[0] if runs else None
+
+
+def get_resumable_radar_runs(client_id: Optional[int] = None, limit: int = 20) -> List[dict]:
+    """Exécutions interrompues (échec ou worker arrêté) qui ont des points de reprise, les plus récentes d'abord"""
+    query = "_resumable = 1"
+    params: List[Any] = []
+    if client_id is not None:
+        query += " AND radar_runs.client_id = ?"
+        params.append(client_id)
+    return _select_radar_runs(query, params, limit)
+
+
+def get_interrupted_run_for_task(task_id: int) -> Optional[dict]:
+    """Dernière exécution non terminée d'une tâche de la file (reprise lors d'une nouvelle tentative)"""
+    runs = _select_radar_runs("radar_runs.task_id = ? AND radar_runs.status != 'done'", [task_id], 1)
+    return runs[0] if runs else None
+
+
+def _select_radar_runs(where: str, params: List[Any], limit: int) -> List[dict]:
+    # Une exécution 'running' dont la tâche n'est plus en cours (bail expiré, tâche terminée) a été interrompue
+    now_iso = datetime.now().isoformat()
+    query = f"""
+        SELECT * FROM (
+            SELECT *, CASE WHEN status != 'done' AND _has_checkpoints
+                                AND (status = 'failed' OR _task_status IS NULL OR _task_status != 'running'
+                                     OR _task_lease_expires_at < ?)
+                           THEN 1 ELSE 0 END AS _resumable
+            FROM (
+                SELECT radar_runs.*, radars.name AS radar_name, tasks.status AS _task_status,
+                       tasks.lease_expires_at AS _task_lease_expires_at,
+                       EXISTS (SELECT 1 FROM radar_run_checkpoints c WHERE c.run_id = radar_runs.id) AS _has_checkpoints
+                FROM radar_runs
+                LEFT JOIN radars ON radars.id = radar_runs.radar_id
+                LEFT JOIN tasks ON tasks.id = radar_runs.task_id
+            )
+        ) AS radar_runs
+        WHERE {where}
+        ORDER BY radar_runs.id DESC LIMIT ?
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, [now_iso] + params + [limit])
+        runs = [dict(row) for row in cursor.fetchall()]
+    for run in runs:
+        run['resumable'] = bool(run.pop('_resumable'))
+        run['has_checkpoints'] = bool(run.pop('_has_checkpoints'))
+        run.pop('_task_status')
+        run.pop('_task_lease_expires_at')
+    return runs
+
+
+def resume_radar_run(run_id: int, task_id: Optional[int] = None) -> bool:
+    """Repasse une exécution interrompue en cours (reprise depuis ses points de reprise, par la tâche task_id)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE radar_runs
+            SET status = 'running', finished_at = NULL, error_message = NULL, task_id = COALESCE(?, task_id)
+            WHERE id = ? AND status != 'done'
+        """, (task_id, run_id))
+        return cursor.rowcount > 0
+
+
+def save_run_checkpoint(run_id: int, stage: str, state: str, completed: bool = False):
+    """Enregistre le point de reprise d'une étape (état sérialisé en JSON)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO radar_run_checkpoints (run_id, stage, completed, state, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(run_id, stage) DO UPDATE SET
+                completed = excluded.completed, state = excluded.state, updated_at = excluded.updated_at
+        """, (run_id, stage, 1 if completed else 0, state, datetime.now().isoformat()))
+
+
+def get_run_checkpoints(run_id: int) -> Dict[str, dict]:
+    """Points de reprise d'une exécution par étape : {stage: {'completed', 'state' (JSON), 'updated_at'}}"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT stage, completed, state, updated_at FROM radar_run_checkpoints WHERE run_id = ?",
+                       (run_id,))
+        return {row['stage']: dict(row) for row in cursor.fetchall()}
+
+
+def delete_run_checkpoints(run_id: int) -> int:
+    """Supprime les points de reprise d'une exécution terminée"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM radar_run_checkpoints WHERE run_id = ?", (run_id,))
+        return cursor.rowcount
+
+
+def get_radar_run_stages(run_id: int) -> List[dict]:
+    """Étapes d'une exécution, dans l'ordre"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM radar_run_stages WHERE run_id = ? ORDER BY position", (run_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
 # ============== MIGRATION ==============
 
 def migrate_from_csv():
@@ -0,0 +1,249 @@
+"""
+Parseur unique des headlines LinkedIn (titre de poste, entreprise, séniorité)
+Patterns précompilés et résultats mémoïsés ; le résultat est stocké sur les réactions
+(colonnes headline_title, headline_company, headline_seniority) à l'enregistrement.
+Le découpage historique (sous-chaînes 'chez' / 'at') n'est conservé que pour le scoring
+par règles, dont les scores ne doivent pas changer
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Any, Optional, NamedTuple
+
+# Version du parseur stockée avec les champs parsés (voir backfill_headlines.py)
+HEADLINE_PARSER_VERSION = 2
+
+# Séparateurs (mots entiers) entre le titre de poste et la suite du headline ; 'at' n'en est un
+# que devant un nom propre ("Head of Sales at Acme", pas "Looking at opportunities")
+_TITLE_SEPARATOR = re.compile(r'\s*(?:\b(?i:chez)\b|\b(?i:at)\b(?=\s+[A-Z0-9])|@|\||·|•|\s[-–—]\s)\s*')
+
+# Entreprise : ce qui suit 'chez', '@' ou 'at' (suivi d'une majuscule), jusqu'au séparateur suivant
+_COMPANY_REGEX = re.compile(
+    r'(?:\b(?i:chez)\b|@|\b(?i:at)\b(?=\s+[A-Z0-9]))\s*'
+    r'([^|,·•(\n]+?)\s*(?=$|[|,·•(\n]|\s[-–—]\s)'
+)
+
+# Patterns historiques d'extraction de l'entreprise (ordre = priorité), utilisés uniquement par
+# le scoring par règles (calculate_prospect_score et sa version vectorisée) pour garder ses scores
+LEGACY_COMPANY_PATTERNS = [
+    r'(?:chez|at|@|chez|chez)\s+([A-Z][a-zA-Z0-9\s&\-]+)',
+    r'([A-Z][a-zA-Z0-9\s&\-]+)\s+(?:|Ltd|Inc|Corp|S\.A\.|SAS|SARL)',
+    r'[A-Z][a-z]+\s+(?:chez|at|@)\s+([A-Z][a-zA-Z0-9\s&\-]+)',
+]
+_LEGACY_COMPANY_REGEXES = [re.compile(pattern, re.IGNORECASE) for pattern in LEGACY_COMPANY_PATTERNS]
+
+# Mots communs à ne pas prendre pour un nom d'entreprise
+COMPANY_STOPWORDS = ['the', 'and', 'or', 'but', 'for', 'with', 'company']
+
+# Niveaux de séniorité, du plus élevé au plus bas (le premier qui matche l'emporte)
+SENIORITY_PATTERNS = [
+    ('c_level', r'\b(?:ceo|cto|cfo|coo|cmo|cpo|cro|chief|founder|co-?founder|fondat(?:eur|rice)|'
+                r'co-?fondat(?:eur|rice)|pr[ée]sident(?:e)?|dg|directeur g[ée]n[ée]ral|'
+                r'directrice g[ée]n[ée]rale|managing director|owner|g[ée]rant(?:e)?)\b'),
+    ('vp', r'\b(?:vp|svp|evp|vice[- ]pr[ée]sident(?:e)?)\b'),
+    ('director', r'\b(?:director|directeur|directrice|head of|head)\b'),
+    ('manager', r'\b(?:manager|responsable|lead|chef de|team lead)\b'),
+    ('senior', r'\b(?:senior|sr|principal|expert|staff)\b'),
+    ('junior', r'\b(?:junior|jr|intern|stagiaire|alternant(?:e)?|apprenti(?:e)?|'
+               r'[ée]tudiant(?:e)?|student|graduate)\b'),
+]
+_SENIORITY_REGEXES = [(level, re.compile(pattern, re.IGNORECASE)) for level, pattern in SENIORITY_PATTERNS]
+
+# Libellés affichés dans l'interface
+SENIORITY_LABELS = {
+    'c_level': 'C-Level / Fondateur',
+    'vp': 'VP',
+    'director': 'Directeur / Head of',
+    'manager': 'Manager',
+    'senior': 'Senior',
+    'junior': 'Junior / Stagiaire',
+}
+
+# Colonnes de la table reactions remplies par le parseur
+HEADLINE_COLUMNS = ['headline_title', 'headline_company', 'headline_seniority']
+
+
+class ParsedHeadline(NamedTuple):
+    """Résultat du parsing d'un headline"""
+    title: str
+    company: Optional[str]
+    seniority: Optional[str]
+
+
+def extract_company(headline: str) -> Optional[str]:
+    """
+    Extrait le nom de l'entreprise depuis un headline LinkedIn (après 'chez', '@' ou 'at')
+
+    Args:
+        headline: Headline du profil LinkedIn (ex: "CEO chez CompanyName | Investisseur")
+
+    Returns:
+        Nom de l'entreprise ou None
+    """
+    if not headline:
+        return None
+
+    for match in _COMPANY_REGEX.finditer(headline):
+        company = match.group(1).strip()
+        # Filtrer les mots communs
+        if company and company.lower() not in COMPANY_STOPWORDS:
+            return company
+
+    return None
+
+
+def extract_title(headline: str) -> str:
+    """
+    Extrait le titre de poste : partie avant le premier séparateur ('chez', 'at', '@', '|', ' - '),
+    sinon le headline complet
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        Titre de poste (chaîne vide si pas de headline)
+    """
+    if not headline:
+        return ''
+    title = _TITLE_SEPARATOR.split(headline, maxsplit=1)[0].strip()
+    return title or headline.strip()
+
+
+def extract_legacy_company(headline: str) -> Optional[str]:
+    """
+    Extraction historique de l'entreprise (patterns LEGACY_COMPANY_PATTERNS), pour le scoring par règles
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        Nom de l'entreprise ou None
+    """
+    if not headline:
+        return None
+
+    for regex in _LEGACY_COMPANY_REGEXES:
+        match = regex.search(headline)
+        if match:
+            company = match.group(1).strip()
+            # Filtrer les mots communs
+            if company.lower() not in COMPANY_STOPWORDS:
+                return company
+
+    return None
+
+
+def extract_legacy_title(headline: str) -> str:
+    """
+    Découpage historique du titre (partie avant la sous-chaîne 'chez' puis avant 'at'),
+    pour le scoring par règles
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        Titre de poste (chaîne vide si pas de headline)
+    """
+    if not headline:
+        return ''
+    if 'chez' in headline or 'at' in headline:
+        return headline.split('chez')[0].split('at')[0].strip()
+    return headline
+
+
+def detect_seniority(text: str) -> Optional[str]:
+    """
+    Détecte le niveau de séniorité d'un titre de poste
+
+    Args:
+        text: Titre de poste ou headline
+
+    Returns:
+        Niveau ('c_level', 'vp', 'director', 'manager', 'senior', 'junior') ou None
+    """
+    if not text:
+        return None
+    for level, regex in _SENIORITY_REGEXES:
+        if regex.search(text):
+            return level
+    return None
+
+
+@lru_cache(maxsize=100000)
+def parse_headline(headline: Optional[str]) -> ParsedHeadline:
+    """
+    Parse un headline LinkedIn (résultat mémoïsé)
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        ParsedHeadline(title, company, seniority)
+    """
+    headline = headline or ''
+    title = extract_title(headline)
+    return ParsedHeadline(
+        title=title,
+        company=extract_company(headline),
+        seniority=detect_seniority(title) or detect_seniority(headline)
+    )
+
+
+@lru_cache(maxsize=100000)
+def parse_legacy_headline(headline: Optional[str]) -> ParsedHeadline:
+    """
+    Parse un headline avec le découpage historique (résultat mémoïsé)
+
+    Réservé au scoring par règles : ses scores restent identiques à ceux de sa version
+    vectorisée (utils.batch_scoring). Les champs stockés et affichés utilisent parse_headline.
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        ParsedHeadline(title, company, seniority)
+    """
+    headline = headline or ''
+    title = extract_legacy_title(headline)
+    return ParsedHeadline(
+        title=title,
+        company=extract_legacy_company(headline),
+        seniority=detect_seniority(title) or detect_seniority(headline)
+    )
+
+
+def headline_fields(headline: Optional[str]) -> Dict[str, Any]:
+    """
+    Retourne les colonnes à stocker sur une réaction pour ce headline
+
+    Args:
+        headline: Headline du profil LinkedIn
+
+    Returns:
+        Dict avec headline_title, headline_company, headline_seniority
+    """
+    parsed = parse_headline(headline if isinstance(headline, str) else None)
+    return {
+        'headline_title': parsed.title,
+        'headline_company': parsed.company,
+        'headline_seniority': parsed.seniority
+    }
+
+
+def get_parsed_headline(prospect_data: Dict[str, Any]) -> ParsedHeadline:
+    """
+    Retourne le headline parsé d'un prospect, depuis les colonnes stockées si disponibles
+
+    Args:
+        prospect_data: Réaction / prospect (dict issu de la DB ou de l'API)
+
+    Returns:
+        ParsedHeadline
+    """
+    if prospect_data.get('headline_title') is not None:
+        return ParsedHeadline(
+            title=prospect_data['headline_title'],
+            company=prospect_data.get('headline_company') or None,
+            seniority=prospect_data.get('headline_seniority') or None
+        )
+    headline = prospect_data.get('headline', '') or ''
+    return parse_headline(headline if isinstance(headline, str) else str(headline))
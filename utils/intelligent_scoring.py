@@ -9,6 +9,11 @@ from typing import Dict, Any, List, Optional, Tuple
 from difflib import SequenceMatcher
 from pathlib import Path
 
+from utils.headline_parser import parse_headline, parse_legacy_headline, get_parsed_headline
+from utils.persona_matcher import get_persona_matcher
+from utils.competitor_index import get_competitor_index
+from utils.llm_telemetry import tracked_chat_completion
+
 logger = logging.getLogger(__name__)
 
 # Configuration OpenAI
@@ -82,22 +87,8 @@ def extract_company_from_headline(headline: str) -> Optional[str]:
     if not headline:
         return None
     
-    # Patterns courants pour extraire l'entreprise
-    patterns = [
-        r'(?:chez|at|@|chez|chez)\s+([A-Z][a-zA-Z0-9\s&\-]+)',
-        r'([A-Z][a-zA-Z0-9\s&\-]+)\s+(?:|Ltd|Inc|Corp|S\.A\.|SAS|SARL)',
-        r'[A-Z][a-z]+\s+(?:chez|at|@)\s+([A-Z][a-zA-Z0-9\s&\-]+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, headline, re.IGNORECASE)
-        if match:
-            company = match.group(1).strip()
-            # Filtrer les mots communs
-            if company.lower() not in ['the', 'and', 'or', 'but', 'for', 'with', 'company']:
-                return company
-    
-    return None
+    # Parseur unique (patterns précompilés, résultat mémoïsé)
+    return parse_headline(headline).company
 
 
 def check_if_competitor(prospect_data: Dict[str, Any], client_id: int,
@@ -116,36 +107,9 @@ def check_if_competitor(prospect_data: Dict[str, Any], client_id: int,
     if not competitors_list:
         return False, None
     
-    headline = prospect_data.get('headline', '') or ''
-    profile_url = prospect_data.get('profile_url', '') or ''
-    
-    # Extraire l'entreprise du headline
-    prospect_company = extract_company_from_headline(headline)
-    
-    # Comparer avec la liste des concurrents
-    for competitor in competitors_list:
-        competitor_name = competitor.get('company_name', '').lower().strip()
-        if not competitor_name:
-            continue
-        
-        # Vérification directe dans le headline
-        if headline:
-            headline_lower = headline.lower()
-            # Recherche exacte ou partielle
-            if competitor_name in headline_lower:
-                return True, competitor['company_name']
-            
-            # Recherche avec similarité
-            if prospect_company:
-                similarity = similarity_score(prospect_company, competitor_name)
-                if similarity > 0.8:  # Seuil de similarité élevé
-                    return True, competitor['company_name']
-        
-        # Vérification dans l'URL du profil
-        if profile_url and competitor_name in profile_url.lower():
-            return True, competitor['company_name']
-    
-    return False, None
+    # Index des concurrents construit une fois par liste (noms dans le headline ou l'URL
+    # du profil, ou similarité > 0.8 avec l'entreprise extraite du headline)
+    return get_competitor_index(competitors_list).match(prospect_data)
 
 
 def calculate_job_title_score(job_title: str, target_job_titles: List[str]) -> float:
@@ -319,25 +283,23 @@ def calculate_prospect_score(prospect_data: Dict[str, Any], company_profile: Dic
     """
     target_persona = company_profile.get('target_persona', {})
     
-    headline = prospect_data.get('headline', '') or ''
     reaction_type = prospect_data.get('reaction_type', '') or ''
     
-    # Extraire les informations du headline
-    prospect_company = extract_company_from_headline(headline)
-    job_title = headline.split('chez')[0].split('at')[0].strip() if 'chez' in headline or 'at' in headline else headline
+    # Informations du headline : découpage historique (mémoïsé), identique à la version
+    # vectorisée (utils.batch_scoring) pour que les scores par règles ne changent pas
+    headline = prospect_data.get('headline', '') or ''
+    parsed_headline = parse_legacy_headline(headline if isinstance(headline, str) else str(headline))
+    prospect_company = parsed_headline.company
+    job_title = parsed_headline.title
     
-    # Scores individuels
-    job_title_score = calculate_job_title_score(
-        job_title,
-        target_persona.get('job_titles', [])
-    )
+    # Scores individuels (matcher compilé une fois par persona, mêmes résultats que
+    # calculate_job_title_score / calculate_company_match_score / calculate_location_score)
+    persona_matcher = get_persona_matcher(target_persona)
+    job_title_score = persona_matcher.job_title_score(job_title)
     
-    company_score = calculate_company_match_score(prospect_company, target_persona)
+    company_score = persona_matcher.company_score(prospect_company)
     
-    location_score = calculate_location_score(
-        prospect_data.get('location', ''),
-        target_persona.get('geographic_location', '')
-    )
+    location_score = persona_matcher.location_score(prospect_data.get('location', ''))
     
     engagement_score = calculate_engagement_score(reaction_type)
     
@@ -373,85 +335,85 @@ def calculate_prospect_score(prospect_data: Dict[str, Any], company_profile: Dic
     }
 
 
-def calculate_prospect_score_with_ai(prospect_data: Dict[str, Any], 
-                                     company_profile: Dict[str, Any],
-                                     post_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def build_post_context(post: Optional[Dict[str, Any]], post_author: str = '') -> Dict[str, Any]:
     """
-    Calcule un score IA précis pour un prospect en utilisant toutes les informations du profil entreprise
-    et en se basant uniquement sur les personas pour la qualification.
+    Contexte du post pour le scoring, depuis un post de la table posts
     
-    Cette fonction utilise OpenAI pour analyser en profondeur chaque prospect et générer un score
-    nuancé et moins restrictif que le scoring basé sur des règles.
+    Args:
+        post: Post enregistré (None si inconnu)
+        post_author: Auteur par défaut (concurrent / mot-clé de la réaction)
+    
+    Returns:
+        Dict avec post_text et post_author
+    """
+    post = post or {}
+    return {
+        'post_text': post.get('post_text') or '',
+        'post_author': post.get('author_name') or post_author
+    }
+
+
+SCORING_SYSTEM_PROMPT = "Tu es un expert en qualification de prospects B2B. Tu analyses les prospects en te basant uniquement sur les personas définis. Tu es nuancé et moins restrictif dans ton scoring. Réponds UNIQUEMENT avec du JSON valide, sans markdown, sans code blocks, directement le JSON."
+
+
+def build_scoring_messages(prospect_data: Dict[str, Any],
+                           company_profile: Dict[str, Any],
+                           post_context: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+    """
+    Construit les messages (system + user) de la requête de scoring IA d'un prospect
     
     Args:
         prospect_data: Données du prospect (headline, reaction_type, location, etc.)
-        company_profile: Profil complet de l'entreprise (toutes les infos)
-        post_context: Contexte du post (optionnel) - dict avec post_text, post_author, etc.
+        company_profile: Profil complet de l'entreprise
+        post_context: Contexte du post (optionnel)
     
     Returns:
-        Dict avec:
-        - total_score: float (0.0-1.0) - Score global de pertinence
-        - reasoning: str - Explication détaillée en français
-        - breakdown: dict - Scores par critère
-        - strengths: List[str] - Points forts du prospect
-        - weaknesses: List[str] - Points faibles
-        - recommendation: str - Recommandation d'action
-        - job_title_score: float (pour compatibilité)
-        - company_score: float (pour compatibilité)
-        - location_score: float (pour compatibilité)
-        - engagement_score: float (pour compatibilité)
-        - post_relevance_score: float (pour compatibilité)
-        - details: dict - Détails techniques
+        Liste de messages au format chat completions
     """
-    # Si OpenAI n'est pas disponible, fallback sur scoring classique
-    if not OPENAI_ENABLED or not openai_client:
-        logger.debug("OpenAI non disponible, utilisation du scoring classique")
-        return calculate_prospect_score(prospect_data, company_profile, post_context)
+    # Extraire les informations du prospect
+    prospect_name = prospect_data.get('reactor_name', '')
+    headline = prospect_data.get('headline', '') or ''
+    reaction_type = prospect_data.get('reaction_type', '') or ''
+    prospect_location = prospect_data.get('location', '')
+    profile_url = prospect_data.get('profile_url', '')
     
-    try:
-        # Extraire les informations du prospect
-        prospect_name = prospect_data.get('reactor_name', '')
-        headline = prospect_data.get('headline', '') or ''
-        reaction_type = prospect_data.get('reaction_type', '') or ''
-        prospect_location = prospect_data.get('location', '')
-        profile_url = prospect_data.get('profile_url', '')
-        
-        # Extraire l'entreprise du headline
-        prospect_company = extract_company_from_headline(headline)
-        
-        # Extraire le contexte du post si disponible
-        post_text = ''
-        post_author = ''
-        if post_context:
-            post_text = post_context.get('post_text', '') or ''
-            post_author = post_context.get('post_author', '') or ''
-        
-        # Préparer les informations du persona
-        target_persona = company_profile.get('target_persona', {})
-        persona_info = {
-            'job_titles': target_persona.get('job_titles', []),
-            'company_types': target_persona.get('company_types', []),
-            'industries': target_persona.get('industries', []),
-            'company_size': target_persona.get('company_size', ''),
-            'geographic_location': target_persona.get('geographic_location', ''),
-            'pain_points': target_persona.get('pain_points', []),
-            'characteristics': target_persona.get('characteristics', [])
-        }
-        
-        # Préparer les informations de l'entreprise
-        company_name = company_profile.get('company_name', '')
-        company_description = company_profile.get('company_description', '')
-        products_services = company_profile.get('products_services', [])
-        website = company_profile.get('website', '')
-        
-        # Préparer la stratégie d'outreach
-        outreach_strategy = company_profile.get('outreach_strategy', {})
-        what_offers = outreach_strategy.get('what_offers', '')
-        value_proposition = outreach_strategy.get('value_proposition', '')
-        ideal_signals = outreach_strategy.get('ideal_signals', [])
-        
-        # Construire le prompt expert
-        prompt = f"""Tu es un expert en qualification de prospects B2B avec une expertise approfondie en analyse de personas et scoring de prospects.
+    # Informations du headline (colonnes stockées sur la réaction, sinon parseur mémoïsé)
+    parsed_headline = get_parsed_headline(prospect_data)
+    prospect_company = parsed_headline.company
+    
+    # Extraire le contexte du post si disponible
+    post_text = ''
+    post_author = ''
+    if post_context:
+        post_text = post_context.get('post_text', '') or ''
+        post_author = post_context.get('post_author', '') or ''
+    
+    # Préparer les informations du persona
+    target_persona = company_profile.get('target_persona', {})
+    persona_info = {
+        'job_titles': target_persona.get('job_titles', []),
+        'company_types': target_persona.get('company_types', []),
+        'industries': target_persona.get('industries', []),
+        'company_size': target_persona.get('company_size', ''),
+        'geographic_location': target_persona.get('geographic_location', ''),
+        'pain_points': target_persona.get('pain_points', []),
+        'characteristics': target_persona.get('characteristics', [])
+    }
+    
+    # Préparer les informations de l'entreprise
+    company_name = company_profile.get('company_name', '')
+    company_description = company_profile.get('company_description', '')
+    products_services = company_profile.get('products_services', [])
+    website = company_profile.get('website', '')
+    
+    # Préparer la stratégie d'outreach
+    outreach_strategy = company_profile.get('outreach_strategy', {})
+    what_offers = outreach_strategy.get('what_offers', '')
+    value_proposition = outreach_strategy.get('value_proposition', '')
+    ideal_signals = outreach_strategy.get('ideal_signals', [])
+    
+    # Construire le prompt expert
+    prompt = f"""Tu es un expert en qualification de prospects B2B avec une expertise approfondie en analyse de personas et scoring de prospects.
 
 ## MISSION
 Analyse ce prospect LinkedIn et détermine sa pertinence en te basant UNIQUEMENT sur le persona cible défini. 
@@ -543,64 +505,124 @@ Réponds UNIQUEMENT avec un JSON valide (sans markdown, sans code blocks):
 - **0.0-0.2** : Très faible match, ne correspond pas au persona, non recommandé
 
 IMPORTANT: Sois généreux dans le scoring. Un prospect avec 2-3 critères partiels peut avoir un score de 0.5-0.6."""
-        
+    
+    return [
+        {"role": "system", "content": SCORING_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_scoring_response(content: str, prospect_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convertit la réponse JSON du modèle en résultat de scoring
+    
+    Args:
+        content: Contenu texte de la réponse
+        prospect_data: Données du prospect (pour les détails)
+    
+    Returns:
+        Dict de scoring (voir calculate_prospect_score_with_ai)
+    
+    Raises:
+        json.JSONDecodeError: si la réponse n'est pas un JSON valide
+    """
+    content = content.strip()
+    reaction_type = prospect_data.get('reaction_type', '') or ''
+    prospect_location = prospect_data.get('location', '')
+    parsed_headline = get_parsed_headline(prospect_data)
+    prospect_company = parsed_headline.company
+    
+    # Nettoyer le contenu (enlever markdown si présent)
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    
+    # Parser le JSON
+    result = json.loads(content)
+    
+    # Extraire les valeurs
+    total_score = float(result.get('total_score', 0.0))
+    reasoning = result.get('reasoning', '')
+    breakdown = result.get('breakdown', {})
+    strengths = result.get('strengths', [])
+    weaknesses = result.get('weaknesses', [])
+    recommendation = result.get('recommendation', '')
+    
+    # Construire la réponse compatible avec l'ancien format
+    return {
+        'total_score': min(max(total_score, 0.0), 1.0),  # S'assurer que c'est entre 0 et 1
+        'reasoning': reasoning,
+        'breakdown': breakdown,
+        'strengths': strengths,
+        'weaknesses': weaknesses,
+        'recommendation': recommendation,
+        # Compatibilité avec l'ancien format
+        'job_title_score': breakdown.get('job_title_match', 0.0) * 0.3,
+        'company_score': breakdown.get('company_match', 0.0) * 0.25,
+        'location_score': breakdown.get('location_match', 0.0) * 0.15,
+        'engagement_score': breakdown.get('engagement_level', 0.0) * 0.1,
+        'post_relevance_score': 0.0,  # Peut être enrichi plus tard
+        'details': {
+            'job_title': parsed_headline.title,
+            'prospect_company': prospect_company,
+            'reaction_type': reaction_type,
+            'location': prospect_location
+        }
+    }
+
+
+def calculate_prospect_score_with_ai(prospect_data: Dict[str, Any], 
+                                     company_profile: Dict[str, Any],
+                                     post_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Calcule un score IA précis pour un prospect en utilisant toutes les informations du profil entreprise
+    et en se basant uniquement sur les personas pour la qualification.
+    
+    Cette fonction utilise OpenAI pour analyser en profondeur chaque prospect et générer un score
+    nuancé et moins restrictif que le scoring basé sur des règles.
+    
+    Args:
+        prospect_data: Données du prospect (headline, reaction_type, location, etc.)
+        company_profile: Profil complet de l'entreprise (toutes les infos)
+        post_context: Contexte du post (optionnel) - dict avec post_text, post_author, etc.
+    
+    Returns:
+        Dict avec:
+        - total_score: float (0.0-1.0) - Score global de pertinence
+        - reasoning: str - Explication détaillée en français
+        - breakdown: dict - Scores par critère
+        - strengths: List[str] - Points forts du prospect
+        - weaknesses: List[str] - Points faibles
+        - recommendation: str - Recommandation d'action
+        - job_title_score: float (pour compatibilité)
+        - company_score: float (pour compatibilité)
+        - location_score: float (pour compatibilité)
+        - engagement_score: float (pour compatibilité)
+        - post_relevance_score: float (pour compatibilité)
+        - details: dict - Détails techniques
+    """
+    # Si OpenAI n'est pas disponible, fallback sur scoring classique
+    if not OPENAI_ENABLED or not openai_client:
+        logger.debug("OpenAI non disponible, utilisation du scoring classique")
+        return calculate_prospect_score(prospect_data, company_profile, post_context)
+    
+    try:
         # Appel à OpenAI
-        response = openai_client.chat.completions.create(
+        response = tracked_chat_completion(
+            openai_client,
+            'scoring',
             model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "Tu es un expert en qualification de prospects B2B. Tu analyses les prospects en te basant uniquement sur les personas définis. Tu es nuancé et moins restrictif dans ton scoring. Réponds UNIQUEMENT avec du JSON valide, sans markdown, sans code blocks, directement le JSON."
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_scoring_messages(prospect_data, company_profile, post_context),
             temperature=OPENAI_TEMPERATURE,
             max_tokens=OPENAI_MAX_TOKENS
         )
         
         content = response.choices[0].message.content.strip()
-        
-        # Nettoyer le contenu (enlever markdown si présent)
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        # Parser le JSON
-        result = json.loads(content)
-        
-        # Extraire les valeurs
-        total_score = float(result.get('total_score', 0.0))
-        reasoning = result.get('reasoning', '')
-        breakdown = result.get('breakdown', {})
-        strengths = result.get('strengths', [])
-        weaknesses = result.get('weaknesses', [])
-        recommendation = result.get('recommendation', '')
-        
-        # Construire la réponse compatible avec l'ancien format
-        return {
-            'total_score': min(max(total_score, 0.0), 1.0),  # S'assurer que c'est entre 0 et 1
-            'reasoning': reasoning,
-            'breakdown': breakdown,
-            'strengths': strengths,
-            'weaknesses': weaknesses,
-            'recommendation': recommendation,
-            # Compatibilité avec l'ancien format
-            'job_title_score': breakdown.get('job_title_match', 0.0) * 0.3,
-            'company_score': breakdown.get('company_match', 0.0) * 0.25,
-            'location_score': breakdown.get('location_match', 0.0) * 0.15,
-            'engagement_score': breakdown.get('engagement_level', 0.0) * 0.1,
-            'post_relevance_score': 0.0,  # Peut être enrichi plus tard
-            'details': {
-                'job_title': headline.split('chez')[0].split('at')[0].strip() if 'chez' in headline or 'at' in headline else headline,
-                'prospect_company': prospect_company,
-                'reaction_type': reaction_type,
-                'location': prospect_location
-            }
-        }
+        return parse_scoring_response(content, prospect_data)
         
     except json.JSONDecodeError as e:
         logger.error(f"Erreur de parsing JSON pour prospect {prospect_data.get('reactor_name', 'Unknown')}: {e}")
@@ -656,17 +678,18 @@ def recalculate_prospect_scoring(client_id: int, reactor_urn: str, post_url: str
         prospect_for_scoring = {
             'reactor_name': prospect_data.get('reactor_name', ''),
             'headline': prospect_data.get('headline', ''),
+            'headline_title': prospect_data.get('headline_title'),
+            'headline_company': prospect_data.get('headline_company'),
+            'headline_seniority': prospect_data.get('headline_seniority'),
             'reaction_type': prospect_data.get('reaction_type', ''),
             'location': '',  # Pas stocké dans la DB actuellement
             'profile_url': prospect_data.get('profile_url', ''),
             'reactor_urn': reactor_urn
         }
         
-        # Préparer le contexte du post
-        post_context = {
-            'post_text': '',  # Pas stocké dans la DB actuellement
-            'post_author': prospect_data.get('competitor_name', '')
-        }
+        # Préparer le contexte du post (contenu enregistré lors de la collecte)
+        from utils.database import get_post
+        post_context = build_post_context(get_post(post_url), prospect_data.get('competitor_name', ''))
         
         # Calculer le nouveau score avec IA
         scoring_result = calculate_prospect_score_with_ai(
@@ -690,12 +713,19 @@ def recalculate_prospect_scoring(client_id: int, reactor_urn: str, post_url: str
             'prospect_relevant': scoring_result.get('total_score', 0.0) >= 0.6,  # Seuil par défaut
             'relevance_score': scoring_result.get('total_score', 0.0),
             'relevance_reasoning': json.dumps(scoring_result, ensure_ascii=False),
-            'personalized_message': prospect_data.get('personalized_message', '')
+            'personalized_message': prospect_data.get('personalized_message', ''),
+            'persona_version': company_profile.get('persona_version')
         }
         
         from utils.database import save_reaction
         save_reaction(client_id, reaction_data)
         
+        # Score LLM conservé comme exemple d'entraînement du modèle local
+        if scoring_result.get('reasoning'):
+            from utils.local_classifier import record_llm_scores
+            record_llm_scores(client_id, [(prospect_for_scoring, scoring_result.get('total_score', 0.0))],
+                              company_profile.get('persona_version'))
+        
         logger.info(f"Scoring recalculé pour prospect {prospect_data.get('reactor_name', 'Unknown')}: {scoring_result.get('total_score', 0.0):.2f}")
         
         return scoring_result
@@ -724,13 +754,12 @@ def filter_competitors_from_reactions(reactions: List[Dict[str, Any]],
     
     logger.info(f"Analyse de {len(reactions)} réaction(s) pour détecter les concurrents...")
     
+    # Index construit une seule fois pour toutes les réactions
+    competitor_index = get_competitor_index(competitors_list)
+    
     for idx, reaction in enumerate(reactions, 1):
         # Vérifier si c'est un concurrent
-        is_competitor, matched_competitor = check_if_competitor(
-            reaction,
-            client_id,
-            competitors_list
-        )
+        is_competitor, matched_competitor = competitor_index.match(reaction)
         
         if is_competitor:
             filtered_count += 1
@@ -758,7 +787,7 @@ def analyze_prospect_match(prospect_data: Dict[str, Any], target_persona: Dict[s
         Dict avec analyse détaillée
     """
     headline = prospect_data.get('headline', '') or ''
-    prospect_company = extract_company_from_headline(headline)
+    prospect_company = get_parsed_headline(prospect_data).company
     
     matches = {
         'job_title_match': False,
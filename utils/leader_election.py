@@ -0,0 +1,114 @@
+"""
+Élection d'un leader entre processus par bail SQLite (table leader_leases)
+Le processus qui détient le bail le renouvelle par heartbeat ; s'il s'arrête, le bail expire
+et un autre candidat le reprend au heartbeat suivant
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Optional
+
+from utils.database import try_acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id() -> str:
+    """Identifiant unique d'un candidat : machine, processus et suffixe aléatoire"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    """
+    Candidat à un bail d'élection, renouvelé dans un thread de heartbeat
+
+    Un leader qui n'arrive pas à renouveler son bail (base verrouillée, bail repris) se retire
+    immédiatement : renew_seconds doit rester nettement inférieur à lease_seconds pour qu'il
+    se retire avant que le bail ne puisse être repris.
+
+    Exemple:
+        election = LeaderElection('scheduler', on_elected=scheduler.resume, on_revoked=scheduler.pause)
+        election.start()
+    """
+
+    def __init__(self, name: str, holder: Optional[str] = None, lease_seconds: float = 15,
+                 renew_seconds: float = 5, on_elected: Optional[Callable[[], None]] = None,
+                 on_revoked: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self._is_leader = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def tick(self) -> bool:
+        """Prend ou renouvelle le bail et notifie les changements de rôle ; retourne is_leader"""
+        try:
+            acquired = try_acquire_lease(self.name, self.holder, self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Bail '{self.name}' non renouvelé: {e}")
+            acquired = False
+
+        if acquired and not self._is_leader:
+            self._is_leader = True
+            logger.info(f"✓ {self.holder} élu leader '{self.name}'")
+            self._notify(self.on_elected)
+        elif not acquired and self._is_leader:
+            self._is_leader = False
+            logger.warning(f"{self.holder} n'est plus leader '{self.name}'")
+            self._notify(self.on_revoked)
+        return self._is_leader
+
+    def _notify(self, callback: Optional[Callable[[], None]]):
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erreur lors du changement de rôle '{self.name}': {e}", exc_info=True)
+
+    def _run(self):
+        while True:
+            self.tick()
+            if self._stop_event.wait(self.renew_seconds):
+                return
+
+    def start(self):
+        """Démarre le heartbeat (premier essai immédiat)"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, release: bool = True):
+        """
+        Arrête le heartbeat
+
+        Args:
+            release: Libère le bail pour qu'un autre candidat le reprenne sans attendre son expiration
+        """
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        if self._is_leader:
+            self._is_leader = False
+            self._notify(self.on_revoked)
+        if release:
+            try:
+                release_lease(self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"Bail '{self.name}' non libéré: {e}")
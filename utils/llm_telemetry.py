@@ -0,0 +1,290 @@
+"""
+Télémétrie des appels LLM (tokens, latence, coût)
+Chaque appel OpenAI passe par tracked_chat_completion, qui gère les nouvelles tentatives
+et enregistre modèle, tokens (prompt / completion / cache), latence, tentatives et résultat
+dans la table llm_calls, rattachés au client, au radar et à l'usage de l'appel
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+try:
+    from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+    RETRYABLE_ERRORS: Tuple[type, ...] = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+except ImportError:
+    RETRYABLE_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Tarifs en USD par million de tokens : (prompt, prompt en cache, completion)
+# Surchargeables via la clé "llm_pricing" de config.json
+MODEL_PRICING = {
+    'gpt-4o-mini': (0.15, 0.075, 0.60),
+    'gpt-4o': (2.50, 1.25, 10.00),
+    'gpt-4.1-nano': (0.10, 0.025, 0.40),
+    'gpt-4.1-mini': (0.40, 0.10, 1.60),
+    'gpt-4.1': (2.00, 0.50, 8.00),
+    'gpt-3.5-turbo': (0.50, 0.50, 1.50),
+}
+
+# Réduction appliquée par OpenAI aux requêtes de l'API Batch
+BATCH_DISCOUNT = 0.5
+
+# Nouvelles tentatives sur les erreurs transitoires (rate limit, réseau, erreur serveur)
+DEFAULT_MAX_RETRIES = 2
+RETRY_BASE_DELAY = 1.0
+
+# Étiquettes (client_id, radar_id) des appels LLM faits dans le contexte courant
+_llm_tags: ContextVar[Dict[str, Any]] = ContextVar('llm_tags', default={})
+
+
+@contextmanager
+def llm_context(**tags):
+    """
+    Rattache les appels LLM faits dans le bloc à un client / radar
+
+    Exemple:
+        with llm_context(client_id=1, radar_id=3):
+            process_radar_with_scoring(...)
+    """
+    token = _llm_tags.set({**_llm_tags.get(), **{key: value for key, value in tags.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _llm_tags.reset(token)
+
+
+@lru_cache(maxsize=1)
+def _configured_pricing() -> Dict[str, Tuple[float, float, float]]:
+    pricing = dict(MODEL_PRICING)
+    if CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                for model, prices in json.load(f).get('llm_pricing', {}).items():
+                    pricing[model] = (float(prices['input']), float(prices.get('cached_input', prices['input'])),
+                                      float(prices['output']))
+        except Exception as e:
+            logger.warning(f"Tarifs LLM de config.json ignorés: {e}")
+    return pricing
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float, float]]:
+    """Tarifs d'un modèle (préfixe le plus long pour les versions datées, ex: gpt-4o-mini-2024-07-18)"""
+    pricing = _configured_pricing()
+    if model in pricing:
+        return pricing[model]
+    matches = [name for name in pricing if model and model.startswith(name)]
+    return pricing[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int,
+                  cached_tokens: int = 0, batch: bool = False) -> float:
+    """
+    Coût estimé d'un appel en USD
+
+    Args:
+        model: Nom du modèle
+        prompt_tokens: Tokens du prompt (y compris ceux servis depuis le cache)
+        completion_tokens: Tokens générés
+        cached_tokens: Tokens du prompt servis depuis le cache
+        batch: Appel fait via l'API Batch (tarif réduit)
+
+    Returns:
+        Coût en USD (0.0 si le modèle n'a pas de tarif connu)
+    """
+    prices = model_pricing(model)
+    if not prices:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def usage_tokens(usage: Any) -> Tuple[int, int, int]:
+    """Extrait (prompt, completion, cache) d'un objet usage du SDK ou d'un dict (sortie de l'API Batch)"""
+    if usage is None:
+        return 0, 0, 0
+    if isinstance(usage, dict):
+        details = usage.get('prompt_tokens_details') or {}
+        return (usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0,
+                details.get('cached_tokens') or 0)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return (getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0,
+            getattr(details, 'cached_tokens', 0) or 0)
+
+
+def record_llm_call(purpose: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    cached_tokens: int = 0, latency_ms: Optional[float] = None, retries: int = 0,
+                    outcome: str = 'success', error: Optional[str] = None,
+                    client_id: Optional[int] = None, radar_id: Optional[int] = None,
+                    batch: bool = False, ttft_ms: Optional[float] = None):
+    """
+    Enregistre un appel LLM dans llm_calls (les étiquettes du contexte complètent client_id / radar_id)
+
+    Une erreur d'enregistrement est journalisée sans interrompre l'appelant.
+    """
+    from utils.database import save_llm_call
+    from utils.run_history import count_llm_call
+
+    tags = _llm_tags.get()
+    cost_usd = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens, batch)
+    count_llm_call(cost_usd)
+    try:
+        save_llm_call(
+            purpose=purpose,
+            model=model,
+            client_id=client_id if client_id is not None else tags.get('client_id'),
+            radar_id=radar_id if radar_id is not None else tags.get('radar_id'),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            latency_ms=latency_ms,
+            retries=retries,
+            outcome=outcome,
+            error=error,
+            cost_usd=cost_usd,
+            batch=batch,
+            ttft_ms=ttft_ms
+        )
+    except Exception as e:
+        logger.warning(f"Télémétrie LLM non enregistrée ({purpose}): {e}")
+
+
+def tracked_chat_completion(openai_client: Any, purpose: str, client_id: Optional[int] = None,
+                            radar_id: Optional[int] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                            **request):
+    """
+    Appelle chat.completions.create en enregistrant tokens, latence, tentatives et résultat
+
+    Args:
+        openai_client: Client OpenAI
+        purpose: Usage de l'appel ('scoring', 'message', 'post_relevance', ...)
+        client_id: ID du client (sinon celui du contexte llm_context)
+        radar_id: ID du radar (sinon celui du contexte llm_context)
+        max_retries: Nouvelles tentatives sur erreur transitoire
+        **request: Paramètres de la requête (model, messages, temperature, ...)
+
+    Returns:
+        Réponse du SDK OpenAI
+
+    Raises:
+        L'exception du dernier essai si l'appel échoue
+    """
+    model = request.get('model', '')
+    retries = 0
+    start = time.perf_counter()
+    while True:
+        try:
+            response = openai_client.chat.completions.create(**request)
+            break
+        except RETRYABLE_ERRORS as e:
+            if retries >= max_retries:
+                record_llm_call(purpose, model, latency_ms=(time.perf_counter() - start) * 1000,
+                                retries=retries, outcome='error', error=str(e)[:500],
+                                client_id=client_id, radar_id=radar_id)
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** retries)
+            retries += 1
+            logger.warning(f"Appel LLM ({purpose}) en erreur transitoire, nouvelle tentative dans {delay:.0f}s: {e}")
+            time.sleep(delay)
+        except Exception as e:
+            record_llm_call(purpose, model, latency_ms=(time.perf_counter() - start) * 1000,
+                            retries=retries, outcome='error', error=str(e)[:500],
+                            client_id=client_id, radar_id=radar_id)
+            raise
+
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(getattr(response, 'usage', None))
+    record_llm_call(
+        purpose,
+        getattr(response, 'model', None) or model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        latency_ms=(time.perf_counter() - start) * 1000,
+        retries=retries,
+        client_id=client_id,
+        radar_id=radar_id
+    )
+    return response
+
+
+def tracked_chat_completion_stream(openai_client: Any, purpose: str, client_id: Optional[int] = None,
+                                   radar_id: Optional[int] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                                   **request) -> Iterator[str]:
+    """
+    Variante en streaming de tracked_chat_completion : produit le texte au fil des tokens
+
+    L'appel est enregistré une fois le flux terminé, avec le délai avant le premier token.
+    Les nouvelles tentatives ne sont faites que tant qu'aucun token n'a été produit.
+
+    Args:
+        openai_client: Client OpenAI
+        purpose: Usage de l'appel
+        client_id: ID du client (sinon celui du contexte llm_context)
+        radar_id: ID du radar (sinon celui du contexte llm_context)
+        max_retries: Nouvelles tentatives sur erreur transitoire
+        **request: Paramètres de la requête (model, messages, temperature, ...)
+
+    Yields:
+        Fragments de texte de la réponse
+    """
+    model = request.get('model', '')
+    retries = 0
+    ttft_ms = None
+    usage = None
+    start = time.perf_counter()
+    while True:
+        try:
+            stream = openai_client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **request
+            )
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if getattr(chunk, 'model', None):
+                    model = chunk.model
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    yield text
+            break
+        except RETRYABLE_ERRORS as e:
+            if ttft_ms is not None or retries >= max_retries:
+                record_llm_call(purpose, model, latency_ms=(time.perf_counter() - start) * 1000,
+                                retries=retries, outcome='error', error=str(e)[:500],
+                                client_id=client_id, radar_id=radar_id, ttft_ms=ttft_ms)
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** retries)
+            retries += 1
+            logger.warning(f"Appel LLM ({purpose}) en erreur transitoire, nouvelle tentative dans {delay:.0f}s: {e}")
+            time.sleep(delay)
+        except Exception as e:
+            record_llm_call(purpose, model, latency_ms=(time.perf_counter() - start) * 1000,
+                            retries=retries, outcome='error', error=str(e)[:500],
+                            client_id=client_id, radar_id=radar_id, ttft_ms=ttft_ms)
+            raise
+
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(usage)
+    record_llm_call(
+        purpose,
+        model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        latency_ms=(time.perf_counter() - start) * 1000,
+        retries=retries,
+        client_id=client_id,
+        radar_id=radar_id,
+        ttft_ms=ttft_ms
+    )
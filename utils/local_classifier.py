@@ -0,0 +1,443 @@
+"""
+Classifieur local distillé des scores LLM
+Régression logistique par client (cibles = scores LLM entre 0 et 1) sur des caractéristiques
+hachées du headline ; le LLM n'est appelé que lorsque la prédiction est proche du seuil
+"""
+import zlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.headline_parser import get_parsed_headline
+from utils.semantic_scoring import text_features
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPE = 'logistic_regression'
+
+# Dimension de l'espace haché du modèle
+MODEL_FEATURES = 2 ** 16
+
+# Nombre minimum de scores LLM pour entraîner un modèle
+MIN_TRAINING_LABELS = 50
+
+# Nombre de nouveaux scores LLM qui déclenche un réentraînement automatique
+RETRAIN_NEW_LABELS = 200
+
+# Une prédiction à moins de CONFIDENCE_MARGIN du seuil est jugée incertaine (=> appel LLM)
+CONFIDENCE_MARGIN = 0.15
+
+# Taux d'accord minimum (sur les prédictions sûres du jeu de test) pour utiliser le modèle
+MIN_CONFIDENT_AGREEMENT = 0.9
+
+# Seuil de qualification utilisé pour le rapport d'évaluation
+EVALUATION_THRESHOLD = 0.6
+
+# Seuils auxquels la fiabilité du modèle est évaluée (pas des curseurs de seuil des radars)
+RELIABILITY_THRESHOLD_STEP = 0.05
+RELIABILITY_THRESHOLDS = [round(step * RELIABILITY_THRESHOLD_STEP, 2) for step in range(21)]
+
+# Paramètres d'entraînement
+EPOCHS = 300
+LEARNING_RATE = 0.05
+L2_PENALTY = 1e-4
+
+_models: Dict[int, "LocalScoringModel"] = {}
+_models_lock = threading.Lock()
+
+
+def prospect_features(prospect: Dict[str, Any]) -> List[int]:
+    """
+    Caractéristiques hachées d'un prospect (titre, headline, séniorité, type de réaction)
+
+    Args:
+        prospect: Réaction / prospect
+
+    Returns:
+        Indices des caractéristiques présentes (sans doublons)
+    """
+    parsed = get_parsed_headline(prospect)
+    features = [f"t|{feature}" for feature in text_features(parsed.title)]
+    features.extend(
+        f"h|{feature}" for feature in text_features(prospect.get('headline', '') or '')
+        if feature.startswith('w:') or feature.startswith('b:')
+    )
+    features.append(f"s|{parsed.seniority or 'none'}")
+    features.append(f"r|{(prospect.get('reaction_type', '') or '').upper()}")
+    return sorted({zlib.crc32(feature.encode('utf-8')) % MODEL_FEATURES for feature in features})
+
+
+class FeatureMatrix:
+    """Matrice creuse binaire normalisée (une ligne par prospect)"""
+
+    def __init__(self, prospects: List[Dict[str, Any]]):
+        rows = [prospect_features(prospect) for prospect in prospects]
+        lengths = np.array([len(row) for row in rows], dtype=np.int64)
+        self.n_rows = len(rows)
+        self.indices = np.fromiter((index for row in rows for index in row), dtype=np.int64,
+                                   count=int(lengths.sum()))
+        self.row_ids = np.repeat(np.arange(self.n_rows), lengths)
+        # Normalisation L2 de chaque ligne
+        self.values = 1.0 / np.sqrt(np.maximum(lengths, 1))[self.row_ids]
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """Produit X @ w"""
+        return np.bincount(self.row_ids, weights=self.values * weights[self.indices],
+                           minlength=self.n_rows)
+
+    def transpose_dot(self, residuals: np.ndarray) -> np.ndarray:
+        """Produit X.T @ r"""
+        return np.bincount(self.indices, weights=self.values * residuals[self.row_ids],
+                           minlength=MODEL_FEATURES)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def fit_logistic_regression(matrix: FeatureMatrix, targets: np.ndarray,
+                            epochs: int = EPOCHS) -> Tuple[np.ndarray, float]:
+    """
+    Entraîne une régression logistique sur des cibles continues (entropie croisée, optimiseur Adam)
+
+    Args:
+        matrix: Caractéristiques des prospects
+        targets: Scores LLM (0-1)
+        epochs: Nombre d'itérations
+
+    Returns:
+        Tuple (poids, biais)
+    """
+    weights = np.zeros(MODEL_FEATURES, dtype=np.float64)
+    mean_target = float(np.clip(targets.mean(), 1e-3, 1 - 1e-3)) if len(targets) else 0.5
+    bias = float(np.log(mean_target / (1 - mean_target)))
+
+    moment_w = np.zeros_like(weights)
+    velocity_w = np.zeros_like(weights)
+    moment_b = velocity_b = 0.0
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    n = max(matrix.n_rows, 1)
+
+    for step in range(1, epochs + 1):
+        residuals = _sigmoid(matrix.dot(weights) + bias) - targets
+        grad_w = matrix.transpose_dot(residuals) / n + L2_PENALTY * weights
+        grad_b = float(residuals.mean())
+
+        moment_w = beta1 * moment_w + (1 - beta1) * grad_w
+        velocity_w = beta2 * velocity_w + (1 - beta2) * grad_w ** 2
+        moment_b = beta1 * moment_b + (1 - beta1) * grad_b
+        velocity_b = beta2 * velocity_b + (1 - beta2) * grad_b ** 2
+
+        correction1 = 1 - beta1 ** step
+        correction2 = 1 - beta2 ** step
+        weights -= LEARNING_RATE * (moment_w / correction1) / (np.sqrt(velocity_w / correction2) + epsilon)
+        bias -= LEARNING_RATE * (moment_b / correction1) / (np.sqrt(velocity_b / correction2) + epsilon)
+
+    return weights, bias
+
+
+class LocalScoringModel:
+    """Modèle local chargé depuis la table scoring_models"""
+
+    def __init__(self, model_id: Optional[int], weights: np.ndarray, bias: float,
+                 metrics: Optional[Dict[str, Any]] = None, persona_version: Optional[int] = None):
+        self.model_id = model_id
+        self.weights = weights
+        self.bias = bias
+        self.metrics = metrics or {}
+        self.persona_version = persona_version
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "LocalScoringModel":
+        weights = np.frombuffer(record['weights'], dtype=np.float32).astype(np.float64)
+        return cls(record['id'], weights, float(record['bias']), record.get('metrics'),
+                   record.get('persona_version'))
+
+    def reliable_at(self, threshold: float) -> bool:
+        """
+        Le modèle est assez fiable pour remplacer le LLM sur ses prédictions sûres au seuil donné
+
+        Args:
+            threshold: Seuil de qualification appliqué (arrondi au seuil évalué le plus proche)
+        """
+        key = _threshold_key(threshold)
+        evaluation = (self.metrics.get('by_threshold') or {}).get(key)
+        agreement = evaluation.get('confident_agreement_rate') if evaluation else None
+        return agreement is not None and agreement >= MIN_CONFIDENT_AGREEMENT
+
+    def predict(self, prospects: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Prédit le score LLM de chaque prospect
+
+        Args:
+            prospects: Réactions / prospects
+
+        Returns:
+            Scores prédits (0-1)
+        """
+        if not prospects:
+            return np.zeros(0)
+        return _sigmoid(FeatureMatrix(prospects).dot(self.weights) + self.bias)
+
+
+def confident_mask(predictions: np.ndarray, threshold: float,
+                   margin: float = CONFIDENCE_MARGIN) -> np.ndarray:
+    """Prédictions assez loin du seuil pour se passer du LLM"""
+    return np.abs(predictions - threshold) >= margin
+
+
+def _is_holdout(reactor_urn: str) -> bool:
+    # Découpage déterministe : 20% des prospects servent à l'évaluation
+    return zlib.crc32(str(reactor_urn).encode('utf-8')) % 5 == 0
+
+
+def evaluate_predictions(predictions: np.ndarray, targets: np.ndarray,
+                         threshold: float = EVALUATION_THRESHOLD,
+                         margin: float = CONFIDENCE_MARGIN) -> Dict[str, Any]:
+    """
+    Rapport d'évaluation du modèle face aux scores LLM
+
+    Args:
+        predictions: Scores prédits
+        targets: Scores LLM
+        threshold: Seuil de qualification
+        margin: Marge de confiance
+
+    Returns:
+        Dict avec mae, agreement_rate, llm_calls_saved_rate, confident_agreement_rate
+    """
+    if len(targets) == 0:
+        return {'n_test': 0}
+    agreement = (predictions >= threshold) == (targets >= threshold)
+    confident = confident_mask(predictions, threshold, margin)
+    return {
+        'n_test': int(len(targets)),
+        'mae': round(float(np.abs(predictions - targets).mean()), 4),
+        'agreement_rate': round(float(agreement.mean()), 4),
+        'llm_calls_saved_rate': round(float(confident.mean()), 4),
+        'confident_agreement_rate': round(float(agreement[confident].mean()), 4) if confident.any() else None,
+        'threshold': threshold,
+        'margin': margin
+    }
+
+
+def _threshold_key(threshold: float) -> str:
+    # Seuil évalué le plus proche (clé des métriques par seuil)
+    return f"{round(float(threshold) / RELIABILITY_THRESHOLD_STEP) * RELIABILITY_THRESHOLD_STEP:.2f}"
+
+
+def evaluate_by_threshold(predictions: np.ndarray, targets: np.ndarray,
+                          margin: float = CONFIDENCE_MARGIN) -> Dict[str, Dict[str, Any]]:
+    """
+    Évalue le modèle à chacun des seuils de RELIABILITY_THRESHOLDS
+
+    Args:
+        predictions: Scores prédits
+        targets: Scores LLM
+        margin: Marge de confiance
+
+    Returns:
+        Dict seuil ("0.60") -> agreement_rate, llm_calls_saved_rate, confident_agreement_rate
+    """
+    by_threshold = {}
+    for threshold in RELIABILITY_THRESHOLDS:
+        evaluation = evaluate_predictions(predictions, targets, threshold, margin)
+        by_threshold[_threshold_key(threshold)] = {
+            key: evaluation.get(key)
+            for key in ('agreement_rate', 'llm_calls_saved_rate', 'confident_agreement_rate')
+        }
+    return by_threshold
+
+
+def train_client_model(client_id: int, min_labels: int = MIN_TRAINING_LABELS) -> Optional[Dict[str, Any]]:
+    """
+    Entraîne le modèle local d'un client sur ses scores LLM et l'enregistre en base
+
+    Seuls les scores obtenus avec la version actuelle du persona servent d'exemples. Le rapport
+    d'évaluation est calculé sur un jeu de test (20% des prospects), à chacun des seuils de
+    RELIABILITY_THRESHOLDS, puis le modèle enregistré est réentraîné sur l'ensemble des exemples.
+
+    Args:
+        client_id: ID du client
+        min_labels: Nombre minimum d'exemples
+
+    Returns:
+        Rapport (model_id, n_labels, métriques) ou None si pas assez d'exemples
+    """
+    from utils.database import get_scoring_labels, save_scoring_model, get_persona_version
+
+    persona_version = get_persona_version(client_id)
+    labels = get_scoring_labels(client_id, persona_version)
+    if len(labels) < min_labels:
+        logger.info(f"Client {client_id}: {len(labels)} score(s) LLM (persona v{persona_version}), "
+                    f"minimum {min_labels} pour entraîner un modèle")
+        return None
+
+    targets = np.clip(np.array([float(label['score']) for label in labels]), 0.0, 1.0)
+    holdout = np.array([_is_holdout(label['reactor_urn']) for label in labels])
+
+    metrics: Dict[str, Any] = {'n_train': int((~holdout).sum())}
+    if holdout.any() and (~holdout).any():
+        train_labels = [label for label, test in zip(labels, holdout) if not test]
+        test_labels = [label for label, test in zip(labels, holdout) if test]
+        weights, bias = fit_logistic_regression(FeatureMatrix(train_labels), targets[~holdout])
+        predictions = LocalScoringModel(None, weights, bias).predict(test_labels)
+        metrics.update(evaluate_predictions(predictions, targets[holdout]))
+        metrics['by_threshold'] = evaluate_by_threshold(predictions, targets[holdout])
+
+    weights, bias = fit_logistic_regression(FeatureMatrix(labels), targets)
+    model_id = save_scoring_model(
+        client_id,
+        MODEL_TYPE,
+        MODEL_FEATURES,
+        weights.astype(np.float32).tobytes(),
+        bias,
+        len(labels),
+        metrics,
+        persona_version
+    )
+    with _models_lock:
+        _models.pop(client_id, None)
+
+    logger.info(f"✓ Modèle local entraîné pour le client {client_id} ({len(labels)} exemple(s), persona v{persona_version}, "
+                f"accord {metrics.get('agreement_rate', 'N/A')}, appels LLM évités {metrics.get('llm_calls_saved_rate', 'N/A')})")
+    return {'model_id': model_id, 'n_labels': len(labels), 'persona_version': persona_version, **metrics}
+
+
+def get_local_model(client_id: int) -> Optional[LocalScoringModel]:
+    """
+    Retourne le modèle local actif d'un client (chargé une fois puis gardé en mémoire)
+
+    Args:
+        client_id: ID du client
+
+    Returns:
+        LocalScoringModel ou None si aucun modèle entraîné
+    """
+    from utils.database import get_active_scoring_model
+
+    record = get_active_scoring_model(client_id)
+    if not record:
+        return None
+    with _models_lock:
+        model = _models.get(client_id)
+        if model is None or model.model_id != record['id']:
+            model = LocalScoringModel.from_record(record)
+            _models[client_id] = model
+    return model
+
+
+def record_llm_scores(client_id: int, scored: List[Tuple[Dict[str, Any], float]],
+                      persona_version: Optional[int] = None) -> int:
+    """
+    Enregistre des scores LLM comme exemples d'entraînement
+
+    Args:
+        client_id: ID du client
+        scored: Liste de tuples (prospect, score LLM)
+        persona_version: Version du persona qui a produit les scores (défaut: version actuelle)
+
+    Returns:
+        Nombre d'exemples enregistrés
+    """
+    from utils.database import save_scoring_labels
+
+    return save_scoring_labels(client_id, [
+        {
+            'reactor_urn': prospect.get('reactor_urn'),
+            'headline': prospect.get('headline', ''),
+            'reaction_type': prospect.get('reaction_type', ''),
+            'score': score
+        }
+        for prospect, score in scored
+    ], persona_version)
+
+
+def maybe_retrain(client_id: int, new_labels_threshold: int = RETRAIN_NEW_LABELS) -> Optional[Dict[str, Any]]:
+    """
+    Réentraîne le modèle si assez de nouveaux scores LLM ont été enregistrés depuis le dernier entraînement
+
+    Un modèle entraîné sur une version précédente du persona (ou sans métriques par seuil) est
+    remplacé comme un premier modèle, dès que le minimum d'exemples de la version actuelle est atteint.
+
+    Args:
+        client_id: ID du client
+        new_labels_threshold: Nombre de nouveaux scores qui déclenche le réentraînement
+
+    Returns:
+        Rapport d'entraînement ou None si pas de réentraînement
+    """
+    from utils.database import get_active_scoring_model, count_scoring_labels_since, get_persona_version
+
+    persona_version = get_persona_version(client_id)
+    record = get_active_scoring_model(client_id)
+    if record and (record.get('persona_version') != persona_version
+                   or 'by_threshold' not in record['metrics']):
+        record = None
+    since = record['trained_at'] if record else None
+    new_labels = count_scoring_labels_since(client_id, since, persona_version)
+    if record is None:
+        # Premier modèle : dès que le minimum d'exemples est atteint
+        if new_labels < MIN_TRAINING_LABELS:
+            return None
+    elif new_labels < new_labels_threshold:
+        return None
+
+    logger.info(f"Réentraînement du modèle local du client {client_id} ({new_labels} nouveau(x) score(s) LLM)")
+    return train_client_model(client_id)
+
+
+def score_with_local_model(reactions: List[Dict[str, Any]], client_id: int,
+                           threshold: float,
+                           margin: float = CONFIDENCE_MARGIN,
+                           persona_version: Optional[int] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Score les réactions avec le modèle local quand il est sûr de lui
+
+    Le modèle n'est utilisé que s'il a été entraîné sur la version du persona des scores
+    et s'il est fiable au seuil de qualification appliqué.
+
+    Args:
+        reactions: Réactions à scorer
+        client_id: ID du client
+        threshold: Seuil de qualification du radar
+        margin: Marge de confiance autour du seuil
+        persona_version: Version du persona des scores (défaut: version actuelle)
+
+    Returns:
+        Liste (même ordre) de dicts de scoring, None pour les prospects à envoyer au LLM
+    """
+    model = get_local_model(client_id)
+    if model is None:
+        return [None] * len(reactions)
+
+    if persona_version is None:
+        from utils.database import get_persona_version
+        persona_version = get_persona_version(client_id)
+    if model.persona_version != persona_version:
+        logger.info(f"  → Modèle local entraîné sur le persona v{model.persona_version} "
+                    f"(v{persona_version} attendue), scoring IA sur tout le lot")
+        return [None] * len(reactions)
+    if not model.reliable_at(threshold):
+        logger.info(f"  → Modèle local pas assez fiable au seuil {threshold}, scoring IA sur tout le lot")
+        return [None] * len(reactions)
+
+    predictions = model.predict(reactions)
+    confident = confident_mask(predictions, threshold, margin)
+    results: List[Optional[Dict[str, Any]]] = []
+    for reaction, prediction, is_confident in zip(reactions, predictions, confident):
+        if not is_confident:
+            results.append(None)
+            continue
+        results.append({
+            'total_score': round(float(prediction), 3),
+            'scoring_method': 'local_model',
+            'model_id': model.model_id,
+            'details': {
+                'job_title': get_parsed_headline(reaction).title,
+                'reaction_type': reaction.get('reaction_type', '')
+            }
+        })
+    return results
@@ -0,0 +1,200 @@
+"""
+Génération de messages en masse pour les prospects qualifiés sans message
+Les appels IA passent par un pool de workers borné, dans un thread de fond : chaque message
+est enregistré dès qu'il est généré et la progression est suivie dans message_jobs, ce qui
+permet à la page Messages d'afficher l'avancement sans bloquer ses reruns
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.database import (
+    get_client_profile_as_dict, get_qualified_prospects_without_message, save_generated_message,
+    create_message_job, get_message_job, update_message_job, get_radar_message_template,
+    find_radar_by_identifier, get_posts_by_url
+)
+from utils.llm_telemetry import llm_context
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'appels IA simultanés
+DEFAULT_MAX_WORKERS = 6
+
+_running_jobs: Dict[int, threading.Thread] = {}
+_running_jobs_lock = threading.Lock()
+
+
+def _find_prospect_radar(client_id: int, prospect: Dict[str, Any]) -> Optional[int]:
+    """Radar d'un prospect : celui enregistré sur la réaction, sinon recherche par concurrent / mot-clé"""
+    if prospect.get('radar_id'):
+        return prospect['radar_id']
+    company_name = prospect.get('competitor_name') or ''
+    if not company_name:
+        return None
+    radar = (find_radar_by_identifier(client_id, company_name=company_name, keyword=None)
+             or find_radar_by_identifier(client_id, company_name=None, keyword=company_name))
+    return radar.get('id') if radar else None
+
+
+def _prospect_for_message(reaction: Dict[str, Any], post: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Données du prospect utilisées par generate_message_for_prospect (cf. page Messages)"""
+    return {
+        'reactor_name': reaction.get('reactor_name', ''),
+        'headline': reaction.get('headline', ''),
+        'headline_title': reaction.get('headline_title'),
+        'headline_company': reaction.get('headline_company'),
+        'headline_seniority': reaction.get('headline_seniority'),
+        'post_url': reaction.get('post_url', ''),
+        'company_name': reaction.get('competitor_name', ''),
+        'competitor_name': reaction.get('competitor_name', ''),
+        'reaction_type': reaction.get('reaction_type', ''),
+        'profile_url': reaction.get('profile_url', ''),
+        'reactor_urn': reaction.get('reactor_urn', ''),
+        'post_text': (post or {}).get('post_text') or ''
+    }
+
+
+def run_message_job(job_id: int, max_workers: int = DEFAULT_MAX_WORKERS) -> Optional[Dict[str, Any]]:
+    """
+    Génère les messages des prospects qualifiés qui n'en ont pas encore
+
+    Le préfixe du prompt (entreprise, style, template du radar) est calculé une seule fois
+    par radar ; seuls les champs du prospect changent d'un appel à l'autre.
+
+    Args:
+        job_id: ID du job
+        max_workers: Nombre d'appels IA simultanés
+
+    Returns:
+        État final du job ou None si le job est introuvable
+    """
+    from utils.ai_analyzer import generate_message_for_prospect, build_message_prompt_prefix
+
+    job = get_message_job(job_id)
+    if not job:
+        logger.error(f"Job de génération de messages {job_id} introuvable")
+        return None
+
+    client_id = job['client_id']
+    company_profile = get_client_profile_as_dict(client_id)
+    if not company_profile:
+        update_message_job(job_id, status='failed', error_message="Profil entreprise non trouvé")
+        logger.error(f"Profil entreprise non trouvé pour le client {client_id}")
+        return get_message_job(job_id)
+
+    # Relu au lancement : un prospect traité par un job précédent (ou édité entre-temps) est ignoré
+    prospects = get_qualified_prospects_without_message(client_id)
+    update_message_job(job_id, status='running', total=len(prospects),
+                       started_at=datetime.now().isoformat(), error_message=None)
+    logger.info(f"Génération de messages {job_id}: {len(prospects)} prospect(s) qualifié(s) sans message")
+
+    # Contenu des posts (table posts) lu en une requête
+    posts = get_posts_by_url([prospect.get('post_url') for prospect in prospects])
+
+    # Préfixe du prompt et template calculés une fois par radar
+    prompt_prefixes: Dict[Optional[int], Tuple[str, Optional[str]]] = {}
+    tasks = []
+    for prospect in prospects:
+        radar_id = _find_prospect_radar(client_id, prospect)
+        if radar_id not in prompt_prefixes:
+            radar_message_template = get_radar_message_template(radar_id) if radar_id else None
+            prompt_prefixes[radar_id] = (
+                build_message_prompt_prefix(company_profile, radar_message_template),
+                radar_message_template
+            )
+        tasks.append((prospect, radar_id) + prompt_prefixes[radar_id])
+
+    def generate_one(task) -> Tuple[Dict[str, Any], Optional[str]]:
+        prospect, radar_id, prompt_prefix, radar_message_template = task
+        with llm_context(client_id=client_id, radar_id=radar_id):
+            return prospect, generate_message_for_prospect(
+                client_id,
+                _prospect_for_message(prospect, posts.get(prospect.get('post_url'))),
+                company_profile,
+                radar_message_template=radar_message_template,
+                prompt_prefix=prompt_prefix
+            )
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks) or 1)),
+                                  thread_name_prefix=f"messages-{job_id}")
+    try:
+        futures = [executor.submit(generate_one, task) for task in tasks]
+        for future in as_completed(futures):
+            try:
+                prospect, message = future.result()
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération d'un message (job {job_id}): {e}")
+                save_generated_message(job_id, None, None)
+                continue
+            save_generated_message(job_id, prospect['id'], message)
+
+            # Annulation demandée depuis l'interface : les appels non démarrés sont abandonnés
+            if get_message_job(job_id)['status'] == 'cancelled':
+                executor.shutdown(wait=True, cancel_futures=True)
+                logger.info(f"Génération de messages {job_id} annulée")
+                return get_message_job(job_id)
+
+        update_message_job(job_id, status='completed', finished_at=datetime.now().isoformat())
+        state = get_message_job(job_id)
+        logger.info(f"✓ Génération de messages {job_id} terminée: {state['processed'] - state['errors']} message(s), "
+                    f"{state['errors']} erreur(s)")
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération de messages {job_id}: {e}", exc_info=True)
+        update_message_job(job_id, status='failed', error_message=str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return get_message_job(job_id)
+
+
+def start_message_generation(client_id: int, background: bool = True,
+                             max_workers: int = DEFAULT_MAX_WORKERS) -> int:
+    """
+    Crée un job de génération pour les prospects qualifiés sans message et l'exécute
+
+    Args:
+        client_id: ID du client
+        background: Exécuter dans un thread (la page suit la progression via message_jobs)
+        max_workers: Nombre d'appels IA simultanés
+
+    Returns:
+        ID du job
+    """
+    job_id = create_message_job(client_id, len(get_qualified_prospects_without_message(client_id)))
+    if not background:
+        run_message_job(job_id, max_workers)
+        return job_id
+    with _running_jobs_lock:
+        thread = threading.Thread(target=run_message_job, args=(job_id, max_workers),
+                                  name=f"message-job-{job_id}", daemon=True)
+        _running_jobs[job_id] = thread
+        thread.start()
+    return job_id
+
+
+def is_running_in_process(job_id: int) -> bool:
+    """Indique si le job tourne dans un thread de ce processus"""
+    with _running_jobs_lock:
+        thread = _running_jobs.get(job_id)
+        return thread is not None and thread.is_alive()
+
+
+def get_running_job_id(client_id: int) -> Optional[int]:
+    """ID du job de génération en cours pour ce client dans ce processus (None si aucun)"""
+    with _running_jobs_lock:
+        running = [job_id for job_id, thread in _running_jobs.items() if thread.is_alive()]
+    for job_id in running:
+        job = get_message_job(job_id)
+        if job and job['client_id'] == client_id:
+            return job_id
+    return None
+
+
+def cancel_message_job(job_id: int) -> bool:
+    """Demande l'arrêt d'un job (les messages déjà générés sont conservés)"""
+    job = get_message_job(job_id)
+    if not job or job['status'] not in ('pending', 'running'):
+        return False
+    return update_message_job(job_id, status='cancelled')
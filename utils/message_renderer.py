@@ -0,0 +1,275 @@
+"""
+Rendu hybride des messages : template du radar rempli localement, accroche générée par l'IA
+Les variables déterministes du template (prénom, entreprise détectée, auteur du post, notre entreprise)
+sont remplacées sans appel IA ; seule une courte phrase d'accroche (et le sujet du post) est demandée
+au modèle, puis mise en cache par (post, entreprise du prospect) dans message_hooks
+"""
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from utils.database import get_message_hook, save_message_hook
+from utils.headline_parser import get_parsed_headline
+from utils.llm_telemetry import tracked_chat_completion
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "message_rendering" de config.json)
+# mode 'hybrid' : template rempli localement + accroche IA ; 'llm' : message entièrement généré par l'IA
+DEFAULT_RENDERING_CONFIG = {
+    'mode': 'hybrid',
+    'hook_max_tokens': 80
+}
+
+HOOK_SYSTEM_PROMPT = "Tu es un expert en rédaction de messages outbound B2B. Réponds UNIQUEMENT avec du JSON valide."
+
+# Variables de template reconnues (insensibles à la casse)
+FIRST_NAME_VARIABLES = ('prospect', 'prénom', 'prenom', 'nom')
+POST_AUTHOR_VARIABLES = ('entreprise', 'auteur', 'concurrent')
+OUR_COMPANY_VARIABLES = ('notre entreprise',)
+PROSPECT_COMPANY_VARIABLES = ('entreprise du prospect', 'société', 'societe')
+TOPIC_VARIABLES = ('sujet',)
+HOOK_VARIABLES = ('accroche',)
+
+_VARIABLE_REGEX = re.compile(r'\[([^\[\]\n]{1,40})\]')
+_GREETING_REGEX = re.compile(r'^(bonjour|hello|salut|hi|hey|coucou)\b', re.IGNORECASE)
+
+# Un verrou par accroche : les workers de la génération en masse ne génèrent pas deux fois la même
+_hook_locks: Dict[Tuple[int, str, str], threading.Lock] = {}
+_hook_locks_lock = threading.Lock()
+
+
+def load_rendering_config() -> Dict[str, Any]:
+    """Configuration du rendu des messages (clé "message_rendering" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_RENDERING_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('message_rendering', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration message_rendering: {e}")
+    return config
+
+
+def company_key(company: Optional[str]) -> str:
+    """Normalise le nom d'entreprise utilisé comme clé de cache ('' si inconnue)"""
+    return ' '.join((company or '').lower().split())
+
+
+def template_variables(template: str) -> set:
+    """Variables [xxx] présentes dans un template (en minuscules)"""
+    return {match.strip().lower() for match in _VARIABLE_REGEX.findall(template or '')}
+
+
+def can_render_template(template: Optional[str]) -> bool:
+    """Indique si toutes les variables du template peuvent être remplies par le rendu hybride"""
+    if not template or not template.strip():
+        return False
+    known = set(FIRST_NAME_VARIABLES + POST_AUTHOR_VARIABLES + OUR_COMPANY_VARIABLES
+                + PROSPECT_COMPANY_VARIABLES + TOPIC_VARIABLES + HOOK_VARIABLES)
+    return template_variables(template) <= known
+
+
+def _first_name(full_name: str) -> str:
+    parts = (full_name or '').split()
+    return parts[0] if parts else ''
+
+
+def template_values(prospect_data: Dict[str, Any], company_profile: Dict[str, Any],
+                    hook: str = '', topic: str = '') -> Dict[str, str]:
+    """
+    Valeurs des variables du template pour un prospect
+
+    Args:
+        prospect_data: Données du prospect
+        company_profile: Profil de l'entreprise
+        hook: Accroche générée
+        topic: Sujet du post
+
+    Returns:
+        Dict variable (minuscules) -> valeur
+    """
+    values = {}
+    post_author = prospect_data.get('company_name', '') or prospect_data.get('competitor_name', '') or ''
+    prospect_company = get_parsed_headline(prospect_data).company or ''
+    for name in FIRST_NAME_VARIABLES:
+        values[name] = _first_name(prospect_data.get('reactor_name', ''))
+    for name in POST_AUTHOR_VARIABLES:
+        values[name] = post_author
+    for name in OUR_COMPANY_VARIABLES:
+        values[name] = company_profile.get('company_name', '')
+    for name in PROSPECT_COMPANY_VARIABLES:
+        values[name] = prospect_company
+    for name in TOPIC_VARIABLES:
+        values[name] = topic
+    for name in HOOK_VARIABLES:
+        values[name] = hook
+    return values
+
+
+def render_template(template: str, values: Dict[str, str], hook: str) -> str:
+    """
+    Remplit le template et place l'accroche
+
+    L'accroche remplace [accroche] si présent, sinon elle est insérée après la ligne de salutation
+    (ou en tête du message s'il n'y en a pas).
+
+    Args:
+        template: Message template du radar
+        values: Valeurs des variables (voir template_values)
+        hook: Accroche générée
+
+    Returns:
+        Message final
+    """
+    has_hook_variable = bool(template_variables(template) & set(HOOK_VARIABLES))
+    message = _VARIABLE_REGEX.sub(
+        lambda match: values.get(match.group(1).strip().lower(), match.group(0)), template
+    ).strip()
+    # Espaces laissés par une variable vide
+    message = re.sub(r'[ \t]{2,}', ' ', message)
+    message = re.sub(r' ([,.])', r'\1', message)
+
+    if has_hook_variable or not hook:
+        return message
+
+    lines = message.split('\n')
+    if _GREETING_REGEX.match(lines[0].strip()) and len(lines[0]) <= 40:
+        return '\n'.join([lines[0], hook] + lines[1:])
+    return f"{hook}\n\n{message}"
+
+
+def build_hook_prompt(prospect_data: Dict[str, Any], company_profile: Dict[str, Any],
+                      radar_message_template: str) -> str:
+    """Prompt de l'accroche : ne dépend que du post et de l'entreprise du prospect (clé du cache)"""
+    outreach_strategy = company_profile.get('outreach_strategy', {})
+    post_author = prospect_data.get('company_name', '') or prospect_data.get('competitor_name', '')
+    prospect_company = get_parsed_headline(prospect_data).company or 'inconnue'
+    post_text = (prospect_data.get('post_text') or '')[:800]
+
+    return f"""Notre entreprise: {company_profile.get('company_name', '')}
+- Ce qu'on offre: {outreach_strategy.get('what_offers', '')}
+- Proposition de valeur: {outreach_strategy.get('value_proposition', '')}
+
+Post LinkedIn auquel le prospect a réagi:
+- Auteur: {post_author}
+- URL: {prospect_data.get('post_url', '')}
+- Texte: {post_text if post_text else 'non disponible'}
+
+Entreprise du prospect: {prospect_company}
+
+Message dans lequel l'accroche sera insérée (les [variables] sont remplies automatiquement):
+{radar_message_template}
+
+Écris une accroche d'une seule phrase (25 mots maximum), naturelle, qui fait le lien entre ce post
+et l'entreprise du prospect, dans le même registre (tu/vous) que le message. N'inclus ni salutation ni prénom.
+Donne aussi le sujet du post en quelques mots (pour la variable [sujet]).
+
+Réponds en JSON: {{"accroche": "...", "sujet": "..."}}"""
+
+
+def parse_hook_response(content: str) -> Tuple[str, str]:
+    """Extrait (accroche, sujet) de la réponse du modèle (le texte brut sert d'accroche si ce n'est pas du JSON)"""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    try:
+        result = json.loads(content)
+        return str(result.get('accroche', '')).strip(), str(result.get('sujet', '')).strip()
+    except (json.JSONDecodeError, AttributeError):
+        return content.strip('"').strip(), ''
+
+
+def get_or_create_hook(client_id: int, prospect_data: Dict[str, Any], company_profile: Dict[str, Any],
+                       radar_message_template: str) -> Optional[Dict[str, str]]:
+    """
+    Accroche d'un prospect, depuis le cache (post, entreprise) ou générée par l'IA
+
+    Args:
+        client_id: ID du client
+        prospect_data: Données du prospect
+        company_profile: Profil de l'entreprise
+        radar_message_template: Message template du radar
+
+    Returns:
+        {'hook': ..., 'topic': ...} ou None si l'IA n'est pas disponible ou a échoué
+    """
+    from utils import ai_analyzer
+
+    post_url = prospect_data.get('post_url', '') or ''
+    key = company_key(get_parsed_headline(prospect_data).company)
+    persona_version = company_profile.get('persona_version')
+
+    with _hook_locks_lock:
+        lock = _hook_locks.setdefault((client_id, post_url, key), threading.Lock())
+
+    with lock:
+        cached = get_message_hook(client_id, post_url, key, persona_version) if post_url else None
+        if cached:
+            return {'hook': cached['hook'], 'topic': cached.get('topic') or ''}
+
+        if not ai_analyzer.OPENAI_ENABLED or not ai_analyzer.openai_client:
+            return None
+
+        try:
+            response = tracked_chat_completion(
+                ai_analyzer.openai_client,
+                'message_hook',
+                client_id=client_id,
+                model=ai_analyzer.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": HOOK_SYSTEM_PROMPT},
+                    {"role": "user", "content": build_hook_prompt(prospect_data, company_profile,
+                                                                  radar_message_template)}
+                ],
+                temperature=0.7,
+                max_tokens=load_rendering_config()['hook_max_tokens']
+            )
+            hook, topic = parse_hook_response(response.choices[0].message.content or '')
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de l'accroche ({post_url}): {e}")
+            return None
+
+        if not hook:
+            return None
+        if post_url:
+            save_message_hook(client_id, post_url, key, hook, topic, persona_version)
+        return {'hook': hook, 'topic': topic}
+
+
+def render_hybrid_message(client_id: int, prospect_data: Dict[str, Any], company_profile: Dict[str, Any],
+                          radar_message_template: Optional[str]) -> Optional[str]:
+    """
+    Rend le message d'un prospect à partir du template du radar et d'une accroche IA
+
+    Args:
+        client_id: ID du client
+        prospect_data: Données du prospect
+        company_profile: Profil de l'entreprise
+        radar_message_template: Message template du radar
+
+    Returns:
+        Message final, ou None si le rendu hybride ne s'applique pas (mode 'llm', pas de template,
+        variable inconnue, accroche indisponible) : l'appelant génère alors le message complet
+    """
+    if load_rendering_config()['mode'] != 'hybrid' or not can_render_template(radar_message_template):
+        return None
+
+    hook = get_or_create_hook(client_id, prospect_data, company_profile, radar_message_template)
+    if not hook or (not hook['topic'] and template_variables(radar_message_template) & set(TOPIC_VARIABLES)):
+        return None
+
+    values = template_values(prospect_data, company_profile, hook['hook'], hook['topic'])
+    message = render_template(radar_message_template, values, hook['hook'])
+    logger.info(f"Message rendu depuis le template pour {prospect_data.get('reactor_name', '')}: {message[:50]}...")
+    return message
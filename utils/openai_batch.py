@@ -0,0 +1,460 @@
+"""
+Scoring différé via l'API Batch d'OpenAI (runs planifiés des radars)
+Les réactions sont enregistrées en 'pending_score', les requêtes de scoring sont écrites
+dans un fichier JSONL soumis à l'API Batch, puis les résultats sont intégrés lorsqu'un
+tick ultérieur du scheduler constate que le lot est terminé
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+
+from utils.llm_telemetry import record_llm_call, usage_tokens
+from utils.database import (
+    get_all_clients, get_client_profile_as_dict, get_radar, save_pending_reactions, get_pending_reactions,
+    create_llm_batch, get_llm_batches, update_llm_batch, unqualify_reactions, save_reaction_enrichment
+)
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clés "batch_*" de la section "openai" de config.json)
+DEFAULT_BATCH_CONFIG = {
+    'batch_base_url': "https://api.openai.com/v1",
+    'batch_completion_window': "24h",
+    'batch_poll_minutes': 10,
+    'batch_max_requests': 50000
+}
+
+# Endpoint appelé pour chaque ligne du fichier JSONL
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Statuts d'un lot après lesquels plus aucun résultat n'arrivera
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+REQUEST_TIMEOUT = 60
+
+
+def load_batch_config() -> Dict[str, Any]:
+    """Charge la configuration OpenAI (clé API, modèle, paramètres de l'API Batch)"""
+    config = dict(DEFAULT_BATCH_CONFIG)
+    if CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('openai', {}))
+        except Exception as e:
+            logger.warning(f"Erreur lors du chargement de la config OpenAI: {e}")
+    return config
+
+
+def _headers(config: Dict[str, Any]) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {config.get('api_key', '')}"}
+
+
+def _custom_id(reaction_id: int) -> str:
+    return f"reaction-{reaction_id}"
+
+
+def _reaction_id(custom_id: str) -> Optional[int]:
+    try:
+        return int(custom_id.rsplit('-', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def build_batch_file(reactions: List[Dict[str, Any]], company_profile: Dict[str, Any],
+                     config: Dict[str, Any]) -> bytes:
+    """
+    Écrit les requêtes de scoring au format JSONL de l'API Batch (une ligne par réaction)
+
+    Args:
+        reactions: Réactions en attente (lignes de la table reactions)
+        company_profile: Profil entreprise du client
+        config: Configuration OpenAI
+
+    Returns:
+        Contenu du fichier JSONL
+    """
+    from utils.intelligent_scoring import build_scoring_messages, build_post_context
+    from utils.bulk_rescoring import _prospect_for_scoring
+    from utils.database import get_posts_by_url
+
+    posts = get_posts_by_url([reaction.get('post_url') for reaction in reactions])
+    lines = []
+    for reaction in reactions:
+        post_context = build_post_context(posts.get(reaction.get('post_url')), reaction.get('competitor_name', ''))
+        lines.append(json.dumps({
+            "custom_id": _custom_id(reaction['id']),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": config.get('model', 'gpt-4o-mini'),
+                "messages": build_scoring_messages(_prospect_for_scoring(reaction), company_profile, post_context),
+                "temperature": config.get('temperature', 0.3),
+                "max_tokens": config.get('max_tokens', 1000)
+            }
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def _pending_groups_by_radar(reactions: List[Dict[str, Any]]) -> Dict[Optional[int], List[Dict[str, Any]]]:
+    """Regroupe les réactions en attente par radar d'origine"""
+    groups: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for reaction in reactions:
+        groups.setdefault(reaction.get('radar_id'), []).append(reaction)
+    return groups
+
+
+def _radar_score_threshold(radar_id: Optional[int]) -> float:
+    """Seuil de qualification d'un radar (0.6 pour les réactions sans radar ou d'un radar supprimé)"""
+    radar = get_radar(radar_id) if radar_id is not None else None
+    return radar.get('min_score_threshold', 0.6) if radar else 0.6
+
+
+def submit_pending_batch(client_id: int, radar_id: Optional[int] = None,
+                         score_threshold: Optional[float] = None,
+                         company_profile: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Soumet à l'API Batch les réactions en attente du client qui ne sont rattachées à aucun lot
+
+    Les réactions sont soumises par radar d'origine : chaque lot est rattaché à son radar
+    et à son seuil de qualification, appliqué à l'intégration des résultats.
+
+    Args:
+        client_id: ID du client
+        radar_id: Uniquement les réactions de ce radar (défaut: tous les radars du client)
+        score_threshold: Seuil de qualification des réactions de radar_id (ignoré sans radar_id :
+            seuil du radar de chaque groupe)
+        company_profile: Profil entreprise (chargé si non fourni)
+
+    Returns:
+        IDs des lots créés (liste vide si rien à soumettre ou en cas d'erreur)
+    """
+    config = load_batch_config()
+    if not config.get('enabled') or not config.get('api_key'):
+        logger.warning("OpenAI non configuré: lot de scoring non soumis")
+        return []
+
+    reactions = get_pending_reactions(client_id, unsubmitted_only=True, radar_id=radar_id)
+    if not reactions:
+        return []
+
+    company_profile = company_profile or get_client_profile_as_dict(client_id)
+    if not company_profile:
+        logger.error(f"Profil entreprise non trouvé pour le client {client_id}")
+        return []
+
+    batch_ids = []
+    for group_radar_id, group in _pending_groups_by_radar(reactions).items():
+        if radar_id is not None and score_threshold is not None:
+            threshold = score_threshold
+        else:
+            threshold = _radar_score_threshold(group_radar_id)
+        batch_ids.extend(_submit_reactions(client_id, group_radar_id, group, threshold, company_profile, config))
+    return batch_ids
+
+
+def _submit_reactions(client_id: int, radar_id: Optional[int], reactions: List[Dict[str, Any]],
+                      score_threshold: float, company_profile: Dict[str, Any],
+                      config: Dict[str, Any]) -> List[str]:
+    """Soumet les réactions en attente d'un radar, en lots d'au plus batch_max_requests requêtes"""
+    base_url = config['batch_base_url'].rstrip('/')
+    max_requests = int(config.get('batch_max_requests') or DEFAULT_BATCH_CONFIG['batch_max_requests'])
+    batch_ids = []
+    for start in range(0, len(reactions), max_requests):
+        chunk = reactions[start:start + max_requests]
+        try:
+            upload = requests.post(
+                f"{base_url}/files",
+                headers=_headers(config),
+                data={"purpose": "batch"},
+                files={"file": (f"scoring_client_{client_id}.jsonl", build_batch_file(chunk, company_profile, config))},
+                timeout=REQUEST_TIMEOUT
+            )
+            upload.raise_for_status()
+            input_file_id = upload.json()['id']
+
+            response = requests.post(
+                f"{base_url}/batches",
+                headers=_headers(config),
+                json={
+                    "input_file_id": input_file_id,
+                    "endpoint": BATCH_ENDPOINT,
+                    "completion_window": config.get('batch_completion_window', '24h'),
+                    "metadata": {"client_id": str(client_id), "radar_id": str(radar_id or '')}
+                },
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            batch = response.json()
+        except (requests.RequestException, KeyError, ValueError) as e:
+            # Les réactions restent en attente et seront resoumises au prochain tick
+            logger.error(f"Erreur lors de la soumission du lot de scoring (client {client_id}): {e}")
+            break
+
+        create_llm_batch(
+            batch['id'], client_id, radar_id, [reaction['id'] for reaction in chunk],
+            input_file_id, batch.get('status', 'validating'), score_threshold,
+            company_profile.get('persona_version')
+        )
+        batch_ids.append(batch['id'])
+        logger.info(f"✓ Lot {batch['id']} soumis: {len(chunk)} prospect(s) à scorer (client {client_id}, "
+                    f"radar {radar_id}, seuil {score_threshold})")
+
+    return batch_ids
+
+
+def defer_reactions_to_batch(client_id: int, radar_id: Optional[int], reactions: List[Dict[str, Any]],
+                             company_profile: Dict[str, Any], score_threshold: float = 0.6) -> int:
+    """
+    Enregistre les réactions en 'pending_score' et soumet leur scoring à l'API Batch
+
+    Seules les réactions en attente de ce radar sont soumises ; celles des autres radars le sont
+    au prochain tick de poll_llm_batches, avec le seuil de leur radar.
+
+    Args:
+        client_id: ID du client
+        radar_id: ID du radar
+        reactions: Nouvelles réactions (déjà dédupliquées et filtrées)
+        company_profile: Profil entreprise du client
+        score_threshold: Seuil de qualification du radar
+
+    Returns:
+        Nombre de réactions mises en attente
+    """
+    pending_count = save_pending_reactions(client_id, reactions, company_profile.get('persona_version'), radar_id)
+    submit_pending_batch(client_id, radar_id, score_threshold, company_profile)
+    return pending_count
+
+
+def _download_results(config: Dict[str, Any], file_id: Optional[str]) -> Dict[int, Dict[str, Any]]:
+    """Télécharge un fichier de sortie (ou d'erreurs) d'un lot, indexé par ID de réaction"""
+    if not file_id:
+        return {}
+    response = requests.get(
+        f"{config['batch_base_url'].rstrip('/')}/files/{file_id}/content",
+        headers=_headers(config),
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+
+    results = {}
+    for line in response.text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        reaction_id = _reaction_id(entry.get('custom_id'))
+        if reaction_id is not None:
+            results[reaction_id] = entry
+    return results
+
+
+def _response_content(entry: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Contenu de la réponse du modèle pour une ligne de sortie (None si la requête a échoué)"""
+    if not entry or entry.get('error'):
+        return None
+    response = entry.get('response') or {}
+    if response.get('status_code') != 200:
+        return None
+    try:
+        return response['body']['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _record_usage(batch: Dict[str, Any], entry: Optional[Dict[str, Any]], config: Dict[str, Any]):
+    """Enregistre la télémétrie d'une requête du lot (tarif API Batch)"""
+    if not entry:
+        return
+    body = (entry.get('response') or {}).get('body') or {}
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(body.get('usage'))
+    record_llm_call(
+        'scoring_batch',
+        body.get('model') or config.get('model', 'gpt-4o-mini'),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        outcome='success' if _response_content(entry) is not None else 'error',
+        error=json.dumps(entry['error'], ensure_ascii=False)[:500] if entry.get('error') else None,
+        client_id=batch['client_id'],
+        radar_id=batch.get('radar_id'),
+        batch=True
+    )
+
+
+def finalize_qualified_reactions(batch: Dict[str, Any], reactions: List[Dict[str, Any]],
+                                 results: List[Optional[Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Applique aux prospects qualifiés d'un lot les étapes qui suivent le scoring d'une exécution
+    synchrone du radar (voir process_radar_with_scoring) : limite de prospects qualifiés du
+    radar (meilleurs scores), puis enrichissement du profil et de l'entreprise
+
+    Les prospects qualifiés au-delà de la limite restent enregistrés, non qualifiés.
+
+    Args:
+        batch: Lot en base (radar_id, score_threshold)
+        reactions: Réactions du lot (lignes de la table reactions)
+        results: Résultats de scoring (même ordre)
+
+    Returns:
+        Dict avec qualified, over_limit, enriched, companies
+    """
+    from utils.radar_manager import _enrich_profile, _enrich_company
+
+    stats = {'qualified': 0, 'over_limit': 0, 'enriched': 0, 'companies': 0}
+    qualified = [
+        (reaction, result) for reaction, result in zip(reactions, results)
+        if result and result.get('total_score', 0.0) >= batch['score_threshold']
+    ]
+    if not qualified:
+        return stats
+
+    radar = get_radar(batch['radar_id']) if batch.get('radar_id') is not None else None
+    max_qualified = radar.get('max_extractions') if radar else None
+    if max_qualified and len(qualified) > max_qualified:
+        qualified.sort(key=lambda item: item[1].get('total_score', 0.0), reverse=True)
+        stats['over_limit'] = unqualify_reactions([reaction['id'] for reaction, _ in qualified[max_qualified:]])
+        qualified = qualified[:max_qualified]
+        logger.info(f"  → Limite du radar: {max_qualified} prospect(s) qualifié(s) retenu(s), "
+                    f"{stats['over_limit']} retiré(s)")
+    stats['qualified'] = len(qualified)
+
+    for reaction, _ in qualified:
+        prospect = dict(reaction)
+        try:
+            if _enrich_profile(prospect):
+                stats['enriched'] += 1
+                if _enrich_company(prospect):
+                    stats['companies'] += 1
+                save_reaction_enrichment(reaction['id'], prospect.get('profile_url', ''),
+                                         prospect.get('enriched_profile'), prospect.get('enriched_company'))
+        except Exception as e:
+            # Continuer même en cas d'erreur d'enrichissement
+            logger.error(f"Erreur lors de l'enrichissement de {reaction.get('reactor_name', 'Unknown')}: {e}")
+    return stats
+
+
+def ingest_batch(batch: Dict[str, Any], remote: Dict[str, Any],
+                 config: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """
+    Intègre les résultats d'un lot terminé dans les réactions en attente
+
+    Les réponses invalides ou manquantes (requête en erreur, lot expiré) sont scorées
+    par règles, comme pour le scoring synchrone. Les prospects qualifiés passent ensuite par
+    la limite et l'enrichissement du radar (voir finalize_qualified_reactions).
+
+    Args:
+        batch: Lot en base (table llm_batches)
+        remote: État du lot renvoyé par l'API Batch
+        config: Configuration OpenAI (chargée si non fournie)
+
+    Returns:
+        Tuple (réactions scorées par l'IA, réactions scorées par règles)
+    """
+    from utils.intelligent_scoring import parse_scoring_response, calculate_prospect_score
+    from utils.bulk_rescoring import _prospect_for_scoring, write_scores
+
+    config = config or load_batch_config()
+    client_id = batch['client_id']
+    output_file_id = remote.get('output_file_id')
+    error_file_id = remote.get('error_file_id')
+    entries = _download_results(config, output_file_id)
+
+    reactions = get_pending_reactions(client_id, llm_batch_id=batch['batch_id'])
+    company_profile = get_client_profile_as_dict(client_id)
+    results = []
+    llm_scores = []
+    fallback_count = 0
+    for reaction in reactions:
+        prospect = _prospect_for_scoring(reaction)
+        entry = entries.get(reaction['id'])
+        _record_usage(batch, entry, config)
+        content = _response_content(entry)
+        result = None
+        if content is not None:
+            try:
+                result = parse_scoring_response(content, prospect)
+                llm_scores.append((prospect, result['total_score']))
+            except (ValueError, TypeError) as e:
+                logger.error(f"Réponse invalide du lot {batch['batch_id']} pour {reaction.get('reactor_name', 'Unknown')}: {e}")
+        if result is None and company_profile:
+            result = calculate_prospect_score(prospect, company_profile)
+            fallback_count += 1
+        results.append(result)
+
+    if reactions:
+        write_scores(None, reactions, results, batch['score_threshold'], batch.get('persona_version'))
+        finalized = finalize_qualified_reactions(batch, reactions, results)
+        logger.info(f"  → {finalized['qualified']} prospect(s) qualifié(s), {finalized['enriched']} profil(s) "
+                    f"et {finalized['companies']} entreprise(s) enrichi(s)")
+
+    if llm_scores:
+        try:
+            from utils.local_classifier import record_llm_scores, maybe_retrain
+            record_llm_scores(client_id, llm_scores, batch.get('persona_version'))
+            maybe_retrain(client_id)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement des scores pour le modèle local: {e}")
+
+    update_llm_batch(
+        batch['batch_id'],
+        status=remote.get('status', batch['status']),
+        output_file_id=output_file_id,
+        error_file_id=error_file_id,
+        ingested_at=datetime.now().isoformat()
+    )
+    logger.info(f"✓ Lot {batch['batch_id']} intégré: {len(llm_scores)} score(s) IA, {fallback_count} score(s) par règles")
+    return len(llm_scores), fallback_count
+
+
+def poll_llm_batches() -> Dict[str, int]:
+    """
+    Vérifie l'état des lots en cours, intègre ceux qui sont terminés et resoumet
+    les réactions en attente dont la soumission avait échoué (exécuté par le scheduler)
+
+    Returns:
+        Dict avec le nombre de lots vérifiés, intégrés et soumis
+    """
+    summary = {'checked': 0, 'ingested': 0, 'submitted': 0}
+    config = load_batch_config()
+    if not config.get('enabled') or not config.get('api_key'):
+        return summary
+
+    base_url = config['batch_base_url'].rstrip('/')
+    for batch in get_llm_batches(open_only=True, limit=1000):
+        summary['checked'] += 1
+        try:
+            response = requests.get(f"{base_url}/batches/{batch['batch_id']}",
+                                    headers=_headers(config), timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            remote = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Erreur lors de la vérification du lot {batch['batch_id']}: {e}")
+            continue
+
+        status = remote.get('status', batch['status'])
+        if status not in TERMINAL_STATUSES:
+            if status != batch['status']:
+                update_llm_batch(batch['batch_id'], status=status)
+            continue
+        try:
+            ingest_batch(batch, remote, config)
+            summary['ingested'] += 1
+        except Exception as e:
+            logger.error(f"Erreur lors de l'intégration du lot {batch['batch_id']}: {e}", exc_info=True)
+            update_llm_batch(batch['batch_id'], status=status, error_message=str(e))
+
+    for client in get_all_clients():
+        summary['submitted'] += len(submit_pending_batch(client['id']))
+
+    if summary['checked'] or summary['submitted']:
+        logger.info(f"Lots OpenAI: {summary['checked']} vérifié(s), {summary['ingested']} intégré(s), "
+                    f"{summary['submitted']} soumis")
+    return summary
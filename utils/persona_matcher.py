@@ -0,0 +1,274 @@
+"""
+Matcher de persona compilé pour le scoring par règles
+Pré-calcule une fois par profil client les index (mots, titres exacts), les regex combinées
+et les matchers de similarité utilisés par calculate_prospect_score
+"""
+import re
+import logging
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Indicateurs de taille d'entreprise (cf. calculate_company_match_score)
+SIZE_INDICATORS = {
+    'startup': ['startup', 'scale-up', 'scaleup'],
+    'pme': ['pme', 'pmi', 'sme'],
+    'grande entreprise': ['group', 'groupement', 'corporation', 'corp']
+}
+
+# Nombre de matchers compilés gardés en mémoire (un par version de persona)
+MAX_CACHED_MATCHERS = 32
+
+# Taille des memos par matcher (headlines, entreprises, localisations)
+MEMO_SIZE = 50000
+
+# Séparateur utilisé pour concaténer les titres cibles (absent des headlines LinkedIn)
+_JOIN_SEPARATOR = '\x00'
+
+_matchers: "OrderedDict[Tuple, PersonaMatcher]" = OrderedDict()
+_matchers_lock = threading.Lock()
+
+
+def _compile_any_substring(keywords: List[str]) -> Optional[re.Pattern]:
+    """
+    Compile une regex unique qui matche si l'un des mots-clés apparaît dans le texte
+
+    Équivalent de `any(keyword in text for keyword in keywords)` en un seul passage.
+    """
+    if not keywords:
+        return None
+    # Les plus longs d'abord : n'influence pas le résultat booléen mais limite les retours arrière
+    alternatives = sorted({re.escape(keyword) for keyword in keywords}, key=len, reverse=True)
+    return re.compile('|'.join(alternatives))
+
+
+class _FuzzyTarget:
+    """Cible de similarité pré-analysée (équivalent rapide de similarity_score(x, cible) > seuil)"""
+
+    def __init__(self, target_lower: str):
+        self.raw = target_lower
+        self.stripped = target_lower.strip()
+        self.length = len(self.stripped)
+        self._local = threading.local()
+
+    def _matcher(self) -> SequenceMatcher:
+        # SequenceMatcher n'est pas thread-safe : un matcher (et son index de seq2) par thread
+        matcher = getattr(self._local, 'matcher', None)
+        if matcher is None:
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(self.stripped)
+            self._local.matcher = matcher
+        return matcher
+
+    def ratio_above(self, value_stripped: str, threshold: float) -> bool:
+        """
+        Indique si le ratio SequenceMatcher dépasse le seuil
+
+        Les bornes supérieures (longueurs, real_quick_ratio, quick_ratio) évitent le calcul
+        complet du ratio quand il ne peut pas dépasser le seuil : le résultat est identique.
+        """
+        if not self.raw:
+            return False
+        total_length = len(value_stripped) + self.length
+        if total_length == 0:
+            return 1.0 > threshold
+        if 2.0 * min(len(value_stripped), self.length) / total_length <= threshold:
+            return False
+        matcher = self._matcher()
+        matcher.set_seq1(value_stripped)
+        return (
+            matcher.real_quick_ratio() > threshold and
+            matcher.quick_ratio() > threshold and
+            matcher.ratio() > threshold
+        )
+
+
+class PersonaMatcher:
+    """
+    Persona cible compilé : mêmes scores que calculate_job_title_score,
+    calculate_company_match_score et calculate_location_score, sans re-découper
+    ni re-normaliser les critères du persona à chaque prospect
+    """
+
+    def __init__(self, target_persona: Dict[str, Any]):
+        target_persona = target_persona or {}
+
+        # Titres de poste cibles (ordre conservé : le premier titre qui matche l'emporte)
+        self.job_titles = [title.lower() for title in target_persona.get('job_titles', []) or []]
+        self._exact_index: Dict[str, int] = {}
+        self._token_index: Dict[str, List[int]] = {}
+        for idx, title in enumerate(self.job_titles):
+            self._exact_index.setdefault(title, idx)
+            for word in set(title.split()):
+                self._token_index.setdefault(word, []).append(idx)
+        self._titles_regex = _compile_any_substring(self.job_titles)
+        self._titles_joined = _JOIN_SEPARATOR.join(self.job_titles)
+        self._title_targets = [_FuzzyTarget(title) for title in self.job_titles]
+
+        # Entreprise : types, industries et indicateurs de taille
+        self._company_types_regex = _compile_any_substring(
+            [company_type.lower() for company_type in target_persona.get('company_types', []) or []]
+        )
+        self._industries_regex = _compile_any_substring(
+            [industry.lower() for industry in target_persona.get('industries', []) or []]
+        )
+        self._size_regex = None
+        company_size = (target_persona.get('company_size', '') or '').lower()
+        if company_size:
+            for size_key, indicators in SIZE_INDICATORS.items():
+                if size_key in company_size:
+                    self._size_regex = _compile_any_substring(indicators)
+                    break
+
+        # Localisation
+        self.target_location = (target_persona.get('geographic_location', '') or '').lower()
+        self._location_target = _FuzzyTarget(self.target_location)
+
+        # Memos (les headlines, entreprises et localisations se répètent beaucoup)
+        self.job_title_score = lru_cache(maxsize=MEMO_SIZE)(self._job_title_score)
+        self.company_score = lru_cache(maxsize=MEMO_SIZE)(self._company_score)
+        self.location_score = lru_cache(maxsize=MEMO_SIZE)(self._location_score)
+
+    def _job_title_score(self, job_title: str) -> float:
+        """Score de correspondance du titre de poste (0-0.3)"""
+        if not job_title or not self.job_titles:
+            return 0.0
+
+        job_title_lower = job_title.lower()
+
+        # (index du premier titre cible qui matche, score du meilleur critère pour ce titre)
+        best_index = len(self.job_titles)
+        best_score = 0.0
+
+        # Correspondance exacte
+        exact_index = self._exact_index.get(job_title_lower)
+        if exact_index is not None:
+            best_index, best_score = exact_index, 0.3
+
+        # Correspondance partielle (cible dans le titre ou titre dans la cible)
+        if best_index > 0:
+            possible_hit = (
+                (self._titles_regex is not None and self._titles_regex.search(job_title_lower)) or
+                _JOIN_SEPARATOR in job_title_lower or
+                job_title_lower in self._titles_joined
+            )
+            if possible_hit:
+                for idx in range(best_index):
+                    target = self.job_titles[idx]
+                    if target in job_title_lower or job_title_lower in target:
+                        best_index, best_score = idx, 0.2
+                        break
+
+        # Mots clés communs (au moins 2)
+        if best_index > 0:
+            common_counts: Dict[int, int] = {}
+            for word in set(job_title_lower.split()):
+                for idx in self._token_index.get(word, ()):
+                    if idx < best_index:
+                        common_counts[idx] = common_counts.get(idx, 0) + 1
+            common_matches = [idx for idx, count in common_counts.items() if count >= 2]
+            if common_matches:
+                best_index, best_score = min(common_matches), 0.15
+
+        # Domaine proche (similarité)
+        if best_index > 0:
+            job_title_stripped = job_title_lower.strip()
+            for idx in range(best_index):
+                if self._title_targets[idx].ratio_above(job_title_stripped, 0.6):
+                    best_index, best_score = idx, 0.1
+                    break
+
+        return best_score
+
+    def _company_score(self, prospect_company: Optional[str]) -> float:
+        """Score de correspondance de l'entreprise (0-0.25)"""
+        if not prospect_company:
+            return 0.0
+
+        score = 0.0
+        prospect_company_lower = prospect_company.lower()
+
+        if self._company_types_regex is not None and self._company_types_regex.search(prospect_company_lower):
+            score += 0.1
+        if self._industries_regex is not None and self._industries_regex.search(prospect_company_lower):
+            score += 0.1
+        if self._size_regex is not None and self._size_regex.search(prospect_company_lower):
+            score += 0.05
+
+        return min(score, 0.25)
+
+    def _location_score(self, prospect_location: Optional[str]) -> float:
+        """Score de correspondance géographique (0-0.15)"""
+        if not prospect_location or not self.target_location:
+            return 0.0
+
+        prospect_lower = prospect_location.lower()
+        target_lower = self.target_location
+
+        if target_lower == prospect_lower:
+            return 0.15
+        if target_lower in prospect_lower or prospect_lower in target_lower:
+            return 0.1
+        if self._location_target.ratio_above(prospect_lower.strip(), 0.7):
+            return 0.05
+
+        return 0.0
+
+
+def persona_fingerprint(target_persona: Dict[str, Any]) -> Tuple:
+    """
+    Clé identifiant le contenu d'un persona (les critères utilisés par le scoring par règles)
+
+    Args:
+        target_persona: Profil persona cible
+
+    Returns:
+        Tuple hashable
+    """
+    target_persona = target_persona or {}
+    return (
+        tuple(target_persona.get('job_titles', []) or []),
+        tuple(target_persona.get('company_types', []) or []),
+        tuple(target_persona.get('industries', []) or []),
+        target_persona.get('company_size', '') or '',
+        target_persona.get('geographic_location', '') or ''
+    )
+
+
+def get_persona_matcher(target_persona: Dict[str, Any]) -> PersonaMatcher:
+    """
+    Retourne le matcher compilé pour ce persona (compilé au premier appel puis réutilisé)
+
+    Le cache est indexé par le contenu du persona : un profil modifié produit un nouveau matcher.
+
+    Args:
+        target_persona: Profil persona cible
+
+    Returns:
+        PersonaMatcher
+    """
+    key = persona_fingerprint(target_persona)
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+        if matcher is not None:
+            _matchers.move_to_end(key)
+            return matcher
+
+    matcher = PersonaMatcher(target_persona)
+    with _matchers_lock:
+        _matchers[key] = matcher
+        while len(_matchers) > MAX_CACHED_MATCHERS:
+            _matchers.popitem(last=False)
+    logger.debug(f"Matcher de persona compilé ({len(matcher.job_titles)} titre(s) cible(s))")
+    return matcher
+
+
+def invalidate_persona_matchers():
+    """Vide le cache des matchers compilés (à appeler après la sauvegarde d'un profil)"""
+    with _matchers_lock:
+        _matchers.clear()
+    logger.debug("Cache des matchers de persona vidé")
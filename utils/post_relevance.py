@@ -0,0 +1,79 @@
+"""
+Filtre de pertinence des posts avant le scoring des réactions d'un radar
+Chaque post est analysé une seule fois par l'IA (cache par URL du post et version du persona) ;
+les réactions d'un post sous le seuil du radar ne sont ni récupérées ni scorées
+"""
+import logging
+from typing import Dict, Any, Callable, Optional
+
+from utils.database import get_post_relevance, save_post_relevance
+from utils.run_history import count_cache_hit
+
+logger = logging.getLogger(__name__)
+
+# Signature du filtre passé à process_radar : (post_url, post) -> analyser les réactions ?
+PostGate = Callable[[str, Dict[str, Any]], bool]
+
+
+def score_post_relevance(client_id: int, post_url: str, post: Dict[str, Any],
+                         company_profile: Dict[str, Any]) -> Optional[float]:
+    """
+    Score de pertinence d'un post, depuis le cache ou analysé par l'IA
+
+    Args:
+        client_id: ID du client
+        post_url: URL du post
+        post: Post tel que retourné par l'API (texte, auteur, stats)
+        company_profile: Profil de l'entreprise
+
+    Returns:
+        Score entre 0 et 1, ou None si l'analyse n'est pas disponible
+    """
+    from utils.ai_analyzer import analyze_post_relevance
+
+    persona_version = company_profile.get('persona_version') or 1
+    cached = get_post_relevance(client_id, post_url, persona_version)
+    if cached:
+        count_cache_hit()
+        return cached['score']
+
+    analysis = analyze_post_relevance({'data': {'posts': [post]}}, company_profile)
+    if not analysis:
+        return None
+
+    score = float(analysis.get('score', 0.0) or 0.0)
+    save_post_relevance(client_id, post_url, persona_version, score,
+                        bool(analysis.get('relevant')), analysis.get('reasoning', ''))
+    return score
+
+
+def make_post_gate(client_id: int, company_profile: Optional[Dict[str, Any]],
+                   threshold: Optional[float]) -> Optional[PostGate]:
+    """
+    Construit le filtre de pertinence des posts d'un radar
+
+    Un post dont l'analyse échoue (OpenAI indisponible, réponse invalide) est conservé.
+
+    Args:
+        client_id: ID du client
+        company_profile: Profil de l'entreprise
+        threshold: Score minimum du post (radars.post_relevance_threshold)
+
+    Returns:
+        Filtre (post_url, post) -> bool, ou None si le filtre est désactivé
+    """
+    if not threshold or not company_profile:
+        return None
+
+    def gate(post_url: str, post: Dict[str, Any]) -> bool:
+        score = score_post_relevance(client_id, post_url, post or {}, company_profile)
+        if score is None:
+            logger.warning(f"  Pertinence du post non évaluée, réactions analysées: {post_url}")
+            return True
+        if score < threshold:
+            logger.info(f"  ✗ Post ignoré (pertinence {score:.2f} < {threshold}): {post_url}")
+            return False
+        logger.info(f"  ✓ Post pertinent ({score:.2f}): {post_url}")
+        return True
+
+    return gate
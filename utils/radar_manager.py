@@ -11,10 +11,12 @@ import logging
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Iterator
 from urllib.parse import quote
 import threading
-from utils.database import save_company_detail, get_company_detail_from_db
+from utils.database import save_company_detail, get_company_detail_from_db, save_posts, get_post
+from utils.run_history import run_stage, current_checkpoints, count_api_call, count_cache_hit, count_error
+from utils.run_checkpoints import RunCheckpoints
 
 logger = logging.getLogger(__name__)
 
@@ -199,6 +201,7 @@ def make_api_request_with_retry(url: str, headers: dict, params: dict = None, ma
     """
     for attempt in range(max_retries):
         try:
+            count_api_call()
             response = requests.get(url, headers=headers, params=params, timeout=30)
             
             # Si succès (2xx), retourner la réponse
@@ -373,6 +376,7 @@ def get_real_profile_slug_via_redirect(profile_url_or_urn: str) -> Optional[str]
         }
         
         # Suivre les redirections (allow_redirects=True par défaut)
+        count_api_call()
         response = requests.get(profile_url_or_urn, headers=headers, timeout=10, allow_redirects=True)
         
         if response.status_code == 200:
@@ -925,6 +929,109 @@ def get_post_reactions(post_url: str, page_number: int = 1, reaction_type: str =
         return None
 
 
+def extract_post_from_posts_data(posts_data: Dict[Any, Any], index: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Extrait un post (texte, auteur, stats) depuis les données
+    
+    Args:
+        posts_data: Données des posts depuis l'API
+        index: Index du post à extraire (0 = plus récent)
+    
+    Returns:
+        Post ou None
+    """
+    posts = []
+    
+    # Structure 1: {success: true, data: {posts: [...]}}
+    if posts_data.get('success') and 'data' in posts_data:
+        posts = posts_data.get('data', {}).get('posts', [])
+    # Structure 2: {posts: [...]}
+    elif 'posts' in posts_data and isinstance(posts_data['posts'], list):
+        posts = posts_data['posts']
+    # Structure 3: {data: [...]} (liste directe)
+    elif 'data' in posts_data and isinstance(posts_data['data'], list):
+        posts = posts_data['data']
+    
+    return posts[index] if posts and len(posts) > index else None
+
+
+def _stat_count(stats: Dict[str, Any], *keys: str) -> Optional[int]:
+    """Premier compteur numérique trouvé parmi les clés (les noms varient selon l'endpoint)"""
+    for key in keys:
+        value = stats.get(key)
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str) and value.isdigit():
+            return int(value)
+    return None
+
+
+def normalize_post(post: Dict[str, Any], source: str, author_name: str = '') -> Optional[Dict[str, Any]]:
+    """
+    Normalise un post de l'API (/company/posts, /profile/posts, /posts/search) pour la table posts
+    
+    Args:
+        post: Post tel que retourné par l'API
+        source: Endpoint d'origine ('company', 'profile', 'search')
+        author_name: Auteur par défaut si le post n'en indique pas (concurrent, profil)
+    
+    Returns:
+        Post normalisé ou None si le post n'a pas d'URL
+    """
+    post_url = (
+        post.get('post_url') or
+        post.get('url') or
+        post.get('linkedin_url') or
+        post.get('share_url') or
+        post.get('permalink')
+    )
+    if not post_url:
+        return None
+    
+    author = post.get('author') if isinstance(post.get('author'), dict) else {}
+    stats = post.get('stats') if isinstance(post.get('stats'), dict) else {}
+    post_date = (
+        post.get('created_at') or
+        post.get('date') or
+        post.get('published_at') or
+        post.get('timestamp') or
+        post.get('time')
+    )
+    return {
+        'post_url': post_url,
+        'source': source,
+        'author_name': author.get('name') or author_name or '',
+        'author_url': author.get('url') or author.get('profile_url') or author.get('linkedin_url') or '',
+        'post_text': post.get('text') or post.get('content') or '',
+        'post_date': str(post_date) if post_date else None,
+        'reaction_count': _stat_count(stats, 'total_reactions', 'reactions', 'like', 'likes'),
+        'comment_count': _stat_count(stats, 'comments', 'total_comments'),
+        'repost_count': _stat_count(stats, 'reposts', 'shares', 'total_reposts'),
+        'stats': stats
+    }
+
+
+def store_posts(posts: List[Dict[str, Any]], source: str, author_name: str = '') -> Dict[str, Dict[str, Any]]:
+    """
+    Enregistre dans la table posts les posts d'une réponse de l'API (sans appel supplémentaire)
+    
+    Args:
+        posts: Posts tels que retournés par l'API
+        source: Endpoint d'origine ('company', 'profile', 'search')
+        author_name: Auteur par défaut
+    
+    Returns:
+        Dict URL du post -> post normalisé
+    """
+    normalized = [record for record in (normalize_post(post, source, author_name) for post in posts if isinstance(post, dict))
+                  if record]
+    try:
+        save_posts(normalized)
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'enregistrement des posts: {e}")
+    return {record['post_url']: record for record in normalized}
+
+
 def extract_post_url_from_posts_data(posts_data: Dict[Any, Any], index: int = 0) -> Optional[str]:
     """
     Extrait l'URL d'un post depuis les données
@@ -1007,7 +1114,8 @@ def extract_post_date_from_posts_data(posts_data: Dict[Any, Any], index: int = 0
     return datetime.now().isoformat()
 
 
-def process_competitor_last_post_radar(company_name: str, client_id: int = None, max_extractions: int = None) -> List[Dict[str, Any]]:
+def process_competitor_last_post_radar(company_name: str, client_id: int = None, max_extractions: int = None,
+                                       post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
     """
     NOTE: max_extractions n'est plus utilisé ici - la limite est appliquée après le scoring IA
     sur les profils qualifiés uniquement. Ce paramètre est conservé pour compatibilité mais ignoré.
@@ -1020,11 +1128,30 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
         company_name: Nom de l'entreprise concurrente
         client_id: ID du client (pour déduplication)
         max_extractions: Nombre maximum de prospects à extraire (None = illimité)
+        post_gate: Filtre de pertinence du post (voir utils.post_relevance), None = pas de filtre
     
     Returns:
         Liste de dictionnaires contenant les réactions
     """
-    reactions_list = []
+    reactions_list = [reaction for page in iter_competitor_last_post_pages(company_name, post_gate=post_gate)
+                      for reaction in page]
+    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour {company_name}")
+    return reactions_list
+
+
+def iter_competitor_last_post_pages(company_name: str,
+                                    post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Réactions du dernier post d'un concurrent, page par page (radar 'competitor_last_post')
+    
+    Args:
+        company_name: Nom de l'entreprise concurrente
+        post_gate: Filtre de pertinence du post (voir utils.post_relevance), None = pas de filtre
+    
+    Returns:
+        Itérateur sur les pages de réactions, au fur et à mesure de leur récupération
+    """
+    collected = 0
     
     # Récupérer les prospects existants pour déduplication
     # NOTE: La déduplication se fera dans process_radar_with_scoring à l'étape 2, après l'extraction.
@@ -1035,7 +1162,7 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
     posts_data = get_company_posts(company_name, limit=1)
     if not posts_data:
         logger.warning(f"Aucun post trouvé pour {company_name}")
-        return reactions_list
+        return
     
     logger.info(f"✓ Post trouvé pour {company_name}")
     
@@ -1043,7 +1170,15 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
     post_url = extract_post_url_from_posts_data(posts_data, index=0)
     if not post_url:
         logger.warning(f"Impossible d'extraire l'URL du post pour {company_name}")
-        return reactions_list
+        return
+    
+    # Contenu du post conservé pour le scoring et les messages
+    first_post = extract_post_from_posts_data(posts_data, index=0) or {}
+    post_record = store_posts([first_post], 'company', company_name).get(post_url, {})
+    
+    # Post non pertinent : pas d'appel API pour ses réactions
+    if post_gate and not post_gate(post_url, first_post):
+        return
     
     # 3. Récupérer les réactions (avec pagination)
     post_date = extract_post_date_from_posts_data(posts_data, index=0)
@@ -1072,6 +1207,7 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
         
         # Extraire les réactions (toutes pour laisser l'IA analyser tous les profils)
         # NOTE: La déduplication avec la DB se fera dans process_radar_with_scoring à l'étape 2
+        page = []
         for reaction in reactions:
             reactor = reaction.get('reactor', {})
             reactor_urn = str(reactor.get('urn', ''))
@@ -1079,10 +1215,12 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
             # Utiliser directement le profile_url de l'API (peut être un ID ou un slug)
             profile_url = reactor.get('profile_url', '')
             
-            reactions_list.append({
+            page.append({
                 'company_name': company_name,
                 'post_url': post_url,
                 'post_date': post_date,
+                'post_text': post_record.get('post_text', ''),
+                'post_author': post_record.get('author_name') or company_name,
                 'reactor_name': reactor.get('name', ''),
                 'reactor_urn': reactor_urn,
                 'profile_url': profile_url,
@@ -1094,28 +1232,49 @@ def process_competitor_last_post_radar(company_name: str, client_id: int = None,
                 )
             })
         
+        collected += len(page)
+        yield page
+        
         # Vérifier s'il y a d'autres pages
-        if len(reactions_list) >= total_reactions or page_number >= 50:
+        if collected >= total_reactions or page_number >= 50:
             break
         
         page_number += 1
-    
-    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour {company_name}")
-    return reactions_list
 
 
-def process_person_last_post_radar(profile_url: str, client_id: int = None, max_extractions: int = None) -> List[Dict[str, Any]]:
+def process_person_last_post_radar(profile_url: str, client_id: int = None, max_extractions: int = None,
+                                   post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
     """
     Traite un radar de type 'person_last_post'
     Récupère le dernier post d'une personne et extrait les réactions
     
     Args:
         profile_url: URL du profil LinkedIn
+        post_gate: Filtre de pertinence du post (voir utils.post_relevance), None = pas de filtre
     
     Returns:
         Liste de dictionnaires contenant les réactions
     """
-    reactions_list = []
+    reactions_list = [reaction for page in iter_person_last_post_pages(profile_url, max_extractions, post_gate=post_gate)
+                      for reaction in page]
+    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour {profile_url}")
+    return reactions_list
+
+
+def iter_person_last_post_pages(profile_url: str, max_extractions: int = None,
+                                post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Réactions du dernier post d'une personne, page par page (radar 'person_last_post')
+    
+    Args:
+        profile_url: URL du profil LinkedIn
+        max_extractions: Nombre maximum de réactions à collecter (None = illimité)
+        post_gate: Filtre de pertinence du post (voir utils.post_relevance), None = pas de filtre
+    
+    Returns:
+        Itérateur sur les pages de réactions, au fur et à mesure de leur récupération
+    """
+    collected = 0
     
     # Récupérer les prospects existants pour déduplication
     # NOTE: La déduplication se fera dans process_radar_with_scoring à l'étape 2, après l'extraction.
@@ -1125,13 +1284,21 @@ def process_person_last_post_radar(profile_url: str, client_id: int = None, max_
     posts_data = get_person_posts(profile_url, limit=1)
     if not posts_data:
         logger.warning(f"Aucun post trouvé pour {profile_url}")
-        return reactions_list
+        return
     
     # 2. Extraire l'URL du post
     post_url = extract_post_url_from_posts_data(posts_data, index=0)
     if not post_url:
         logger.warning(f"Impossible d'extraire l'URL du post pour {profile_url}")
-        return reactions_list
+        return
+    
+    # Contenu du post conservé pour le scoring et les messages
+    first_post = extract_post_from_posts_data(posts_data, index=0) or {}
+    post_record = store_posts([first_post], 'profile').get(post_url, {})
+    
+    # Post non pertinent : pas d'appel API pour ses réactions
+    if post_gate and not post_gate(post_url, first_post):
+        return
     
     # 3. Récupérer les réactions (avec pagination)
     post_date = extract_post_date_from_posts_data(posts_data, index=0)
@@ -1143,7 +1310,7 @@ def process_person_last_post_radar(profile_url: str, client_id: int = None, max_
     
     while True:
         # Arrêter si on a atteint la limite
-        if max_extractions and len(reactions_list) >= max_extractions:
+        if max_extractions and collected >= max_extractions:
             logger.info(f"Limite d'extraction atteinte: {max_extractions} prospect(s)")
             break
         
@@ -1164,6 +1331,7 @@ def process_person_last_post_radar(profile_url: str, client_id: int = None, max_
         
         # Extraire les réactions (toutes pour laisser l'IA analyser tous les profils)
         # NOTE: La déduplication avec la DB se fera dans process_radar_with_scoring à l'étape 2
+        page = []
         for reaction in reactions:
             reactor = reaction.get('reactor', {})
             reactor_urn = str(reactor.get('urn', ''))
@@ -1171,10 +1339,12 @@ def process_person_last_post_radar(profile_url: str, client_id: int = None, max_
             # Utiliser directement le profile_url de l'API (peut être un ID ou un slug)
             profile_url_reactor = reactor.get('profile_url', '')
             
-            reactions_list.append({
+            page.append({
                 'person_profile_url': profile_url,
                 'post_url': post_url,
                 'post_date': post_date,
+                'post_text': post_record.get('post_text', ''),
+                'post_author': post_record.get('author_name', ''),
                 'reactor_name': reactor.get('name', ''),
                 'reactor_urn': reactor_urn,
                 'profile_url': profile_url_reactor,
@@ -1186,18 +1356,19 @@ def process_person_last_post_radar(profile_url: str, client_id: int = None, max_
                 )
             })
         
+        collected += len(page)
+        yield page
+        
         # Vérifier s'il y a d'autres pages
         total_reactions = reactions_data.get('data', {}).get('total_reactions', 0)
-        if len(reactions_list) >= total_reactions or page_number >= 50:
+        if collected >= total_reactions or page_number >= 50:
             break
         
         page_number += 1
-    
-    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour {profile_url}")
-    return reactions_list
 
 
-def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: int = None, max_extractions: int = None) -> List[Dict[str, Any]]:
+def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: int = None, max_extractions: int = None,
+                                post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
     """
     Traite un radar de type 'keyword_posts'
     Recherche X derniers posts sur une thématique et extrait les réactions
@@ -1205,12 +1376,30 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
     Args:
         keyword: Mot-clé à rechercher
         post_count: Nombre de posts à analyser
+        post_gate: Filtre de pertinence des posts (voir utils.post_relevance), None = pas de filtre
     
     Returns:
         Liste de dictionnaires contenant les réactions
     """
-    reactions_list = []
+    reactions_list = [reaction for page in iter_keyword_posts_pages(keyword, post_count, post_gate=post_gate)
+                      for reaction in page]
+    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour '{keyword}'")
+    return reactions_list
+
+
+def iter_keyword_posts_pages(keyword: str, post_count: int = 10,
+                             post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Réactions des derniers posts sur un mot-clé, une page par post (radar 'keyword_posts')
+    
+    Args:
+        keyword: Mot-clé à rechercher
+        post_count: Nombre de posts à analyser
+        post_gate: Filtre de pertinence des posts (voir utils.post_relevance), None = pas de filtre
     
+    Returns:
+        Itérateur sur les pages de réactions, au fur et à mesure de leur récupération
+    """
     # Récupérer les prospects existants pour déduplication
     # NOTE: max_extractions n'est plus utilisé ici - la limite est appliquée après le scoring IA
     # sur les profils qualifiés uniquement. On collecte toutes les réactions pour l'analyse IA.
@@ -1220,10 +1409,11 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
     posts_data = search_posts_by_keyword(keyword, limit=post_count)
     if not posts_data:
         logger.warning(f"Aucun post trouvé pour '{keyword}'")
-        return reactions_list
+        return
     
     # 2. Traiter chaque post (tous pour laisser l'IA analyser)
     posts = posts_data.get('data', {}).get('posts', [])
+    post_records = store_posts(posts, 'search')
     for post in posts:
         post_url = (
             post.get('post_url') or
@@ -1235,6 +1425,10 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
         if not post_url:
             continue
         
+        # Post hors sujet : pas d'appel API pour ses réactions
+        if post_gate and not post_gate(post_url, post):
+            continue
+        
         post_date = (
             post.get('created_at') or
             post.get('date') or
@@ -1248,9 +1442,11 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
             continue
         
         reactions = reactions_data.get('data', {}).get('reactions', [])
+        post_record = post_records.get(post_url, {})
         
         # Extraire les réactions (toutes pour laisser l'IA analyser tous les profils)
         # NOTE: La déduplication avec la DB se fera dans process_radar_with_scoring à l'étape 2
+        page = []
         for reaction in reactions:
             reactor = reaction.get('reactor', {})
             reactor_urn = str(reactor.get('urn', ''))
@@ -1258,10 +1454,12 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
             # Utiliser directement le profile_url de l'API (peut être un ID ou un slug)
             profile_url_reactor = reactor.get('profile_url', '')
             
-            reactions_list.append({
+            page.append({
                 'keyword': keyword,
                 'post_url': post_url,
                 'post_date': str(post_date),
+                'post_text': post_record.get('post_text', ''),
+                'post_author': post_record.get('author_name', ''),
                 'reactor_name': reactor.get('name', ''),
                 'reactor_urn': reactor_urn,
                 'profile_url': profile_url_reactor,
@@ -1272,17 +1470,19 @@ def process_keyword_posts_radar(keyword: str, post_count: int = 10, client_id: i
                     reactor.get('profile_pictures', {}).get('large') or ''
                 )
             })
-    
-    logger.info(f"✓ {len(reactions_list)} réaction(s) extraite(s) pour '{keyword}'")
-    return reactions_list
+        
+        if page:
+            yield page
 
 
-def process_radar(radar: Dict[str, Any]) -> List[Dict[str, Any]]:
+def process_radar(radar: Dict[str, Any],
+                  post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
     """
     Traite un radar selon son type (version simple sans scoring)
     
     Args:
         radar: Dictionnaire contenant les informations du radar
+        post_gate: Filtre de pertinence des posts (les réactions des posts rejetés ne sont pas récupérées)
     
     Returns:
         Liste de dictionnaires contenant les réactions
@@ -1296,17 +1496,48 @@ def process_radar(radar: Dict[str, Any]) -> List[Dict[str, Any]]:
     max_extractions = radar.get('max_extractions')
     
     if radar_type == 'competitor_last_post':
-        return process_competitor_last_post_radar(target_identifier, client_id=client_id, max_extractions=max_extractions)
+        return process_competitor_last_post_radar(target_identifier, client_id=client_id, max_extractions=max_extractions,
+                                                  post_gate=post_gate)
     elif radar_type == 'person_last_post':
         profile_url = target_value or target_identifier
-        return process_person_last_post_radar(profile_url, client_id=client_id, max_extractions=max_extractions)
+        return process_person_last_post_radar(profile_url, client_id=client_id, max_extractions=max_extractions,
+                                              post_gate=post_gate)
     elif radar_type == 'keyword_posts':
-        return process_keyword_posts_radar(keyword or target_identifier, post_count, client_id=client_id, max_extractions=max_extractions)
+        return process_keyword_posts_radar(keyword or target_identifier, post_count, client_id=client_id,
+                                           max_extractions=max_extractions, post_gate=post_gate)
     else:
         logger.error(f"Type de radar inconnu: {radar_type}")
         return []
 
 
+def iter_radar_reaction_pages(radar: Dict[str, Any],
+                              post_gate: Optional[Callable[[str, Dict[str, Any]], bool]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Réactions d'un radar page par page, au fur et à mesure de leur récupération (pipeline en flux)
+    
+    Args:
+        radar: Dictionnaire contenant les informations du radar
+        post_gate: Filtre de pertinence des posts (les réactions des posts rejetés ne sont pas récupérées)
+    
+    Returns:
+        Itérateur sur les pages de réactions (mêmes champs que process_radar)
+    """
+    radar_type = radar.get('radar_type')
+    target_identifier = radar.get('target_identifier')
+    
+    if radar_type == 'competitor_last_post':
+        return iter_competitor_last_post_pages(target_identifier, post_gate=post_gate)
+    elif radar_type == 'person_last_post':
+        return iter_person_last_post_pages(radar.get('target_value') or target_identifier,
+                                           radar.get('max_extractions'), post_gate=post_gate)
+    elif radar_type == 'keyword_posts':
+        return iter_keyword_posts_pages(radar.get('keyword') or target_identifier, radar.get('post_count', 1),
+                                        post_gate=post_gate)
+    else:
+        logger.error(f"Type de radar inconnu: {radar_type}")
+        return iter([])
+
+
 def process_multiple_competitors(competitor_names: List[str]) -> List[Dict[str, Any]]:
     """
     Traite plusieurs concurrents en une fois
@@ -1359,24 +1590,349 @@ def get_post_details(post_url: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dict avec détails du post ou None
     """
-    # Cette fonction pourrait être étendue pour récupérer plus d'informations
-    # Pour l'instant, on retourne juste les infos de base
+    # Contenu enregistré lors de la collecte (table posts), sans appel API
+    post = get_post(post_url)
+    if not post:
+        return None
     return {
         'post_url': post_url,
-        'post_date': datetime.now().isoformat()
+        'post_date': post.get('post_date') or datetime.now().isoformat(),
+        'post_text': post.get('post_text') or '',
+        'post_author': post.get('author_name') or '',
+        'reaction_count': post.get('reaction_count'),
+        'comment_count': post.get('comment_count'),
+        'repost_count': post.get('repost_count')
     }
 
 
+# Modes de scoring d'un radar (colonne radars.scoring_mode)
+SCORING_MODES = {
+    'ai': "IA (règles si OpenAI indisponible)",
+    'rules': "Règles",
+    'semantic': "Sémantique local (hors ligne)",
+    'semantic_prefilter': "Préfiltre sémantique + IA",
+    'local_model': "Modèle local (IA si incertain)",
+    'batch': "API Batch OpenAI différée (runs planifiés)",
+}
+
+
+def _score_reactions(radar: Dict[str, Any], client_id: int, new_reactions: List[Dict[str, Any]],
+                     company_profile: Dict[str, Any], min_score_threshold: float,
+                     scoring_mode: Optional[str], allow_deferred_scoring: bool,
+                     run_stats: Dict[str, Any], checkpoint: bool = True) -> List[Dict[str, Any]]:
+    """
+    Étape de scoring : score les nouveaux prospects et retourne ceux qui atteignent le seuil
+
+    En mode batch (runs planifiés), les prospects sont mis en attente de scoring
+    (run_stats['deferred']) et aucun n'est retourné. La progression est enregistrée dans les
+    points de reprise de l'exécution : une exécution reprise ne rescore pas les prospects déjà scorés.
+    Le pipeline en flux score page par page et gère ses propres points de reprise (checkpoint=False).
+    """
+    from utils import intelligent_scoring
+    from utils.intelligent_scoring import calculate_prospect_score_with_ai, calculate_prospect_score
+
+    checkpoints = current_checkpoints() if checkpoint else RunCheckpoints()
+    progress = checkpoints.progress('scoring')
+    start = 0
+    qualified_indices = []
+    if progress is not None:
+        new_reactions = progress['reactions']
+        start = progress['done']
+        qualified_indices = progress['qualified']
+        logger.info(f"  ↪ Reprise du scoring au prospect {start + 1}/{len(new_reactions)}")
+
+    scored_reactions = [new_reactions[index] for index in qualified_indices]
+    scored_count = len(scored_reactions)
+    ai_scoring_used = 0
+    fallback_scoring_used = 0
+    semantic_scoring_used = 0
+    local_model_used = 0
+    llm_scores = []
+
+    scoring_mode = scoring_mode or radar.get('scoring_mode') or 'ai'
+    if scoring_mode not in SCORING_MODES:
+        logger.warning(f"Mode de scoring inconnu '{scoring_mode}', utilisation du mode 'ai'")
+        scoring_mode = 'ai'
+    openai_available = intelligent_scoring.OPENAI_ENABLED and intelligent_scoring.openai_client
+    logger.info(f"  → Mode de scoring: {SCORING_MODES[scoring_mode]}")
+
+    # Mode batch : scoring différé via l'API Batch, intégré par le scheduler quand le lot est terminé
+    if scoring_mode == 'batch':
+        if allow_deferred_scoring:
+            from utils.openai_batch import defer_reactions_to_batch
+            pending_count = defer_reactions_to_batch(
+                client_id, radar.get('id'), new_reactions, company_profile, min_score_threshold
+            )
+            logger.info(f"✓ {pending_count} prospect(s) en attente de scoring (lot OpenAI)")
+            run_stats['deferred'] = pending_count
+            return []
+        logger.info("  → Mode batch réservé aux runs planifiés: scoring IA immédiat")
+        scoring_mode = 'ai'
+
+    # Scores calculés en un seul passage sur tout le lot (sinon scoring IA prospect par prospect)
+    precomputed_results = None
+
+    if scoring_mode == 'semantic':
+        from utils.semantic_scoring import semantic_scores_batch
+        logger.info("  → Scoring sémantique local (TF-IDF haché) sur tout le lot")
+        precomputed_results = semantic_scores_batch(new_reactions, company_profile)
+    elif scoring_mode == 'semantic_prefilter' and progress is None:
+        from utils.semantic_scoring import semantic_prefilter
+        kept_reactions, _, rejected_reactions = semantic_prefilter(new_reactions, company_profile)
+        logger.info(f"  → Préfiltre sémantique: {len(rejected_reactions)} prospect(s) écarté(s) sans appel IA, {len(kept_reactions)} restant(s)")
+        new_reactions = kept_reactions
+    elif scoring_mode == 'local_model' and openai_available:
+        from utils.local_classifier import score_with_local_model
+        precomputed_results = score_with_local_model(new_reactions, client_id, min_score_threshold,
+                                                     persona_version=company_profile.get('persona_version'))
+        confident_count = sum(1 for result in precomputed_results if result is not None)
+        logger.info(f"  → Modèle local: {confident_count} prospect(s) scoré(s) localement, {len(new_reactions) - confident_count} envoyé(s) à l'IA")
+
+    # Sans OpenAI (ou en mode règles), le scoring par règles est calculé en un seul passage vectorisé
+    if precomputed_results is None and (scoring_mode == 'rules' or not openai_available):
+        from utils.batch_scoring import score_reactions_rule_based
+        if scoring_mode == 'rules':
+            logger.info("  → Scoring par règles vectorisé sur tout le lot")
+        else:
+            logger.info("  → OpenAI non disponible: scoring par règles vectorisé sur tout le lot")
+        precomputed_results = score_reactions_rule_based(new_reactions, company_profile)
+
+    for idx, reaction in enumerate(new_reactions[start:], start + 1):
+        try:
+            # Préparer le contexte du post si disponible
+            post_context = None
+            if reaction.get('post_url'):
+                # On pourrait enrichir avec les détails du post ici
+                post_context = {
+                    'post_text': reaction.get('post_text', ''),
+                    'post_author': reaction.get('post_author', '')
+                }
+
+            if precomputed_results is not None and precomputed_results[idx - 1] is not None:
+                scoring_result = precomputed_results[idx - 1]
+            else:
+                # Calculer le score avec IA (avec fallback automatique si erreur)
+                scoring_result = calculate_prospect_score_with_ai(
+                    reaction,
+                    company_profile,
+                    post_context=post_context
+                )
+
+            # Détecter si c'était un fallback (pas de reasoning = fallback)
+            if scoring_result.get('scoring_method') == 'semantic':
+                semantic_scoring_used += 1
+            elif scoring_result.get('scoring_method') == 'local_model':
+                local_model_used += 1
+            elif 'reasoning' in scoring_result and scoring_result.get('reasoning'):
+                ai_scoring_used += 1
+                llm_scores.append((reaction, scoring_result.get('total_score', 0.0)))
+            else:
+                fallback_scoring_used += 1
+
+            score = scoring_result.get('total_score', 0.0)
+
+            # Filtrer selon le seuil
+            if score >= min_score_threshold:
+                # Ajouter les informations de scoring à la réaction
+                reaction['relevance_score'] = score
+                reaction['scoring_breakdown'] = scoring_result
+                reaction['prospect_relevant'] = True
+                reaction['persona_version'] = company_profile.get('persona_version')
+                scored_reactions.append(reaction)
+                qualified_indices.append(idx - 1)
+                scored_count += 1
+
+                # Log tous les 20 pour ne pas surcharger
+                if scored_count % 20 == 0:
+                    logger.info(f"  → {scored_count} prospect(s) qualifié(s) sur {idx} analysé(s)...")
+            else:
+                logger.debug(f"Prospect filtré (score {score:.2f} < {min_score_threshold}): {reaction.get('reactor_name')}")
+
+        except Exception as e:
+            logger.error(f"Erreur lors du scoring pour prospect {reaction.get('reactor_name', 'Unknown')}: {e}")
+            count_error()
+            # En cas d'erreur, utiliser le scoring classique
+            try:
+                scoring_result = calculate_prospect_score(
+                    reaction,
+                    company_profile,
+                    post_context=None
+                )
+                score = scoring_result.get('total_score', 0.0)
+                fallback_scoring_used += 1
+
+                if score >= min_score_threshold:
+                    reaction['relevance_score'] = score
+                    reaction['scoring_breakdown'] = scoring_result
+                    reaction['prospect_relevant'] = True
+                    reaction['persona_version'] = company_profile.get('persona_version')
+                    scored_reactions.append(reaction)
+                    qualified_indices.append(idx - 1)
+                    scored_count += 1
+            except Exception as e2:
+                logger.error(f"Erreur même avec scoring classique: {e2}")
+                count_error()
+                # Prospect ignoré en cas d'erreur double
+
+        checkpoints.save_progress('scoring', {'done': idx, 'reactions': new_reactions, 'qualified': qualified_indices})
+
+    logger.info(f"✓ {len(scored_reactions)} prospect(s) qualifié(s) sur {len(new_reactions)} analysé(s)")
+    if ai_scoring_used > 0:
+        logger.info(f"  → Scoring IA utilisé: {ai_scoring_used} prospect(s)")
+    if fallback_scoring_used > 0:
+        logger.info(f"  → Scoring classique (fallback): {fallback_scoring_used} prospect(s)")
+    if semantic_scoring_used > 0:
+        logger.info(f"  → Scoring sémantique local: {semantic_scoring_used} prospect(s)")
+    if local_model_used > 0:
+        logger.info(f"  → Modèle local (appels IA évités): {local_model_used} prospect(s)")
+
+    # Les scores LLM (qualifiés ou non) servent d'exemples au modèle local du client
+    if llm_scores:
+        try:
+            from utils.local_classifier import record_llm_scores, maybe_retrain
+            record_llm_scores(client_id, llm_scores, company_profile.get('persona_version'))
+            maybe_retrain(client_id)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement des scores pour le modèle local: {e}")
+    return scored_reactions
+
+
+def _enrich_profile(reaction: Dict[str, Any]) -> bool:
+    """
+    Enrichit une réaction qualifiée avec get_profile et remplace son profile_url par le vrai slug
+
+    Returns:
+        True si le profil a été enrichi
+    """
+    reactor_urn = str(reaction.get('reactor_urn', ''))
+    profile_url = reaction.get('profile_url', '')
+    
+    # Extraire le username pour l'API
+    username = extract_username_from_url(profile_url) if profile_url else None
+    if not username and reactor_urn:
+        # Si on a un URN, on peut essayer de l'utiliser
+        username = reactor_urn.split(':')[-1] if ':' in reactor_urn else reactor_urn
+    if not username:
+        return False
+    
+    # Appel API get_profile pour enrichir
+    profile_detail = get_profile_detail(username)
+    if not profile_detail:
+        logger.debug(f"  ✗ Impossible d'enrichir: {reaction.get('reactor_name', 'Unknown')}")
+        return False
+    
+    reaction['enriched_profile'] = profile_detail
+    logger.debug(f"  ✓ Profil enrichi: {reaction.get('reactor_name', 'Unknown')}")
+    
+    # Mettre à jour profile_url avec le vrai slug depuis basic_info
+    basic_info = profile_detail.get('basic_info', {}) if isinstance(profile_detail, dict) else {}
+    if basic_info and isinstance(basic_info, dict):
+        enriched_profile_url = basic_info.get('profile_url')
+        if enriched_profile_url:
+            # Normaliser l'URL (linkedin.com -> www.linkedin.com)
+            if enriched_profile_url.startswith('https://linkedin.com'):
+                enriched_profile_url = enriched_profile_url.replace('https://linkedin.com', 'https://www.linkedin.com')
+            reaction['profile_url'] = enriched_profile_url
+            logger.debug(f"  ✓ Profile URL mis à jour avec le slug: {enriched_profile_url}")
+    return True
+
+
+def _enrich_company(reaction: Dict[str, Any]) -> bool:
+    """
+    Enrichit une réaction dont le profil est enrichi avec les données de son entreprise actuelle
+    (depuis la base si l'entreprise est connue, sinon via l'API)
+
+    Returns:
+        True si les données d'entreprise ont été ajoutées
+    """
+    profile_detail = reaction.get('enriched_profile') or {}
+    
+    # Extraire l'URN et le nom de l'entreprise depuis basic_info (priorité à l'URN)
+    company_urn = None
+    company_name = None
+    
+    # Les données enrichies sont dans basic_info
+    basic_info = profile_detail.get('basic_info', {}) if isinstance(profile_detail, dict) else {}
+    
+    if basic_info and isinstance(basic_info, dict):
+        # Priorité 1: URN de l'entreprise (le plus fiable)
+        company_urn = basic_info.get('current_company_urn')
+        company_name = basic_info.get('current_company')
+    
+    # Fallback: chercher dans experience
+    if not company_urn and profile_detail.get('experience') and isinstance(profile_detail.get('experience'), list):
+        for exp in profile_detail.get('experience', []):
+            if isinstance(exp, dict) and exp.get('is_current', False):
+                company_urn = exp.get('company_id')  # company_id est l'URN
+                if not company_name:
+                    company_name = exp.get('company')
+                break
+    
+    # Fallback: nom de l'entreprise seulement
+    if not company_name:
+        if profile_detail.get('current_company'):
+            company_name = profile_detail.get('current_company')
+        elif profile_detail.get('company'):
+            company_name = profile_detail.get('company')
+    
+    # Utiliser aussi le detected_company depuis la réaction originale
+    if not company_name:
+        company_name = reaction.get('detected_company') or reaction.get('company_name')
+    
+    if not (company_urn or company_name):
+        return False
+    
+    # Utiliser l'URN comme identifiant principal si disponible, sinon le nom
+    if company_urn:
+        company_identifier = str(company_urn)
+    else:
+        company_identifier = company_name.lower().strip()
+    
+    # Vérifier si l'entreprise existe déjà en DB
+    company_detail = get_company_detail_from_db(company_identifier)
+    
+    if not company_detail:
+        # Appel API pour récupérer les détails de l'entreprise
+        # Prioriser l'URN si disponible (plus fiable que le nom)
+        api_identifier = company_urn if company_urn else company_name
+        logger.debug(f"  → Récupération des détails de l'entreprise: {api_identifier} (URN: {company_urn or 'N/A'}, Nom: {company_name or 'N/A'})")
+        company_detail = get_company_detail(api_identifier)
+        
+        if company_detail:
+            # Sauvegarder en DB avec l'URN comme identifiant si disponible
+            save_company_detail(company_identifier, company_name or 'Unknown', company_detail)
+            logger.debug(f"  ✓ Entreprise enrichie et sauvegardée: {company_name or company_urn}")
+        else:
+            logger.debug(f"  ✗ Impossible de récupérer les détails de l'entreprise: {api_identifier}")
+    else:
+        count_cache_hit()
+        logger.debug(f"  ✓ Entreprise trouvée en DB (pas d'appel API): {company_name or company_urn}")
+    
+    # Ajouter les données d'entreprise à la réaction
+    if not company_detail:
+        return False
+    reaction['enriched_company'] = company_detail
+    return True
+
+
 def process_radar_with_scoring(radar: Dict[str, Any], 
                                client_id: int,
                                company_profile: Optional[Dict[str, Any]] = None,
                                competitors_list: Optional[List[Dict[str, Any]]] = None,
                                min_score_threshold: float = 0.6,
                                filter_competitors: bool = True,
-                               max_qualified_prospects: int = None) -> List[Dict[str, Any]]:
+                               max_qualified_prospects: int = None,
+                               scoring_mode: Optional[str] = None,
+                               allow_deferred_scoring: bool = False,
+                               run_stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Traite un radar avec scoring IA et filtrage
     
+    Chaque étape est mesurée (durée, éléments, appels API / LLM) dans l'historique de l'exécution
+    en cours (voir utils.run_history), et sa sortie est enregistrée comme point de reprise : une
+    exécution reprise repart de la dernière étape terminée et du dernier prospect enregistré
+    (voir utils.run_checkpoints).
+    
     Args:
         radar: Dictionnaire contenant les informations du radar
         client_id: ID du client
@@ -1384,46 +1940,82 @@ def process_radar_with_scoring(radar: Dict[str, Any],
         competitors_list: Liste des concurrents (optionnel)
         min_score_threshold: Score minimum pour qualifier
         filter_competitors: Activer le filtrage des concurrents
+        scoring_mode: Mode de scoring (voir SCORING_MODES, défaut: celui du radar ou 'ai')
+        allow_deferred_scoring: Autorise le mode 'batch' (runs planifiés) : les réactions sont
+            enregistrées en attente de scoring et aucune réaction qualifiée n'est retournée
+        run_stats: Dict complété avec le rendement de l'exécution (post_urls des posts ayant des
+            réactions, reactions, reactor_urns des réacteurs collectés, deferred)
     
     Returns:
         Liste de réactions avec scoring appliqué
     """
     logger.info(f"Traitement du radar: {radar.get('name', 'Unknown')} (ID: {radar.get('id')})")
+    if run_stats is None:
+        run_stats = {}
+    run_stats.update({'post_urls': [], 'reactions': 0, 'reactor_urns': [], 'deferred': 0})
+    
+    # Charger le profil si non fourni (nécessaire au filtre de pertinence des posts)
+    if not company_profile:
+        from utils.database import get_client_profile_as_dict
+        company_profile = get_client_profile_as_dict(client_id)
+    
+    # Filtre de pertinence des posts : les réactions des posts sous le seuil du radar sont ignorées
+    from utils.post_relevance import make_post_gate
+    post_gate = make_post_gate(client_id, company_profile, radar.get('post_relevance_threshold'))
+    if post_gate:
+        logger.info(f"  → Filtre de pertinence des posts actif (seuil: {radar.get('post_relevance_threshold')})")
+    
+    # Points de reprise de l'exécution en cours : une exécution reprise saute les étapes terminées
+    checkpoints = current_checkpoints()
     
     # ÉTAPE 1: Collecte de toutes les réactions (sans limite)
-    logger.info("Étape 1/7: Récupération des réactions depuis LinkedIn...")
-    raw_reactions = process_radar(radar)
+    resumed = checkpoints.output('fetch')
+    if resumed is not None:
+        raw_reactions = resumed['reactions']
+        logger.info(f"↪ Étape 1/7 reprise: {len(raw_reactions)} réaction(s) récupérée(s) avant l'interruption")
+    else:
+        logger.info("Étape 1/7: Récupération des réactions depuis LinkedIn...")
+        with run_stage('fetch') as stage:
+            raw_reactions = process_radar(radar, post_gate=post_gate)
+            stage.items_out = len(raw_reactions)
+        checkpoints.complete('fetch', {'reactions': raw_reactions})
     
     if not raw_reactions:
         logger.warning(f"Aucune réaction trouvée pour le radar {radar.get('id')}")
         return []
     
     logger.info(f"✓ {len(raw_reactions)} réaction(s) brute(s) récupérée(s)")
+    run_stats['post_urls'] = list(dict.fromkeys(r['post_url'] for r in raw_reactions if r.get('post_url')))
+    run_stats['reactions'] = len(raw_reactions)
+    run_stats['reactor_urns'] = list(dict.fromkeys(str(r['reactor_urn']) for r in raw_reactions if r.get('reactor_urn')))
     
-    # Charger le profil et les concurrents si non fournis
-    if not company_profile:
-        from utils.database import get_client_profile_as_dict
-        company_profile = get_client_profile_as_dict(client_id)
-    
+    # Charger les concurrents si non fournis
     if not competitors_list:
         from utils.database import get_competitors
         competitors_list = get_competitors(client_id)
     
     # ÉTAPE 2: Déduplication APRÈS l'extraction, AVANT le scoring IA pour éviter les coûts inutiles
-    logger.info("Étape 2/7: Déduplication des prospects existants (après extraction)...")
-    from utils.database import get_existing_prospect_urns
-    existing_urns = get_existing_prospect_urns(client_id)
-    logger.info(f"  → {len(existing_urns)} prospect(s) déjà présent(s) dans la base de données")
-    
-    new_reactions = []
-    skipped_count = 0
-    for reaction in raw_reactions:
-        reactor_urn = str(reaction.get('reactor_urn', ''))
-        if reactor_urn and reactor_urn in existing_urns:
-            skipped_count += 1
-            logger.debug(f"  Prospect déjà existant ignoré (skip IA): {reaction.get('reactor_name', 'Unknown')}")
-            continue
-        new_reactions.append(reaction)
+    resumed = checkpoints.output('dedup')
+    if resumed is not None:
+        new_reactions, skipped_count = resumed['reactions'], resumed['skipped']
+    else:
+        logger.info("Étape 2/7: Déduplication des prospects existants (après extraction)...")
+        with run_stage('dedup', items_in=len(raw_reactions)) as stage:
+            from utils.database import get_existing_prospect_urns
+            existing_urns = get_existing_prospect_urns(client_id)
+            logger.info(f"  → {len(existing_urns)} prospect(s) déjà présent(s) dans la base de données")
+            
+            new_reactions = []
+            skipped_count = 0
+            for reaction in raw_reactions:
+                reactor_urn = str(reaction.get('reactor_urn', ''))
+                if reactor_urn and reactor_urn in existing_urns:
+                    skipped_count += 1
+                    logger.debug(f"  Prospect déjà existant ignoré (skip IA): {reaction.get('reactor_name', 'Unknown')}")
+                    continue
+                new_reactions.append(reaction)
+            stage.items_out = len(new_reactions)
+        checkpoints.complete('dedup', {'reactions': new_reactions, 'skipped': skipped_count})
     
     logger.info(f"✓ {skipped_count} prospect(s) déjà existant(s) ignoré(s), {len(new_reactions)} nouveau(x) prospect(s) à analyser")
     
@@ -1433,101 +2025,51 @@ def process_radar_with_scoring(radar: Dict[str, Any],
     
     # Filtrer les concurrents si activé (sur les nouveaux prospects uniquement)
     if filter_competitors and competitors_list:
-        logger.info(f"Étape 2.5/7: Filtrage des concurrents ({len(competitors_list)} concurrent(s) à filtrer)...")
-        from utils.intelligent_scoring import filter_competitors_from_reactions
-        filtered_reactions, filtered_count = filter_competitors_from_reactions(
-            new_reactions,
-            client_id,
-            competitors_list
-        )
+        resumed = checkpoints.output('competitor_filter')
+        if resumed is not None:
+            filtered_reactions, filtered_count = resumed['reactions'], resumed['filtered']
+        else:
+            logger.info(f"Étape 2.5/7: Filtrage des concurrents ({len(competitors_list)} concurrent(s) à filtrer)...")
+            with run_stage('competitor_filter', items_in=len(new_reactions)) as stage:
+                from utils.intelligent_scoring import filter_competitors_from_reactions
+                filtered_reactions, filtered_count = filter_competitors_from_reactions(
+                    new_reactions,
+                    client_id,
+                    competitors_list
+                )
+                stage.items_out = len(filtered_reactions)
+            checkpoints.complete('competitor_filter', {'reactions': filtered_reactions, 'filtered': filtered_count})
         logger.info(f"✓ {filtered_count} prospect(s) filtré(s) (concurrents), {len(filtered_reactions)} restant(s)")
         new_reactions = filtered_reactions
     elif filter_competitors:
         logger.info("Filtrage des concurrents désactivé (aucun concurrent configuré)")
     
+    if not company_profile:
+        logger.warning("Profil entreprise non disponible, scoring désactivé")
+        # Si pas de profil, retourner toutes les réactions sans scoring
+        return raw_reactions
+    
     # ÉTAPE 3: Scoring IA uniquement sur les profils non présents
-    if company_profile:
+    resumed = checkpoints.output('scoring')
+    if resumed is not None:
+        scored_reactions = resumed['reactions']
+        run_stats['deferred'] = resumed['deferred']
+        logger.info(f"↪ Étape 3/7 reprise: {len(scored_reactions)} prospect(s) qualifié(s) avant l'interruption")
+    else:
         logger.info(f"Étape 3/7: Application du scoring IA sur {len(new_reactions)} nouveau(x) prospect(s) (seuil: {min_score_threshold})...")
-        from utils.intelligent_scoring import calculate_prospect_score_with_ai, calculate_prospect_score
-        
-        scored_reactions = []
-        scored_count = 0
-        ai_scoring_used = 0
-        fallback_scoring_used = 0
-        
-        for idx, reaction in enumerate(new_reactions, 1):
-            try:
-                # Préparer le contexte du post si disponible
-                post_context = None
-                if reaction.get('post_url'):
-                    # On pourrait enrichir avec les détails du post ici
-                    post_context = {
-                        'post_text': reaction.get('post_text', ''),
-                        'post_author': reaction.get('post_author', '')
-                    }
-                
-                # Calculer le score avec IA (avec fallback automatique si erreur)
-                scoring_result = calculate_prospect_score_with_ai(
-                    reaction,
-                    company_profile,
-                    post_context=post_context
-                )
-                
-                # Détecter si c'était un fallback (pas de reasoning = fallback)
-                if 'reasoning' in scoring_result and scoring_result.get('reasoning'):
-                    ai_scoring_used += 1
-                else:
-                    fallback_scoring_used += 1
-                
-                score = scoring_result.get('total_score', 0.0)
-                
-                # Filtrer selon le seuil
-                if score >= min_score_threshold:
-                    # Ajouter les informations de scoring à la réaction
-                    reaction['relevance_score'] = score
-                    reaction['scoring_breakdown'] = scoring_result
-                    reaction['prospect_relevant'] = True
-                    scored_reactions.append(reaction)
-                    scored_count += 1
-                    
-                    # Log tous les 20 pour ne pas surcharger
-                    if scored_count % 20 == 0:
-                        logger.info(f"  → {scored_count} prospect(s) qualifié(s) sur {idx} analysé(s)...")
-                else:
-                    logger.debug(f"Prospect filtré (score {score:.2f} < {min_score_threshold}): {reaction.get('reactor_name')}")
-                    
-            except Exception as e:
-                logger.error(f"Erreur lors du scoring pour prospect {reaction.get('reactor_name', 'Unknown')}: {e}")
-                # En cas d'erreur, utiliser le scoring classique
-                try:
-                    scoring_result = calculate_prospect_score(
-                        reaction,
-                        company_profile,
-                        post_context=None
-                    )
-                    score = scoring_result.get('total_score', 0.0)
-                    fallback_scoring_used += 1
-                    
-                    if score >= min_score_threshold:
-                        reaction['relevance_score'] = score
-                        reaction['scoring_breakdown'] = scoring_result
-                        reaction['prospect_relevant'] = True
-                        scored_reactions.append(reaction)
-                        scored_count += 1
-                except Exception as e2:
-                    logger.error(f"Erreur même avec scoring classique: {e2}")
-                    # Prospect ignoré en cas d'erreur double
-        
-        logger.info(f"✓ {len(scored_reactions)} prospect(s) qualifié(s) sur {len(new_reactions)} analysé(s)")
-        if ai_scoring_used > 0:
-            logger.info(f"  → Scoring IA utilisé: {ai_scoring_used} prospect(s)")
-        if fallback_scoring_used > 0:
-            logger.info(f"  → Scoring classique (fallback): {fallback_scoring_used} prospect(s)")
-        
-        # ÉTAPE 4: Filtrage des profils qualifiés (score >= seuil) - déjà fait dans la boucle
-        # Les réactions dans scored_reactions ont déjà score >= min_score_threshold
-        
-        # ÉTAPE 5: Application de la limite sur les qualifiés (triés par score décroissant)
+        with run_stage('scoring', items_in=len(new_reactions)) as stage:
+            scored_reactions = _score_reactions(radar, client_id, new_reactions, company_profile, min_score_threshold,
+                                                scoring_mode, allow_deferred_scoring, run_stats)
+            stage.items_out = len(scored_reactions)
+        checkpoints.complete('scoring', {'reactions': scored_reactions, 'deferred': run_stats['deferred']})
+    if run_stats['deferred']:
+        return []
+    
+    # ÉTAPE 4: Filtrage des profils qualifiés (score >= seuil) - déjà fait pendant le scoring
+    
+    # ÉTAPE 5: Application de la limite sur les qualifiés (triés par score décroissant)
+    # Sans appel externe : recalculée depuis la sortie du scoring lors d'une reprise
+    with run_stage('limit', items_in=len(scored_reactions)) as stage:
         if max_qualified_prospects and len(scored_reactions) > max_qualified_prospects:
             logger.info(f"Étape 5/7: Application de la limite ({max_qualified_prospects} prospect(s) qualifié(s) maximum)...")
             # Trier par score décroissant pour garder les meilleurs
@@ -1535,123 +2077,99 @@ def process_radar_with_scoring(radar: Dict[str, Any],
             limited_reactions = scored_reactions[:max_qualified_prospects]
             logger.info(f"✓ {max_qualified_prospects} prospect(s) qualifié(s) retenu(s) sur {len(scored_reactions)} qualifié(s)")
             scored_reactions = limited_reactions
-        
-        # ÉTAPE 6: Enrichissement des profils qualifiés avec get_profile
-        if scored_reactions:
+        stage.items_out = len(scored_reactions)
+    
+    if not scored_reactions:
+        return scored_reactions
+    
+    # ÉTAPE 6: Enrichissement des profils qualifiés avec get_profile
+    resumed = checkpoints.output('profile_enrichment')
+    if resumed is not None:
+        scored_reactions, enriched_count = resumed['reactions'], resumed['enriched']
+    else:
+        progress = checkpoints.progress('profile_enrichment')
+        start, enriched_count = 0, 0
+        if progress is not None:
+            scored_reactions, start, enriched_count = progress['reactions'], progress['done'], progress['enriched']
+            logger.info(f"↪ Étape 6/7 reprise au profil {start + 1}/{len(scored_reactions)}")
+        else:
             logger.info(f"Étape 6/7: Enrichissement des {len(scored_reactions)} prospect(s) qualifié(s) avec get_profile...")
-            enriched_reactions = []
-            for idx, reaction in enumerate(scored_reactions, 1):
+        with run_stage('profile_enrichment', items_in=len(scored_reactions)) as stage:
+            for idx, reaction in enumerate(scored_reactions[start:], start + 1):
                 try:
-                    reactor_urn = str(reaction.get('reactor_urn', ''))
-                    profile_url = reaction.get('profile_url', '')
-                    
-                    # Extraire le username pour l'API
-                    username = extract_username_from_url(profile_url) if profile_url else None
-                    if not username and reactor_urn:
-                        # Si on a un URN, on peut essayer de l'utiliser
-                        username = reactor_urn.split(':')[-1] if ':' in reactor_urn else reactor_urn
-                    
-                    if username:
-                        # Appel API get_profile pour enrichir
-                        profile_detail = get_profile_detail(username)
-                        if profile_detail:
-                            # Enrichir la réaction avec les détails du profil
-                            reaction['enriched_profile'] = profile_detail
-                            logger.debug(f"  ✓ Profil enrichi: {reaction.get('reactor_name', 'Unknown')}")
-                            
-                            # ÉTAPE 7: Enrichissement des données d'entreprise
-                            # Extraire l'URN et le nom de l'entreprise depuis basic_info (priorité à l'URN)
-                            company_urn = None
-                            company_name = None
-                            company_identifier = None
-                            
-                            # Les données enrichies sont dans basic_info
-                            basic_info = profile_detail.get('basic_info', {}) if isinstance(profile_detail, dict) else {}
-                            
-                            if basic_info and isinstance(basic_info, dict):
-                                # Priorité 1: URN de l'entreprise (le plus fiable)
-                                company_urn = basic_info.get('current_company_urn')
-                                company_name = basic_info.get('current_company')
-                            
-                            # Fallback: chercher dans experience
-                            if not company_urn and profile_detail.get('experience') and isinstance(profile_detail.get('experience'), list):
-                                for exp in profile_detail.get('experience', []):
-                                    if isinstance(exp, dict) and exp.get('is_current', False):
-                                        company_urn = exp.get('company_id')  # company_id est l'URN
-                                        if not company_name:
-                                            company_name = exp.get('company')
-                                        break
-                            
-                            # Fallback: nom de l'entreprise seulement
-                            if not company_name:
-                                if profile_detail.get('current_company'):
-                                    company_name = profile_detail.get('current_company')
-                                elif profile_detail.get('company'):
-                                    company_name = profile_detail.get('company')
-                            
-                            # Utiliser aussi le detected_company depuis la réaction originale
-                            if not company_name:
-                                company_name = reaction.get('detected_company') or reaction.get('company_name')
-                            
-                            if company_urn or company_name:
-                                # Utiliser l'URN comme identifiant principal si disponible, sinon le nom
-                                if company_urn:
-                                    company_identifier = str(company_urn)
-                                else:
-                                    company_identifier = company_name.lower().strip()
-                                
-                                # Vérifier si l'entreprise existe déjà en DB
-                                company_detail = get_company_detail_from_db(company_identifier)
-                                
-                                if not company_detail:
-                                    # Appel API pour récupérer les détails de l'entreprise
-                                    # Prioriser l'URN si disponible (plus fiable que le nom)
-                                    api_identifier = company_urn if company_urn else company_name
-                                    logger.debug(f"  → Récupération des détails de l'entreprise: {api_identifier} (URN: {company_urn or 'N/A'}, Nom: {company_name or 'N/A'})")
-                                    company_detail = get_company_detail(api_identifier)
-                                    
-                                    if company_detail:
-                                        # Sauvegarder en DB avec l'URN comme identifiant si disponible
-                                        save_company_detail(company_identifier, company_name or 'Unknown', company_detail)
-                                        logger.debug(f"  ✓ Entreprise enrichie et sauvegardée: {company_name or company_urn}")
-                                    else:
-                                        logger.debug(f"  ✗ Impossible de récupérer les détails de l'entreprise: {api_identifier}")
-                                else:
-                                    logger.debug(f"  ✓ Entreprise trouvée en DB (pas d'appel API): {company_name or company_urn}")
-                                
-                                # Ajouter les données d'entreprise à la réaction
-                                if company_detail:
-                                    reaction['enriched_company'] = company_detail
-                            
-                            # Mettre à jour profile_url avec le vrai slug depuis basic_info
-                            if basic_info and isinstance(basic_info, dict):
-                                enriched_profile_url = basic_info.get('profile_url')
-                                if enriched_profile_url:
-                                    # Normaliser l'URL (linkedin.com -> www.linkedin.com)
-                                    if enriched_profile_url.startswith('https://linkedin.com'):
-                                        enriched_profile_url = enriched_profile_url.replace('https://linkedin.com', 'https://www.linkedin.com')
-                                    reaction['profile_url'] = enriched_profile_url
-                                    logger.debug(f"  ✓ Profile URL mis à jour avec le slug: {enriched_profile_url}")
-                        else:
-                            logger.debug(f"  ✗ Impossible d'enrichir: {reaction.get('reactor_name', 'Unknown')}")
-                    
-                    enriched_reactions.append(reaction)
-                    
-                    # Log tous les 10 pour ne pas surcharger
-                    if idx % 10 == 0:
-                        logger.info(f"  → {idx}/{len(scored_reactions)} profil(s) enrichi(s)...")
-                        
+                    if _enrich_profile(reaction):
+                        enriched_count += 1
                 except Exception as e:
-                    logger.error(f"Erreur lors de l'enrichissement du profil {reaction.get('reactor_name', 'Unknown')}: {e}")
                     # Continuer même en cas d'erreur d'enrichissement
-                    enriched_reactions.append(reaction)
-            
-            logger.info(f"✓ {len(enriched_reactions)} prospect(s) qualifié(s) enrichi(s)")
-            return enriched_reactions
-        
-        return scored_reactions
+                    logger.error(f"Erreur lors de l'enrichissement du profil {reaction.get('reactor_name', 'Unknown')}: {e}")
+                    count_error()
+                checkpoints.save_progress('profile_enrichment',
+                                          {'done': idx, 'reactions': scored_reactions, 'enriched': enriched_count})
+                
+                # Log tous les 10 pour ne pas surcharger
+                if idx % 10 == 0:
+                    logger.info(f"  → {idx}/{len(scored_reactions)} profil(s) enrichi(s)...")
+            stage.items_out = enriched_count
+        checkpoints.complete('profile_enrichment', {'reactions': scored_reactions, 'enriched': enriched_count})
+    
+    # ÉTAPE 7: Enrichissement des données d'entreprise des profils enrichis
+    resumed = checkpoints.output('company_enrichment')
+    if resumed is not None:
+        logger.info(f"↪ Étape 7/7 terminée avant l'interruption: {len(resumed['reactions'])} prospect(s) qualifié(s) enrichi(s)")
+        return resumed['reactions']
+    progress = checkpoints.progress('company_enrichment')
+    start, company_count = 0, 0
+    if progress is not None:
+        scored_reactions, start, company_count = progress['reactions'], progress['done'], progress['companies']
+    profiled_reactions = [reaction for reaction in scored_reactions if reaction.get('enriched_profile')]
+    if progress is not None:
+        logger.info(f"↪ Étape 7/7 reprise à l'entreprise {start + 1}/{len(profiled_reactions)}")
     else:
-        logger.warning("Profil entreprise non disponible, scoring désactivé")
-    
-    # Si pas de profil, retourner toutes les réactions sans scoring
-    return raw_reactions
+        logger.info(f"Étape 7/7: Enrichissement des entreprises de {len(profiled_reactions)} profil(s) enrichi(s)...")
+    with run_stage('company_enrichment', items_in=len(profiled_reactions)) as stage:
+        for idx, reaction in enumerate(profiled_reactions[start:], start + 1):
+            try:
+                if _enrich_company(reaction):
+                    company_count += 1
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enrichissement de l'entreprise de {reaction.get('reactor_name', 'Unknown')}: {e}")
+                count_error()
+            checkpoints.save_progress('company_enrichment',
+                                      {'done': idx, 'reactions': scored_reactions, 'companies': company_count})
+        stage.items_out = company_count
+    checkpoints.complete('company_enrichment', {'reactions': scored_reactions})
+    
+    logger.info(f"✓ {len(scored_reactions)} prospect(s) qualifié(s) enrichi(s) ({enriched_count} profil(s), {company_count} entreprise(s))")
+    return scored_reactions
+
+
+def reaction_to_record(reaction: Dict[str, Any], radar_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Convertit une réaction scorée (sortie de process_radar_with_scoring) en enregistrement pour save_reaction
+
+    Les données enrichies (profil, entreprise) sont conservées dans le détail du scoring.
+    """
+    scoring_breakdown = dict(reaction.get('scoring_breakdown') or {})
+    if reaction.get('enriched_profile'):
+        scoring_breakdown['enriched_profile'] = reaction['enriched_profile']
+    if reaction.get('enriched_company'):
+        scoring_breakdown['enriched_company'] = reaction['enriched_company']
+
+    return {
+        'company_name': reaction.get('company_name') or reaction.get('keyword') or '',
+        'post_url': reaction.get('post_url', ''),
+        'post_date': reaction.get('post_date', ''),
+        'reactor_name': reaction.get('reactor_name', ''),
+        'reactor_urn': reaction.get('reactor_urn', ''),
+        'profile_url': reaction.get('profile_url', ''),  # profile_url enrichi (vrai slug) si disponible
+        'reaction_type': reaction.get('reaction_type', ''),
+        'headline': reaction.get('headline', ''),
+        'profile_picture_url': reaction.get('profile_picture_url', ''),
+        'post_relevant': False,
+        'prospect_relevant': reaction.get('prospect_relevant', False),
+        'relevance_score': reaction.get('relevance_score', 0.0),
+        'relevance_reasoning': json.dumps(scoring_breakdown) if scoring_breakdown else '',
+        'personalized_message': '',
+        'persona_version': reaction.get('persona_version'),
+        'radar_id': radar_id
+    }
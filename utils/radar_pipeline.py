@@ -0,0 +1,385 @@
+"""
+Pipeline en flux des exécutions de radars
+Les étapes (collecte, déduplication, filtrage des concurrents, scoring, enrichissement des profils
+et des entreprises, sauvegarde) tournent chacune dans un thread, reliées par des files bornées :
+les pages de réactions avancent dans le pipeline dès leur récupération, les prospects qualifiés
+sont sauvegardés dès qu'ils sont enrichis, et la mémoire est bornée par la taille des files
+(et non plus par le nombre de réactions de l'exécution)
+"""
+import contextvars
+import json
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+from utils.run_checkpoints import RunCheckpoints
+from utils.run_history import run_stage, current_checkpoints, count_error
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "radar_pipeline" de config.json)
+DEFAULT_PIPELINE_CONFIG = {
+    # Exécute les radars en flux (sinon étape par étape, sur toutes les réactions à la fois)
+    'streaming': True,
+    # Lots en attente entre deux étapes : une étape en avance attend que la suivante consomme
+    'queue_size': 4
+}
+
+# Point de reprise du pipeline en flux : prospects scorés sous le seuil (non rescorés à la reprise)
+STREAM_CHECKPOINT = 'stream'
+
+# Fin du flux d'une étape
+_END = object()
+
+
+def load_pipeline_config() -> Dict[str, Any]:
+    """Configuration du pipeline (clé "radar_pipeline" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_PIPELINE_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('radar_pipeline', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration radar_pipeline: {e}")
+    return config
+
+
+def should_stream(radar: Dict[str, Any], company_profile: Optional[Dict[str, Any]], allow_deferred_scoring: bool,
+                  checkpoints: RunCheckpoints, config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Indique si l'exécution passe par le pipeline en flux
+
+    Le pipeline par lots reste utilisé sans profil entreprise (pas de scoring), en mode batch
+    planifié (un seul lot OpenAI par exécution) et pour reprendre une exécution interrompue
+    du pipeline par lots.
+    """
+    config = config or load_pipeline_config()
+    if not config['streaming'] or not company_profile:
+        return False
+    if allow_deferred_scoring and radar.get('scoring_mode') == 'batch':
+        return False
+    return not (checkpoints.stages - {STREAM_CHECKPOINT})
+
+
+class PipelineStopped(Exception):
+    """Étape arrêtée par l'erreur d'une autre étape du pipeline"""
+
+    def __init__(self):
+        super().__init__("Pipeline interrompu par l'erreur d'une autre étape")
+
+
+class RadarPipeline:
+    """
+    Pipeline en flux d'une exécution de radar
+
+    Chaque étape lit des lots de réactions dans sa file d'entrée et écrit ses lots dans la file
+    de l'étape suivante. Une erreur dans une étape arrête toutes les autres et est relevée par
+    run() ; la limite de prospects qualifiés arrête la collecte des pages suivantes.
+
+    Exemple:
+        pipeline = RadarPipeline(radar, client_id, company_profile, competitors, min_score_threshold=0.6)
+        outcome = pipeline.run()
+    """
+
+    def __init__(self, radar: Dict[str, Any], client_id: int, company_profile: Dict[str, Any],
+                 competitors_list: Optional[List[Dict[str, Any]]] = None, min_score_threshold: float = 0.6,
+                 filter_competitors: bool = True, max_qualified_prospects: Optional[int] = None,
+                 scoring_mode: Optional[str] = None, run_stats: Optional[Dict[str, Any]] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        self.radar = radar
+        self.client_id = client_id
+        self.company_profile = company_profile
+        self.competitors_list = competitors_list
+        self.min_score_threshold = min_score_threshold
+        self.filter_competitors = filter_competitors
+        self.max_qualified_prospects = max_qualified_prospects
+        self.scoring_mode = scoring_mode
+        self.run_stats = run_stats if run_stats is not None else {}
+        self.config = config or load_pipeline_config()
+        self.checkpoints = current_checkpoints()
+
+        self.qualified = 0
+        self.saved = 0
+        # Prospects scorés sous le seuil (point de reprise)
+        self.rejected: List[str] = []
+
+        self._stop = threading.Event()
+        self._enough = threading.Event()
+        self._errors: List[BaseException] = []
+        self._threads: List[threading.Thread] = []
+
+    # ---------- Files et threads ----------
+
+    def _put(self, outbox: queue.Queue, batch: Any):
+        while not self._stop.is_set():
+            try:
+                outbox.put(batch, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+        raise PipelineStopped()
+
+    def _get(self, inbox: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        raise PipelineStopped()
+
+    def _batches(self, inbox: queue.Queue, coalesce: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """Lots de la file d'entrée jusqu'à la fin du flux (coalesce: regroupe les lots déjà en attente)"""
+        while True:
+            batch = self._get(inbox)
+            if batch is _END:
+                return
+            ended = False
+            while coalesce and not ended:
+                try:
+                    pending = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is _END:
+                    ended = True
+                else:
+                    batch = batch + pending
+            yield batch
+            if ended:
+                return
+
+    def _start(self, name: str, target, inbox: Optional[queue.Queue], outbox: Optional[queue.Queue]):
+        # Copie du contexte : exécution en cours (historique, points de reprise) et contexte LLM
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                context.run(target, inbox, outbox)
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                logger.error(f"❌ Étape '{name}' du pipeline en erreur: {e}")
+                self._errors.append(e)
+                self._stop.set()
+
+        thread = threading.Thread(target=run, name=f"radar-{self.radar.get('id')}-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def run(self) -> Dict[str, int]:
+        """
+        Exécute le pipeline jusqu'à la sauvegarde du dernier prospect qualifié
+
+        Returns:
+            Dict avec le nombre de réactions collectées, de prospects qualifiés et sauvegardés
+        """
+        self.run_stats.update({'post_urls': [], 'reactions': 0, 'reactor_urns': [], 'deferred': 0})
+
+        progress = self.checkpoints.progress(STREAM_CHECKPOINT)
+        if progress is not None:
+            self.rejected = list(progress['rejected'])
+            logger.info(f"↪ Reprise en flux: {len(self.rejected)} prospect(s) déjà scoré(s) sous le seuil ignoré(s)")
+
+        stages = [('fetch', self._fetch), ('dedup', self._dedup)]
+        if self.filter_competitors and self.competitors_list:
+            stages.append(('competitor_filter', self._competitor_filter))
+        stages += [('scoring', self._score), ('profile_enrichment', self._enrich_profiles),
+                   ('company_enrichment', self._enrich_companies), ('persist', self._persist)]
+
+        inbox = None
+        for idx, (name, target) in enumerate(stages):
+            outbox = queue.Queue(maxsize=int(self.config['queue_size'])) if idx < len(stages) - 1 else None
+            self._start(name, target, inbox, outbox)
+            inbox = outbox
+
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+        logger.info(f"✓ {self.run_stats['reactions']} réaction(s) collectée(s), {self.qualified} prospect(s) "
+                    f"qualifié(s), {self.saved} sauvegardé(s)")
+        return {'reactions': self.run_stats['reactions'], 'qualified': self.qualified, 'saved': self.saved}
+
+    # ---------- Étapes ----------
+
+    def _fetch(self, inbox, outbox: queue.Queue):
+        from utils.post_relevance import make_post_gate
+        from utils.radar_manager import iter_radar_reaction_pages
+
+        # Filtre de pertinence des posts : les réactions des posts sous le seuil du radar sont ignorées
+        post_gate = make_post_gate(self.client_id, self.company_profile, self.radar.get('post_relevance_threshold'))
+        if post_gate:
+            logger.info(f"  → Filtre de pertinence des posts actif (seuil: {self.radar.get('post_relevance_threshold')})")
+
+        post_urls: Dict[str, None] = {}
+        reactor_urns: Dict[str, None] = {}
+        with run_stage('fetch') as stage:
+            stage.items_out = 0
+            for page in iter_radar_reaction_pages(self.radar, post_gate=post_gate):
+                post_urls.update(dict.fromkeys(r['post_url'] for r in page if r.get('post_url')))
+                reactor_urns.update(dict.fromkeys(str(r['reactor_urn']) for r in page if r.get('reactor_urn')))
+                self.run_stats['reactions'] += len(page)
+                stage.items_out += len(page)
+                self._put(outbox, page)
+                if self._enough.is_set():
+                    logger.info("  → Limite de prospects qualifiés atteinte: pages suivantes non récupérées")
+                    break
+        self.run_stats['post_urls'] = list(post_urls)
+        self.run_stats['reactor_urns'] = list(reactor_urns)
+        self._put(outbox, _END)
+
+    def _dedup(self, inbox: queue.Queue, outbox: queue.Queue):
+        from utils.database import get_existing_prospect_urns
+
+        # Prospects déjà en base, déjà vus dans l'exécution ou déjà scorés sous le seuil avant une reprise
+        seen = get_existing_prospect_urns(self.client_id) | set(self.rejected)
+        with run_stage('dedup') as stage:
+            stage.items_in = stage.items_out = 0
+            for page in self._batches(inbox):
+                stage.items_in += len(page)
+                if self._enough.is_set():
+                    continue
+                new_reactions = []
+                for reaction in page:
+                    reactor_urn = str(reaction.get('reactor_urn', ''))
+                    if reactor_urn and reactor_urn in seen:
+                        continue
+                    if reactor_urn:
+                        seen.add(reactor_urn)
+                    new_reactions.append(reaction)
+                stage.items_out += len(new_reactions)
+                if new_reactions:
+                    self._put(outbox, new_reactions)
+        self._put(outbox, _END)
+
+    def _competitor_filter(self, inbox: queue.Queue, outbox: queue.Queue):
+        from utils.intelligent_scoring import filter_competitors_from_reactions
+
+        with run_stage('competitor_filter') as stage:
+            stage.items_in = stage.items_out = 0
+            for page in self._batches(inbox):
+                stage.items_in += len(page)
+                if self._enough.is_set():
+                    continue
+                filtered_reactions, _ = filter_competitors_from_reactions(page, self.client_id, self.competitors_list)
+                stage.items_out += len(filtered_reactions)
+                if filtered_reactions:
+                    self._put(outbox, filtered_reactions)
+        self._put(outbox, _END)
+
+    def _score(self, inbox: queue.Queue, outbox: queue.Queue):
+        from utils.radar_manager import _score_reactions
+
+        with run_stage('scoring') as stage:
+            stage.items_in = stage.items_out = 0
+            for page in self._batches(inbox):
+                stage.items_in += len(page)
+                if self._enough.is_set():
+                    continue
+                qualified = _score_reactions(self.radar, self.client_id, page, self.company_profile,
+                                             self.min_score_threshold, self.scoring_mode, False, {}, checkpoint=False)
+                qualified_ids = {id(reaction) for reaction in qualified}
+                self.rejected.extend(str(reaction['reactor_urn']) for reaction in page
+                                     if id(reaction) not in qualified_ids and reaction.get('reactor_urn'))
+
+                # Limite des qualifiés : meilleurs scores de la page qui atteint la limite, collecte arrêtée
+                if self.max_qualified_prospects:
+                    remaining = self.max_qualified_prospects - self.qualified
+                    if len(qualified) >= remaining:
+                        qualified.sort(key=lambda x: x.get('relevance_score', 0.0), reverse=True)
+                        qualified = qualified[:remaining]
+                        self._enough.set()
+                        logger.info(f"✓ Limite de {self.max_qualified_prospects} prospect(s) qualifié(s) atteinte")
+
+                self.qualified += len(qualified)
+                stage.items_out += len(qualified)
+                self.checkpoints.save_progress(STREAM_CHECKPOINT, {'rejected': self.rejected})
+                if qualified:
+                    self._put(outbox, qualified)
+        self._put(outbox, _END)
+
+    def _enrich_profiles(self, inbox: queue.Queue, outbox: queue.Queue):
+        from utils.radar_manager import _enrich_profile
+
+        with run_stage('profile_enrichment') as stage:
+            stage.items_in = stage.items_out = 0
+            for batch in self._batches(inbox):
+                for reaction in batch:
+                    stage.items_in += 1
+                    try:
+                        if _enrich_profile(reaction):
+                            stage.items_out += 1
+                    except Exception as e:
+                        # Continuer même en cas d'erreur d'enrichissement
+                        logger.error(f"Erreur lors de l'enrichissement du profil {reaction.get('reactor_name', 'Unknown')}: {e}")
+                        count_error()
+                    # Prospect transmis dès son enrichissement (sans attendre le reste de la page)
+                    self._put(outbox, [reaction])
+        self._put(outbox, _END)
+
+    def _enrich_companies(self, inbox: queue.Queue, outbox: queue.Queue):
+        from utils.radar_manager import _enrich_company
+
+        with run_stage('company_enrichment') as stage:
+            stage.items_in = stage.items_out = 0
+            for batch in self._batches(inbox):
+                for reaction in batch:
+                    if reaction.get('enriched_profile'):
+                        stage.items_in += 1
+                        try:
+                            if _enrich_company(reaction):
+                                stage.items_out += 1
+                        except Exception as e:
+                            logger.error(f"Erreur lors de l'enrichissement de l'entreprise de {reaction.get('reactor_name', 'Unknown')}: {e}")
+                            count_error()
+                    self._put(outbox, [reaction])
+        self._put(outbox, _END)
+
+    def _persist(self, inbox: queue.Queue, outbox):
+        from utils.radar_service import persist_radar_reactions
+
+        with run_stage('persist') as stage:
+            stage.items_in = stage.items_out = 0
+            # Les prospects en attente sont sauvegardés ensemble
+            for batch in self._batches(inbox, coalesce=True):
+                saved_count = persist_radar_reactions(self.client_id, self.radar.get('id'), batch)
+                stage.items_in += len(batch)
+                stage.items_out += saved_count
+                self.saved += saved_count
+
+
+def stream_radar_with_scoring(radar: Dict[str, Any], client_id: int, company_profile: Dict[str, Any],
+                              competitors_list: Optional[List[Dict[str, Any]]] = None,
+                              min_score_threshold: float = 0.6, filter_competitors: bool = True,
+                              max_qualified_prospects: Optional[int] = None, scoring_mode: Optional[str] = None,
+                              run_stats: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    Traite un radar en flux : scoring, enrichissement et sauvegarde des prospects qualifiés
+    au fur et à mesure de la collecte des pages
+
+    Équivalent en flux de process_radar_with_scoring suivi de persist_radar_reactions. La limite de
+    prospects qualifiés est atteinte dans l'ordre de collecte (meilleurs scores de la dernière page)
+    et arrête la collecte ; les prospects sous le seuil sont enregistrés comme point de reprise.
+
+    Args:
+        radar: Dictionnaire contenant les informations du radar
+        client_id: ID du client
+        company_profile: Profil entreprise
+        competitors_list: Liste des concurrents
+        min_score_threshold: Score minimum pour qualifier
+        filter_competitors: Activer le filtrage des concurrents
+        max_qualified_prospects: Nombre maximum de prospects qualifiés (None = illimité)
+        scoring_mode: Mode de scoring (voir SCORING_MODES, défaut: celui du radar ou 'ai')
+        run_stats: Dict complété avec le rendement de l'exécution (post_urls, reactions, reactor_urns, deferred)
+
+    Returns:
+        Dict avec le nombre de réactions collectées, de prospects qualifiés et sauvegardés
+    """
+    logger.info(f"Traitement en flux du radar: {radar.get('name', 'Unknown')} (ID: {radar.get('id')})")
+    pipeline = RadarPipeline(radar, client_id, company_profile, competitors_list, min_score_threshold,
+                             filter_competitors, max_qualified_prospects, scoring_mode, run_stats)
+    return pipeline.run()
@@ -1,36 +1,92 @@
 """
 Module de scheduling automatique pour les radars LinkedIn
-Utilise APScheduler pour exécuter automatiquement les radars selon leur configuration
+Utilise APScheduler pour déclencher automatiquement les radars selon leur configuration :
+chaque déclenchement ajoute l'exécution du radar à la file de tâches (utils.task_queue)
+Les jobs sont persistés dans la base SQLite (table scheduler_jobs) : un redémarrage reprend
+la planification existante, et les exécutions manquées pendant l'arrêt sont regroupées
+en une seule exécution de rattrapage par radar (job ponctuel), étalée dans le temps
 """
+import json
 import logging
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional, List
 
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING, STATE_STOPPED
     from apscheduler.triggers.interval import IntervalTrigger
     from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.date import DateTrigger
     APSCHEDULER_AVAILABLE = True
 except ImportError:
     APSCHEDULER_AVAILABLE = False
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.database import get_scheduled_radars, get_radar, update_radar_last_run
-from utils.radar_manager import process_radar_with_scoring
-from utils.database import get_client, get_client_profile_as_dict, get_competitors
+from utils.database import get_scheduled_radars, get_radar, get_lease
+from utils.leader_election import LeaderElection
+from utils.task_queue import enqueue_radar_run
+from utils.schedule_planner import load_planner_config, choose_phase, next_slot, trigger_phase
+from utils.adaptive_schedule import effective_schedule
 
 logger = logging.getLogger(__name__)
 
-# Scheduler global
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Scheduler global (les jobs sont dans la table scheduler_jobs)
 scheduler = None
-job_ids = {}  # Mapping radar_id -> job_id
+
+# Élection du leader : seul le processus qui détient le bail déclenche les jobs
+leader_election = None
+LEADER_LEASE_NAME = "scheduler"
+
+# Préfixe des IDs de jobs des radars (radar_<id>)
+RADAR_JOB_PREFIX = "radar_"
+
+# Préfixe des IDs des jobs ponctuels de rattrapage (catchup_radar_<id>) : le job d'intervalle
+# du radar reste sur la grille de sa phase
+CATCHUP_JOB_PREFIX = "catchup_radar_"
+
+# Configuration par défaut (clé "scheduler" de config.json)
+DEFAULT_SCHEDULER_CONFIG = {
+    # Retard maximum toléré pour une exécution (au-delà, elle est sautée jusqu'à la suivante)
+    'misfire_grace_seconds': 3600,
+    # Écart entre les exécutions de rattrapage des radars en retard au démarrage
+    'catchup_stagger_seconds': 30,
+    # Bail du leader et fréquence de renouvellement (un autre processus reprend la main
+    # au plus leader_lease_seconds + leader_renew_seconds après l'arrêt du leader)
+    'leader_lease_seconds': 15,
+    'leader_renew_seconds': 5
+}
+
+# Job de recalcul progressif des scores obsolètes
+STALE_RESCORING_JOB_ID = "stale_rescoring"
+
+# Job de suivi des lots de scoring OpenAI (API Batch)
+BATCH_POLLING_JOB_ID = "llm_batch_polling"
+
+
+def load_scheduler_config() -> Dict[str, Any]:
+    """Configuration du scheduler (clé "scheduler" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_SCHEDULER_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('scheduler', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration du scheduler: {e}")
+    return config
 
 
 def get_scheduler() -> Optional[Any]:
-    """Retourne le scheduler global ou en crée un nouveau"""
+    """
+    Retourne le scheduler global ou en crée un nouveau
+    
+    Le scheduler est démarré en pause : les jobs persistés peuvent être lus et modifiés
+    (page Radars, CLI) sans être exécutés ; seul start_scheduler() lance les exécutions.
+    """
     global scheduler
     
     if not APSCHEDULER_AVAILABLE:
@@ -38,49 +94,116 @@ def get_scheduler() -> Optional[Any]:
         return None
     
     if scheduler is None:
+        from utils.scheduler_jobstore import SQLiteJobStore
+        config = load_scheduler_config()
         scheduler = BackgroundScheduler(
+            jobstores={'default': SQLiteJobStore()},
+            job_defaults={
+                # Plusieurs échéances manquées = une seule exécution
+                'coalesce': True,
+                'max_instances': 1,
+                'misfire_grace_time': int(config['misfire_grace_seconds'])
+            },
             daemon=True,
             timezone='UTC'
         )
+        scheduler.start(paused=True)
     
     return scheduler
 
 
-def calculate_next_run_time(schedule_type: str, schedule_interval: int) -> datetime:
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_run_time(value: str) -> datetime:
+    """Convertit une date enregistrée (ISO, heure locale si sans fuseau) en datetime UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed.astimezone(timezone.utc)
+
+
+def schedule_interval_delta(schedule_type: str, schedule_interval: int) -> Optional[timedelta]:
+    """Intervalle entre deux exécutions (None si le type de planification est invalide)"""
+    if schedule_type in ('minutes', 'hours', 'days') and schedule_interval and schedule_interval > 0:
+        return timedelta(**{schedule_type: schedule_interval})
+    return None
+
+
+def calculate_next_run_time(schedule_type: str, schedule_interval: int,
+                            last_scheduled_run: Optional[str] = None) -> datetime:
     """
-    Calcule la prochaine heure d'exécution
+    Calcule la prochaine heure d'exécution à partir de la dernière exécution planifiée
     
     Args:
         schedule_type: Type de planification ('minutes', 'hours', 'days')
         schedule_interval: Intervalle en minutes/heures/jours
+        last_scheduled_run: Date de la dernière exécution planifiée (radars.last_scheduled_run)
     
     Returns:
-        datetime de la prochaine exécution
+        datetime (UTC) de la prochaine exécution, maintenant si le radar n'a jamais été exécuté
     """
-    now = datetime.now()
-    
-    if schedule_type == 'minutes':
-        return now + timedelta(minutes=schedule_interval)
-    elif schedule_type == 'hours':
-        return now + timedelta(hours=schedule_interval)
-    elif schedule_type == 'days':
-        return now + timedelta(days=schedule_interval)
-    else:
+    now = _now()
+    interval = schedule_interval_delta(schedule_type, schedule_interval)
+    if not interval or not last_scheduled_run:
+        return now
+    
+    try:
+        return _parse_run_time(last_scheduled_run) + interval
+    except ValueError:
+        logger.warning(f"Date de dernière exécution invalide: {last_scheduled_run}")
         return now
 
 
-def schedule_radar(radar_id: int) -> bool:
+def _radar_job_id(radar_id: int) -> str:
+    return f"{RADAR_JOB_PREFIX}{radar_id}"
+
+
+def _catchup_job_id(radar_id: int) -> str:
+    return f"{CATCHUP_JOB_PREFIX}{radar_id}"
+
+
+def _schedule_catchup(scheduler_obj, radar_id: int, name: str, run_time: datetime) -> None:
+    """Planifie l'exécution de rattrapage ponctuelle d'un radar (remplace celle déjà planifiée)"""
+    scheduler_obj.add_job(
+        run_radar_job,
+        trigger=DateTrigger(run_date=run_time, timezone='UTC'),
+        args=[radar_id],
+        id=_catchup_job_id(radar_id),
+        name=f"{name} (rattrapage)",
+        replace_existing=True
+    )
+
+
+def _planned_radar_phases(scheduler_obj, exclude_job_id: Optional[str] = None) -> List[tuple]:
+    """Phases (phase, intervalle en secondes) des radars déjà planifiés"""
+    phases = []
+    for job in scheduler_obj.get_jobs():
+        if not job.id.startswith(RADAR_JOB_PREFIX) or job.id == exclude_job_id:
+            continue
+        interval_seconds = int(getattr(job.trigger, 'interval_length', 0) or 0)
+        start_date = getattr(job.trigger, 'start_date', None)
+        if interval_seconds > 0 and start_date:
+            phases.append((trigger_phase(start_date, interval_seconds), interval_seconds))
+    return phases
+
+
+def schedule_radar(radar_id: int, replan: bool = False) -> bool:
     """
     Planifie un radar selon sa configuration
     
+    Un job persisté dont l'intervalle n'a pas changé est conservé tel quel (pas de replanification
+    au redémarrage). Sinon le radar reçoit une phase stable dans son intervalle (voir
+    utils.schedule_planner) et sa première exécution est le premier créneau de cette phase
+    après last_scheduled_run + intervalle. Un radar en mode adaptatif est planifié selon son
+    intervalle effectif (voir utils.adaptive_schedule).
+    
     Args:
         radar_id: ID du radar
+        replan: Recalcule la phase même si le job existe déjà avec le même intervalle
     
     Returns:
         True si planifié avec succès, False sinon
     """
-    global job_ids
-    
     scheduler_obj = get_scheduler()
     if not scheduler_obj:
         return False
@@ -90,42 +213,51 @@ def schedule_radar(radar_id: int) -> bool:
         logger.error(f"Radar {radar_id} introuvable")
         return False
     
-    schedule_type = radar.get('schedule_type', 'manual')
-    schedule_interval = radar.get('schedule_interval', 0)
+    schedule_type, schedule_interval = effective_schedule(radar)
     
     if schedule_type == 'manual' or schedule_interval <= 0:
         logger.info(f"Radar {radar_id} n'a pas de scheduling configuré")
         return False
     
-    # Retirer le job existant s'il existe
-    unschedule_radar(radar_id)
-    
-    # Créer le trigger selon le type
-    if schedule_type == 'minutes':
-        trigger = IntervalTrigger(minutes=schedule_interval)
-    elif schedule_type == 'hours':
-        trigger = IntervalTrigger(hours=schedule_interval)
-    elif schedule_type == 'days':
-        trigger = IntervalTrigger(days=schedule_interval)
-    else:
+    interval = schedule_interval_delta(schedule_type, schedule_interval)
+    if not interval:
         logger.error(f"Type de scheduling invalide: {schedule_type}")
         return False
     
-    # Créer le job
-    job_id = f"radar_{radar_id}"
+    # Job déjà persisté avec le même intervalle : sa prochaine exécution est conservée
+    job_id = _radar_job_id(radar_id)
+    existing_job = scheduler_obj.get_job(job_id)
+    if not replan and existing_job and getattr(existing_job.trigger, 'interval', None) == interval:
+        logger.info(f"Radar {radar_id} déjà planifié, prochaine exécution: {existing_job.next_run_time}")
+        return True
+    
+    # Phase du radar dans son intervalle, en tenant compte des démarrages déjà planifiés
+    interval_seconds = int(interval.total_seconds())
+    now = _now()
+    phase = choose_phase(radar_id, interval_seconds, _planned_radar_phases(scheduler_obj, job_id),
+                         load_planner_config(), now)
+    earliest = calculate_next_run_time(schedule_type, schedule_interval, radar.get('last_scheduled_run'))
+    slot = next_slot(phase, interval_seconds, max(earliest, now))
+    
+    name = f"Radar {radar.get('name', radar_id)}"
     scheduler_obj.add_job(
         run_radar_job,
-        trigger=trigger,
+        trigger=IntervalTrigger(**{schedule_type: schedule_interval}, start_date=slot, timezone='UTC'),
         args=[radar_id],
         id=job_id,
+        name=name,
         replace_existing=True,
-        max_instances=1
+        next_run_time=slot
     )
     
-    job_ids[radar_id] = job_id
+    # Échéance passée : une exécution de rattrapage ponctuelle dès maintenant (étalée par
+    # schedule_all_radars), le job d'intervalle reste sur la grille de la phase
+    if radar.get('last_scheduled_run') and earliest < now:
+        _schedule_catchup(scheduler_obj, radar_id, name, now)
+        logger.info(f"Radar {radar_id}: exécution de rattrapage planifiée")
     
-    next_run = calculate_next_run_time(schedule_type, schedule_interval)
-    logger.info(f"Radar {radar_id} planifié: {schedule_type}={schedule_interval}, prochaine exécution: {next_run}")
+    logger.info(f"Radar {radar_id} planifié: {schedule_type}={schedule_interval}, "
+                f"phase {phase // 60} min, prochaine exécution: {slot}")
     
     return True
 
@@ -140,17 +272,16 @@ def unschedule_radar(radar_id: int) -> bool:
     Returns:
         True si désactivé avec succès, False sinon
     """
-    global job_ids
-    
     scheduler_obj = get_scheduler()
     if not scheduler_obj:
         return False
     
-    job_id = job_ids.get(radar_id)
-    if job_id:
+    job_id = _radar_job_id(radar_id)
+    if scheduler_obj.get_job(job_id):
         try:
             scheduler_obj.remove_job(job_id)
-            del job_ids[radar_id]
+            if scheduler_obj.get_job(_catchup_job_id(radar_id)):
+                scheduler_obj.remove_job(_catchup_job_id(radar_id))
             logger.info(f"Planification du radar {radar_id} désactivée")
             return True
         except Exception as e:
@@ -162,7 +293,8 @@ def unschedule_radar(radar_id: int) -> bool:
 
 def run_radar_job(radar_id: int):
     """
-    Fonction exécutée par le scheduler pour un radar
+    Fonction exécutée par le scheduler pour un radar : ajoute son exécution à la file de tâches
+    (exécutée et sauvegardée par un worker avec run_and_persist_radar, voir radar_worker.py)
     
     Args:
         radar_id: ID du radar
@@ -179,37 +311,20 @@ def run_radar_job(radar_id: int):
             logger.info(f"Radar {radar_id} désactivé, exécution annulée")
             return
         
-        # Traiter le radar
-        client_id = radar.get('client_id')
-        client = get_client(client_id)
-        company_profile = get_client_profile_as_dict(client_id)
-        competitors = get_competitors(client_id)
-        
-        # Exécuter le radar avec scoring
-        reactions = process_radar_with_scoring(
-            radar,
-            client_id,
-            company_profile,
-            competitors,
-            min_score_threshold=radar.get('min_score_threshold', 0.6),
-            filter_competitors=radar.get('filter_competitors', True)
-        )
-        
-        # Mettre à jour la date de dernière exécution
-        update_radar_last_run(radar_id, scheduled=True)
-        
-        logger.info(f"Radar {radar_id} exécuté avec succès: {len(reactions)} réaction(s) collectée(s)")
+        enqueue_radar_run(radar_id, scheduled=True)
         
     except Exception as e:
-        logger.error(f"Erreur lors de l'exécution automatique du radar {radar_id}: {e}", exc_info=True)
+        logger.error(f"Erreur lors de l'ajout à la file du radar {radar_id}: {e}", exc_info=True)
 
 
-def schedule_all_radars(client_id: int = None):
+def schedule_all_radars(client_id: int = None, replan: bool = False):
     """
     Planifie tous les radars avec scheduling activé
     
     Args:
         client_id: ID du client (optionnel, tous les clients si None)
+        replan: Recalcule la phase de tous les radars (ex: radars planifiés au même instant
+            par une version précédente)
     """
     scheduler_obj = get_scheduler()
     if not scheduler_obj:
@@ -219,54 +334,218 @@ def schedule_all_radars(client_id: int = None):
     radars = get_scheduled_radars(client_id)
     logger.info(f"Planification de {len(radars)} radar(s)")
     
+    if replan:
+        # Les phases sont recalculées dans l'ordre des IDs, à partir d'une grille vide
+        for radar in radars:
+            unschedule_radar(radar['id'])
+    
     scheduled_count = 0
-    for radar in radars:
-        if schedule_radar(radar['id']):
+    for radar in sorted(radars, key=lambda r: r['id']):
+        if schedule_radar(radar['id'], replan=replan):
             scheduled_count += 1
     
     logger.info(f"{scheduled_count} radar(s) planifié(s) avec succès")
+    
+    stagger_overdue_radars()
+    schedule_stale_rescoring()
+    schedule_batch_polling()
 
 
-def unschedule_all_radars():
-    """Désactive la planification de tous les radars"""
-    global job_ids
+def stagger_overdue_radars() -> int:
+    """
+    Étale les exécutions de rattrapage des radars en retard (échéance passée pendant un arrêt)
+    
+    Chaque radar en retard est exécuté une seule fois par un job de rattrapage ponctuel, à
+    catchup_stagger_seconds d'intervalle, pour éviter une rafale d'appels API au démarrage.
+    Le job d'intervalle d'un radar en retard reprend au prochain créneau de sa phase.
     
+    Returns:
+        Nombre de radars en retard replanifiés
+    """
     scheduler_obj = get_scheduler()
     if not scheduler_obj:
+        return 0
+    
+    stagger_seconds = int(load_scheduler_config()['catchup_stagger_seconds'])
+    # Pas plus de démarrages par minute que ne l'autorise le planificateur
+    max_starts = int(load_planner_config()['max_starts_per_minute'] or 0)
+    if max_starts > 0:
+        stagger_seconds = max(stagger_seconds, -(-60 // max_starts))
+    stagger = timedelta(seconds=stagger_seconds)
+    now = _now()
+    overdue_jobs = [
+        job for job in scheduler_obj.get_jobs()
+        if job.id.startswith((RADAR_JOB_PREFIX, CATCHUP_JOB_PREFIX))
+        and job.next_run_time and job.next_run_time <= now
+    ]
+    # Un job d'intervalle en retard (arrêt du scheduler) revient sur sa grille : son rattrapage
+    # devient un job ponctuel, sauf si le radar en a déjà un
+    catchup_ids = {job.id for job in overdue_jobs if job.id.startswith(CATCHUP_JOB_PREFIX)}
+    for job in overdue_jobs:
+        if job.id.startswith(RADAR_JOB_PREFIX):
+            job.modify(next_run_time=job.trigger.get_next_fire_time(None, now))
+    overdue_jobs = [job for job in overdue_jobs
+                    if job.id.startswith(CATCHUP_JOB_PREFIX)
+                    or _catchup_job_id(job.args[0]) not in catchup_ids]
+    
+    for slot, job in enumerate(overdue_jobs):
+        run_time = now + slot * stagger
+        if job.id.startswith(CATCHUP_JOB_PREFIX):
+            job.modify(next_run_time=run_time)
+        else:
+            _schedule_catchup(scheduler_obj, job.args[0], job.name, run_time)
+    
+    if overdue_jobs:
+        logger.info(f"{len(overdue_jobs)} radar(s) en retard: une exécution de rattrapage chacun, "
+                    f"toutes les {stagger.total_seconds():.0f}s")
+    return len(overdue_jobs)
+
+
+def _ensure_interval_job(job_id: str, func, interval_minutes: int) -> None:
+    """Planifie un job de maintenance, en conservant le job persisté si son intervalle n'a pas changé"""
+    scheduler_obj = get_scheduler()
+    existing_job = scheduler_obj.get_job(job_id)
+    if existing_job and getattr(existing_job.trigger, 'interval', None) == timedelta(minutes=interval_minutes):
         return
+    scheduler_obj.add_job(
+        func,
+        trigger=IntervalTrigger(minutes=interval_minutes),
+        id=job_id,
+        replace_existing=True
+    )
+
+
+def schedule_stale_rescoring() -> bool:
+    """
+    Planifie le recalcul progressif des scores obsolètes (persona modifié)
+    
+    Returns:
+        True si planifié, False sinon
+    """
+    from utils.bulk_rescoring import load_stale_rescoring_config, run_stale_rescoring
+    
+    scheduler_obj = get_scheduler()
+    if not scheduler_obj:
+        return False
+    
+    config = load_stale_rescoring_config()
+    if not config.get('enabled', True):
+        if scheduler_obj.get_job(STALE_RESCORING_JOB_ID):
+            scheduler_obj.remove_job(STALE_RESCORING_JOB_ID)
+        logger.info("Recalcul progressif des scores obsolètes désactivé")
+        return False
+    
+    interval_minutes = int(config.get('interval_minutes', 30))
+    _ensure_interval_job(STALE_RESCORING_JOB_ID, run_stale_rescoring, interval_minutes)
+    logger.info(f"Recalcul des scores obsolètes planifié toutes les {interval_minutes} minute(s) "
+                f"(budget: {config.get('llm_budget_per_run')} appel(s) LLM)")
+    return True
+
+
+def schedule_batch_polling() -> bool:
+    """
+    Planifie le suivi des lots de scoring soumis à l'API Batch (intégration des résultats)
+    
+    Returns:
+        True si planifié, False sinon
+    """
+    from utils.openai_batch import load_batch_config, poll_llm_batches
+    
+    scheduler_obj = get_scheduler()
+    if not scheduler_obj:
+        return False
     
-    radar_ids = list(job_ids.keys())
-    for radar_id in radar_ids:
+    interval_minutes = int(load_batch_config().get('batch_poll_minutes', 10))
+    _ensure_interval_job(BATCH_POLLING_JOB_ID, poll_llm_batches, interval_minutes)
+    logger.info(f"Suivi des lots OpenAI planifié toutes les {interval_minutes} minute(s)")
+    return True
+
+
+def unschedule_all_radars():
+    """Désactive la planification de tous les radars"""
+    for radar_id in get_scheduled_radar_ids():
         unschedule_radar(radar_id)
 
 
+def get_scheduled_radar_ids() -> List[int]:
+    """IDs des radars ayant un job planifié"""
+    scheduler_obj = get_scheduler()
+    if not scheduler_obj:
+        return []
+    return [int(job.id[len(RADAR_JOB_PREFIX):]) for job in scheduler_obj.get_jobs()
+            if job.id.startswith(RADAR_JOB_PREFIX)]
+
+
+def _on_elected():
+    """Ce processus devient leader : rattrapage étalé des jobs en retard puis déclenchement des jobs"""
+    scheduler_obj = get_scheduler()
+    if scheduler_obj and scheduler_obj.state == STATE_PAUSED:
+        stagger_overdue_radars()
+        scheduler_obj.resume()
+        logger.info("Leader du scheduler : déclenchement des jobs")
+
+
+def _on_revoked():
+    """Ce processus n'est plus leader : les jobs ne sont plus déclenchés ici"""
+    if scheduler and scheduler.state == STATE_RUNNING:
+        scheduler.pause()
+        logger.info("Scheduler en attente (un autre processus est leader)")
+
+
 def start_scheduler():
-    """Démarre le scheduler"""
+    """
+    Démarre le scheduler en candidat à l'élection du leader
+    
+    Plusieurs processus peuvent démarrer le scheduler : seul le leader (bail SQLite renouvelé
+    par heartbeat) déclenche les jobs, les autres restent en attente et prennent le relais
+    si le leader s'arrête.
+    """
+    global leader_election
+    
     scheduler_obj = get_scheduler()
     if not scheduler_obj:
         logger.error("Scheduler non disponible")
         return False
     
-    if not scheduler_obj.running:
-        scheduler_obj.start()
-        logger.info("Scheduler démarré")
-        return True
-    else:
+    if leader_election and leader_election.running:
         logger.info("Scheduler déjà en cours d'exécution")
         return False
+    
+    config = load_scheduler_config()
+    leader_election = LeaderElection(
+        LEADER_LEASE_NAME,
+        lease_seconds=float(config['leader_lease_seconds']),
+        renew_seconds=float(config['leader_renew_seconds']),
+        on_elected=_on_elected,
+        on_revoked=_on_revoked
+    )
+    leader_election.start()
+    logger.info(f"Scheduler démarré (candidat leader: {leader_election.holder})")
+    return True
 
 
 def stop_scheduler():
-    """Arrête le scheduler"""
-    global scheduler
+    """Arrête le scheduler et libère le bail du leader (les jobs restent persistés pour le prochain démarrage)"""
+    global scheduler, leader_election
     
-    if scheduler and scheduler.running:
+    if leader_election:
+        leader_election.stop(release=True)
+        leader_election = None
+    
+    if scheduler and scheduler.state != STATE_STOPPED:
         scheduler.shutdown(wait=False)
+        scheduler = None
         logger.info("Scheduler arrêté")
         return True
     return False
 
 
+def refresh_scheduler():
+    """Relit les jobs persistés (modifiés par un autre processus, ex: la page Radars)"""
+    if scheduler and scheduler.state == STATE_RUNNING:
+        scheduler.wakeup()
+
+
 def get_next_run_time(radar_id: int) -> Optional[datetime]:
     """
     Affiche la prochaine exécution d'un radar
@@ -281,14 +560,14 @@ def get_next_run_time(radar_id: int) -> Optional[datetime]:
     if not scheduler_obj:
         return None
     
-    job_id = job_ids.get(radar_id)
-    if not job_id:
-        return None
-    
     try:
-        job = scheduler_obj.get_job(job_id)
-        if job:
-            return job.next_run_time
+        # Prochaine exécution : rattrapage en attente ou créneau suivant du job d'intervalle
+        run_times = [job.next_run_time
+                     for job in (scheduler_obj.get_job(_radar_job_id(radar_id)),
+                                 scheduler_obj.get_job(_catchup_job_id(radar_id)))
+                     if job and job.next_run_time]
+        if run_times:
+            return min(run_times)
     except Exception as e:
         logger.error(f"Erreur lors de la récupération de la prochaine exécution: {e}")
     
@@ -297,27 +576,25 @@ def get_next_run_time(radar_id: int) -> Optional[datetime]:
 
 def run_scheduled_radars():
     """
-    Exécute manuellement tous les radars planifiés qui sont dus
+    Ajoute à la file de tâches tous les radars planifiés qui sont dus
     Utile pour tester ou pour une exécution manuelle
     """
     radars = get_scheduled_radars()
     
     for radar in radars:
-        schedule_type = radar.get('schedule_type', 'manual')
-        schedule_interval = radar.get('schedule_interval', 0)
+        schedule_type, schedule_interval = effective_schedule(radar)
         last_scheduled_run = radar.get('last_scheduled_run')
         
         if schedule_type == 'manual' or schedule_interval <= 0:
             continue
         
-        # Vérifier si le radar est dû
+        # Vérifier si le radar est dû (dernière exécution planifiée + intervalle)
         if last_scheduled_run:
-            last_run = datetime.fromisoformat(last_scheduled_run.replace('Z', '+00:00'))
-            next_run = calculate_next_run_time(schedule_type, schedule_interval)
-            if datetime.now() < next_run:
+            next_run = calculate_next_run_time(schedule_type, schedule_interval, last_scheduled_run)
+            if _now() < next_run:
                 continue
         
-        # Exécuter le radar
+        # Ajouter l'exécution du radar à la file
         run_radar_job(radar['id'])
 
 
@@ -337,9 +614,14 @@ def get_scheduler_status() -> Dict[str, Any]:
             'jobs_count': 0
         }
     
+    lease = get_lease(LEADER_LEASE_NAME)
     return {
         'available': True,
-        'running': scheduler_obj.running if scheduler_obj else False,
-        'jobs_count': len(scheduler_obj.get_jobs()) if scheduler_obj else 0,
-        'scheduled_radars': list(job_ids.keys())
+        # Ce processus déclenche les jobs (leader)
+        'running': scheduler_obj.state == STATE_RUNNING,
+        # Ce processus est candidat mais un autre processus est leader
+        'standby': bool(leader_election and leader_election.running and not leader_election.is_leader),
+        'leader': lease['holder'] if lease and not lease['expired'] else None,
+        'jobs_count': len(scheduler_obj.get_jobs()),
+        'scheduled_radars': get_scheduled_radar_ids()
     }
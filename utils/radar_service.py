@@ -0,0 +1,165 @@
+"""
+Exécution et sauvegarde des radars
+Point d'entrée unique d'une exécution de radar, qu'elle soit demandée depuis l'interface ou
+planifiée (toutes deux passent par la file de tâches) : collecte, scoring, sauvegarde en masse
+des prospects qualifiés et suivi du radar (dernière exécution, posts vus, intervalle adaptatif)
+"""
+import logging
+from typing import Dict, Any, List, Optional
+
+from utils.database import (
+    get_radar, get_client_profile_as_dict, get_competitors, update_radar_last_run, record_radar_posts,
+    record_radar_reactors, get_radar_run, get_interrupted_run_for_task, save_reactions_bulk, save_reaction
+)
+from utils.radar_manager import process_radar_with_scoring, reaction_to_record
+
+logger = logging.getLogger(__name__)
+
+
+def persist_radar_reactions(client_id: int, radar_id: Optional[int], reactions: List[Dict[str, Any]]) -> int:
+    """
+    Sauvegarde en masse les réactions qualifiées d'une exécution de radar
+
+    Les réactions sont enregistrées en une transaction, dédupliquées sur l'index unique
+    client / prospect / post. Si la transaction échoue, elles sont sauvegardées une par une
+    pour ne perdre que les réactions en erreur.
+
+    Returns:
+        Nombre de réactions sauvegardées (insérées ou mises à jour)
+    """
+    if not reactions:
+        return 0
+    records = [reaction_to_record(reaction, radar_id) for reaction in reactions]
+    try:
+        counts = save_reactions_bulk(client_id, records)
+        logger.info(f"  → {counts['inserted']} réaction(s) ajoutée(s), {counts['updated']} mise(s) à jour")
+        return counts['inserted'] + counts['updated']
+    except Exception as e:
+        logger.error(f"❌ Erreur sauvegarde en masse de {len(records)} réaction(s), sauvegarde une par une: {e}")
+
+    saved_count = 0
+    for idx, record in enumerate(records, 1):
+        try:
+            save_reaction(client_id, record)
+            saved_count += 1
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde réaction {idx}: {e}")
+    return saved_count
+
+
+def run_and_persist_radar(radar_id: int, scheduled: bool = False, task_id: Optional[int] = None,
+                          resume_run_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Exécute un radar de bout en bout : collecte, scoring, sauvegarde des prospects qualifiés
+    et mise à jour de la date de dernière exécution
+
+    Appelée par les workers de la file de tâches (voir utils.task_queue) pour les exécutions
+    demandées depuis l'interface comme pour les exécutions planifiées. Les étapes sont
+    exécutées en flux (voir utils.radar_pipeline), sinon par lots avec process_radar_with_scoring.
+    L'exécution et ses étapes sont enregistrées dans l'historique (voir utils.run_history). Une
+    nouvelle tentative d'une tâche reprend l'exécution interrompue de la tentative précédente
+    depuis ses points de reprise (voir utils.run_checkpoints).
+
+    Args:
+        radar_id: ID du radar
+        scheduled: Exécution planifiée (autorise le scoring différé et met à jour last_scheduled_run)
+        task_id: Tâche de la file qui exécute le radar (rattachée à l'historique)
+        resume_run_id: Exécution interrompue à reprendre (défaut: celle de la tentative précédente de task_id)
+
+    Returns:
+        Dict avec le statut ('done' ou 'skipped'), l'ID de l'exécution, le nombre de réactions
+        qualifiées et sauvegardées et le rendement de l'exécution
+    """
+    from utils.llm_telemetry import llm_context
+    from utils.adaptive_schedule import apply_run_yield
+    from utils.run_history import radar_run
+    from utils.radar_pipeline import should_stream, stream_radar_with_scoring
+
+    radar = get_radar(radar_id)
+    if not radar:
+        logger.error(f"Radar {radar_id} introuvable lors de l'exécution")
+        return {'status': 'skipped', 'reason': 'Radar introuvable'}
+
+    if scheduled and not radar.get('enabled', False):
+        logger.info(f"Radar {radar_id} désactivé, exécution annulée")
+        return {'status': 'skipped', 'reason': 'Radar désactivé'}
+
+    # Reprise d'une exécution interrompue (demandée, ou tentative précédente de la même tâche)
+    if resume_run_id is not None:
+        interrupted_run = get_radar_run(resume_run_id)
+        resumable = bool(interrupted_run and interrupted_run['resumable'])
+    else:
+        # La tâche est réclamée par ce worker : l'exécution de sa tentative précédente est interrompue
+        interrupted_run = get_interrupted_run_for_task(task_id) if task_id is not None else None
+        resumable = bool(interrupted_run and interrupted_run['has_checkpoints'])
+    if resumable and interrupted_run['radar_id'] == radar_id:
+        resume_run_id = interrupted_run['id']
+    elif resume_run_id is not None:
+        logger.warning(f"Exécution #{resume_run_id} non reprenable pour le radar {radar_id}, nouvelle exécution")
+        resume_run_id = None
+
+    client_id = radar.get('client_id')
+    company_profile = get_client_profile_as_dict(client_id)
+    competitors = get_competitors(client_id)
+    logger.info(f"✓ Profil chargé - {len(competitors)} concurrent(s) configuré(s)")
+
+    max_qualified = radar.get('max_extractions')
+    if max_qualified:
+        logger.info(f"📊 Limite: {max_qualified} prospect(s) qualifié(s) maximum")
+
+    run_stats: Dict[str, Any] = {}
+    with radar_run(radar_id, client_id, 'scheduled' if scheduled else 'manual', task_id, resume_run_id) as run:
+        with llm_context(client_id=client_id, radar_id=radar_id):
+            if should_stream(radar, company_profile, scheduled, run.checkpoints):
+                # Pipeline en flux : les prospects qualifiés sont sauvegardés dès leur enrichissement
+                outcome = stream_radar_with_scoring(
+                    radar,
+                    client_id,
+                    company_profile,
+                    competitors,
+                    min_score_threshold=radar.get('min_score_threshold', 0.6),
+                    filter_competitors=radar.get('filter_competitors', True),
+                    max_qualified_prospects=max_qualified,
+                    scoring_mode=radar.get('scoring_mode'),
+                    run_stats=run_stats
+                )
+                qualified_count, saved_count = outcome['qualified'], outcome['saved']
+            else:
+                reactions = process_radar_with_scoring(
+                    radar,
+                    client_id,
+                    company_profile,
+                    competitors,
+                    min_score_threshold=radar.get('min_score_threshold', 0.6),
+                    filter_competitors=radar.get('filter_competitors', True),
+                    max_qualified_prospects=max_qualified,
+                    scoring_mode=radar.get('scoring_mode'),
+                    allow_deferred_scoring=scheduled,
+                    run_stats=run_stats
+                )
+                qualified_count = len(reactions)
+                saved_count = persist_radar_reactions(client_id, radar_id, reactions)
+
+        update_radar_last_run(radar_id, scheduled=scheduled)
+
+        # Rendement de l'exécution : ajuste l'intervalle des radars en mode adaptatif. Posts et
+        # réacteurs sont nouveaux s'ils n'ont jamais été vus par ce radar (qualifiés ou non)
+        run_yield = {
+            'posts': len(run_stats['post_urls']),
+            'new_posts': record_radar_posts(radar_id, run_stats['post_urls']),
+            'reactions': run_stats['reactions'],
+            'new_reactors': record_radar_reactors(radar_id, run_stats['reactor_urns']),
+            'qualified': qualified_count,
+            'deferred': run_stats['deferred']
+        }
+        run.summary = {'reactions': run_yield['reactions'], 'new_reactors': run_yield['new_reactors'],
+                       'qualified': run_yield['qualified'], 'saved': saved_count}
+        try:
+            apply_run_yield(radar, run_yield)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ajustement de l'intervalle adaptatif du radar {radar_id}: {e}")
+
+    logger.info(f"✅ Radar {radar_id} exécuté: {qualified_count} prospect(s) qualifié(s), "
+                f"{saved_count} sauvegardé(s)")
+    return {'status': 'done', 'run_id': run.run_id, 'reactions': qualified_count, 'saved': saved_count,
+            'yield': run_yield}
@@ -0,0 +1,124 @@
+"""
+Points de reprise des exécutions de radars (table radar_run_checkpoints)
+La sortie de chaque étape terminée est enregistrée sous l'ID de l'exécution, ainsi que la
+progression des étapes traitées prospect par prospect (scoring IA, enrichissements) : une
+exécution interrompue (erreur, redémarrage du worker) reprend à la dernière étape terminée et
+au dernier prospect enregistré, sans refaire les appels API et LLM déjà payés
+"""
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Set
+
+from utils.database import save_run_checkpoint, get_run_checkpoints, delete_run_checkpoints
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "run_checkpoints" de config.json)
+DEFAULT_CHECKPOINT_CONFIG = {
+    # Intervalle minimum entre deux enregistrements de la progression d'une étape
+    # (travail perdu au plus en cas d'arrêt brutal)
+    'progress_interval_seconds': 15
+}
+
+
+def load_checkpoint_config() -> Dict[str, Any]:
+    """Configuration des points de reprise (clé "run_checkpoints" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_CHECKPOINT_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('run_checkpoints', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration run_checkpoints: {e}")
+    return config
+
+
+def _json_default(value: Any) -> Any:
+    # Scalaires numpy (scores vectorisés) et autres valeurs non JSON
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class RunCheckpoints:
+    """
+    Points de reprise d'une exécution
+
+    Sans exécution (run_id None), rien n'est enregistré ni restauré.
+
+    Exemple:
+        resumed = checkpoints.output('fetch')
+        if resumed is None:
+            reactions = fetch()
+            checkpoints.complete('fetch', {'reactions': reactions})
+    """
+
+    def __init__(self, run_id: Optional[int] = None, resume: bool = False,
+                 config: Optional[Dict[str, Any]] = None):
+        self.run_id = run_id
+        self.progress_interval = 0.0
+        if run_id is not None:
+            self.progress_interval = float((config or load_checkpoint_config())['progress_interval_seconds'])
+        self._saved: Dict[str, Dict[str, Any]] = {}
+        self._last_progress: Dict[str, float] = {}
+        if run_id is not None and resume:
+            for stage, row in get_run_checkpoints(run_id).items():
+                try:
+                    self._saved[stage] = {'completed': bool(row['completed']), 'state': json.loads(row['state'])}
+                except ValueError:
+                    logger.warning(f"Point de reprise '{stage}' de l'exécution #{run_id} illisible, ignoré")
+
+    @property
+    def enabled(self) -> bool:
+        return self.run_id is not None
+
+    @property
+    def stages(self) -> Set[str]:
+        """Étapes qui ont un point de reprise enregistré avant l'interruption"""
+        return set(self._saved)
+
+    def output(self, stage: str) -> Optional[Dict[str, Any]]:
+        """Sortie d'une étape terminée avant l'interruption (None si l'étape est à exécuter)"""
+        saved = self._saved.get(stage)
+        return saved['state'] if saved and saved['completed'] else None
+
+    def progress(self, stage: str) -> Optional[Dict[str, Any]]:
+        """Progression d'une étape interrompue en cours (None si l'étape repart du début)"""
+        saved = self._saved.get(stage)
+        return saved['state'] if saved and not saved['completed'] else None
+
+    def complete(self, stage: str, state: Dict[str, Any]):
+        """Enregistre la sortie d'une étape terminée"""
+        self._save(stage, state, completed=True)
+
+    def save_progress(self, stage: str, state: Dict[str, Any], force: bool = False):
+        """Enregistre la progression d'une étape (au plus toutes les progress_interval_seconds, sauf force)"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress.get(stage, 0.0) < self.progress_interval:
+            return
+        self._last_progress[stage] = now
+        self._save(stage, state, completed=False)
+
+    def _save(self, stage: str, state: Dict[str, Any], completed: bool):
+        if not self.enabled:
+            return
+        try:
+            save_run_checkpoint(self.run_id, stage, json.dumps(state, ensure_ascii=False, default=_json_default),
+                                completed)
+        except Exception as e:
+            logger.warning(f"Point de reprise '{stage}' de l'exécution #{self.run_id} non enregistré: {e}")
+
+    def clear(self):
+        """Supprime les points de reprise (exécution terminée)"""
+        if not self.enabled:
+            return
+        try:
+            delete_run_checkpoints(self.run_id)
+        except Exception as e:
+            logger.warning(f"Points de reprise de l'exécution #{self.run_id} non supprimés: {e}")
@@ -0,0 +1,226 @@
+"""
+Historique des exécutions de radars (tables radar_runs et radar_run_stages)
+Une exécution est découpée en étapes (collecte, déduplication, filtrage des concurrents, scoring,
+limite, enrichissement des profils et des entreprises, sauvegarde) : chaque étape enregistre sa durée, ses
+éléments en entrée / sortie, ses appels API et LLM, ses hits de cache et ses erreurs
+Les compteurs sont alimentés par les fonctions count_* appelées là où les appels sont faits
+(requêtes RapidAPI, télémétrie LLM, caches), pour l'étape en cours du contexte courant
+Une exécution interrompue peut être reprise sous le même ID (voir utils.run_checkpoints)
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+from utils.database import create_radar_run, finish_radar_run, save_radar_run_stage, resume_radar_run
+from utils.run_checkpoints import RunCheckpoints
+
+logger = logging.getLogger(__name__)
+
+# Étapes d'une exécution de radar, dans l'ordre du pipeline
+RUN_STAGES = {
+    'fetch': 'Récupération des réactions',
+    'dedup': 'Déduplication',
+    'competitor_filter': 'Filtrage des concurrents',
+    'scoring': 'Scoring',
+    'limit': 'Limite des qualifiés',
+    'profile_enrichment': 'Enrichissement des profils',
+    'company_enrichment': 'Enrichissement des entreprises',
+    'persist': 'Sauvegarde des prospects',
+}
+
+
+class StageStats:
+    """Compteurs et durée d'une étape (ou des appels faits hors étape pendant une exécution)"""
+
+    def __init__(self, stage: str, items_in: Optional[int] = None):
+        self.stage = stage
+        self.items_in = items_in
+        self.items_out: Optional[int] = None
+        self.api_calls = 0
+        self.llm_calls = 0
+        self.llm_cost_usd = 0.0
+        self.cache_hits = 0
+        self.errors = 0
+        self.status = 'running'
+        self.error_message: Optional[str] = None
+        self.started_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+        self._start = time.perf_counter()
+
+    def finish(self, status: str, error_message: Optional[str] = None):
+        self.status = status
+        self.error_message = error_message
+        self.finished_at = datetime.now().isoformat()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_record(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if not key.startswith('_')}
+
+
+class RadarRun:
+    """Exécution de radar en cours : étapes terminées et résultat"""
+
+    def __init__(self, run_id: Optional[int], radar_id: int, checkpoints: Optional[RunCheckpoints] = None):
+        self.run_id = run_id
+        self.radar_id = radar_id
+        self.checkpoints = checkpoints or RunCheckpoints(run_id)
+        self.stages: List[StageStats] = []
+        # Appels faits hors des étapes (sauvegarde, mise à jour du planning...)
+        self.unstaged = StageStats('run')
+        # Résultat de l'exécution (reactions, new_reactors, qualified, saved)
+        self.summary: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+
+    def totals(self) -> Dict[str, Any]:
+        """Compteurs cumulés de toutes les étapes et des appels hors étape"""
+        stats = self.stages + [self.unstaged]
+        return {
+            'api_calls': sum(stage.api_calls for stage in stats),
+            'llm_calls': sum(stage.llm_calls for stage in stats),
+            'llm_cost_usd': sum(stage.llm_cost_usd for stage in stats),
+            'cache_hits': sum(stage.cache_hits for stage in stats),
+            'errors': sum(stage.errors for stage in stats),
+        }
+
+
+# Exécution en cours dans le contexte courant (None hors exécution : les compteurs sont ignorés)
+_current_run: ContextVar[Optional[RadarRun]] = ContextVar('radar_run', default=None)
+# Étape en cours dans le contexte courant : les étapes du pipeline en flux tournent en parallèle,
+# chacune dans son thread (avec une copie du contexte)
+_current_stage: ContextVar[Optional[StageStats]] = ContextVar('radar_run_stage', default=None)
+
+
+def current_run() -> Optional[RadarRun]:
+    """Exécution de radar en cours dans le contexte courant"""
+    return _current_run.get()
+
+
+def current_checkpoints() -> RunCheckpoints:
+    """Points de reprise de l'exécution en cours (inactifs hors exécution)"""
+    run = _current_run.get()
+    return run.checkpoints if run else RunCheckpoints()
+
+
+def _active_stats() -> Optional[StageStats]:
+    run = _current_run.get()
+    if run is None:
+        return None
+    return _current_stage.get() or run.unstaged
+
+
+def count_api_call(count: int = 1):
+    """Compte une requête API (RapidAPI, LinkedIn) pour l'étape en cours"""
+    stats = _active_stats()
+    if stats:
+        stats.api_calls += count
+
+
+def count_llm_call(cost_usd: float = 0.0):
+    """Compte un appel LLM et son coût pour l'étape en cours"""
+    stats = _active_stats()
+    if stats:
+        stats.llm_calls += 1
+        stats.llm_cost_usd += cost_usd or 0.0
+
+
+def count_cache_hit(count: int = 1):
+    """Compte un résultat servi depuis un cache (appel API / LLM évité) pour l'étape en cours"""
+    stats = _active_stats()
+    if stats:
+        stats.cache_hits += count
+
+
+def count_error(count: int = 1):
+    """Compte une erreur récupérée (élément ignoré ou traité en mode dégradé) pour l'étape en cours"""
+    stats = _active_stats()
+    if stats:
+        stats.errors += count
+
+
+@contextmanager
+def radar_run(radar_id: int, client_id: Optional[int] = None, trigger: str = 'manual',
+              task_id: Optional[int] = None, resume_run_id: Optional[int] = None) -> Iterator[RadarRun]:
+    """
+    Enregistre une exécution de radar et les étapes exécutées dans le bloc
+
+    Avec resume_run_id, l'exécution interrompue est reprise sous son ID, depuis ses points de
+    reprise ; ceux-ci sont supprimés quand l'exécution se termine. Une erreur d'enregistrement
+    est journalisée sans interrompre l'exécution.
+
+    Exemple:
+        with radar_run(radar_id, client_id, 'scheduled') as run:
+            reactions = process_radar_with_scoring(...)
+            run.summary['saved'] = persist_radar_reactions(...)
+    """
+    try:
+        if resume_run_id is not None and resume_radar_run(resume_run_id, task_id):
+            run_id = resume_run_id
+            logger.info(f"↪ Reprise de l'exécution #{run_id} du radar {radar_id}")
+        else:
+            run_id = create_radar_run(radar_id, client_id, trigger, task_id)
+    except Exception as e:
+        logger.warning(f"Historique de l'exécution du radar {radar_id} non enregistré: {e}")
+        run_id = None
+
+    run = RadarRun(run_id, radar_id, RunCheckpoints(run_id, resume=run_id == resume_run_id))
+    token = _current_run.set(run)
+    status, error_message = 'done', None
+    try:
+        yield run
+        run.checkpoints.clear()
+    except BaseException as e:
+        # Arrêt du worker compris : l'exécution reste reprenable depuis ses points de reprise
+        status, error_message = 'failed', (str(e) or type(e).__name__)[:500]
+        raise
+    finally:
+        _current_run.reset(token)
+        if run.run_id is not None:
+            try:
+                finish_radar_run(run.run_id, status, (time.perf_counter() - run._start) * 1000,
+                                 run.totals(), run.summary, error_message)
+            except Exception as e:
+                logger.warning(f"Fin de l'exécution #{run.run_id} non enregistrée: {e}")
+
+
+@contextmanager
+def run_stage(stage: str, items_in: Optional[int] = None) -> Iterator[StageStats]:
+    """
+    Mesure une étape de l'exécution en cours (sans exécution en cours, l'étape n'est pas enregistrée)
+
+    Le bloc renseigne stage.items_out ; une exception marque l'étape en erreur et est propagée.
+
+    Exemple:
+        with run_stage('dedup', items_in=len(reactions)) as stage:
+            new_reactions = ...
+            stage.items_out = len(new_reactions)
+    """
+    run = _current_run.get()
+    stats = StageStats(stage, items_in)
+    token = _current_stage.set(stats)
+    try:
+        yield stats
+    except BaseException as e:
+        stats.errors += 1
+        stats.finish('error', (str(e) or type(e).__name__)[:500])
+        raise
+    else:
+        stats.finish('done')
+    finally:
+        _current_stage.reset(token)
+        if run:
+            run.stages.append(stats)
+            logger.info(
+                f"  ⏱️ {RUN_STAGES.get(stage, stage)}: {stats.duration_ms / 1000:.1f}s, "
+                f"{stats.items_in if stats.items_in is not None else '-'} → "
+                f"{stats.items_out if stats.items_out is not None else '-'}, "
+                f"{stats.api_calls} appel(s) API, {stats.llm_calls} appel(s) LLM"
+            )
+            if run.run_id is not None:
+                try:
+                    save_radar_run_stage(run.run_id, stats.to_record())
+                except Exception as e:
+                    logger.warning(f"Étape '{stage}' de l'exécution #{run.run_id} non enregistrée: {e}")
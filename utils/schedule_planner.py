@@ -0,0 +1,120 @@
+"""
+Planification étalée des radars
+Chaque radar reçoit une phase stable dans son intervalle (dérivée de son ID) : les radars de même
+intervalle ne démarrent plus tous au même instant. La phase est ensuite décalée minute par minute
+pour ne pas dépasser un nombre maximum de démarrages par minute, afin de lisser la charge API / LLM
+"""
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "schedule_planner" de config.json)
+DEFAULT_PLANNER_CONFIG = {
+    # Part de l'intervalle sur laquelle les phases sont réparties (1.0 = tout l'intervalle)
+    'spread_fraction': 1.0,
+    # Nombre maximum de radars démarrant dans une même minute (0 = pas de limite)
+    'max_starts_per_minute': 2,
+    # Fenêtre sur laquelle la charge par minute est évaluée
+    'horizon_hours': 24
+}
+
+# Phase planifiée d'un radar : (phase en secondes depuis l'epoch modulo l'intervalle, intervalle en secondes)
+PlannedPhase = Tuple[int, int]
+
+
+def load_planner_config() -> Dict[str, Any]:
+    """Configuration du planificateur (clé "schedule_planner" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_PLANNER_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('schedule_planner', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration schedule_planner: {e}")
+    return config
+
+
+def preferred_phase(radar_id: int, interval_seconds: int, spread_fraction: float = 1.0) -> int:
+    """
+    Phase stable d'un radar dans son intervalle (identique d'un processus et d'un redémarrage à l'autre)
+
+    Args:
+        radar_id: ID du radar
+        interval_seconds: Intervalle entre deux exécutions
+        spread_fraction: Part de l'intervalle sur laquelle les phases sont réparties
+
+    Returns:
+        Phase en secondes, dans [0, interval_seconds)
+    """
+    digest = hashlib.sha1(f"radar:{radar_id}".encode('utf-8')).digest()
+    fraction = int.from_bytes(digest[:8], 'big') / 2 ** 64
+    spread = max(0.0, min(float(spread_fraction), 1.0))
+    return int(fraction * spread * interval_seconds) % interval_seconds
+
+
+def _fire_minutes(phase: int, interval_seconds: int, start_ts: int, end_ts: int) -> Iterable[int]:
+    """Minutes (depuis l'epoch) des exécutions d'une phase entre start_ts et end_ts"""
+    first = phase + -(-(start_ts - phase) // interval_seconds) * interval_seconds
+    return (fire_ts // 60 for fire_ts in range(first, end_ts, interval_seconds))
+
+
+def choose_phase(radar_id: int, interval_seconds: int, planned: List[PlannedPhase],
+                 config: Optional[Dict[str, Any]] = None, now: Optional[datetime] = None) -> int:
+    """
+    Choisit la phase d'un radar : sa phase préférée, décalée par pas d'une minute tant qu'une
+    de ses exécutions tomberait dans une minute déjà pleine
+
+    Args:
+        radar_id: ID du radar
+        interval_seconds: Intervalle du radar
+        planned: Phases des autres radars planifiés
+        config: Configuration du planificateur (défaut: load_planner_config())
+        now: Début de la fenêtre d'évaluation de la charge (défaut: maintenant)
+
+    Returns:
+        Phase en secondes, dans [0, interval_seconds) ; la moins chargée si aucune ne respecte la limite
+    """
+    config = config or load_planner_config()
+    phase = preferred_phase(radar_id, interval_seconds, config['spread_fraction'])
+    max_starts = int(config['max_starts_per_minute'] or 0)
+    if max_starts <= 0 or not planned:
+        return phase
+
+    start_ts = int((now or datetime.now(timezone.utc)).timestamp())
+    end_ts = start_ts + max(int(float(config['horizon_hours']) * 3600), interval_seconds)
+    load = Counter()
+    for other_phase, other_interval in planned:
+        load.update(_fire_minutes(other_phase, other_interval, start_ts, end_ts))
+
+    best_phase, best_load = phase, None
+    for step in range(max(interval_seconds // 60, 1)):
+        candidate = (phase + step * 60) % interval_seconds
+        peak = max((load[minute] for minute in _fire_minutes(candidate, interval_seconds, start_ts, end_ts)),
+                   default=0)
+        if peak < max_starts:
+            return candidate
+        if best_load is None or peak < best_load:
+            best_phase, best_load = candidate, peak
+
+    logger.warning(f"Radar {radar_id}: aucune minute libre dans l'intervalle, phase la moins chargée retenue")
+    return best_phase
+
+
+def next_slot(phase: int, interval_seconds: int, earliest: datetime) -> datetime:
+    """Première exécution sur la grille de la phase (phase + k * intervalle depuis l'epoch) à partir de earliest"""
+    earliest_ts = earliest.timestamp()
+    k = -(-(earliest_ts - phase) // interval_seconds)
+    return datetime.fromtimestamp(phase + k * interval_seconds, tz=timezone.utc)
+
+
+def trigger_phase(start_date: datetime, interval_seconds: int) -> int:
+    """Phase d'un trigger d'intervalle existant (date de départ modulo l'intervalle)"""
+    return int(start_date.timestamp()) % interval_seconds
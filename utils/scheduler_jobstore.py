@@ -0,0 +1,93 @@
+"""
+Job store APScheduler persisté dans la base SQLite de l'application (table scheduler_jobs)
+Les jobs (radars planifiés, maintenance) et leur prochaine exécution survivent aux redémarrages
+du scheduler : un redémarrage reprend la planification sans la recalculer
+"""
+import logging
+import pickle
+import sqlite3
+from typing import List, Optional
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from utils.database import (
+    get_scheduler_job_state, get_scheduler_job_states, get_scheduler_next_run_time,
+    insert_scheduler_job, update_scheduler_job, delete_scheduler_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    Job store APScheduler adossé à la table scheduler_jobs
+
+    L'état des jobs est sérialisé avec pickle, comme pour les job stores fournis par APScheduler ;
+    les fonctions planifiées doivent donc être des fonctions de module.
+    """
+
+    def __init__(self, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+
+    def lookup_job(self, job_id: str) -> Optional[Job]:
+        job_state = get_scheduler_job_state(job_id)
+        return self._reconstitute_job(job_state) if job_state else None
+
+    def get_due_jobs(self, now) -> List[Job]:
+        return self._get_jobs(get_scheduler_job_states(due_before=datetime_to_utc_timestamp(now)))
+
+    def get_next_run_time(self):
+        next_run_time = get_scheduler_next_run_time()
+        return utc_timestamp_to_datetime(next_run_time) if next_run_time is not None else None
+
+    def get_all_jobs(self) -> List[Job]:
+        return self._get_jobs(get_scheduler_job_states())
+
+    def add_job(self, job: Job):
+        try:
+            insert_scheduler_job(job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                 pickle.dumps(job.__getstate__(), self.pickle_protocol))
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job: Job):
+        if not update_scheduler_job(job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                    pickle.dumps(job.__getstate__(), self.pickle_protocol)):
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id: str):
+        if not delete_scheduler_jobs([job_id]):
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        delete_scheduler_jobs()
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, rows: List[dict]) -> List[Job]:
+        jobs = []
+        failed_job_ids = []
+        for row in rows:
+            try:
+                jobs.append(self._reconstitute_job(row['job_state']))
+            except BaseException:
+                # Fonction déplacée / supprimée depuis l'enregistrement du job
+                logger.exception(f"Impossible de restaurer le job '{row['id']}', suppression")
+                failed_job_ids.append(row['id'])
+
+        if failed_job_ids:
+            delete_scheduler_jobs(failed_job_ids)
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}>"
@@ -0,0 +1,351 @@
+"""
+Scoring sémantique local (hors ligne, CPU uniquement)
+Vecteurs TF-IDF de n-grammes hachés calculés avec NumPy, vecteurs du persona
+pré-calculés une fois par profil client, similarité cosinus calculée par lot
+"""
+import re
+import zlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.headline_parser import get_parsed_headline
+
+logger = logging.getLogger(__name__)
+
+# Dimension de l'espace haché (puissance de 2)
+N_FEATURES = 2 ** 18
+
+# Taille des n-grammes de caractères (calculés à l'intérieur des mots)
+CHAR_NGRAM_SIZES = (3, 4)
+
+# Poids des composantes du score sémantique
+TITLE_WEIGHT = 0.6
+PROFILE_WEIGHT = 0.25
+ENGAGEMENT_WEIGHT = 0.15
+
+# Seuil par défaut du préfiltre : en dessous, le prospect est écarté sans appel LLM
+DEFAULT_PREFILTER_THRESHOLD = 0.25
+
+# Nombre de jeux de vecteurs de persona gardés en mémoire (un par version de profil)
+MAX_CACHED_PERSONAS = 32
+
+# Mêmes poids d'engagement que le scoring par règles (ramenés sur 0-1)
+ENGAGEMENT_LEVELS = {
+    'COMMENT': 1.0,
+    'REPOST': 0.8,
+    'PRAISE': 0.6,
+    'EMPATHY': 0.6,
+    'INTEREST': 0.6,
+    'LIKE': 0.4,
+}
+
+_WORD_REGEX = re.compile(r'[a-z0-9]+(?:[+#][a-z0-9+#]*)?')
+
+_personas: "OrderedDict[Tuple, PersonaVectors]" = OrderedDict()
+_personas_lock = threading.Lock()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Minuscules et suppression des accents"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def text_features(text: Optional[str]) -> List[str]:
+    """
+    Découpe un texte en caractéristiques : mots, bigrammes de mots et n-grammes de caractères
+
+    Args:
+        text: Texte à découper
+
+    Returns:
+        Liste des caractéristiques (avec répétitions)
+    """
+    words = _WORD_REGEX.findall(normalize_text(text))
+    features = [f"w:{word}" for word in words]
+    features.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        for size in CHAR_NGRAM_SIZES:
+            if len(padded) >= size:
+                features.extend(f"c:{padded[i:i + size]}" for i in range(len(padded) - size + 1))
+    return features
+
+
+def _hash_feature(feature: str) -> int:
+    # crc32 : stable d'un processus à l'autre (contrairement à hash())
+    return zlib.crc32(feature.encode('utf-8')) % N_FEATURES
+
+
+class SparseBatch:
+    """
+    Lot de vecteurs creux (format CSR : indices, valeurs, bornes des lignes)
+
+    Les valeurs sont des fréquences sous-linéaires (1 + log(tf)) ; la pondération IDF
+    est appliquée au moment du calcul de similarité.
+    """
+
+    def __init__(self, texts: List[Optional[str]]):
+        indices: List[np.ndarray] = []
+        values: List[np.ndarray] = []
+        offsets = [0]
+        memo: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for text in texts:
+            key = text or ''
+            row = memo.get(key)
+            if row is None:
+                hashed = np.fromiter((_hash_feature(f) for f in text_features(key)), dtype=np.int64)
+                row_indices, counts = np.unique(hashed, return_counts=True)
+                row = (row_indices, 1.0 + np.log(counts.astype(np.float64)))
+                memo[key] = row
+            indices.append(row[0])
+            values.append(row[1])
+            offsets.append(offsets[-1] + len(row[0]))
+        self.indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        self.values = np.concatenate(values) if values else np.zeros(0, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def row_ids(self) -> np.ndarray:
+        """Numéro de ligne de chaque valeur stockée"""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def document_frequencies(self) -> np.ndarray:
+        """Nombre de lignes contenant chaque caractéristique (dense, N_FEATURES)"""
+        return np.bincount(self.indices, minlength=N_FEATURES)
+
+
+def compute_idf(*batches: SparseBatch) -> np.ndarray:
+    """
+    Calcule les poids IDF lissés sur l'ensemble des lots fournis
+
+    Args:
+        batches: Lots de vecteurs (prospects à scorer + documents du persona)
+
+    Returns:
+        Vecteur dense des poids IDF (N_FEATURES)
+    """
+    n_documents = sum(len(batch) for batch in batches)
+    frequencies = np.zeros(N_FEATURES, dtype=np.int64)
+    for batch in batches:
+        frequencies += batch.document_frequencies()
+    return np.log((1.0 + n_documents) / (1.0 + frequencies)) + 1.0
+
+
+def cosine_similarities(batch: SparseBatch, references: SparseBatch, idf: np.ndarray) -> np.ndarray:
+    """
+    Similarité cosinus entre chaque ligne du lot et chaque vecteur de référence
+
+    Args:
+        batch: Lot de vecteurs à comparer (n lignes)
+        references: Vecteurs de référence (m lignes)
+        idf: Poids IDF
+
+    Returns:
+        Matrice (n, m) des similarités
+    """
+    n_rows, n_refs = len(batch), len(references)
+    similarities = np.zeros((n_rows, n_refs), dtype=np.float64)
+    if n_rows == 0 or n_refs == 0 or len(batch.indices) == 0:
+        return similarities
+
+    weighted = batch.values * idf[batch.indices]
+    row_ids = batch.row_ids()
+    norms = np.sqrt(np.bincount(row_ids, weights=weighted ** 2, minlength=n_rows))
+
+    for ref in range(n_refs):
+        start, end = references.offsets[ref], references.offsets[ref + 1]
+        if start == end:
+            continue
+        ref_indices = references.indices[start:end]
+        ref_weighted = references.values[start:end] * idf[ref_indices]
+        ref_norm = np.sqrt(np.sum(ref_weighted ** 2))
+        if ref_norm == 0:
+            continue
+        # Vecteur de référence dense : le produit scalaire devient une simple indexation
+        dense = np.zeros(N_FEATURES, dtype=np.float64)
+        dense[ref_indices] = ref_weighted
+        dots = np.bincount(row_ids, weights=weighted * dense[batch.indices], minlength=n_rows)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarities[:, ref] = np.where(norms > 0, dots / (norms * ref_norm), 0.0)
+    return np.clip(similarities, 0.0, 1.0)
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value if item]
+
+
+class PersonaVectors:
+    """
+    Documents du persona vectorisés une fois par profil client
+
+    - un vecteur par titre de poste cible (le meilleur titre l'emporte)
+    - un vecteur « profil » (types d'entreprise, industries, caractéristiques, problématiques)
+    """
+
+    def __init__(self, company_profile: Dict[str, Any]):
+        company_profile = company_profile or {}
+        target_persona = company_profile.get('target_persona', {}) or {}
+
+        self.job_titles = _as_list(target_persona.get('job_titles'))
+        profile_parts = (
+            self.job_titles +
+            _as_list(target_persona.get('company_types')) +
+            _as_list(target_persona.get('industries')) +
+            _as_list(target_persona.get('characteristics')) +
+            _as_list(target_persona.get('pain_points')) +
+            _as_list(target_persona.get('company_size'))
+        )
+        self.profile_text = ' '.join(profile_parts)
+
+        self.titles = SparseBatch(self.job_titles)
+        self.profile = SparseBatch([self.profile_text] if self.profile_text else [])
+
+    @property
+    def empty(self) -> bool:
+        return not self.job_titles and not self.profile_text
+
+
+def persona_vectors_fingerprint(company_profile: Dict[str, Any]) -> Tuple:
+    """Clé identifiant le contenu du persona utilisé par le scoring sémantique"""
+    target_persona = (company_profile or {}).get('target_persona', {}) or {}
+    return tuple(
+        tuple(_as_list(target_persona.get(field)))
+        for field in ('job_titles', 'company_types', 'industries', 'characteristics',
+                      'pain_points', 'company_size')
+    )
+
+
+def get_persona_vectors(company_profile: Dict[str, Any]) -> PersonaVectors:
+    """
+    Retourne les vecteurs du persona (calculés au premier appel puis réutilisés)
+
+    Args:
+        company_profile: Profil entreprise (get_client_profile_as_dict)
+
+    Returns:
+        PersonaVectors
+    """
+    key = persona_vectors_fingerprint(company_profile)
+    with _personas_lock:
+        vectors = _personas.get(key)
+        if vectors is not None:
+            _personas.move_to_end(key)
+            return vectors
+
+    vectors = PersonaVectors(company_profile)
+    with _personas_lock:
+        _personas[key] = vectors
+        while len(_personas) > MAX_CACHED_PERSONAS:
+            _personas.popitem(last=False)
+    logger.debug(f"Vecteurs du persona calculés ({len(vectors.job_titles)} titre(s) cible(s))")
+    return vectors
+
+
+def invalidate_persona_vectors():
+    """Vide le cache des vecteurs de persona (à appeler après la sauvegarde d'un profil)"""
+    with _personas_lock:
+        _personas.clear()
+
+
+def semantic_scores_batch(reactions: List[Dict[str, Any]],
+                          company_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Score sémantique d'un lot de réactions (similarité cosinus avec le persona)
+
+    Args:
+        reactions: Réactions / prospects (headline, reaction_type, ...)
+        company_profile: Profil entreprise
+
+    Returns:
+        Liste de dicts de scoring (même ordre que les réactions) avec total_score entre 0 et 1
+    """
+    if not reactions:
+        return []
+
+    persona = get_persona_vectors(company_profile)
+
+    # Titre découpé sur des mots entiers ("Data Analyst chez Acme" -> "Data Analyst")
+    titles = [get_parsed_headline(reaction).title for reaction in reactions]
+    headlines = [reaction.get('headline', '') or '' for reaction in reactions]
+    title_batch = SparseBatch(titles)
+    headline_batch = SparseBatch(headlines)
+
+    # IDF estimé sur le lot courant et les documents du persona
+    idf = compute_idf(headline_batch, persona.titles, persona.profile)
+
+    if len(persona.titles):
+        title_matrix = cosine_similarities(title_batch, persona.titles, idf)
+        title_scores = title_matrix.max(axis=1)
+        best_titles = title_matrix.argmax(axis=1)
+    else:
+        title_scores = np.zeros(len(reactions))
+        best_titles = np.zeros(len(reactions), dtype=np.int64)
+
+    if len(persona.profile):
+        profile_scores = cosine_similarities(headline_batch, persona.profile, idf)[:, 0]
+    else:
+        profile_scores = np.zeros(len(reactions))
+
+    engagement_scores = np.array([
+        ENGAGEMENT_LEVELS.get((reaction.get('reaction_type', '') or '').upper(), 0.0)
+        for reaction in reactions
+    ])
+
+    totals = (TITLE_WEIGHT * title_scores +
+              PROFILE_WEIGHT * profile_scores +
+              ENGAGEMENT_WEIGHT * engagement_scores)
+
+    results = []
+    for row, reaction in enumerate(reactions):
+        results.append({
+            'total_score': round(min(float(totals[row]), 1.0), 3),
+            'semantic_title_score': round(float(title_scores[row]), 3),
+            'semantic_profile_score': round(float(profile_scores[row]), 3),
+            'engagement_score': round(float(engagement_scores[row]), 3),
+            'scoring_method': 'semantic',
+            'details': {
+                'job_title': titles[row],
+                'closest_target_title': persona.job_titles[best_titles[row]] if persona.job_titles else None,
+                'reaction_type': reaction.get('reaction_type', '')
+            }
+        })
+    return results
+
+
+def semantic_prefilter(reactions: List[Dict[str, Any]],
+                       company_profile: Dict[str, Any],
+                       threshold: float = DEFAULT_PREFILTER_THRESHOLD) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Préfiltre sémantique avant le scoring LLM : écarte les prospects clairement hors cible
+
+    Args:
+        reactions: Réactions à filtrer
+        company_profile: Profil entreprise
+        threshold: Score sémantique minimum pour passer au LLM
+
+    Returns:
+        Tuple (réactions retenues, scores sémantiques des réactions retenues, réactions écartées)
+    """
+    scores = semantic_scores_batch(reactions, company_profile)
+    kept, kept_scores, rejected = [], [], []
+    for reaction, score in zip(reactions, scores):
+        if score['total_score'] >= threshold:
+            kept.append(reaction)
+            kept_scores.append(score)
+        else:
+            rejected.append(reaction)
+    return kept, kept_scores, rejected
@@ -0,0 +1,293 @@
+"""
+File de tâches persistée dans SQLite (table tasks) et workers qui l'exécutent
+L'interface et le scheduler ajoutent les exécutions de radars à la file ; les workers
+(radar_worker.py, un ou plusieurs processus partageant la base) les réclament par priorité,
+renouvellent leur bail par heartbeat et remettent en file les tentatives en échec
+Le nombre d'exécutions simultanées est plafonné pour l'ensemble des workers, et la file est
+équitable entre clients (pondérée par client) : un client avec beaucoup de radars ne peut pas
+monopoliser les workers ni les clés API partagées
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+from utils.database import (
+    enqueue_task, claim_task, heartbeat_task, complete_task, fail_task, get_radar,
+    has_ready_tasks, get_task_queue_metrics
+)
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.json"
+
+# Configuration par défaut (clé "task_queue" de config.json)
+DEFAULT_TASK_QUEUE_CONFIG = {
+    # Durée du bail d'une tâche : sans heartbeat pendant cette durée, elle est reprise par un autre worker
+    'lease_seconds': 300,
+    'heartbeat_seconds': 60,
+    # Attente entre deux réclamations quand la file est vide
+    'poll_seconds': 5,
+    'max_attempts': 3,
+    # Délai avant une nouvelle tentative (doublé à chaque échec)
+    'retry_base_delay_seconds': 60,
+    # Exécutions simultanées maximum, tous workers confondus (0 = pas de limite)
+    'max_concurrency': 4,
+    # Poids des clients dans la file équitable ({"<client_id>": poids}), défaut: default_client_weight
+    'client_weights': {},
+    'default_client_weight': 1.0
+}
+
+# Types de tâches
+RADAR_RUN_TASK = 'radar_run'
+
+# Priorités : une exécution demandée depuis l'interface passe avant les exécutions planifiées
+PRIORITY_MANUAL = 10
+PRIORITY_SCHEDULED = 0
+
+
+def load_task_queue_config() -> Dict[str, Any]:
+    """Configuration de la file de tâches (clé "task_queue" de config.json, sinon valeurs par défaut)"""
+    config = dict(DEFAULT_TASK_QUEUE_CONFIG)
+    try:
+        if CONFIG_FILE.exists():
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('task_queue', {}) or {})
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement de la configuration task_queue: {e}")
+    return config
+
+
+def client_weight(client_id: Optional[int], config: Optional[Dict[str, Any]] = None) -> float:
+    """Poids d'un client dans la file équitable (part des exécutions quand plusieurs clients attendent)"""
+    config = config or load_task_queue_config()
+    weights = config.get('client_weights') or {}
+    return float(weights.get(str(client_id), config['default_client_weight']))
+
+
+def enqueue_radar_run(radar_id: int, scheduled: bool = False, priority: Optional[int] = None,
+                      resume_run_id: Optional[int] = None) -> Optional[int]:
+    """
+    Ajoute l'exécution d'un radar à la file
+
+    Un radar n'a qu'une exécution active à la fois : si une exécution est déjà en attente
+    ou en cours, son ID est retourné.
+
+    Args:
+        radar_id: ID du radar
+        scheduled: Exécution planifiée (sinon demandée depuis l'interface)
+        priority: Priorité (défaut: PRIORITY_SCHEDULED ou PRIORITY_MANUAL)
+        resume_run_id: ID d'une exécution interrompue à reprendre depuis ses points de reprise
+
+    Returns:
+        ID de la tâche, ou None si le radar est introuvable
+    """
+    radar = get_radar(radar_id)
+    if not radar:
+        logger.error(f"Radar {radar_id} introuvable, exécution non ajoutée à la file")
+        return None
+
+    if priority is None:
+        priority = PRIORITY_SCHEDULED if scheduled else PRIORITY_MANUAL
+
+    payload = {'radar_id': radar_id, 'scheduled': scheduled}
+    if resume_run_id is not None:
+        payload['resume_run_id'] = resume_run_id
+
+    config = load_task_queue_config()
+    task_id = enqueue_task(
+        RADAR_RUN_TASK,
+        payload,
+        priority=priority,
+        client_id=radar.get('client_id'),
+        radar_id=radar_id,
+        dedupe_key=f"{RADAR_RUN_TASK}:{radar_id}",
+        max_attempts=int(config['max_attempts']),
+        weight=client_weight(radar.get('client_id'), config)
+    )
+    logger.info(f"Exécution du radar {radar_id} en file (tâche #{task_id}, priorité {priority})")
+    return task_id
+
+
+def _run_radar_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    from utils.radar_service import run_and_persist_radar
+
+    payload = task['payload']
+    return run_and_persist_radar(payload['radar_id'], scheduled=bool(payload.get('scheduled')), task_id=task['id'],
+                                 resume_run_id=payload.get('resume_run_id'))
+
+
+# Exécution de chaque type de tâche : task -> résultat (dict sérialisable en JSON)
+TASK_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    RADAR_RUN_TASK: _run_radar_task,
+}
+
+
+def default_worker_id() -> str:
+    """Identifiant d'un worker : machine et processus"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_queue_metrics(hours: int = 24) -> Dict[str, Any]:
+    """
+    Métriques de la file : profondeur et temps d'attente, au total et par client
+
+    Args:
+        hours: Fenêtre des temps d'attente (tâches démarrées dans les dernières heures)
+
+    Returns:
+        Dict avec queued, running, max_concurrency et clients (liste par client avec queued, running,
+        oldest_wait_seconds, started, avg_wait_seconds, max_wait_seconds)
+    """
+    now = datetime.now()
+    clients = []
+    for row in get_task_queue_metrics((now - timedelta(hours=hours)).isoformat()):
+        oldest_wait = None
+        if row.get('oldest_queued_at'):
+            try:
+                oldest_wait = (now - datetime.fromisoformat(row['oldest_queued_at'])).total_seconds()
+            except ValueError:
+                pass
+        clients.append({
+            'client_id': row['client_id'],
+            'queued': row['queued'] or 0,
+            'running': row['running'] or 0,
+            'oldest_wait_seconds': oldest_wait,
+            'started': row['started'] or 0,
+            'avg_wait_seconds': row['avg_wait_ms'] / 1000 if row['avg_wait_ms'] is not None else None,
+            'max_wait_seconds': row['max_wait_ms'] / 1000 if row['max_wait_ms'] is not None else None
+        })
+    return {
+        'queued': sum(client['queued'] for client in clients),
+        'running': sum(client['running'] for client in clients),
+        'max_concurrency': int(load_task_queue_config()['max_concurrency']),
+        'clients': clients
+    }
+
+
+def _heartbeat_loop(task_id: int, lease_owner: str, config: Dict[str, Any], done: threading.Event):
+    while not done.wait(float(config['heartbeat_seconds'])):
+        if not heartbeat_task(task_id, lease_owner, int(config['lease_seconds'])):
+            logger.warning(f"Bail de la tâche #{task_id} perdu (reprise par un autre worker)")
+            return
+
+
+def execute_task(task: Dict[str, Any], lease_owner: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Exécute une tâche réclamée en renouvelant son bail, puis enregistre son résultat
+
+    Args:
+        task: Tâche retournée par claim_task
+        lease_owner: Identifiant du worker qui détient le bail
+        config: Configuration de la file (défaut: load_task_queue_config())
+
+    Returns:
+        Statut final de la tâche ('done', 'queued' pour une nouvelle tentative, 'failed', ou 'lost'
+        si le bail a été perdu entre-temps)
+    """
+    config = config or load_task_queue_config()
+    task_id = task['id']
+    handler = TASK_HANDLERS.get(task['task_type'])
+
+    logger.info(f"▶️ Tâche #{task_id} ({task['task_type']}, tentative {task['attempts']}/{task['max_attempts']})")
+
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(task_id, lease_owner, config, done), daemon=True)
+    heartbeat.start()
+    try:
+        if handler is None:
+            raise ValueError(f"Type de tâche inconnu: {task['task_type']}")
+        result = handler(task)
+    except Exception as e:
+        done.set()
+        logger.error(f"❌ Tâche #{task_id} en erreur: {e}", exc_info=True)
+        delay = float(config['retry_base_delay_seconds']) * (2 ** max(task['attempts'] - 1, 0))
+        status = fail_task(task_id, lease_owner, f"{e}\n{traceback.format_exc()}", delay)
+        if status == 'queued':
+            logger.info(f"  → Nouvelle tentative de la tâche #{task_id} dans {delay:.0f}s")
+        return status or 'lost'
+    finally:
+        done.set()
+        heartbeat.join()
+
+    if not complete_task(task_id, lease_owner, result):
+        logger.warning(f"Tâche #{task_id} terminée mais son bail a été perdu, résultat ignoré")
+        return 'lost'
+    logger.info(f"✓ Tâche #{task_id} terminée: {result}")
+    return 'done'
+
+
+def _worker_loop(lease_owner: str, config: Dict[str, Any], stop_event: threading.Event,
+                 once: bool, task_types: Optional[List[str]], counter: Dict[str, int],
+                 counter_lock: threading.Lock):
+    while not stop_event.is_set():
+        try:
+            task = claim_task(lease_owner, int(config['lease_seconds']), task_types,
+                              max_running=int(config['max_concurrency']) or None)
+        except Exception as e:
+            logger.error(f"Erreur lors de la réclamation d'une tâche: {e}")
+            task = None
+
+        if task is None:
+            # File vide (et pas seulement limite d'exécutions simultanées atteinte)
+            if once and not has_ready_tasks(task_types):
+                return
+            stop_event.wait(float(config['poll_seconds']))
+            continue
+
+        execute_task(task, lease_owner, config)
+        with counter_lock:
+            counter['processed'] += 1
+
+
+def run_worker(worker_id: Optional[str] = None, concurrency: int = 1, once: bool = False,
+               stop_event: Optional[threading.Event] = None,
+               task_types: Optional[List[str]] = None) -> int:
+    """
+    Boucle d'un worker : réclame et exécute les tâches de la file jusqu'à l'arrêt
+
+    Args:
+        worker_id: Identifiant du worker (défaut: machine:pid)
+        concurrency: Nombre de tâches exécutées en parallèle par ce processus
+        once: Vide la file puis s'arrête (au lieu d'attendre de nouvelles tâches)
+        stop_event: Événement d'arrêt (les tâches en cours sont terminées)
+        task_types: Types de tâches acceptés (tous si None)
+
+    Returns:
+        Nombre de tâches exécutées
+    """
+    config = load_task_queue_config()
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    counter = {'processed': 0}
+    counter_lock = threading.Lock()
+
+    logger.info(f"Worker {worker_id} démarré ({concurrency} tâche(s) en parallèle)")
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(f"{worker_id}#{slot}", config, stop_event, once, task_types, counter, counter_lock),
+            name=f"task-worker-{slot}",
+            daemon=True
+        )
+        for slot in range(max(1, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        logger.info("Arrêt demandé, fin des tâches en cours...")
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    logger.info(f"Worker {worker_id} arrêté: {counter['processed']} tâche(s) exécutée(s)")
+    return counter['processed']